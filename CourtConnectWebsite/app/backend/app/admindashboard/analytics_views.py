@@ -3,105 +3,108 @@ Dashboard Analytics & Oversight Views for Admin Dashboard
 Handles platform analytics, user activity, and booking oversight
 """
 
+import os
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from app.auth.permissions import IsAdminUser
+from app.auth.permissions import IsAdminUser, HasMetricsScrapeToken
 from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Sum, Avg, F, Q, FloatField, ExpressionWrapper, DurationField, Value
-from django.db.models.functions import Extract, Cast
-from django.http import HttpResponse
-from datetime import timedelta
+from django.http import FileResponse, HttpResponse
+from django.db.models import Count, Sum, F, Q, Value, CharField, TextField, BigIntegerField
+from datetime import datetime, timedelta
 from decimal import Decimal
-import csv
 
 from app.users.models import User
 from app.facilities.models import Facility
 from app.bookings.models import Booking
-from .models import Report, AdminActionLog, ManagerRequest, RefundRequest, ActivityLog
+from .models import Report, AdminActionLog, ManagerRequest, RefundRequest, ActivityLog, ExportJob, ProfileCapture
+from .serializers import ExportJobCreateSerializer, ExportJobSerializer, ProfileCaptureSerializer
+from .services import (
+    DailyMetricsService, ExportJobService, FlaggedUserService, ProfileCaptureService, RequestMetricsService,
+)
+from .exports import export_csv_response
 
 
 # ====== Phase 6: Admin Dashboard Overview ======
 
+DASHBOARD_OVERVIEW_CACHE_KEY = 'admindashboard:overview'
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def dashboard_overview(request):
     """
     Get admin dashboard overview with key metrics
     GET /api/admin/dashboard/overview/
+
+    The response is cached for DASHBOARD_CACHE_TTL seconds (0 disables caching).
     """
+    cached = cache.get(DASHBOARD_OVERVIEW_CACHE_KEY)
+    if cached is not None:
+        return Response(cached, status=status.HTTP_200_OK)
+
     now = timezone.now()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
     week_start = now - timedelta(days=7)
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
+    # Each table's metrics are computed in a single pass with filtered aggregates
+
     # User Statistics
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    suspended_users = User.objects.filter(is_active=False).count()
-    unverified_users = User.objects.filter(verification_status='unverified').count()
-    new_users_this_week = User.objects.filter(created_at__gte=week_start).count()
+    user_stats = User.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True)),
+        suspended=Count('pk', filter=Q(is_active=False)),
+        unverified=Count('pk', filter=Q(verification_status='unverified')),
+        new_this_week=Count('pk', filter=Q(created_at__gte=week_start)),
+    )
 
     # Manager Statistics
     from app.users.models import Manager
-    total_managers = Manager.objects.count()
-    active_managers = Manager.objects.filter(is_suspended=False, user__is_active=True).count()
-    suspended_managers = Manager.objects.filter(is_suspended=True).count()
+    manager_stats = Manager.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_suspended=False, user__is_active=True)),
+        suspended=Count('pk', filter=Q(is_suspended=True)),
+    )
 
     # Facility Statistics
-    total_facilities = Facility.objects.count()
-    active_facilities = Facility.objects.filter(is_active=True, is_suspended=False, approval_status='approved').count()
-    pending_facilities = Facility.objects.filter(approval_status='pending').count()
-    suspended_facilities = Facility.objects.filter(is_suspended=True).count()
-
-    # Booking Statistics
-    total_bookings = Booking.objects.count()
-    bookings_today = Booking.objects.filter(created_at__gte=today_start).count()
-    bookings_this_week = Booking.objects.filter(created_at__gte=week_start).count()
-    bookings_this_month = Booking.objects.filter(created_at__gte=month_start).count()
-
-    # Revenue Statistics (this month)
-    month_bookings = Booking.objects.filter(created_at__gte=month_start)
-    revenue_data = month_bookings.aggregate(
-        revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        ),
-        commission=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * F('commission_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
+    facility_stats = Facility.objects.aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True, is_suspended=False, approval_status='approved')),
+        pending_approval=Count('pk', filter=Q(approval_status='pending')),
+        suspended=Count('pk', filter=Q(is_suspended=True)),
     )
 
-    revenue_this_month = Decimal(str(revenue_data['revenue'] or 0))
-    commission_this_month = Decimal(str(revenue_data['commission'] or 0))
-
-    # Today's revenue
-    today_bookings = Booking.objects.filter(created_at__gte=today_start)
-    today_revenue_data = today_bookings.aggregate(
-        revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
+    # Booking and Revenue Statistics (today and this month folded into one aggregate)
+    booking_stats = Booking.objects.aggregate(
+        total=Count('pk'),
+        today=Count('pk', filter=Q(created_at__gte=today_start)),
+        this_week=Count('pk', filter=Q(created_at__gte=week_start)),
+        this_month=Count('pk', filter=Q(created_at__gte=month_start)),
+        revenue_today=Sum('total_amount', filter=Q(created_at__gte=today_start)),
+        revenue_this_month=Sum('total_amount', filter=Q(created_at__gte=month_start)),
+        commission_this_month=Sum('commission_amount', filter=Q(created_at__gte=month_start)),
     )
-    revenue_today = Decimal(str(today_revenue_data['revenue'] or 0))
+
+    revenue_today = booking_stats['revenue_today'] or Decimal('0')
+    revenue_this_month = booking_stats['revenue_this_month'] or Decimal('0')
+    commission_this_month = booking_stats['commission_this_month'] or Decimal('0')
 
     # Pending Actions
     pending_manager_requests = ManagerRequest.objects.filter(status='pending').count()
     pending_refunds = RefundRequest.objects.filter(status='pending').count()
-    open_reports = Report.objects.filter(status='open').count()
-    critical_reports = Report.objects.filter(status='open', severity='critical').count()
+    report_stats = Report.objects.filter(status='open').aggregate(
+        open=Count('pk'),
+        critical=Count('pk', filter=Q(severity='critical')),
+    )
+    open_reports = report_stats['open']
+    critical_reports = report_stats['critical']
+    pending_facilities = facility_stats['pending_approval']
 
     # Recent Admin Activity
     recent_actions = AdminActionLog.objects.select_related('admin_user').order_by('-created_at')[:10]
@@ -115,31 +118,16 @@ def dashboard_overview(request):
         'created_at': action.created_at.isoformat(),
     } for action in recent_actions]
 
-    return Response({
+    payload = {
         'data': {
-            'users': {
-                'total': total_users,
-                'active': active_users,
-                'suspended': suspended_users,
-                'unverified': unverified_users,
-                'new_this_week': new_users_this_week,
-            },
-            'managers': {
-                'total': total_managers,
-                'active': active_managers,
-                'suspended': suspended_managers,
-            },
-            'facilities': {
-                'total': total_facilities,
-                'active': active_facilities,
-                'pending_approval': pending_facilities,
-                'suspended': suspended_facilities,
-            },
+            'users': user_stats,
+            'managers': manager_stats,
+            'facilities': facility_stats,
             'bookings': {
-                'total': total_bookings,
-                'today': bookings_today,
-                'this_week': bookings_this_week,
-                'this_month': bookings_this_month,
+                'total': booking_stats['total'],
+                'today': booking_stats['today'],
+                'this_week': booking_stats['this_week'],
+                'this_month': booking_stats['this_month'],
             },
             'revenue': {
                 'today': round(revenue_today, 2),
@@ -156,7 +144,13 @@ def dashboard_overview(request):
             },
             'recent_admin_activity': recent_activity,
         }
-    }, status=status.HTTP_200_OK)
+    }
+
+    ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
+    if ttl:
+        cache.set(DASHBOARD_OVERVIEW_CACHE_KEY, payload, ttl)
+
+    return Response(payload, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -166,32 +160,23 @@ def platform_health(request):
     Get platform health metrics and growth trends
     GET /api/admin/analytics/platform-health/
     """
-    now = timezone.now()
+    # Weekly totals are summed from the daily rollup (8 weeks = 56 rows)
+    today = timezone.localdate()
+    daily = DailyMetricsService.get_range(today - timedelta(days=8 * 7 - 1), today)
 
     # Calculate weekly growth for last 8 weeks
     weeks_data = []
     for i in range(8):
-        week_start = now - timedelta(days=(i+1)*7)
-        week_end = now - timedelta(days=i*7)
-
-        week_users = User.objects.filter(created_at__gte=week_start, created_at__lt=week_end).count()
-        week_bookings = Booking.objects.filter(created_at__gte=week_start, created_at__lt=week_end).count()
-        week_revenue = Booking.objects.filter(created_at__gte=week_start, created_at__lt=week_end).aggregate(
-            revenue=Sum(
-                ExpressionWrapper(
-                    F('hourly_rate_snapshot') *
-                    Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                    output_field=FloatField()
-                )
-            )
-        )['revenue'] or 0
+        week_end = today - timedelta(days=i * 7)
+        week_start = week_end - timedelta(days=6)
+        week_rows = [daily[week_start + timedelta(days=d)] for d in range(7)]
 
         weeks_data.append({
-            'week_start': week_start.date().isoformat(),
-            'week_end': week_end.date().isoformat(),
-            'new_users': week_users,
-            'bookings': week_bookings,
-            'revenue': round(Decimal(str(week_revenue)), 2),
+            'week_start': week_start.isoformat(),
+            'week_end': week_end.isoformat(),
+            'new_users': sum(row.new_users for row in week_rows),
+            'bookings': sum(row.bookings for row in week_rows),
+            'revenue': round(sum((row.revenue for row in week_rows), Decimal('0')), 2),
         })
 
     weeks_data.reverse()  # Chronological order
@@ -288,73 +273,78 @@ def user_activity(request, user_id):
     }, status=status.HTTP_200_OK)
 
 
+FLAGGED_REASON_FILTERS = {
+    'cancellations': 'high_cancellation',
+    'reported': 'multiple_reports',
+    'reporter': 'excessive_reporting',
+}
+
+
+def _flagged_user_row(flag):
+    """Format one FlaggedUser row, listing every reason the user was flagged"""
+    reasons, details = [], []
+    if flag.high_cancellation:
+        reasons.append('High cancellation rate')
+        details.append(f'{flag.cancellation_rate:.1f}% cancellation rate')
+    if flag.multiple_reports:
+        reasons.append('Multiple reports')
+        details.append(f'{flag.reports_against} reports against user')
+    if flag.excessive_reporting:
+        reasons.append('Excessive report filing')
+        details.append(f'{flag.reports_filed} reports filed')
+
+    return {
+        'user_id': flag.user_id,
+        'email': flag.user.email,
+        'name': flag.user.name,
+        'reason': '; '.join(reasons),
+        'reasons': reasons,
+        'details': '; '.join(details),
+        'total_bookings': flag.total_bookings,
+        'cancelled_bookings': flag.cancelled_bookings,
+        'cancellation_rate': round(flag.cancellation_rate, 1),
+        'report_count': flag.reports_against,
+        'reports_filed': flag.reports_filed,
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def flagged_users(request):
     """
     Get list of flagged/suspicious users
-    GET /api/admin/users/flagged/
+    GET /api/admin/users/flagged/?reason=cancellations&page=1&pageSize=50
+
+    Reads the materialised FlaggedUser table (one row per user, refreshed by
+    FlaggedUserService when older than FLAGGED_USERS_REFRESH_SECONDS).
+    reason filters to cancellations, reported or reporter.
     """
-    # Define flagging criteria
-    now = timezone.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    page = max(1, int(request.query_params.get('page', 1)))
+    page_size = max(1, min(int(request.query_params.get('pageSize', 50)), 200))
 
-    flagged_users = []
-
-    # Users with high cancellation rate
-    users_with_bookings = User.objects.annotate(
-        total_bookings=Count('booking'),
-        cancelled_bookings=Count('booking', filter=Q(booking__status__status_name='cancelled'))
-    ).filter(total_bookings__gte=5)
-
-    for user in users_with_bookings:
-        if user.total_bookings > 0:
-            cancellation_rate = (user.cancelled_bookings / user.total_bookings) * 100
-            if cancellation_rate > 50:  # More than 50% cancellation
-                flagged_users.append({
-                    'user_id': user.user_id,
-                    'email': user.email,
-                    'name': user.name,
-                    'reason': 'High cancellation rate',
-                    'details': f'{cancellation_rate:.1f}% cancellation rate',
-                    'total_bookings': user.total_bookings,
-                    'cancelled_bookings': user.cancelled_bookings,
-                })
-
-    # Users with multiple reports against them
-    reported_users = User.objects.annotate(
-        report_count=Count('admin_actions_received')
-    ).filter(report_count__gte=3)
-
-    for user in reported_users:
-        flagged_users.append({
-            'user_id': user.user_id,
-            'email': user.email,
-            'name': user.name,
-            'reason': 'Multiple reports',
-            'details': f'{user.report_count} reports filed',
-            'report_count': user.report_count,
-        })
+    queryset = FlaggedUserService.get_queryset()
 
-    # Users who filed excessive reports (potential spam)
-    excessive_reporters = User.objects.annotate(
-        reports_filed=Count('reported_by')
-    ).filter(reports_filed__gte=10)
+    reason = request.query_params.get('reason')
+    if reason:
+        if reason not in FLAGGED_REASON_FILTERS:
+            return Response(
+                {'error': {'code': 'VALIDATION_ERROR', 'message': f"reason must be one of: {', '.join(FLAGGED_REASON_FILTERS)}"}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = queryset.filter(**{FLAGGED_REASON_FILTERS[reason]: True})
 
-    for user in excessive_reporters:
-        flagged_users.append({
-            'user_id': user.user_id,
-            'email': user.email,
-            'name': user.name,
-            'reason': 'Excessive report filing',
-            'details': f'{user.reports_filed} reports filed',
-            'reports_filed': user.reports_filed,
-        })
+    last_refreshed = FlaggedUserService.last_refreshed()
+    total_flagged = queryset.count()
+    offset = (page - 1) * page_size
+    flagged = [_flagged_user_row(flag) for flag in queryset[offset:offset + page_size]]
 
     return Response({
-        'data': flagged_users,
+        'data': flagged,
         'meta': {
-            'total_flagged': len(flagged_users),
+            'total_flagged': total_flagged,
+            'page': page,
+            'pageSize': page_size,
+            'refreshed_at': last_refreshed.isoformat() if last_refreshed else None,
         }
     }, status=status.HTTP_200_OK)
 
@@ -427,8 +417,8 @@ def booking_statistics(request):
     Get booking statistics
     GET /api/admin/bookings/stats/
     """
-    now = timezone.now()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
 
     total_bookings = Booking.objects.count()
 
@@ -438,31 +428,14 @@ def booking_statistics(request):
     )
     status_data = {item['status__status_name']: item['count'] for item in status_counts if item['status__status_name']}
 
-    # This month
-    month_bookings = Booking.objects.filter(created_at__gte=month_start)
-    month_count = month_bookings.count()
-
-    # Revenue
-    revenue_data = month_bookings.aggregate(
-        revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-    month_revenue = Decimal(str(revenue_data['revenue'] or 0))
+    # This month (from the daily rollup)
+    month_rows = DailyMetricsService.get_range(month_start, today).values()
+    month_count = sum(row.bookings for row in month_rows)
+    month_revenue = sum((row.revenue for row in month_rows), Decimal('0'))
+    month_hours = sum((row.booking_hours for row in month_rows), Decimal('0'))
 
     # Average duration
-    avg_duration = month_bookings.aggregate(
-        avg=Avg(
-            ExpressionWrapper(
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )['avg'] or 0
+    avg_duration = float(month_hours / month_count) if month_count else 0
 
     return Response({
         'data': {
@@ -520,31 +493,75 @@ def admin_action_logs(request):
     return paginator.get_paginated_response(log_data)
 
 
+# Columns shared by both branches of the unified audit log UNION ALL, in select order
+AUDIT_LOG_COLUMNS = [
+    'entry_created_at', 'entry_type', 'entry_id', 'entry_action', 'entry_user_id',
+    'entry_email', 'entry_target_id', 'entry_resource_type', 'entry_resource_id',
+    'entry_reason', 'entry_metadata',
+]
+
+
+def _keyset_filter(entry_type, cursor):
+    """
+    Build the "strictly after the cursor" filter for one branch of the union
+
+    Rows are ordered by (created_at, entry_type, entry_id) descending. Within a
+    branch entry_type is constant, so the tuple comparison collapses to a
+    condition on created_at and the primary key.
+    """
+    ts, cursor_type, cursor_id = cursor['ts'], cursor['type'], cursor['id']
+    if entry_type < cursor_type:
+        return Q(entry_created_at__lte=ts)
+    if entry_type > cursor_type:
+        return Q(entry_created_at__lt=ts)
+    return Q(entry_created_at__lt=ts) | Q(entry_created_at=ts, entry_id__lt=cursor_id)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def unified_audit_log(request):
     """
     Get unified audit log (combines ActivityLog and AdminActionLog)
     GET /api/admin/audit-log/?q=search&action=login&adminId=123&targetUserId=456&page=1&pageSize=10
+    GET /api/admin/audit-log/?cursor=<meta.nextCursor>&pageSize=10
 
     This endpoint provides a unified view of all platform activities including:
     - User actions (login, bookings, profile changes, etc.)
     - Manager actions (facility/court CRUD operations)
     - Admin actions (user moderation, approvals, etc.)
+
+    Both tables are merged in the database with UNION ALL and ordered by
+    created_at, so only one page of rows is ever fetched. Passing the
+    nextCursor from a previous response uses keyset pagination, which costs
+    the same on every page; page numbers are still accepted for compatibility.
+    The total is a planner estimate on large result sets (see totalIsApproximate).
     """
-    from itertools import chain
-    from operator import attrgetter
+    from app.utils.pagination import encode_cursor, decode_cursor, approximate_count
 
     # Get query parameters
     q = request.query_params.get('q', '').strip()
     action_filter = request.query_params.get('action', '').strip()
     admin_id = request.query_params.get('adminId', '').strip()
     target_user_id = request.query_params.get('targetUserId', '').strip()
-    page_num = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('pageSize', 10))
+    cursor_param = request.query_params.get('cursor', '').strip()
+    page_num = max(1, int(request.query_params.get('page', 1)))
+    page_size = max(1, min(int(request.query_params.get('pageSize', 10)), 200))
+
+    cursor = None
+    if cursor_param:
+        try:
+            cursor = decode_cursor(cursor_param)
+            cursor['ts'] = timezone.datetime.fromisoformat(cursor['ts'])
+            cursor['id'] = int(cursor['id'])
+            cursor['type'] = str(cursor['type'])
+        except (ValueError, KeyError, TypeError):
+            return Response(
+                {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid cursor'}},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
     # Query ActivityLog
-    activity_query = ActivityLog.objects.select_related('user').all()
+    activity_query = ActivityLog.objects.all()
     if action_filter:
         activity_query = activity_query.filter(action__icontains=action_filter)
     if admin_id:
@@ -556,9 +573,22 @@ def unified_audit_log(request):
             Q(action__icontains=q) |
             Q(resource_type__icontains=q)
         )
+    activity_query = activity_query.annotate(
+        entry_created_at=F('created_at'),
+        entry_type=Value('activity', output_field=CharField()),
+        entry_id=F('activity_id'),
+        entry_action=F('action'),
+        entry_user_id=F('user_id'),
+        entry_email=F('user__email'),
+        entry_target_id=Value(None, output_field=BigIntegerField()),
+        entry_resource_type=F('resource_type'),
+        entry_resource_id=F('resource_id'),
+        entry_reason=Value(None, output_field=TextField()),
+        entry_metadata=F('metadata'),
+    )
 
     # Query AdminActionLog
-    admin_query = AdminActionLog.objects.select_related('admin_user', 'target_user').all()
+    admin_query = AdminActionLog.objects.all()
     if action_filter:
         admin_query = admin_query.filter(action_name__icontains=action_filter)
     if admin_id:
@@ -571,54 +601,66 @@ def unified_audit_log(request):
             Q(reason__icontains=q) |
             Q(resource_type__icontains=q)
         )
+    admin_query = admin_query.annotate(
+        entry_created_at=F('created_at'),
+        entry_type=Value('admin_action', output_field=CharField()),
+        entry_id=F('action_id'),
+        entry_action=F('action_name'),
+        entry_user_id=F('admin_user_id'),
+        entry_email=F('admin_user__email'),
+        entry_target_id=F('target_user_id'),
+        entry_resource_type=F('resource_type'),
+        entry_resource_id=F('resource_id'),
+        entry_reason=F('reason'),
+        entry_metadata=F('metadata'),
+    )
 
-    # Convert to unified format
-    unified_logs = []
-
-    # Add ActivityLog entries
-    for log in activity_query:
-        unified_logs.append({
-            'ts': log.created_at.isoformat(),
-            'action': log.action,
-            'admin_user_id': log.user.user_id if log.user else None,
-            'admin_email': log.user.email if log.user else None,
-            'target_user_id': log.metadata.get('target_user_id') if log.metadata else None,
-            'resource_type': log.resource_type,
-            'resource_id': log.resource_id,
-            'reason': None,  # ActivityLog doesn't have reason field
-            'metadata': log.metadata or {},
-            'log_type': 'activity',
-            'created_at_timestamp': log.created_at.timestamp(),  # For sorting
-        })
-
-    # Add AdminActionLog entries
-    for log in admin_query:
-        unified_logs.append({
-            'ts': log.created_at.isoformat(),
-            'action': log.action_name,
-            'admin_user_id': log.admin_user.user_id if log.admin_user else None,
-            'admin_email': log.admin_user.email if log.admin_user else None,
-            'target_user_id': log.target_user.user_id if log.target_user else None,
-            'resource_type': log.resource_type,
-            'resource_id': log.resource_id,
-            'reason': log.reason,
-            'metadata': log.metadata or {},
-            'log_type': 'admin_action',
-            'created_at_timestamp': log.created_at.timestamp(),  # For sorting
-        })
+    def merged(activity_qs, admin_qs):
+        return activity_qs.values(*AUDIT_LOG_COLUMNS).union(
+            admin_qs.values(*AUDIT_LOG_COLUMNS), all=True
+        )
 
-    # Sort by timestamp (newest first)
-    unified_logs.sort(key=lambda x: x['created_at_timestamp'], reverse=True)
+    total, total_is_approximate = approximate_count(merged(activity_query, admin_query))
 
-    # Remove the timestamp field used for sorting
-    for log in unified_logs:
-        del log['created_at_timestamp']
+    if cursor:
+        activity_query = activity_query.filter(_keyset_filter('activity', cursor))
+        admin_query = admin_query.filter(_keyset_filter('admin_action', cursor))
+        offset = 0
+    else:
+        offset = (page_num - 1) * page_size
 
-    # Pagination
-    total = len(unified_logs)
-    start = (page_num - 1) * page_size
-    end = start + page_size
-    paginated_logs = unified_logs[start:end]
+    # Fetch one extra row to know whether another page exists
+    rows = list(
+        merged(activity_query, admin_query)
+        .order_by('-entry_created_at', '-entry_type', '-entry_id')[offset:offset + page_size + 1]
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    paginated_logs = [{
+        'ts': row['entry_created_at'].isoformat(),
+        'action': row['entry_action'],
+        'admin_user_id': row['entry_user_id'],
+        'admin_email': row['entry_email'],
+        'target_user_id': (
+            row['entry_target_id'] if row['entry_type'] == 'admin_action'
+            else (row['entry_metadata'] or {}).get('target_user_id')
+        ),
+        'resource_type': row['entry_resource_type'],
+        'resource_id': row['entry_resource_id'],
+        'reason': row['entry_reason'],
+        'metadata': row['entry_metadata'] or {},
+        'log_type': row['entry_type'],
+    } for row in rows]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor({
+            'ts': last['entry_created_at'].isoformat(),
+            'type': last['entry_type'],
+            'id': last['entry_id'],
+        })
 
     return Response({
         'data': paginated_logs,
@@ -626,6 +668,8 @@ def unified_audit_log(request):
             'page': page_num,
             'pageSize': page_size,
             'total': total,
+            'totalIsApproximate': total_is_approximate,
+            'nextCursor': next_cursor,
         }
     }, status=status.HTTP_200_OK)
 
@@ -651,17 +695,12 @@ def system_reports(request):
     else:
         days = 7
 
-    now = timezone.now()
-    start_date = now - timedelta(days=days)
+    end_date = timezone.localdate()
+    start_date = end_date - timedelta(days=days)
 
     # Generate date series
-    from datetime import date
-    dates = []
-    current_date = start_date.date()
-    end_date = now.date()
-    while current_date <= end_date:
-        dates.append(current_date.isoformat())
-        current_date += timedelta(days=1)
+    day_list = [start_date + timedelta(days=i) for i in range(days + 1)]
+    dates = [day.isoformat() for day in day_list]
 
     # Calculate KPI cards
     open_reports = Report.objects.filter(status__in=['open', 'in_review']).count()
@@ -669,45 +708,28 @@ def system_reports(request):
     # Simple health check (always OK for now - can be enhanced with actual health checks)
     health_ok = 1
 
-    # Average latency (mock value - would need actual metrics tracking)
-    avg_latency_ms = 120
-
-    # Error rate (mock value - would need actual error tracking)
-    error_rate = 0.5
-
-    # Build time series data
-    active_users_series = []
-    new_reports_series = []
-    errors_series = []
-
-    for day_date in dates:
-        day_start = timezone.datetime.strptime(day_date, '%Y-%m-%d').replace(tzinfo=timezone.get_current_timezone())
-        day_end = day_start + timedelta(days=1)
-
-        # Count active users (users with activity on that day)
-        active_count = ActivityLog.objects.filter(
-            created_at__gte=day_start,
-            created_at__lt=day_end,
-            user__isnull=False
-        ).values('user').distinct().count()
-        active_users_series.append(active_count)
+    # Latency and error rate from the request metrics time series
+    range_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    requests_summary = RequestMetricsService.overall(range_start, timezone.now())
 
-        # Count new reports
-        reports_count = Report.objects.filter(
-            created_at__gte=day_start,
-            created_at__lt=day_end
-        ).count()
-        new_reports_series.append(reports_count)
+    # Build time series data from the daily rollup
+    daily = DailyMetricsService.get_range(start_date, end_date)
+    active_users_series = [daily[day].active_users for day in day_list]
+    new_reports_series = [daily[day].new_reports for day in day_list]
 
-        # Errors (mock data for now - would need actual error tracking)
-        errors_series.append(0)
+    # Server errors (5xx) per day
+    errors_series = RequestMetricsService.daily_series(start_date, end_date)['errors']
 
     return Response({
         'data': {
             'cards': {
                 'healthOk': health_ok,
-                'avgLatencyMs': avg_latency_ms,
-                'errorRate': error_rate,
+                'avgLatencyMs': requests_summary['avg_latency_ms'],
+                'p50LatencyMs': requests_summary['p50_latency_ms'],
+                'p95LatencyMs': requests_summary['p95_latency_ms'],
+                'p99LatencyMs': requests_summary['p99_latency_ms'],
+                'errorRate': requests_summary['error_rate'],
+                'requestCount': requests_summary['requests'],
                 'openModeration': open_reports
             },
             'series': {
@@ -719,164 +741,268 @@ def system_reports(request):
         }
     }, status=status.HTTP_200_OK)
 
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# (metric name, type, help text, summary key) exported per endpoint and overall
+PROMETHEUS_METRICS = [
+    ('courtconnect_http_requests', 'gauge', 'Requests handled in the window', 'requests'),
+    ('courtconnect_http_server_errors', 'gauge', 'Responses with a 5xx status in the window', 'server_errors'),
+    ('courtconnect_http_client_errors', 'gauge', 'Responses with a 4xx status in the window', 'client_errors'),
+    ('courtconnect_http_error_rate_percent', 'gauge', 'Share of requests answered with a 5xx status', 'error_rate'),
+    ('courtconnect_http_latency_avg_ms', 'gauge', 'Mean request latency in milliseconds', 'avg_latency_ms'),
+    ('courtconnect_db_queries_per_request', 'gauge', 'Mean SQL statements per request', 'avg_db_queries'),
+    ('courtconnect_db_time_per_request_ms', 'gauge', 'Mean SQL time per request in milliseconds', 'avg_db_time_ms'),
+]
+
+
+def _prometheus_labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser | HasMetricsScrapeToken])
+def metrics_prometheus(request):
+    """
+    Request metrics in the Prometheus text exposition format
+    GET /api/admin/metrics/?minutes=5
+
+    Values are gauges over the trailing window (default 5 minutes), computed
+    from the same request_metrics table as the system health cards. Unlabelled
+    series cover all endpoints. Scrapers authenticate with
+    ``Authorization: Bearer <METRICS_SCRAPE_TOKEN>``.
+    """
+    try:
+        minutes = int(request.query_params.get('minutes', 5))
+    except (TypeError, ValueError):
+        minutes = 0
+    if not 1 <= minutes <= 1440:
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': 'minutes must be an integer between 1 and 1440'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    end = timezone.now()
+    start = end - timedelta(minutes=minutes)
+    overall = RequestMetricsService.overall(start, end)
+    endpoints = RequestMetricsService.by_endpoint(start, end)
+
+    lines = []
+    for name, metric_type, help_text, key in PROMETHEUS_METRICS:
+        lines.append(f'# HELP {name} {help_text} (last {minutes}m)')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {overall[key]}')
+        for (endpoint, method), summary in endpoints.items():
+            lines.append(f'{name}{_prometheus_labels(endpoint=endpoint, method=method)} {summary[key]}')
+
+    name = 'courtconnect_http_latency_ms'
+    lines.append(f'# HELP {name} Request latency percentiles in milliseconds (last {minutes}m)')
+    lines.append(f'# TYPE {name} summary')
+    for series, labels in [(overall, {}), *[
+        (summary, {'endpoint': endpoint, 'method': method}) for (endpoint, method), summary in endpoints.items()
+    ]]:
+        for quantile_name, quantile in RequestMetricsService.QUANTILES:
+            lines.append(f'{name}{_prometheus_labels(**labels, quantile=quantile)} {series[f"{quantile_name}_latency_ms"]}')
+        lines.append(f'{name}_sum{_prometheus_labels(**labels)} {series["latency_sum_ms"]}')
+        lines.append(f'{name}_count{_prometheus_labels(**labels)} {series["requests"]}')
+
+    return HttpResponse('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def export_activity_report_csv(request):
     """
     Export activity logs as CSV file
-    GET /api/admin/reports/export/activity/?days=30
+    GET /api/admin/reports/export/activity/?days=30&compress=gzip
 
-    Downloads a CSV file containing all user activities for the specified time period
+    Downloads a CSV file containing all user activities for the specified time period.
+    Rows are streamed from a server-side cursor; pass compress=gzip for a .csv.gz download.
+    For very large ranges use the background export jobs instead.
     """
-    # Get time period (default 30 days)
-    days = int(request.query_params.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
+    return export_csv_response(request, 'activity', {'days': request.query_params.get('days', 30)})
 
-    # Query activity logs
-    activities = ActivityLog.objects.filter(
-        created_at__gte=start_date
-    ).select_related('user').order_by('-created_at')
 
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="activity_report_{timezone.now().strftime("%Y%m%d")}.csv"'
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_admin_actions_csv(request):
+    """
+    Export admin actions as CSV file
+    GET /api/admin/reports/export/admin-actions/?days=30&compress=gzip
 
-    writer = csv.writer(response)
-    writer.writerow(['Timestamp', 'User ID', 'User Email', 'User Name', 'Action', 'Resource Type', 'Resource ID', 'Metadata'])
+    Downloads a CSV file containing all admin actions for the specified time period
+    """
+    return export_csv_response(request, 'admin_actions', {'days': request.query_params.get('days', 30)})
 
-    for activity in activities:
-        writer.writerow([
-            activity.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            activity.user.user_id if activity.user else 'N/A',
-            activity.user.email if activity.user else 'N/A',
-            activity.user.name if activity.user else 'N/A',
-            activity.action,
-            activity.resource_type or 'N/A',
-            activity.resource_id or 'N/A',
-            str(activity.metadata) if activity.metadata else '',
-        ])
 
-    return response
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_user_statistics_csv(request):
+    """
+    Export user statistics as CSV file
+    GET /api/admin/reports/export/users/?compress=gzip
+
+    Downloads a CSV file containing all users with their statistics
+    """
+    return export_csv_response(request, 'users', {})
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
-def export_admin_actions_csv(request):
+def export_booking_statistics_csv(request):
     """
-    Export admin actions as CSV file
-    GET /api/admin/reports/export/admin-actions/?days=30
+    Export booking statistics as CSV file
+    GET /api/admin/reports/export/bookings/?days=30&compress=gzip
 
-    Downloads a CSV file containing all admin actions for the specified time period
+    Downloads a CSV file containing all bookings for the specified time period
     """
-    # Get time period (default 30 days)
-    days = int(request.query_params.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
+    return export_csv_response(request, 'bookings', {'days': request.query_params.get('days', 30)})
 
-    # Query admin action logs
-    actions = AdminActionLog.objects.filter(
-        created_at__gte=start_date
-    ).select_related('admin_user', 'target_user').order_by('-created_at')
 
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="admin_actions_report_{timezone.now().strftime("%Y%m%d")}.csv"'
+# ====== Background Export Jobs ======
 
-    writer = csv.writer(response)
-    writer.writerow(['Timestamp', 'Admin Email', 'Action Name', 'Resource Type', 'Resource ID', 'Target User', 'Reason', 'Financial Impact', 'Metadata'])
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def create_export_job(request):
+    """
+    Queue a background export
+    POST /api/admin/reports/export-jobs/
+    Body: {"type": "activity", "format": "csv", "params": {"days": 365}}
 
-    for action in actions:
-        writer.writerow([
-            action.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            action.admin_user.email if action.admin_user else 'N/A',
-            action.action_name,
-            action.resource_type,
-            action.resource_id,
-            action.target_user.email if action.target_user else 'N/A',
-            action.reason[:200] if action.reason else '',  # Truncate long reasons
-            str(action.financial_impact) if action.financial_impact else 'N/A',
-            str(action.metadata) if action.metadata else '',
-        ])
+    The file is produced by the run_export_worker command. An identical request
+    made within EXPORT_JOB_REUSE_SECONDS returns the existing job instead
+    (meta.reused is true); a completed job is returned with 200, otherwise 202.
+    """
+    serializer = ExportJobCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': 'Invalid export request', 'details': serializer.errors}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-    return response
+    try:
+        job, reused = ExportJobService.request_export(
+            serializer.validated_data['type'],
+            serializer.validated_data['params'],
+            file_format=serializer.validated_data['format'],
+            user=request.user,
+        )
+    except ValueError as exc:
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': str(exc)}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'data': ExportJobSerializer(job, context={'request': request}).data,
+        'meta': {'reused': reused}
+    }, status=status.HTTP_200_OK if job.status == 'completed' else status.HTTP_202_ACCEPTED)
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
-def export_user_statistics_csv(request):
+def export_job_status(request, job_id):
     """
-    Export user statistics as CSV file
-    GET /api/admin/reports/export/users/
-
-    Downloads a CSV file containing all users with their statistics
+    Get the status of a background export
+    GET /api/admin/reports/export-jobs/{job_id}/
     """
-    # Get all users with annotations
-    users = User.objects.annotate(
-        total_bookings=Count('booking'),
-        cancelled_bookings=Count('booking', filter=Q(booking__status__status_name='cancelled'))
-    ).order_by('-created_at')
+    job = get_object_or_404(ExportJob.objects.select_related('requested_by'), job_id=job_id)
+    return Response({
+        'data': ExportJobSerializer(job, context={'request': request}).data
+    }, status=status.HTTP_200_OK)
 
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="user_statistics_{timezone.now().strftime("%Y%m%d")}.csv"'
 
-    writer = csv.writer(response)
-    writer.writerow(['User ID', 'Name', 'Email', 'Phone', 'Verification Status', 'Is Active', 'Is Admin', 'MFA Enabled', 'Total Bookings', 'Cancelled Bookings', 'Created At'])
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def download_export_job(request, job_id):
+    """
+    Download the artefact of a completed export
+    GET /api/admin/reports/export-jobs/{job_id}/download/
+    """
+    job = get_object_or_404(ExportJob, job_id=job_id)
 
-    for user in users:
-        writer.writerow([
-            user.user_id,
-            user.name,
-            user.email,
-            user.phone_number or 'N/A',
-            user.verification_status,
-            'Yes' if user.is_active else 'No',
-            'Yes' if user.is_admin else 'No',
-            'Yes' if user.mfa_enabled else 'No',
-            user.total_bookings,
-            user.cancelled_bookings,
-            user.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        ])
+    if job.status != 'completed':
+        return Response(
+            {'error': {'code': 'EXPORT_NOT_READY', 'message': f'Export is {job.status}'}},
+            status=status.HTTP_409_CONFLICT
+        )
+    if not ExportJobService.artefact_exists(job):
+        return Response(
+            {'error': {'code': 'EXPORT_EXPIRED', 'message': 'Export file is no longer available'}},
+            status=status.HTTP_410_GONE
+        )
 
-    return response
+    content_type = 'application/gzip' if job.file_format == 'csv' else 'application/vnd.apache.parquet'
+    return FileResponse(
+        open(ExportJobService.artefact_path(job), 'rb'),
+        as_attachment=True,
+        filename=job.file_name,
+        content_type=content_type,
+    )
 
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
-def export_booking_statistics_csv(request):
+def profile_captures(request):
     """
-    Export booking statistics as CSV file
-    GET /api/admin/reports/export/bookings/?days=30
+    Slowest recent request profiles per URL name
+    GET /api/admin/profiles/?hours=24&limit=5&url_name=managers:manager-overview
 
-    Downloads a CSV file containing all bookings for the specified time period
+    Captures are recorded by ProfilingMiddleware when PROFILING_ENABLED is
+    set. Groups are ordered by their slowest capture; each lists up to
+    `limit` captures, slowest first, with a link to the JSON artefact.
+    """
+    try:
+        hours = int(request.query_params.get('hours', 24))
+        limit = int(request.query_params.get('limit', 5))
+    except (TypeError, ValueError):
+        hours = limit = 0
+    if not 1 <= hours <= 24 * 30 or not 1 <= limit <= 50:
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': 'hours must be between 1 and 720 and limit between 1 and 50'}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    since = timezone.now() - timedelta(hours=hours)
+    groups = ProfileCaptureService.slowest_by_url_name(
+        since, per_url_name=limit, url_name=request.query_params.get('url_name') or None
+    )
+    for group in groups:
+        group['captures'] = ProfileCaptureSerializer(group['captures'], many=True, context={'request': request}).data
+
+    return Response({
+        'data': groups,
+        'meta': {
+            'since': since.isoformat(),
+            'hours': hours,
+            'limit': limit,
+            'profiling_enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        }
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def download_profile_capture(request, capture_id):
     """
-    # Get time period (default 30 days)
-    days = int(request.query_params.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
-
-    # Query bookings
-    bookings = Booking.objects.filter(
-        created_at__gte=start_date
-    ).select_related('user', 'court__facility', 'status').order_by('-created_at')
-
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="booking_statistics_{timezone.now().strftime("%Y%m%d")}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Booking ID', 'User Email', 'Facility Name', 'Court Name', 'Start Time', 'End Time', 'Hourly Rate', 'Commission Rate', 'Status', 'Created At'])
-
-    for booking in bookings:
-        writer.writerow([
-            booking.booking_id,
-            booking.user.email,
-            booking.court.facility.facility_name,
-            booking.court.name,
-            booking.start_time.strftime('%Y-%m-%d %H:%M:%S'),
-            booking.end_time.strftime('%Y-%m-%d %H:%M:%S'),
-            str(booking.hourly_rate_snapshot),
-            str(booking.commission_rate_snapshot),
-            booking.status.status_name if booking.status else 'N/A',
-            booking.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-        ])
-
-    return response
+    Download a request profile as JSON
+    GET /api/admin/profiles/{capture_id}/download/
+    """
+    capture = get_object_or_404(ProfileCapture, capture_id=capture_id)
+    path = ProfileCaptureService.artefact_path(capture)
+    if not os.path.exists(path):
+        return Response(
+            {'error': {'code': 'PROFILE_EXPIRED', 'message': 'Profile file is no longer available'}},
+            status=status.HTTP_410_GONE
+        )
+
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=os.path.basename(capture.file_path),
+        content_type='application/json',
+    )
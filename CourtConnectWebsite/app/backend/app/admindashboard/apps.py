@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class AdmindashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app.admindashboard'
\ No newline at end of file
+    name = 'app.admindashboard'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import app.admindashboard.signals  # noqa: F401
@@ -0,0 +1,274 @@
+"""
+Admin report exports
+Row builders shared by the streaming CSV endpoints and the background export worker
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from app.users.models import User
+from app.bookings.models import Booking
+from app.utils.exports import EXPORT_CHUNK_SIZE, stream_csv_response, wants_gzip
+from .models import ActivityLog, AdminActionLog
+
+
+CSV_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+DEFAULT_EXPORT_DAYS = 30
+MAX_EXPORT_DAYS = 3650
+
+COMMISSION_PERIODS = ('week', 'month', 'year', 'all')
+
+
+def _csv_timestamp(value):
+    return value.strftime(CSV_TIMESTAMP_FORMAT) if value else ''
+
+
+def _yes_no(value):
+    return 'Yes' if value else 'No'
+
+
+def _parse_days(params):
+    try:
+        days = int(params.get('days', DEFAULT_EXPORT_DAYS))
+    except (TypeError, ValueError):
+        raise ValueError('days must be an integer')
+    if not 1 <= days <= MAX_EXPORT_DAYS:
+        raise ValueError(f'days must be between 1 and {MAX_EXPORT_DAYS}')
+    return days
+
+
+def activity_rows(params):
+    """Activity log rows for the last params['days'] days, newest first"""
+    start_date = timezone.now() - timedelta(days=params['days'])
+
+    activities = ActivityLog.objects.filter(
+        created_at__gte=start_date
+    ).order_by('-created_at').values_list(
+        'created_at', 'user_id', 'user__email', 'user__name',
+        'action', 'resource_type', 'resource_id', 'metadata',
+    )
+
+    return (
+        [
+            _csv_timestamp(created_at),
+            user_id if user_id else 'N/A',
+            email if user_id else 'N/A',
+            name if user_id else 'N/A',
+            action,
+            resource_type or 'N/A',
+            resource_id or 'N/A',
+            str(metadata) if metadata else '',
+        ]
+        for created_at, user_id, email, name, action, resource_type, resource_id, metadata
+        in activities.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def admin_action_rows(params):
+    """Admin action rows for the last params['days'] days, newest first"""
+    start_date = timezone.now() - timedelta(days=params['days'])
+
+    actions = AdminActionLog.objects.filter(
+        created_at__gte=start_date
+    ).order_by('-created_at').values_list(
+        'created_at', 'admin_user__email', 'action_name', 'resource_type', 'resource_id',
+        'target_user__email', 'reason', 'financial_impact', 'metadata',
+    )
+
+    return (
+        [
+            _csv_timestamp(created_at),
+            admin_email or 'N/A',
+            action_name,
+            resource_type,
+            resource_id,
+            target_email or 'N/A',
+            reason[:200] if reason else '',  # Truncate long reasons
+            str(financial_impact) if financial_impact else 'N/A',
+            str(metadata) if metadata else '',
+        ]
+        for (created_at, admin_email, action_name, resource_type, resource_id,
+             target_email, reason, financial_impact, metadata)
+        in actions.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def user_rows(params):
+    """One row per user with booking counts, newest first"""
+    users = User.objects.annotate(
+        total_bookings=Count('booking'),
+        cancelled_bookings=Count('booking', filter=Q(booking__status__status_name='cancelled'))
+    ).order_by('-created_at').values_list(
+        'user_id', 'name', 'email', 'phone_number', 'verification_status',
+        'is_active', 'is_admin', 'mfa_enabled', 'total_bookings', 'cancelled_bookings', 'created_at',
+    )
+
+    return (
+        [
+            user_id,
+            name,
+            email,
+            phone_number or 'N/A',
+            verification_status,
+            _yes_no(is_active),
+            _yes_no(is_admin),
+            _yes_no(mfa_enabled),
+            total_bookings,
+            cancelled_bookings,
+            _csv_timestamp(created_at),
+        ]
+        for (user_id, name, email, phone_number, verification_status, is_active, is_admin,
+             mfa_enabled, total_bookings, cancelled_bookings, created_at)
+        in users.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def booking_rows(params):
+    """Booking rows for the last params['days'] days, newest first"""
+    start_date = timezone.now() - timedelta(days=params['days'])
+
+    bookings = Booking.objects.filter(
+        created_at__gte=start_date
+    ).order_by('-created_at').values_list(
+        'booking_id', 'user__email', 'court__facility__facility_name', 'court__name',
+        'start_time', 'end_time', 'hourly_rate_snapshot', 'commission_rate_snapshot',
+        'status__status_name', 'created_at',
+    )
+
+    return (
+        [
+            booking_id,
+            user_email,
+            facility_name,
+            court_name,
+            _csv_timestamp(start_time),
+            _csv_timestamp(end_time),
+            str(hourly_rate),
+            str(commission_rate),
+            status_name or 'N/A',
+            _csv_timestamp(created_at),
+        ]
+        for (booking_id, user_email, facility_name, court_name, start_time, end_time,
+             hourly_rate, commission_rate, status_name, created_at)
+        in bookings.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def commission_rows(params):
+    """One row per facility with revenue and commission for params['period']"""
+    # Imported here because financial_views imports this module
+    from .financial_views import _commission_bookings, _commission_by_facility, _commission_row
+
+    grouped = _commission_by_facility(_commission_bookings(params['period']), params['sort'])
+    return (
+        [
+            item['facility_id'],
+            item['facility_name'],
+            item['manager_name'],
+            item['commission_rate'],
+            item['booking_count'],
+            item['total_revenue'],
+            item['commission_collected'],
+            item['manager_payout'],
+        ]
+        for item in map(_commission_row, grouped.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    )
+
+
+EXPORTS = {
+    'activity': {
+        'filename': 'activity_report',
+        'header': ['Timestamp', 'User ID', 'User Email', 'User Name', 'Action', 'Resource Type', 'Resource ID', 'Metadata'],
+        'rows': activity_rows,
+    },
+    'admin_actions': {
+        'filename': 'admin_actions_report',
+        'header': ['Timestamp', 'Admin Email', 'Action Name', 'Resource Type', 'Resource ID', 'Target User', 'Reason', 'Financial Impact', 'Metadata'],
+        'rows': admin_action_rows,
+    },
+    'users': {
+        'filename': 'user_statistics',
+        'header': ['User ID', 'Name', 'Email', 'Phone', 'Verification Status', 'Is Active', 'Is Admin', 'MFA Enabled', 'Total Bookings', 'Cancelled Bookings', 'Created At'],
+        'rows': user_rows,
+    },
+    'bookings': {
+        'filename': 'booking_statistics',
+        'header': ['Booking ID', 'User Email', 'Facility Name', 'Court Name', 'Start Time', 'End Time', 'Hourly Rate', 'Commission Rate', 'Status', 'Created At'],
+        'rows': booking_rows,
+    },
+    'commission': {
+        'filename': 'commission_breakdown',
+        'header': ['Facility ID', 'Facility Name', 'Manager', 'Commission Rate', 'Bookings',
+                   'Total Revenue', 'Commission Collected', 'Manager Payout'],
+        'rows': commission_rows,
+    },
+}
+
+
+def normalize_export_params(export_type, params):
+    """
+    Validate export parameters and fill in defaults
+
+    The result is canonical, so identical requests produce identical dicts
+    (used to reuse artefacts from earlier export jobs).
+
+    Raises:
+        ValueError: If the export type or a parameter is invalid
+    """
+    if export_type not in EXPORTS:
+        raise ValueError(f"Unknown export type: {export_type}. Choose from: {', '.join(EXPORTS)}")
+
+    params = params or {}
+    if export_type in ('activity', 'admin_actions', 'bookings'):
+        return {'days': _parse_days(params)}
+
+    if export_type == 'commission':
+        period = params.get('period', 'month')
+        if period not in COMMISSION_PERIODS:
+            raise ValueError(f"period must be one of: {', '.join(COMMISSION_PERIODS)}")
+        return {'period': period, 'sort': params.get('sort', '-commission_collected')}
+
+    return {}
+
+
+def build_export(export_type, params):
+    """
+    Resolve an export into its file name stem, header and lazy row iterator
+
+    Args:
+        export_type: Key of EXPORTS
+        params: Raw parameters (query string values or job params)
+
+    Returns:
+        Tuple of (filename, header, rows) where filename has a .csv extension
+    """
+    params = normalize_export_params(export_type, params)
+    definition = EXPORTS[export_type]
+
+    stem = definition['filename']
+    if export_type == 'commission':
+        stem = f"{stem}_{params['period']}"
+    filename = f'{stem}_{timezone.now().strftime("%Y%m%d")}.csv'
+
+    return filename, definition['header'], definition['rows'](params)
+
+
+def export_csv_response(request, export_type, params):
+    """
+    Stream one of the admin exports as CSV (gzip when ?compress=gzip)
+
+    Returns a 400 VALIDATION_ERROR response for invalid parameters.
+    """
+    try:
+        filename, header, rows = build_export(export_type, params)
+    except ValueError as exc:
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': str(exc)}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return stream_csv_response(filename, header, rows, gzip=wants_gzip(request))
@@ -9,17 +9,19 @@ from rest_framework.response import Response
 from app.auth.permissions import IsAdminUser
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Sum, Avg, F, Q, FloatField, ExpressionWrapper
-from django.db.models.functions import ExtractHour, Extract, Cast
+from django.db.models import Sum, Avg, Q
 from datetime import timedelta
+from zoneinfo import ZoneInfo
 from decimal import Decimal
 
 from app.facilities.models import Facility, Court
 from app.bookings.models import Booking
+from app.utils.occupancy import occupancy_report, occupancy_window
 from .models import FacilitySuspension, CommissionAdjustment, AdminActionLog
+from .services import FacilityAnalyticsService, RefundBatchService
 from .serializers import (
     FacilitySuspensionSerializer, FacilityUnsuspensionSerializer,
-    CommissionAdjustmentSerializer, FacilityAnalyticsSerializer
+    CommissionAdjustmentSerializer, FacilityAnalyticsSerializer, RefundBatchSerializer
 )
 
 
@@ -32,6 +34,10 @@ def suspend_facility(request, facility_id):
     Suspend a facility
     POST /api/admin/facilities/{facility_id}/suspend/
     Body: { "reason": "Policy violation...", "duration_days": 30 }
+
+    Confirmed upcoming bookings are cancelled and refunded by a background
+    refund batch; data.refund_batch links to its progress (null when there
+    was nothing to refund).
     """
     serializer = FacilitySuspensionSerializer(data=request.data)
     if not serializer.is_valid():
@@ -81,6 +87,8 @@ def suspend_facility(request, facility_id):
         }
     )
 
+    refund_batch = RefundBatchService.for_suspension(suspension, request.user)
+
     return Response({
         'detail': 'Facility suspended successfully',
         'data': {
@@ -88,6 +96,7 @@ def suspend_facility(request, facility_id):
             'facility_id': facility.facility_id,
             'facility_name': facility.facility_name,
             'suspended_until': expires_at.isoformat() if expires_at else 'Indefinite',
+            'refund_batch': RefundBatchSerializer(refund_batch, context={'request': request}).data if refund_batch else None,
         }
     }, status=status.HTTP_200_OK)
 
@@ -163,99 +172,29 @@ def facility_analytics(request, facility_id):
     """
     facility = get_object_or_404(Facility.objects.select_related('manager__user'), facility_id=facility_id)
 
-    # Get courts
-    courts = Court.objects.filter(facility=facility)
-    total_courts = courts.count()
-    active_courts = courts.filter(is_active=True).count()
-
-    # Get all bookings for this facility
-    bookings = Booking.objects.filter(
-        court__facility=facility
-    ).select_related('status', 'court__sport_type')
-
-    total_bookings = bookings.count()
-
-    # Count bookings by status
-    completed_bookings = bookings.filter(status__status_name='confirmed').count()
-    cancelled_bookings = bookings.filter(status__status_name='cancelled').count()
-
-    # Calculate revenue (hourly_rate_snapshot * hours)
-    revenue_data = bookings.aggregate(
-        total_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        ),
-        total_commission=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * F('commission_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-
-    total_revenue = Decimal(str(revenue_data['total_revenue'] or 0))
-    commission_collected = Decimal(str(revenue_data['total_commission'] or 0))
-
-    # Average booking rate (occupancy)
-    if total_courts > 0:
-        # Simple calculation: bookings / (courts * days in operation)
-        days_in_operation = max((timezone.now().date() - facility.created_at.date()).days, 1)
-        average_booking_rate = (total_bookings / (total_courts * days_in_operation)) * 100
-    else:
-        average_booking_rate = 0.0
-
-    # This month's data
-    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    bookings_this_month = bookings.filter(created_at__gte=month_start).count()
-
-    month_revenue_data = bookings.filter(created_at__gte=month_start).aggregate(
-        month_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-    revenue_this_month = Decimal(str(month_revenue_data['month_revenue'] or 0))
-
-    # Peak booking hour
-    peak_hour_data = bookings.annotate(
-        hour=ExtractHour('start_time')
-    ).values('hour').annotate(
-        count=Count('booking_id')
-    ).order_by('-count').first()
-
-    peak_booking_hour = peak_hour_data['hour'] if peak_hour_data else None
-
-    # Most popular sport
-    sport_data = bookings.values('court__sport_type__sport_name').annotate(
-        count=Count('booking_id')
-    ).order_by('-count').first()
-
-    most_popular_sport = sport_data['court__sport_type__sport_name'] if sport_data else None
+    # Read the materialised snapshot (rebuilt only when bookings or courts changed)
+    snapshot = FacilityAnalyticsService.get(facility)
 
     # Build response data
     analytics_data = {
         'facility_id': facility.facility_id,
         'facility_name': facility.facility_name,
         'manager_name': facility.manager.user.name if facility.manager else 'N/A',
-        'total_courts': total_courts,
-        'active_courts': active_courts,
-        'total_bookings': total_bookings,
-        'completed_bookings': completed_bookings,
-        'cancelled_bookings': cancelled_bookings,
-        'total_revenue': round(total_revenue, 2),
-        'commission_collected': round(commission_collected, 2),
-        'average_booking_rate': round(average_booking_rate, 2),
-        'bookings_this_month': bookings_this_month,
-        'revenue_this_month': round(revenue_this_month, 2),
-        'peak_booking_hour': peak_booking_hour,
-        'most_popular_sport': most_popular_sport,
+        'total_courts': snapshot.total_courts,
+        'active_courts': snapshot.active_courts,
+        'total_bookings': snapshot.total_bookings,
+        'completed_bookings': snapshot.completed_bookings,
+        'cancelled_bookings': snapshot.cancelled_bookings,
+        'total_revenue': round(snapshot.total_revenue, 2),
+        'commission_collected': round(snapshot.commission_collected, 2),
+        'average_booking_rate': round(snapshot.average_booking_rate, 2),
+        'bookings_this_month': snapshot.bookings_this_month,
+        'revenue_this_month': round(snapshot.revenue_this_month, 2),
+        'peak_booking_hour': snapshot.peak_booking_hour,
+        'most_popular_sport': snapshot.most_popular_sport,
+        'hourly_histogram': snapshot.hourly_histogram,
+        'sport_mix': snapshot.sport_mix,
+        'computed_at': snapshot.computed_at,
     }
 
     serializer = FacilityAnalyticsSerializer(data=analytics_data)
@@ -265,6 +204,42 @@ def facility_analytics(request, facility_id):
         return Response(analytics_data, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def facility_occupancy(request, facility_id):
+    """
+    Get court occupancy (booked vs offered slot-hours) for a facility
+    GET /api/admin/facilities/{facility_id}/occupancy/?days=30
+
+    Breaks the trailing window down per court, per local day and per hour
+    of the week (7 x 24 grid, Monday first; null where nothing was offered).
+    """
+    facility = get_object_or_404(Facility, facility_id=facility_id)
+
+    try:
+        start, end = occupancy_window(timezone.now(), request.query_params.get('days'))
+    except ValueError as exc:
+        return Response(
+            {'error': {'code': 'VALIDATION_ERROR', 'message': str(exc)}},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    report = occupancy_report(Court.objects.filter(facility=facility), start, end, ZoneInfo(facility.timezone))
+
+    return Response({
+        'data': {
+            'facility_id': facility.facility_id,
+            'facility_name': facility.facility_name,
+            **report,
+        },
+        'meta': {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'timezone': facility.timezone,
+        }
+    }, status=status.HTTP_200_OK)
+
+
 # ====== Commission Adjustment Endpoint ======
 
 @api_view(['POST'])
@@ -312,15 +287,9 @@ def adjust_commission_rate(request, facility_id):
         court__facility=facility,
         created_at__gte=month_start
     ).aggregate(
-        month_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
+        month_revenue=Sum('total_amount')
     )
-    monthly_revenue = Decimal(str(month_revenue_data['month_revenue'] or 0))
+    monthly_revenue = month_revenue_data['month_revenue'] or Decimal('0')
     financial_impact = monthly_revenue * (new_rate - old_rate)
 
     # Log admin action
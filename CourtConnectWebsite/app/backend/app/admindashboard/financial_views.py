@@ -10,8 +10,8 @@ from app.auth.permissions import IsAdminUser
 from rest_framework.pagination import PageNumberPagination
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count, Avg, F, Q, FloatField, ExpressionWrapper
-from django.db.models.functions import Extract, Cast
+from django.db.models import Sum, Count, Avg, Q
+from django.db import transaction
 from django.http import HttpResponse
 from datetime import timedelta, datetime
 from decimal import Decimal
@@ -19,9 +19,16 @@ import csv
 
 from app.bookings.models import Booking
 from app.payments.models import Payment
-from app.facilities.models import Facility
-from .models import RefundRequest, AdminActionLog
-from .serializers import RefundRequestSerializer, RefundActionSerializer
+from app.utils.query_budget import query_budget
+from .models import RefundRequest, AdminActionLog, RefundBatch
+from .serializers import (
+    RefundRequestSerializer, RefundActionSerializer, RefundBulkApproveSerializer, RefundBatchSerializer
+)
+from .services import RefundBatchService
+from .exports import export_csv_response
+
+# Refund requests an admin can still approve or reject ('failed' ones are retried)
+REVIEWABLE_REFUND_STATUSES = ('pending', 'failed')
 
 
 # ====== Payment Statistics Endpoint ======
@@ -99,24 +106,12 @@ def payment_statistics(request):
 
     # Calculate revenue
     revenue_data = bookings.aggregate(
-        total_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        ),
-        total_commission=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * F('commission_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
+        total_revenue=Sum('total_amount'),
+        total_commission=Sum('commission_amount'),
     )
 
-    total_revenue = Decimal(str(revenue_data['total_revenue'] or 0))
-    total_commission = Decimal(str(revenue_data['total_commission'] or 0))
+    total_revenue = revenue_data['total_revenue'] or Decimal('0')
+    total_commission = revenue_data['total_commission'] or Decimal('0')
     manager_payout = total_revenue - total_commission
 
     # Payment counts
@@ -248,6 +243,10 @@ def approve_refund(request, request_id):
     Approve a refund request
     POST /api/admin/payments/refunds/{request_id}/approve/
     Body: { "reason": "Approved because..." }
+
+    The provider refund is issued by a background refund batch; the request
+    becomes 'processed' once the money has been returned, or 'failed' if it
+    could not be. Failed requests can be approved again to retry.
     """
     serializer = RefundActionSerializer(data=request.data)
     if not serializer.is_valid():
@@ -255,7 +254,7 @@ def approve_refund(request, request_id):
 
     refund_request = get_object_or_404(RefundRequest, request_id=request_id)
 
-    if refund_request.status != 'pending':
+    if refund_request.status not in REVIEWABLE_REFUND_STATUSES:
         return Response(
             {'detail': f'Refund request is already {refund_request.status}'},
             status=status.HTTP_400_BAD_REQUEST
@@ -283,16 +282,82 @@ def approve_refund(request, request_id):
         }
     )
 
+    refund_batch = RefundBatchService.for_refund_requests(
+        [refund_request.request_id], request.user, serializer.validated_data['reason']
+    )
+
     return Response({
         'detail': 'Refund request approved successfully',
         'data': {
             'request_id': refund_request.request_id,
             'amount': str(refund_request.amount),
             'status': refund_request.status,
+            'refund_batch': RefundBatchSerializer(refund_batch, context={'request': request}).data,
         }
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def approve_refunds(request):
+    """
+    Approve several refund requests and refund them in one batch
+    POST /api/admin/payments/refunds/approve/
+    Body: { "request_ids": [1, 2, 3], "reason": "Approved because..." }
+
+    Requests that are not pending (or failed, to retry them) are left alone
+    and listed in meta.skipped.
+    """
+    serializer = RefundBulkApproveSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    requested_ids = set(serializer.validated_data['request_ids'])
+    reason = serializer.validated_data['reason']
+    reviewable = RefundRequest.objects.filter(request_id__in=requested_ids, status__in=REVIEWABLE_REFUND_STATUSES)
+    approved_ids = list(reviewable.values_list('request_id', flat=True))
+    if not approved_ids:
+        return Response(
+            {'detail': 'None of the refund requests are pending or failed'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    with transaction.atomic():
+        RefundRequest.objects.filter(request_id__in=approved_ids, status__in=REVIEWABLE_REFUND_STATUSES).update(
+            status='approved',
+            reviewed_by=request.user,
+            review_reason=reason,
+            reviewed_at=timezone.now()
+        )
+        refund_batch = RefundBatchService.for_refund_requests(approved_ids, request.user, reason)
+
+    return Response({
+        'detail': f'{len(approved_ids)} refund requests approved',
+        'data': RefundBatchSerializer(refund_batch, context={'request': request}).data,
+        'meta': {
+            'approved': sorted(approved_ids),
+            'skipped': sorted(requested_ids - set(approved_ids)),
+        }
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def refund_batch_status(request, batch_id):
+    """
+    Get the progress of a refund batch
+    GET /api/admin/payments/refund-batches/{batch_id}/
+
+    meta.failures lists the bookings whose refund failed (first 50).
+    """
+    batch = get_object_or_404(RefundBatch.objects.select_related('facility'), batch_id=batch_id)
+    failures = batch.items.filter(status='failed').order_by('item_id').values('booking_id', 'payment_id', 'error')[:50]
+    return Response({
+        'data': RefundBatchSerializer(batch, context={'request': request}).data,
+        'meta': {'failures': list(failures)}
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def reject_refund(request, request_id):
@@ -307,7 +372,7 @@ def reject_refund(request, request_id):
 
     refund_request = get_object_or_404(RefundRequest, request_id=request_id)
 
-    if refund_request.status != 'pending':
+    if refund_request.status not in REVIEWABLE_REFUND_STATUSES:
         return Response(
             {'detail': f'Refund request is already {refund_request.status}'},
             status=status.HTTP_400_BAD_REQUEST
@@ -345,15 +410,12 @@ def reject_refund(request, request_id):
 
 # ====== Commission Breakdown ======
 
-@api_view(['GET'])
-@permission_classes([IsAdminUser])
-def commission_breakdown(request):
-    """
-    Get commission breakdown by facility
-    GET /api/admin/payments/commission/?period=month
-    """
-    # Parse date filters
-    period = request.query_params.get('period', 'month')
+# Sort keys accepted by ?sort= (prefix with '-' for descending)
+COMMISSION_SORT_FIELDS = {'commission_collected', 'total_revenue', 'booking_count', 'facility_name'}
+
+
+def _commission_bookings(period):
+    """Return the bookings in the requested commission period"""
     now = timezone.now()
 
     if period == 'month':
@@ -365,63 +427,112 @@ def commission_breakdown(request):
     else:
         start_date = None
 
-    # Get bookings by facility
-    bookings = Booking.objects.select_related('court__facility__manager__user')
+    bookings = Booking.objects.all()
     if start_date:
         bookings = bookings.filter(created_at__gte=start_date)
+    return bookings
 
-    # Get facilities that have bookings
-    facility_ids = bookings.values_list('court__facility_id', flat=True).distinct()
-    facilities = Facility.objects.filter(
-        facility_id__in=facility_ids
-    ).select_related('manager__user')
-
-    commission_data = []
-    for facility in facilities:
-        facility_bookings = bookings.filter(court__facility=facility)
-
-        revenue_data = facility_bookings.aggregate(
-            revenue=Sum(
-                ExpressionWrapper(
-                    F('hourly_rate_snapshot') *
-                    Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                    output_field=FloatField()
-                )
-            ),
-            commission=Sum(
-                ExpressionWrapper(
-                    F('hourly_rate_snapshot') * F('commission_rate_snapshot') *
-                    Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                    output_field=FloatField()
-                )
-            )
-        )
 
-        revenue = Decimal(str(revenue_data['revenue'] or 0))
-        commission = Decimal(str(revenue_data['commission'] or 0))
-
-        commission_data.append({
-            'facility_id': facility.facility_id,
-            'facility_name': facility.facility_name,
-            'manager_name': facility.manager.user.name if facility.manager else 'N/A',
-            'commission_rate': f"{float(facility.commission_rate) * 100}%",
-            'total_revenue': round(revenue, 2),
-            'commission_collected': round(commission, 2),
-            'manager_payout': round(revenue - commission, 2),
-            'booking_count': facility_bookings.count(),
-        })
+def _commission_by_facility(bookings, sort='-commission_collected'):
+    """
+    Group bookings by facility in a single query
+
+    Returns a values() queryset with one row per facility, ordered in SQL.
+    """
+    order_field = sort.lstrip('-')
+    if order_field not in COMMISSION_SORT_FIELDS:
+        sort, order_field = '-commission_collected', 'commission_collected'
+    if order_field == 'facility_name':
+        order_field = 'court__facility__facility_name'
+    descending = sort.startswith('-')
+
+    return bookings.values(
+        'court__facility_id',
+        'court__facility__facility_name',
+        'court__facility__commission_rate',
+        'court__facility__manager__user__name',
+    ).annotate(
+        total_revenue=Sum('total_amount'),
+        commission_collected=Sum('commission_amount'),
+        booking_count=Count('booking_id'),
+    ).order_by(
+        f"{'-' if descending else ''}{order_field}",
+        'court__facility_id',
+    )
 
-    # Sort by commission collected (descending)
-    commission_data.sort(key=lambda x: x['commission_collected'], reverse=True)
+
+def _commission_row(row):
+    """Format one grouped facility row"""
+    revenue = row['total_revenue'] or Decimal('0')
+    commission = row['commission_collected'] or Decimal('0')
+    return {
+        'facility_id': row['court__facility_id'],
+        'facility_name': row['court__facility__facility_name'],
+        'manager_name': row['court__facility__manager__user__name'] or 'N/A',
+        'commission_rate': f"{float(row['court__facility__commission_rate']) * 100}%",
+        'total_revenue': round(revenue, 2),
+        'commission_collected': round(commission, 2),
+        'manager_payout': round(revenue - commission, 2),
+        'booking_count': row['booking_count'],
+    }
+
+
+@query_budget(3, max_repeats=1)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def commission_breakdown(request):
+    """
+    Get commission breakdown by facility
+    GET /api/admin/payments/commission/?period=month&sort=-commission_collected&page=1&pageSize=50
+
+    One grouped aggregate over bookings produces the page of facilities and a
+    second aggregate produces the totals, regardless of facility count.
+    sort accepts commission_collected, total_revenue, booking_count or
+    facility_name, with a '-' prefix for descending (default -commission_collected).
+    """
+    period = request.query_params.get('period', 'month')
+    sort = request.query_params.get('sort', '-commission_collected')
+    page = max(1, int(request.query_params.get('page', 1)))
+    page_size = max(1, min(int(request.query_params.get('pageSize', 50)), 500))
+
+    bookings = _commission_bookings(period)
+
+    offset = (page - 1) * page_size
+    commission_data = [
+        _commission_row(row)
+        for row in _commission_by_facility(bookings, sort)[offset:offset + page_size]
+    ]
+
+    totals = bookings.aggregate(
+        total_facilities=Count('court__facility', distinct=True),
+        total_commission=Sum('commission_amount'),
+    )
 
     return Response({
         'data': commission_data,
         'meta': {
             'period': period,
-            'total_facilities': len(commission_data),
-            'total_commission': sum(item['commission_collected'] for item in commission_data),
+            'page': page,
+            'pageSize': page_size,
+            'total_facilities': totals['total_facilities'],
+            'total_commission': round(totals['total_commission'] or Decimal('0'), 2),
         }
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_commission_breakdown_csv(request):
+    """
+    Export the full commission breakdown as a streamed CSV file
+    GET /api/admin/payments/commission/export/?period=month&sort=-commission_collected
+
+    Intended for month-end finance runs: rows are read from the grouped query
+    in chunks and written to the response as they arrive.
+    """
+    return export_csv_response(request, 'commission', {
+        'period': request.query_params.get('period', 'month'),
+        'sort': request.query_params.get('sort', '-commission_collected'),
+    })
+
 
@@ -0,0 +1,147 @@
+"""
+Archive and purge old audit log rows.
+
+Rows in activity_log and admin_action_log older than the retention window are
+exported one calendar month at a time to gzip-compressed JSON Lines files and
+then deleted, so the live tables (and the dashboard queries over them) stay
+bounded as audit volume grows.
+
+Usage:
+    python manage.py archive_audit_logs                    # Use AUDIT_LOG_RETENTION_DAYS
+    python manage.py archive_audit_logs --days 180         # Custom retention window
+    python manage.py archive_audit_logs --dry-run          # Report what would be archived
+    python manage.py archive_audit_logs --keep-rows        # Export without deleting
+"""
+
+import gzip
+import json
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from app.admindashboard.models import ActivityLog, AdminActionLog
+
+
+AUDIT_TABLES = {
+    'activity': ActivityLog,
+    'admin_actions': AdminActionLog,
+}
+
+
+class Command(BaseCommand):
+    help = 'Export audit log rows older than the retention window to compressed monthly files and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'AUDIT_LOG_RETENTION_DAYS', 365),
+            help='Archive rows older than this many days'
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=getattr(settings, 'AUDIT_LOG_ARCHIVE_DIR', None),
+            help='Directory the .jsonl.gz archives are written to'
+        )
+        parser.add_argument(
+            '--table',
+            choices=['all', *AUDIT_TABLES],
+            default='all',
+            help='Which audit table to archive'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per database round trip while exporting'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be archived'
+        )
+        parser.add_argument(
+            '--keep-rows',
+            action='store_true',
+            help='Write archives but do not delete the archived rows'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if not options['output_dir']:
+            raise CommandError('No output directory configured (set AUDIT_LOG_ARCHIVE_DIR or pass --output-dir)')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        output_dir = Path(options['output_dir'])
+        tables = AUDIT_TABLES if options['table'] == 'all' else {options['table']: AUDIT_TABLES[options['table']]}
+
+        self.stdout.write(f"Archiving audit rows created before {cutoff.isoformat()}")
+
+        total = 0
+        for model in tables.values():
+            total += self.archive_model(model, cutoff, output_dir, options)
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} audit rows"))
+
+    def archive_model(self, model, cutoff, output_dir, options):
+        """Archive one model month by month and return the number of rows handled"""
+        table = model._meta.db_table
+        expired = model.objects.filter(created_at__lt=cutoff)
+        archived = 0
+
+        for month_start in expired.datetimes('created_at', 'month'):
+            month_end = min(self._next_month(month_start), cutoff)
+            month_rows = model.objects.filter(created_at__gte=month_start, created_at__lt=month_end)
+            label = f"{table}_{month_start:%Y-%m}"
+
+            if options['dry_run']:
+                count = month_rows.count()
+                self.stdout.write(f"  {label}: {count} rows")
+                archived += count
+                continue
+
+            output_dir.mkdir(parents=True, exist_ok=True)
+            path = self._archive_path(output_dir, label)
+            count = self.write_archive(month_rows, path, options['chunk_size'])
+
+            if count and not options['keep_rows']:
+                with transaction.atomic():
+                    month_rows.delete()
+
+            self.stdout.write(f"  {label}: {count} rows -> {path}")
+            archived += count
+
+        return archived
+
+    @staticmethod
+    def write_archive(queryset, path, chunk_size):
+        """Stream a queryset into a gzip-compressed JSON Lines file"""
+        count = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as archive:
+            for row in queryset.order_by('created_at').values().iterator(chunk_size=chunk_size):
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder))
+                archive.write('\n')
+                count += 1
+        return count
+
+    @staticmethod
+    def _next_month(month_start):
+        """Return the first instant of the month after month_start"""
+        if month_start.month == 12:
+            return month_start.replace(year=month_start.year + 1, month=1)
+        return month_start.replace(month=month_start.month + 1)
+
+    @staticmethod
+    def _archive_path(output_dir, label):
+        """Pick a file name for this month that doesn't overwrite a previous run"""
+        path = output_dir / f"{label}.jsonl.gz"
+        if path.exists():
+            path = output_dir / f"{label}_{timezone.now():%Y%m%d%H%M%S}.jsonl.gz"
+        return path
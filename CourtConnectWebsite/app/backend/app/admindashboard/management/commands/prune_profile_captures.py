@@ -0,0 +1,32 @@
+"""
+Delete old request profiles and their artefacts.
+
+Intended to run daily from cron; captures older than PROFILING_RETENTION_DAYS
+(default 7) are removed together with their files under MEDIA_ROOT/profiles.
+
+Usage:
+    python manage.py prune_profile_captures
+    python manage.py prune_profile_captures --days 1
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.admindashboard.services import ProfileCaptureService
+
+
+class Command(BaseCommand):
+    help = 'Delete request profiles older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Keep this many days instead of PROFILING_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        deleted = ProfileCaptureService.purge(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} profile captures"))
@@ -0,0 +1,36 @@
+"""
+Compact and delete old request metrics rows.
+
+Intended to run daily from cron; rows older than METRICS_COMPACT_AFTER_HOURS
+(default 24) are merged into METRICS_COMPACT_BUCKET_SECONDS buckets and rows
+older than METRICS_RETENTION_DAYS (default 30) are removed.
+
+Usage:
+    python manage.py prune_request_metrics
+    python manage.py prune_request_metrics --days 7
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.admindashboard.services import RequestMetricsService
+
+
+class Command(BaseCommand):
+    help = 'Compact old request metrics and delete those older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Keep this many days instead of METRICS_RETENTION_DAYS'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        deleted = RequestMetricsService.purge(options['days'])
+        merged = RequestMetricsService.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} request metric rows, merged away {merged} more"
+        ))
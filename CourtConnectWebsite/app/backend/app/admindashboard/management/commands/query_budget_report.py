@@ -0,0 +1,80 @@
+"""
+List the endpoints with the most SQL statements per request.
+
+Reads the statistics QueryBudgetMiddleware writes to QUERY_BUDGET_REPORT_FILE,
+typically collected over a test run:
+
+Usage:
+    QUERY_BUDGET_ENABLED=True QUERY_BUDGET_REPORT_FILE=query_budget.json python manage.py test
+    python manage.py query_budget_report --file query_budget.json
+    python manage.py query_budget_report --file query_budget.json --sort repeats --limit 10
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SORT_KEYS = {
+    'max': lambda stats: stats['max_queries'],
+    'avg': lambda stats: stats['total_queries'] / stats['requests'],
+    'repeats': lambda stats: stats['max_repeats'],
+    'violations': lambda stats: stats['violations'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Show the worst query-count offenders recorded by QueryBudgetMiddleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=getattr(settings, 'QUERY_BUDGET_REPORT_FILE', ''),
+            help='Statistics file (defaults to QUERY_BUDGET_REPORT_FILE)'
+        )
+        parser.add_argument(
+            '--sort',
+            choices=sorted(SORT_KEYS),
+            default='max',
+            help='Rank by max queries, average queries, repeated shapes or budget violations'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of endpoints to show'
+        )
+        parser.add_argument(
+            '--show-sql',
+            action='store_true',
+            help='Print the most repeated statement shape for each endpoint'
+        )
+
+    def handle(self, *args, **options):
+        path = options['file']
+        if not path:
+            raise CommandError('No statistics file given; pass --file or set QUERY_BUDGET_REPORT_FILE')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist; run the test suite with QUERY_BUDGET_ENABLED=True first')
+
+        with open(path) as handle:
+            endpoints = json.load(handle)
+
+        ranked = sorted(endpoints.items(), key=lambda item: SORT_KEYS[options['sort']](item[1]), reverse=True)
+        ranked = ranked[:options['limit']]
+
+        self.stdout.write(f"{'Endpoint':<70} {'Reqs':>6} {'Avg':>6} {'Max':>5} {'Budget':>6} {'Repeat':>6} {'Over':>5}")
+        for endpoint, stats in ranked:
+            budget = stats['budget'] if stats['budget'] is not None else '-'
+            line = (
+                f"{endpoint[:70]:<70} {stats['requests']:>6} "
+                f"{stats['total_queries'] / stats['requests']:>6.1f} {stats['max_queries']:>5} "
+                f"{budget:>6} {stats['max_repeats']:>6} {stats['violations']:>5}"
+            )
+            self.stdout.write(self.style.WARNING(line) if stats['violations'] else line)
+            if options['show_sql'] and stats['worst_shape']:
+                self.stdout.write(f"    {stats['worst_shape']}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(endpoints)} endpoints recorded"))
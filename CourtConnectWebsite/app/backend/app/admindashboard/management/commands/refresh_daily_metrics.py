@@ -0,0 +1,47 @@
+"""
+Refresh the DailyPlatformMetrics rollup.
+
+Intended to run from cron every few minutes so analytics requests rarely have
+to refresh the rollup themselves.
+
+Usage:
+    python manage.py refresh_daily_metrics            # Only days changed since the last run
+    python manage.py refresh_daily_metrics --days 30  # Rebuild the last 30 days
+    python manage.py refresh_daily_metrics --full     # Rebuild all history
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from app.admindashboard.services import DailyMetricsService
+
+
+class Command(BaseCommand):
+    help = 'Incrementally rebuild the daily platform metrics rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every day from the earliest recorded activity'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Rebuild the last N days regardless of what changed'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            today = timezone.localdate()
+            written = DailyMetricsService.build_days(
+                today - timedelta(days=i) for i in range(options['days'])
+            )
+        else:
+            written = DailyMetricsService.refresh(full=options['full'])
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {written} daily metrics rows"))
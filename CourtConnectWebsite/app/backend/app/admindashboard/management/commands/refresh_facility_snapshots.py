@@ -0,0 +1,34 @@
+"""
+Rebuild facility analytics snapshots.
+
+By default only missing, stale, expired or previous-month snapshots are
+rebuilt, so it is cheap to run from cron (e.g. hourly) to keep dashboard
+reads warm.
+
+Usage:
+    python manage.py refresh_facility_snapshots          # Outdated snapshots only
+    python manage.py refresh_facility_snapshots --all    # Rebuild every facility
+"""
+
+from django.core.management.base import BaseCommand
+
+from app.admindashboard.services import FacilityAnalyticsService
+from app.facilities.models import Facility
+
+
+class Command(BaseCommand):
+    help = 'Recompute materialised facility analytics snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild every snapshot, not just outdated ones'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            rebuilt = FacilityAnalyticsService.build(Facility.objects.values_list('facility_id', flat=True))
+        else:
+            rebuilt = FacilityAnalyticsService.refresh(Facility.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} facility snapshots"))
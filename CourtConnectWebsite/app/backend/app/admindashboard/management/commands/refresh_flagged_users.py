@@ -0,0 +1,21 @@
+"""
+Rebuild the FlaggedUser table.
+
+Intended to run from cron (e.g. every 5 minutes) so the moderation page
+always reads a fresh table without rebuilding it during a request.
+
+Usage:
+    python manage.py refresh_flagged_users
+"""
+
+from django.core.management.base import BaseCommand
+
+from app.admindashboard.services import FlaggedUserService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the flagged users moderation table'
+
+    def handle(self, *args, **options):
+        flagged = FlaggedUserService.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Flagged {flagged} users"))
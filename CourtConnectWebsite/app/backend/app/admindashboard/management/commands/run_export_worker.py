@@ -0,0 +1,89 @@
+"""
+Process queued admin export jobs.
+
+Runs as a long-lived worker process (e.g. a systemd unit or container next
+to the web workers). Several workers can run at once; each job is claimed
+with SELECT ... FOR UPDATE SKIP LOCKED. Expired artefacts are deleted at
+startup and then every EXPORT_WORKER_PURGE_SECONDS.
+
+Usage:
+    python manage.py run_export_worker                   # Poll forever
+    python manage.py run_export_worker --once            # Drain the queue and exit (cron)
+    python manage.py run_export_worker --poll-interval 2
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connection
+
+from app.admindashboard.services import ExportJobService
+
+
+class Command(BaseCommand):
+    help = 'Run queued admin export jobs and write their files under MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every pending job, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'EXPORT_WORKER_POLL_SECONDS', 5),
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after processing this many jobs'
+        )
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+        max_jobs = options['max_jobs']
+        if max_jobs is not None and max_jobs < 1:
+            raise CommandError('--max-jobs must be at least 1')
+
+        purge_interval = getattr(settings, 'EXPORT_WORKER_PURGE_SECONDS', 3600)
+        next_purge = time.monotonic()
+
+        processed = 0
+        try:
+            while max_jobs is None or processed < max_jobs:
+                # Drop connections the database closed while we were idle
+                # (not inside a transaction, e.g. when called from a TestCase)
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                try:
+                    if time.monotonic() >= next_purge:
+                        expired = ExportJobService.purge_expired()
+                        if expired:
+                            self.stdout.write(f"Expired {expired} old export files")
+                        next_purge = time.monotonic() + purge_interval
+                    job = ExportJobService.claim_next()
+                except DatabaseError as e:
+                    self.stderr.write(f"Database error, retrying: {e}")
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                job = ExportJobService.run(job)
+                processed += 1
+                if job.status == 'completed':
+                    self.stdout.write(f"Export {job.job_id} ({job.export_type}) wrote {job.row_count} rows to {job.file_path}")
+                else:
+                    self.stderr.write(f"Export {job.job_id} ({job.export_type}) failed: {job.error}")
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping export worker')
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} export jobs"))
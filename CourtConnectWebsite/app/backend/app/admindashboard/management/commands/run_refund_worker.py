@@ -0,0 +1,74 @@
+"""
+Process queued refund batches.
+
+Needed when REFUND_BATCH_EXECUTOR is 'worker'; in 'thread' mode it is still
+worth running from cron with --once to finish batches a crashed web process
+left running. Several workers can run at once; each batch is claimed with
+SELECT ... FOR UPDATE SKIP LOCKED.
+
+Usage:
+    python manage.py run_refund_worker                   # Poll forever
+    python manage.py run_refund_worker --once            # Drain the queue and exit (cron)
+    python manage.py run_refund_worker --poll-interval 2
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.admindashboard.services import RefundBatchService
+
+
+class Command(BaseCommand):
+    help = 'Run queued refund batches against the payment providers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every pending batch, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'REFUND_WORKER_POLL_SECONDS', 5),
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after processing this many batches'
+        )
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+        max_jobs = options['max_jobs']
+        if max_jobs is not None and max_jobs < 1:
+            raise CommandError('--max-jobs must be at least 1')
+
+        processed = 0
+        try:
+            while max_jobs is None or processed < max_jobs:
+                batch = RefundBatchService.claim_next()
+                if batch is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                batch = RefundBatchService.run(batch)
+                processed += 1
+                summary = (
+                    f"Refund batch {batch.batch_id} ({batch.source}): {batch.refunded_items} refunded, "
+                    f"{batch.failed_items} failed, {batch.skipped_items} skipped"
+                )
+                if batch.status == 'completed':
+                    self.stdout.write(summary)
+                else:
+                    self.stderr.write(f"{summary}; stopped: {batch.error}")
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping refund worker')
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} refund batches"))
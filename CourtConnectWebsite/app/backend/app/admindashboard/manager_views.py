@@ -10,15 +10,13 @@ from rest_framework.pagination import PageNumberPagination
 from app.auth.permissions import IsAdminUser
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Sum, F, Case, When, Value, CharField, FloatField, ExpressionWrapper
-from django.db.models.functions import Extract, Cast
+from django.db.models import Q, Count, Case, When, Value, CharField
 from datetime import timedelta
-from decimal import Decimal
 
 from app.users.models import User, Manager
-from app.facilities.models import Facility, Court, FacilitySportType
-from app.bookings.models import Booking
+from app.facilities.models import Facility, FacilitySportType
 from .models import ManagerRequest, ManagerRequestSportType, ManagerSuspension, AdminActionLog
+from .services import FacilityAnalyticsService
 from .serializers import (
     ManagerListSerializer, ManagerDetailSerializer,
     ManagerRequestSerializer, ManagerRequestActionSerializer,
@@ -400,72 +398,26 @@ def manager_performance(request, user_id):
     Get performance analytics for a specific manager
     GET /api/admin/managers/{user_id}/performance/
     """
-    manager = get_object_or_404(Manager, user__user_id=user_id)
-
-    # Get facilities managed
-    facilities = Facility.objects.filter(manager=manager)
-    total_facilities = facilities.count()
-    active_facilities = facilities.filter(is_active=True, is_suspended=False).count()
-    suspended_facilities = facilities.filter(is_suspended=True).count()
-
-    # Get courts
-    total_courts = Court.objects.filter(facility__manager=manager).count()
-
-    # Get all bookings for this manager's facilities
-    bookings = Booking.objects.filter(
-        court__facility__manager=manager
-    ).select_related('status')
+    manager = get_object_or_404(Manager.objects.select_related('user'), user__user_id=user_id)
 
-    total_bookings = bookings.count()
-
-    # Calculate revenue (using hourly_rate_snapshot from bookings)
-    revenue_data = bookings.aggregate(
-        total_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        ),
-        total_commission=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * F('commission_rate_snapshot') * Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-
-    total_revenue = revenue_data['total_revenue'] or Decimal('0.00')
-    commission_collected = revenue_data['total_commission'] or Decimal('0.00')
-
-    # This month's data
-    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    bookings_this_month = bookings.filter(created_at__gte=month_start).count()
-
-    month_revenue_data = bookings.filter(created_at__gte=month_start).aggregate(
-        month_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-    revenue_this_month = month_revenue_data['month_revenue'] or Decimal('0.00')
+    # Sum the facility analytics snapshots instead of scanning raw bookings
+    totals = FacilityAnalyticsService.manager_totals(manager)
 
     # Build response data
     performance_data = {
         'manager_id': manager.user_id,
         'manager_name': manager.user.name,
         'manager_email': manager.user.email,
-        'total_facilities': total_facilities,
-        'active_facilities': active_facilities,
-        'suspended_facilities': suspended_facilities,
-        'total_courts': total_courts,
-        'total_bookings': total_bookings,
-        'total_revenue': round(total_revenue, 2),
-        'commission_collected': round(commission_collected, 2),
+        'total_facilities': totals['total_facilities'],
+        'active_facilities': totals['active_facilities'],
+        'suspended_facilities': totals['suspended_facilities'],
+        'total_courts': totals['total_courts'],
+        'total_bookings': totals['total_bookings'],
+        'total_revenue': round(totals['total_revenue'], 2),
+        'commission_collected': round(totals['commission_collected'], 2),
         'average_facility_rating': None,  # Placeholder for future rating system
-        'bookings_this_month': bookings_this_month,
-        'revenue_this_month': round(revenue_this_month, 2),
+        'bookings_this_month': totals['bookings_this_month'],
+        'revenue_this_month': round(totals['revenue_this_month'], 2),
     }
 
     serializer = ManagerPerformanceSerializer(data=performance_data)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0004_managerrequest_approved_facility'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['created_at'], name='idx_activity_created'),
+        ),
+        migrations.AddIndex(
+            model_name='adminactionlog',
+            index=models.Index(fields=['created_at'], name='idx_admin_action_created'),
+        ),
+    ]
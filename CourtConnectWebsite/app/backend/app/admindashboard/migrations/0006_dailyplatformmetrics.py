@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0005_activity_log_created_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlatformMetrics',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+                ('new_users', models.IntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('booking_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_users', models.IntegerField(default=0)),
+                ('new_reports', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'daily_platform_metrics',
+                'indexes': [models.Index(fields=['computed_at'], name='idx_daily_metrics_computed')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0006_dailyplatformmetrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('job_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('export_type', models.CharField(max_length=32)),
+                ('file_format', models.CharField(choices=[('csv', 'Gzipped CSV'), ('parquet', 'Parquet')], default='csv', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('expired', 'Expired')], default='pending', max_length=20)),
+                ('file_path', models.CharField(blank=True, max_length=500, null=True)),
+                ('file_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('file_size', models.BigIntegerField(blank=True, null=True)),
+                ('row_count', models.IntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'export_jobs',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_export_jobs_status'), models.Index(fields=['params_hash', 'created_at'], name='idx_export_jobs_hash')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0007_export_jobs'),
+        ('users', '0003_user_mfa_enabled'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlaggedUser',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='flag', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('cancellation_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('reports_against', models.IntegerField(default=0)),
+                ('reports_filed', models.IntegerField(default=0)),
+                ('high_cancellation', models.BooleanField(default=False)),
+                ('multiple_reports', models.BooleanField(default=False)),
+                ('excessive_reporting', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'flagged_users',
+                'indexes': [models.Index(fields=['-reports_against', '-cancellation_rate'], name='idx_flagged_users_severity'), models.Index(fields=['computed_at'], name='idx_flagged_users_computed')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0008_flagged_users'),
+        ('facilities', '0011_remove_court_image_url'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacilityAnalyticsSnapshot',
+            fields=[
+                ('facility', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analytics_snapshot', serialize=False, to='facilities.facility')),
+                ('total_courts', models.IntegerField(default=0)),
+                ('active_courts', models.IntegerField(default=0)),
+                ('total_bookings', models.IntegerField(default=0)),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('month_start', models.DateField()),
+                ('bookings_this_month', models.IntegerField(default=0)),
+                ('revenue_this_month', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('hourly_histogram', models.JSONField(default=list)),
+                ('sport_mix', models.JSONField(default=dict)),
+                ('peak_booking_hour', models.IntegerField(blank=True, null=True)),
+                ('most_popular_sport', models.CharField(blank=True, max_length=100, null=True)),
+                ('average_booking_rate', models.FloatField(default=0)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'facility_analytics_snapshots',
+                'indexes': [models.Index(fields=['is_stale'], name='idx_facility_snapshot_stale')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0009_facility_analytics_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestMetric',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('bucket_start', models.DateTimeField()),
+                ('endpoint', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('client_error_count', models.PositiveIntegerField(default=0)),
+                ('server_error_count', models.PositiveIntegerField(default=0)),
+                ('status_counts', models.JSONField(default=dict)),
+                ('latency_sum_ms', models.FloatField(default=0)),
+                ('latency_max_ms', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=list)),
+                ('db_query_count', models.PositiveIntegerField(default=0)),
+                ('db_time_ms', models.FloatField(default=0)),
+            ],
+            options={
+                'db_table': 'request_metrics',
+                'indexes': [models.Index(fields=['bucket_start'], name='idx_request_metrics_bucket'), models.Index(fields=['endpoint', 'bucket_start'], name='idx_request_metrics_endpoint')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0010_request_metrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('capture_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('url_name', models.CharField(max_length=255)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('db_time_ms', models.FloatField(default=0)),
+                ('reason', models.CharField(choices=[('sampled', 'Sampled'), ('slow', 'Slow')], max_length=10)),
+                ('profile_type', models.CharField(choices=[('cprofile', 'cProfile'), ('stack', 'Stack samples')], max_length=10)),
+                ('file_path', models.CharField(max_length=500)),
+                ('file_size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_captures', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'profile_captures',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['url_name', 'created_at'], name='idx_profile_url_name_created'), models.Index(fields=['created_at'], name='idx_profile_created')],
+            },
+        ),
+    ]
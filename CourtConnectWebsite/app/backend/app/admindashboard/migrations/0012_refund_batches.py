@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0011_profile_captures'),
+        ('bookings', '0004_booking_amounts'),
+        ('facilities', '0011_remove_court_image_url'),
+        ('payments', '0004_payment_reconciliation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefundBatch',
+            fields=[
+                ('batch_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('facility_suspension', 'Facility Suspension'), ('refund_requests', 'Refund Requests')], max_length=32)),
+                ('reason', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_items', models.IntegerField(default=0)),
+                ('refunded_items', models.IntegerField(default=0)),
+                ('failed_items', models.IntegerField(default=0)),
+                ('skipped_items', models.IntegerField(default=0)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('facility', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batches', to='facilities.facility')),
+                ('requested_by', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='refund_batches', to=settings.AUTH_USER_MODEL)),
+                ('suspension', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batches', to='admindashboard.facilitysuspension')),
+            ],
+            options={
+                'db_table': 'refund_batches',
+            },
+        ),
+        migrations.CreateModel(
+            name='RefundBatchItem',
+            fields=[
+                ('item_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('refunded', 'Refunded'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20)),
+                ('provider_refund_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='admindashboard.refundbatch')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='refund_batch_items', to='bookings.booking')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batch_items', to='payments.payment')),
+                ('refund_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refund_batch_items', to='admindashboard.refundrequest')),
+            ],
+            options={
+                'db_table': 'refund_batch_items',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='refundbatch',
+            index=models.Index(fields=['status', 'created_at'], name='idx_refund_batches_status'),
+        ),
+        migrations.AddIndex(
+            model_name='refundbatchitem',
+            index=models.Index(fields=['batch', 'status'], name='idx_refund_items_batch'),
+        ),
+    ]
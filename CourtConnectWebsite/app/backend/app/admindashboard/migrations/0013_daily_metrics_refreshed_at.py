@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0012_refund_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyplatformmetrics',
+            name='refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dailyplatformmetrics',
+            index=models.Index(fields=['refreshed_at'], name='idx_daily_metrics_refreshed'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0013_daily_metrics_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='refundrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('processed', 'Processed'), ('failed', 'Refund failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admindashboard', '0014_refund_request_failed_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestmetric',
+            name='bucket_seconds',
+            field=models.PositiveIntegerField(default=60),
+        ),
+    ]
@@ -72,6 +72,7 @@ class ActivityLog(models.Model):
         indexes = [
             models.Index(fields=['user', 'created_at'], name='idx_activity_user_time'),
             models.Index(fields=['action'], name='idx_activity_action'),
+            models.Index(fields=['created_at'], name='idx_activity_created'),
         ]
 
     def __str__(self):
@@ -98,6 +99,9 @@ class AdminActionLog(models.Model):
 
     class Meta:
         db_table = 'admin_action_log'
+        indexes = [
+            models.Index(fields=['created_at'], name='idx_admin_action_created'),
+        ]
 
     def __str__(self):
         """
@@ -314,6 +318,7 @@ class RefundRequest(models.Model):
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
         ('processed', 'Processed'),
+        ('failed', 'Refund failed'),  # metadata['refund_error'] says why; can be approved again or rejected
     ]
 
     request_id = models.BigAutoField(primary_key=True)
@@ -375,4 +380,367 @@ class CommissionAdjustment(models.Model):
         Returns:
             str: Formatted string with adjustment ID, facility, old rate, and new rate
         """
-        return f"Commission Adjustment {self.adjustment_id} - {self.facility} ({self.old_rate} → {self.new_rate})"
\ No newline at end of file
+        return f"Commission Adjustment {self.adjustment_id} - {self.facility} ({self.old_rate} → {self.new_rate})"
+
+
+class DailyPlatformMetrics(models.Model):
+    """
+    Pre-aggregated platform metrics for one calendar day (in settings.TIME_ZONE).
+
+    Maintained incrementally by DailyMetricsService so admin analytics can read
+    a handful of rollup rows instead of scanning the fact tables.
+    """
+    date = models.DateField(primary_key=True)
+    new_users = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    booking_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_users = models.IntegerField(default=0)
+    new_reports = models.IntegerField(default=0)
+    computed_at = models.DateTimeField()
+    # Start of the incremental refresh that last wrote this row; backfilled
+    # rows keep the previous value so they never advance the refresh watermark
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'daily_platform_metrics'
+        indexes = [
+            models.Index(fields=['computed_at'], name='idx_daily_metrics_computed'),
+            models.Index(fields=['refreshed_at'], name='idx_daily_metrics_refreshed'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the daily metrics row.
+
+        Returns:
+            str: Formatted string with the metrics date
+        """
+        return f"Metrics {self.date}"
+
+
+class ExportJob(models.Model):
+    """
+    A queued admin export processed by the ``run_export_worker`` command.
+
+    Completed jobs keep a compressed artefact under MEDIA_ROOT; identical
+    requests within EXPORT_JOB_REUSE_SECONDS are served from it.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'Gzipped CSV'),
+        ('parquet', 'Parquet'),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    export_type = models.CharField(max_length=32)
+    file_format = models.CharField(max_length=16, choices=FORMAT_CHOICES, default='csv')
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    file_path = models.CharField(max_length=500, null=True, blank=True)  # Relative to MEDIA_ROOT
+    file_name = models.CharField(max_length=255, null=True, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    row_count = models.IntegerField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'export_jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_export_jobs_status'),
+            models.Index(fields=['params_hash', 'created_at'], name='idx_export_jobs_hash'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the export job.
+
+        Returns:
+            str: Formatted string with job ID, export type, and status
+        """
+        return f"Export {self.job_id} - {self.export_type} ({self.status})"
+
+
+class FlaggedUser(models.Model):
+    """
+    Materialised result of the flagged-user detection query.
+
+    Rebuilt by FlaggedUserService.refresh() so the moderation page reads a
+    small indexed table instead of aggregating bookings and reports per user.
+    """
+    user = models.OneToOneField('users.User', on_delete=models.CASCADE, primary_key=True, related_name='flag')
+    total_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    cancellation_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    reports_against = models.IntegerField(default=0)
+    reports_filed = models.IntegerField(default=0)
+    high_cancellation = models.BooleanField(default=False)
+    multiple_reports = models.BooleanField(default=False)
+    excessive_reporting = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'flagged_users'
+        indexes = [
+            models.Index(fields=['-reports_against', '-cancellation_rate'], name='idx_flagged_users_severity'),
+            models.Index(fields=['computed_at'], name='idx_flagged_users_computed'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the flagged user.
+
+        Returns:
+            str: Formatted string with the flagged user's ID
+        """
+        return f"Flagged user {self.user_id}"
+
+
+class FacilityAnalyticsSnapshot(models.Model):
+    """
+    Pre-aggregated analytics for one facility.
+
+    Rebuilt by FacilityAnalyticsService when marked stale (booking or court
+    changes, via signals) or when the calendar month rolls over, so the
+    facility and manager analytics endpoints read one row per facility.
+    """
+    facility = models.OneToOneField('facilities.Facility', on_delete=models.CASCADE, primary_key=True, related_name='analytics_snapshot')
+    total_courts = models.IntegerField(default=0)
+    active_courts = models.IntegerField(default=0)
+    total_bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    month_start = models.DateField()  # Month the *_this_month values refer to (facility local time)
+    bookings_this_month = models.IntegerField(default=0)
+    revenue_this_month = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    hourly_histogram = models.JSONField(default=list)  # 24 booking counts by local start hour
+    sport_mix = models.JSONField(default=dict)  # sport name -> booking count
+    peak_booking_hour = models.IntegerField(null=True, blank=True)
+    most_popular_sport = models.CharField(max_length=100, null=True, blank=True)
+    # Booked share of the slot-hours offered up to computed_at, in percent
+    average_booking_rate = models.FloatField(default=0)
+    is_stale = models.BooleanField(default=False)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'facility_analytics_snapshots'
+        indexes = [
+            models.Index(fields=['is_stale'], name='idx_facility_snapshot_stale'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the analytics snapshot.
+
+        Returns:
+            str: Formatted string with the facility ID and computation time
+        """
+        return f"Analytics snapshot {self.facility_id} @ {self.computed_at}"
+
+
+class RequestMetric(models.Model):
+    """
+    Request metrics for one endpoint within one time bucket.
+
+    Written by the per-process MetricsAggregator (app/utils/metrics.py) each
+    time it flushes, so a bucket may have one row per web process; readers
+    sum them. prune_request_metrics later merges old rows into wider
+    buckets (see RequestMetricsService.compact). latency_histogram holds
+    counts per LATENCY_BUCKETS_MS bound plus a final overflow count.
+    """
+    id = models.BigAutoField(primary_key=True)
+    bucket_start = models.DateTimeField()
+    bucket_seconds = models.PositiveIntegerField(default=60)  # Bucket width; larger once compacted
+    endpoint = models.CharField(max_length=255)  # URL route pattern, not the raw path
+    method = models.CharField(max_length=10)
+    request_count = models.PositiveIntegerField(default=0)
+    client_error_count = models.PositiveIntegerField(default=0)  # 4xx responses
+    server_error_count = models.PositiveIntegerField(default=0)  # 5xx responses
+    status_counts = models.JSONField(default=dict)  # status code -> count
+    latency_sum_ms = models.FloatField(default=0)
+    latency_max_ms = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=list)
+    db_query_count = models.PositiveIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+
+    class Meta:
+        db_table = 'request_metrics'
+        indexes = [
+            models.Index(fields=['bucket_start'], name='idx_request_metrics_bucket'),
+            models.Index(fields=['endpoint', 'bucket_start'], name='idx_request_metrics_endpoint'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the metrics row.
+
+        Returns:
+            str: Formatted string with method, endpoint and bucket
+        """
+        return f"{self.method} {self.endpoint} @ {self.bucket_start}"
+
+
+class ProfileCapture(models.Model):
+    """
+    A profiled request kept by ProfilingMiddleware.
+
+    The artefact under MEDIA_ROOT (file_path) is a JSON document with the
+    request details, every SQL statement executed and either cProfile
+    function statistics (sampled requests) or folded stack samples (requests
+    over PROFILING_SLOW_MS).
+    """
+    REASON_CHOICES = [
+        ('sampled', 'Sampled'),
+        ('slow', 'Slow'),
+    ]
+
+    PROFILE_TYPE_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('stack', 'Stack samples'),
+    ]
+
+    capture_id = models.BigAutoField(primary_key=True)
+    url_name = models.CharField(max_length=255)  # Resolved view name, e.g. managers:manager-overview
+    endpoint = models.CharField(max_length=255)  # URL route pattern
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    profile_type = models.CharField(max_length=10, choices=PROFILE_TYPE_CHOICES)
+    user = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='profile_captures')
+    file_path = models.CharField(max_length=500)  # Relative to MEDIA_ROOT
+    file_size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'profile_captures'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['url_name', 'created_at'], name='idx_profile_url_name_created'),
+            models.Index(fields=['created_at'], name='idx_profile_created'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the capture.
+
+        Returns:
+            str: Formatted string with method, path and duration
+        """
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms, {self.reason})"
+
+
+class RefundBatch(models.Model):
+    """
+    A set of provider refunds issued together, e.g. for every upcoming
+    booking of a suspended facility or a group of approved refund requests.
+
+    Run by RefundBatchService (in a web-process thread pool or by the
+    ``run_refund_worker`` command); the counters are updated as each chunk of
+    refunds finishes so the status endpoint can report progress.
+    """
+    SOURCE_CHOICES = [
+        ('facility_suspension', 'Facility Suspension'),
+        ('refund_requests', 'Refund Requests'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    batch_id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=32, choices=SOURCE_CHOICES)
+    facility = models.ForeignKey('facilities.Facility', on_delete=models.SET_NULL, null=True, blank=True, related_name='refund_batches')
+    suspension = models.ForeignKey(FacilitySuspension, on_delete=models.SET_NULL, null=True, blank=True, related_name='refund_batches')
+    requested_by = models.ForeignKey('users.User', on_delete=models.RESTRICT, related_name='refund_batches')
+    reason = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_items = models.IntegerField(default=0)
+    refunded_items = models.IntegerField(default=0)
+    failed_items = models.IntegerField(default=0)
+    skipped_items = models.IntegerField(default=0)  # Nothing to refund (no completed payment)
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'refund_batches'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_refund_batches_status'),
+        ]
+
+    @property
+    def processed_items(self):
+        return self.refunded_items + self.failed_items + self.skipped_items
+
+    def __str__(self):
+        """
+        Return string representation of the refund batch.
+
+        Returns:
+            str: Formatted string with batch ID, source, and status
+        """
+        return f"Refund Batch {self.batch_id} - {self.source} ({self.status})"
+
+
+class RefundBatchItem(models.Model):
+    """One booking (and its completed payment, if any) in a RefundBatch"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('refunded', 'Refunded'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+
+    item_id = models.BigAutoField(primary_key=True)
+    batch = models.ForeignKey(RefundBatch, on_delete=models.CASCADE, related_name='items')
+    booking = models.ForeignKey('bookings.Booking', on_delete=models.CASCADE, related_name='refund_batch_items')
+    payment = models.ForeignKey('payments.Payment', on_delete=models.SET_NULL, null=True, blank=True, related_name='refund_batch_items')
+    refund_request = models.ForeignKey(RefundRequest, on_delete=models.SET_NULL, null=True, blank=True, related_name='refund_batch_items')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Null refunds the whole payment
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    provider_refund_id = models.CharField(max_length=255, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'refund_batch_items'
+        indexes = [
+            models.Index(fields=['batch', 'status'], name='idx_refund_items_batch'),
+        ]
+
+    @property
+    def idempotency_key(self):
+        """Sent with the provider refund so a re-run batch never refunds twice"""
+        return f'refund-batch-item-{self.item_id}'
+
+    def __str__(self):
+        """
+        Return string representation of the refund batch item.
+
+        Returns:
+            str: Formatted string with item ID, booking ID, and status
+        """
+        return f"Refund Item {self.item_id} - Booking {self.booking_id} ({self.status})"
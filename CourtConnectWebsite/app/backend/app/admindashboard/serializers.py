@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from app.users.models import User, Session, Manager
-from app.admindashboard.models import ManagerRequest, ManagerSuspension, FacilitySuspension, RefundRequest, CommissionAdjustment, Report
+from app.admindashboard.models import ManagerRequest, ManagerSuspension, FacilitySuspension, RefundRequest, CommissionAdjustment, Report, ExportJob, ProfileCapture, RefundBatch
 from app.facilities.models import Facility
 from app.bookings.models import Booking
 from django.db.models import Max, Count, Sum, Q, Avg
+from django.urls import reverse
 from django.utils import timezone
 
 
@@ -237,6 +238,9 @@ class FacilityAnalyticsSerializer(serializers.Serializer):
     revenue_this_month = serializers.DecimalField(max_digits=15, decimal_places=2)
     peak_booking_hour = serializers.IntegerField(allow_null=True)
     most_popular_sport = serializers.CharField(allow_null=True)
+    hourly_histogram = serializers.ListField(child=serializers.IntegerField(), min_length=24, max_length=24)
+    sport_mix = serializers.DictField(child=serializers.IntegerField())
+    computed_at = serializers.DateTimeField()
 
 
 # Refund Management Serializers
@@ -288,6 +292,59 @@ class RefundActionSerializer(serializers.Serializer):
     reason = serializers.CharField(required=True, min_length=10, max_length=2000, help_text='Reason for approval/rejection (mandatory)')
 
 
+class RefundBulkApproveSerializer(RefundActionSerializer):
+    """Serializer for approving several refund requests at once"""
+    request_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=500,
+        help_text='Refund requests to approve and refund together'
+    )
+
+
+class RefundBatchSerializer(serializers.ModelSerializer):
+    """Serializer for refund batch progress"""
+    facility_name = serializers.CharField(source='facility.facility_name', read_only=True, allow_null=True)
+    processed_items = serializers.IntegerField(read_only=True)
+    progress = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RefundBatch
+        fields = [
+            'batch_id',
+            'source',
+            'facility',
+            'facility_name',
+            'suspension',
+            'status',
+            'total_items',
+            'processed_items',
+            'refunded_items',
+            'failed_items',
+            'skipped_items',
+            'refunded_amount',
+            'progress',
+            'error',
+            'status_url',
+            'created_at',
+            'started_at',
+            'completed_at',
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Share of items processed, 0-100"""
+        if not obj.total_items:
+            return 100
+        return round(obj.processed_items * 100 / obj.total_items)
+
+    def get_status_url(self, obj):
+        url = reverse('admindashboard:refund-batch-status', args=[obj.batch_id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
 # Report Moderation Serializers
 
 class ReportSerializer(serializers.ModelSerializer):
@@ -329,3 +386,80 @@ class ReportActionSerializer(serializers.Serializer):
         choices=['none', 'user_suspended', 'facility_suspended', 'manager_suspended', 'content_removed', 'warning_issued'],
         help_text='Action taken based on report'
     )
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    """Serializer for queuing a background export"""
+    type = serializers.ChoiceField(
+        choices=['activity', 'admin_actions', 'users', 'bookings', 'commission'],
+        help_text='Export to generate'
+    )
+    format = serializers.ChoiceField(choices=['csv', 'parquet'], default='csv', help_text='csv (gzip-compressed) or parquet')
+    params = serializers.DictField(required=False, default=dict, help_text='Export parameters, e.g. {"days": 90} or {"period": "month"}')
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Serializer for export job status"""
+    requested_by_email = serializers.EmailField(source='requested_by.email', read_only=True, allow_null=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'job_id',
+            'export_type',
+            'file_format',
+            'params',
+            'status',
+            'requested_by_email',
+            'file_name',
+            'file_size',
+            'row_count',
+            'error',
+            'download_url',
+            'created_at',
+            'started_at',
+            'completed_at',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        """Download link once the artefact is ready"""
+        if obj.status != 'completed':
+            return None
+        url = reverse('admindashboard:export-job-download', args=[obj.job_id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class ProfileCaptureSerializer(serializers.ModelSerializer):
+    """Serializer for stored request profiles"""
+    user_email = serializers.EmailField(source='user.email', read_only=True, allow_null=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProfileCapture
+        fields = [
+            'capture_id',
+            'url_name',
+            'endpoint',
+            'method',
+            'path',
+            'status_code',
+            'duration_ms',
+            'query_count',
+            'db_time_ms',
+            'reason',
+            'profile_type',
+            'user_email',
+            'file_size',
+            'download_url',
+            'created_at',
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        """Link to the JSON artefact"""
+        url = reverse('admindashboard:profile-capture-download', args=[obj.capture_id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
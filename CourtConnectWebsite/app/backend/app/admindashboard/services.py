@@ -0,0 +1,1414 @@
+"""
+Admin dashboard services
+Maintains the DailyPlatformMetrics rollup used by the analytics endpoints
+and runs background export and refund jobs
+"""
+
+import hashlib
+import json
+import logging
+import operator
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Sum, Max, Min, F, Q, Func, FloatField, OuterRef, Subquery, IntegerField, Window
+from django.db.models.functions import Extract, ExtractHour, Cast, TruncDate, Coalesce, NullIf, RowNumber
+from django.utils import timezone
+
+from app.users.models import User
+from app.utils.commit_batch import CommitBatch
+from app.utils.timeseries import time_series
+from app.utils.exports import write_csv_gz_file, write_parquet_file, parquet_available
+from app.utils.occupancy import annotated_slots, occupancy_rate, occupancy_totals
+from app.utils.metrics import align_to_bucket, empty_histogram, merge_histograms, histogram_percentile
+from app.bookings.models import Booking, BookingStatus
+from app.facilities.models import Facility, Court, Availability
+from app.managers.services import ManagerOverviewService
+from app.payments.models import Payment, PaymentStatus
+from app.payments.services import get_payment_service
+from .models import (
+    ActivityLog, AdminActionLog, Report, DailyPlatformMetrics, ExportJob, FlaggedUser, FacilityAnalyticsSnapshot,
+    ProfileCapture, RefundBatch, RefundBatchItem, RefundRequest, RequestMetric,
+)
+from .exports import build_export, normalize_export_params
+
+
+logger = logging.getLogger(__name__)
+
+
+METRIC_FIELDS = [
+    'new_users', 'bookings', 'booking_hours', 'revenue',
+    'commission', 'active_users', 'new_reports',
+]
+
+
+def booking_hours_expression():
+    """Booking duration in hours as a database expression"""
+    return Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0
+
+
+def _to_decimal(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+
+class DailyMetricsService:
+    """
+    Builds and reads the per-day platform metrics rollup
+
+    Days are calendar days in settings.TIME_ZONE. A refresh only recomputes
+    days touched by rows created (or, for bookings, updated) since the last
+    refresh, plus today. Deletions are not detected; run a full rebuild with
+    ``python manage.py refresh_daily_metrics --full`` after bulk deletes.
+    """
+
+    @staticmethod
+    def build_days(days, refresh=False):
+        """
+        Recompute and upsert the rollup rows for the given dates
+
+        Consecutive days are computed together with one time-bucketed query per
+        fact table, so rebuilding a month costs the same handful of queries as one day.
+
+        Args:
+            days: Iterable of date objects
+            refresh: Stamp the rows as written by refresh(); backfills leave the
+                watermark alone so days changed since the last refresh are still found
+
+        Returns:
+            Number of rows written
+        """
+        days = sorted(set(days))
+        if not days:
+            return 0
+
+        # Split into runs of consecutive days so a stray old date doesn't widen the scan
+        runs = [[days[0]]]
+        for current in days[1:]:
+            if current - runs[-1][-1] == timedelta(days=1):
+                runs[-1].append(current)
+            else:
+                runs.append([current])
+
+        computed_at = timezone.now()
+        rows = []
+        for run in runs:
+            rows.extend(DailyMetricsService._compute_run(run, computed_at))
+
+        update_fields = METRIC_FIELDS + ['computed_at']
+        if refresh:
+            for row in rows:
+                row.refreshed_at = computed_at
+            update_fields.append('refreshed_at')
+
+        DailyPlatformMetrics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=update_fields,
+        )
+        return len(rows)
+
+    @staticmethod
+    def _compute_run(days, computed_at):
+        """Compute unsaved rollup rows for a run of consecutive days"""
+        start, end = days[0], days[-1]
+
+        users = time_series(User.objects.all(), start, end, count=Count('pk'))
+        bookings = time_series(
+            Booking.objects.all(), start, end,
+            count=Count('pk'),
+            hours=Sum(booking_hours_expression()),
+            revenue=Sum('total_amount'),
+            commission=Sum('commission_amount'),
+        )
+        activity = time_series(
+            ActivityLog.objects.filter(user__isnull=False), start, end,
+            count=Count('user', distinct=True)
+        )
+        reports = time_series(Report.objects.all(), start, end, count=Count('pk'))
+
+        return [
+            DailyPlatformMetrics(
+                date=current,
+                new_users=users['count'][i],
+                bookings=bookings['count'][i],
+                booking_hours=_to_decimal(bookings['hours'][i]),
+                revenue=_to_decimal(bookings['revenue'][i]),
+                commission=_to_decimal(bookings['commission'][i]),
+                active_users=activity['count'][i],
+                new_reports=reports['count'][i],
+                computed_at=computed_at,
+            )
+            for i, current in enumerate(users['buckets'])
+        ]
+
+    @staticmethod
+    def changed_days(since):
+        """
+        Return the local dates with fact rows created or updated since a timestamp
+
+        Args:
+            since: Aware datetime of the previous refresh
+        """
+        day = TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+        sources = [
+            User.objects.filter(created_at__gte=since),
+            Booking.objects.filter(updated_at__gte=since),
+            ActivityLog.objects.filter(created_at__gte=since),
+            Report.objects.filter(created_at__gte=since),
+        ]
+        days = set()
+        for queryset in sources:
+            days.update(queryset.annotate(day=day).values_list('day', flat=True).distinct())
+        return days
+
+    @staticmethod
+    def refresh(full=False):
+        """
+        Bring the rollup up to date
+
+        Args:
+            full: Rebuild every day from the earliest fact row instead of only changed days
+
+        Returns:
+            Number of rows written
+        """
+        today = timezone.localdate()
+        last_run = DailyMetricsService.last_refresh()
+
+        if full or last_run is None:
+            earliest = [
+                model.objects.aggregate(first=Min('created_at'))['first']
+                for model in (User, Booking, ActivityLog, Report)
+            ]
+            earliest = [timezone.localtime(value).date() for value in earliest if value]
+            start = min(earliest) if earliest else today
+            days = [start + timedelta(days=i) for i in range((today - start).days + 1)]
+        else:
+            days = DailyMetricsService.changed_days(last_run)
+            days.add(today)
+
+        return DailyMetricsService.build_days(days, refresh=True)
+
+    @staticmethod
+    def last_refresh():
+        """Start of the last incremental or full refresh (None if there never was one)"""
+        return DailyPlatformMetrics.objects.aggregate(last=Max('refreshed_at'))['last']
+
+    @staticmethod
+    def get_range(start_date, end_date):
+        """
+        Return rollup rows for an inclusive date range, refreshing as needed
+
+        The rollup is refreshed when it is older than DAILY_METRICS_REFRESH_SECONDS,
+        and any day in the range that has never been built is filled in.
+
+        Returns:
+            Dict mapping date -> DailyPlatformMetrics, with an entry for every day
+        """
+        max_age = getattr(settings, 'DAILY_METRICS_REFRESH_SECONDS', 300)
+        last_run = DailyMetricsService.last_refresh()
+        if last_run is None or last_run <= timezone.now() - timedelta(seconds=max_age):
+            DailyMetricsService.refresh()
+
+        rows = {
+            row.date: row
+            for row in DailyPlatformMetrics.objects.filter(date__gte=start_date, date__lte=end_date)
+        }
+        all_days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        missing = [day for day in all_days if day not in rows]
+        if missing:
+            DailyMetricsService.build_days(missing)
+            rows.update({
+                row.date: row
+                for row in DailyPlatformMetrics.objects.filter(date__in=missing)
+            })
+        return rows
+
+
+class ExportJobService:
+    """
+    Queues admin exports and writes them to files under MEDIA_ROOT/exports
+
+    Jobs are claimed by ``python manage.py run_export_worker`` with
+    SELECT ... FOR UPDATE SKIP LOCKED, so several workers can run at once.
+    """
+
+    EXPORT_SUBDIR = 'exports'
+    FILE_EXTENSIONS = {'csv': '.csv.gz', 'parquet': '.parquet'}
+
+    @staticmethod
+    def params_hash(export_type, file_format, params):
+        """Stable hash identifying identical export requests"""
+        payload = json.dumps([export_type, file_format, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def request_export(export_type, params, file_format='csv', user=None):
+        """
+        Queue an export, reusing a recent identical job when possible
+
+        A pending, running or completed job with the same type, format and
+        parameters created within EXPORT_JOB_REUSE_SECONDS is returned instead
+        of queuing a new one (completed jobs only if their file still exists).
+
+        Returns:
+            Tuple of (ExportJob, reused)
+
+        Raises:
+            ValueError: If the export type, format or parameters are invalid
+        """
+        if file_format not in ExportJobService.FILE_EXTENSIONS:
+            raise ValueError(f"format must be one of: {', '.join(ExportJobService.FILE_EXTENSIONS)}")
+        if file_format == 'parquet' and not parquet_available():
+            raise ValueError('Parquet exports require pyarrow to be installed')
+
+        params = normalize_export_params(export_type, params)
+        params_hash = ExportJobService.params_hash(export_type, file_format, params)
+
+        reuse_window = getattr(settings, 'EXPORT_JOB_REUSE_SECONDS', 900)
+        if reuse_window > 0:
+            candidates = ExportJob.objects.filter(
+                params_hash=params_hash,
+                status__in=['pending', 'running', 'completed'],
+                created_at__gte=timezone.now() - timedelta(seconds=reuse_window),
+            ).order_by('-created_at')
+            for job in candidates[:5]:
+                if job.status != 'completed' or ExportJobService.artefact_exists(job):
+                    return job, True
+
+        job = ExportJob.objects.create(
+            export_type=export_type,
+            file_format=file_format,
+            params=params,
+            params_hash=params_hash,
+            requested_by=user,
+        )
+        return job, False
+
+    @staticmethod
+    def artefact_path(job):
+        """Absolute path of a job's artefact, or None if it has none"""
+        if not job.file_path:
+            return None
+        return os.path.join(settings.MEDIA_ROOT, job.file_path)
+
+    @staticmethod
+    def artefact_exists(job):
+        path = ExportJobService.artefact_path(job)
+        return path is not None and os.path.exists(path)
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically mark the oldest runnable job as running and return it
+
+        Jobs left running longer than EXPORT_JOB_TIMEOUT_SECONDS (e.g. after a
+        worker crash) are picked up again.
+
+        Returns:
+            ExportJob or None when the queue is empty
+        """
+        timeout = getattr(settings, 'EXPORT_JOB_TIMEOUT_SECONDS', 3600)
+        now = timezone.now()
+
+        with transaction.atomic():
+            job = ExportJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') |
+                Q(status='running', started_at__lt=now - timedelta(seconds=timeout))
+            ).order_by('created_at').first()
+            if job is None:
+                return None
+
+            job.status = 'running'
+            job.started_at = now
+            job.save(update_fields=['status', 'started_at'])
+        return job
+
+    @staticmethod
+    def run(job):
+        """
+        Write a claimed job's artefact and record the outcome
+
+        Rows are streamed from the database straight into the compressed file,
+        so memory use does not depend on the size of the export.
+        """
+        try:
+            filename, header, rows = build_export(job.export_type, job.params)
+            file_name = filename[:-len('.csv')] + ExportJobService.FILE_EXTENSIONS[job.file_format]
+            month_dir = timezone.now().strftime('%Y/%m')
+            relative_path = os.path.join(ExportJobService.EXPORT_SUBDIR, month_dir, f'{job.job_id}_{file_name}')
+            absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+
+            if job.file_format == 'parquet':
+                row_count = write_parquet_file(absolute_path, header, rows)
+            else:
+                row_count = write_csv_gz_file(absolute_path, header, rows)
+        except Exception as exc:
+            logger.exception("Export job %s failed", job.job_id)
+            job.status = 'failed'
+            job.error = str(exc)[:2000]
+            job.completed_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'completed_at'])
+            return job
+
+        job.status = 'completed'
+        job.file_path = relative_path
+        job.file_name = file_name
+        job.file_size = os.path.getsize(absolute_path)
+        job.row_count = row_count
+        job.error = None
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'file_path', 'file_name', 'file_size', 'row_count', 'error', 'completed_at'])
+        return job
+
+    @staticmethod
+    def purge_expired():
+        """
+        Delete artefacts of completed jobs older than EXPORT_JOB_RETENTION_DAYS
+
+        Returns:
+            Number of jobs expired
+        """
+        retention_days = getattr(settings, 'EXPORT_JOB_RETENTION_DAYS', 7)
+        cutoff = timezone.now() - timedelta(days=retention_days)
+
+        expired = 0
+        for job in ExportJob.objects.filter(status='completed', completed_at__lt=cutoff).iterator():
+            path = ExportJobService.artefact_path(job)
+            if path and os.path.exists(path):
+                os.remove(path)
+            job.status = 'expired'
+            job.save(update_fields=['status'])
+            expired += 1
+        return expired
+
+
+class FlaggedUserService:
+    """
+    Detects users who need moderator attention and materialises them into FlaggedUser
+
+    A user is flagged when any of these hold:
+      - at least FLAG_MIN_BOOKINGS bookings with more than FLAG_CANCELLATION_RATE % cancelled
+      - at least FLAG_REPORTS_AGAINST reports filed against them
+      - at least FLAG_REPORTS_FILED reports filed by them (potential spam)
+    """
+
+    REFRESHED_AT_CACHE_KEY = 'admindashboard:flagged_users:refreshed_at'
+
+    FLAG_MIN_BOOKINGS = 5
+    FLAG_CANCELLATION_RATE = 50
+    FLAG_REPORTS_AGAINST = 3
+    FLAG_REPORTS_FILED = 10
+
+    @staticmethod
+    def _report_count(**filters):
+        """Correlated COUNT(*) of reports, avoiding a second fan-out join"""
+        reports = Report.objects.filter(**filters).order_by().annotate(
+            n=Func(F('pk'), function='COUNT')
+        ).values('n')
+        return Coalesce(Subquery(reports, output_field=IntegerField()), 0)
+
+    @staticmethod
+    def detection_queryset():
+        """
+        Every flagged user with their metrics, as one grouped query
+
+        Booking counts come from conditional aggregates over the booking join,
+        report counts from indexed correlated subqueries, and the flag
+        conditions are applied in a HAVING clause.
+        """
+        service = FlaggedUserService
+        cancellation_rate = (
+            Cast(F('cancelled_bookings'), FloatField()) * 100.0 /
+            NullIf(Cast(F('total_bookings'), FloatField()), 0.0)
+        )
+
+        return User.objects.order_by().annotate(
+            reports_against=service._report_count(resource_type='user', resource_id=OuterRef('pk')),
+            reports_filed=service._report_count(reporter_user=OuterRef('pk')),
+        ).values('pk', 'reports_against', 'reports_filed').annotate(
+            total_bookings=Count('booking'),
+            cancelled_bookings=Count('booking', filter=Q(booking__status__status_name='cancelled')),
+        ).annotate(
+            cancellation_rate=cancellation_rate,
+        ).filter(
+            Q(total_bookings__gte=service.FLAG_MIN_BOOKINGS, cancellation_rate__gt=service.FLAG_CANCELLATION_RATE) |
+            Q(reports_against__gte=service.FLAG_REPORTS_AGAINST) |
+            Q(reports_filed__gte=service.FLAG_REPORTS_FILED)
+        )
+
+    @staticmethod
+    def refresh():
+        """
+        Recompute the FlaggedUser table
+
+        Returns:
+            Number of users currently flagged
+        """
+        service = FlaggedUserService
+        computed_at = timezone.now()
+        rows = []
+        for row in service.detection_queryset().iterator():
+            rate = row['cancellation_rate'] or 0
+            rows.append(FlaggedUser(
+                user_id=row['pk'],
+                total_bookings=row['total_bookings'],
+                cancelled_bookings=row['cancelled_bookings'],
+                cancellation_rate=_to_decimal(rate),
+                reports_against=row['reports_against'],
+                reports_filed=row['reports_filed'],
+                high_cancellation=(
+                    row['total_bookings'] >= service.FLAG_MIN_BOOKINGS and rate > service.FLAG_CANCELLATION_RATE
+                ),
+                multiple_reports=row['reports_against'] >= service.FLAG_REPORTS_AGAINST,
+                excessive_reporting=row['reports_filed'] >= service.FLAG_REPORTS_FILED,
+                computed_at=computed_at,
+            ))
+
+        with transaction.atomic():
+            FlaggedUser.objects.exclude(user_id__in=[row.user_id for row in rows]).delete()
+            FlaggedUser.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=[
+                    'total_bookings', 'cancelled_bookings', 'cancellation_rate', 'reports_against',
+                    'reports_filed', 'high_cancellation', 'multiple_reports', 'excessive_reporting',
+                    'computed_at',
+                ],
+            )
+        cache.set(service.REFRESHED_AT_CACHE_KEY, computed_at, None)
+        return len(rows)
+
+    @staticmethod
+    def last_refreshed():
+        """Time of the last refresh, or None if the table has never been built"""
+        last_run = cache.get(FlaggedUserService.REFRESHED_AT_CACHE_KEY)
+        if last_run is None:
+            last_run = FlaggedUser.objects.aggregate(last=Max('computed_at'))['last']
+        return last_run
+
+    @staticmethod
+    def get_queryset():
+        """
+        Flagged users ordered by severity, refreshing the table when stale
+
+        The table is rebuilt when the last refresh (run by this request path or
+        the refresh_flagged_users command) is older than FLAGGED_USERS_REFRESH_SECONDS.
+        """
+        max_age = getattr(settings, 'FLAGGED_USERS_REFRESH_SECONDS', 300)
+        last_run = FlaggedUserService.last_refreshed()
+        if last_run is None or last_run <= timezone.now() - timedelta(seconds=max_age):
+            FlaggedUserService.refresh()
+
+        return FlaggedUser.objects.select_related('user').order_by(
+            '-reports_against', '-cancellation_rate', 'user_id'
+        )
+
+
+# Snapshots to flag once the saving transaction commits, by facility and by court
+_stale_facilities = CommitBatch(lambda facility_ids: FacilityAnalyticsSnapshot.objects.filter(
+    facility_id__in=facility_ids, is_stale=False
+).update(is_stale=True))
+_stale_courts = CommitBatch(lambda court_ids: FacilityAnalyticsSnapshot.objects.filter(
+    facility__court__pk__in=court_ids, is_stale=False
+).update(is_stale=True))
+
+
+class FacilityAnalyticsService:
+    """
+    Maintains one FacilityAnalyticsSnapshot row per facility
+
+    Snapshots are rebuilt in batches: facilities sharing a timezone are
+    computed together with five grouped queries (courts, booking totals,
+    hourly histogram, sport mix, occupancy), however many facilities are in
+    the batch.
+    Booking and court changes mark the affected snapshot stale (see
+    app/admindashboard/signals.py); month-to-date values are also treated
+    as stale once the facility's local month rolls over, and the occupancy
+    rate (which counts only slots that have started) once the snapshot is
+    older than FACILITY_SNAPSHOT_REFRESH_SECONDS.
+    """
+
+    @staticmethod
+    def _month_start(tz):
+        """First instant of the current month in a timezone"""
+        local_now = timezone.localtime(timezone.now(), tz)
+        return local_now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def build(facility_ids):
+        """
+        Recompute and upsert snapshots for the given facilities
+
+        Returns:
+            Number of snapshots written
+        """
+        facilities = list(Facility.objects.filter(facility_id__in=facility_ids).only('facility_id', 'timezone'))
+        by_timezone = defaultdict(list)
+        for facility in facilities:
+            by_timezone[facility.timezone or settings.TIME_ZONE].append(facility)
+
+        # Clear the flag before reading, and leave it out of the upsert, so a
+        # change saved while the snapshot is computed marks it stale again
+        FacilityAnalyticsSnapshot.objects.filter(
+            facility_id__in=[facility.facility_id for facility in facilities], is_stale=True
+        ).update(is_stale=False)
+
+        computed_at = timezone.now()
+        rows = []
+        for tz_name, group in by_timezone.items():
+            rows.extend(FacilityAnalyticsService._compute_group(group, ZoneInfo(tz_name), computed_at))
+
+        FacilityAnalyticsSnapshot.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['facility'],
+            update_fields=[
+                'total_courts', 'active_courts', 'total_bookings', 'completed_bookings',
+                'cancelled_bookings', 'total_revenue', 'commission_collected', 'month_start',
+                'bookings_this_month', 'revenue_this_month', 'hourly_histogram', 'sport_mix',
+                'peak_booking_hour', 'most_popular_sport', 'average_booking_rate', 'computed_at',
+            ],
+        )
+        return len(rows)
+
+    @staticmethod
+    def _compute_group(facilities, tz, computed_at):
+        """Compute unsaved snapshots for facilities that share a timezone"""
+        ids = [facility.facility_id for facility in facilities]
+        month_start = FacilityAnalyticsService._month_start(tz)
+
+        courts = {
+            row['facility_id']: row
+            for row in Court.objects.filter(facility_id__in=ids).values('facility_id').annotate(
+                total=Count('pk'),
+                active=Count('pk', filter=Q(is_active=True)),
+            )
+        }
+
+        bookings = Booking.objects.filter(court__facility_id__in=ids).order_by()
+        totals = {
+            row['court__facility_id']: row
+            for row in bookings.values('court__facility_id').annotate(
+                total=Count('pk'),
+                completed=Count('pk', filter=Q(status__status_name='confirmed')),
+                cancelled=Count('pk', filter=Q(status__status_name='cancelled')),
+                revenue=Sum('total_amount'),
+                commission=Sum('commission_amount'),
+                month_total=Count('pk', filter=Q(created_at__gte=month_start)),
+                month_revenue=Sum('total_amount', filter=Q(created_at__gte=month_start)),
+            )
+        }
+
+        histograms = defaultdict(lambda: [0] * 24)
+        for row in bookings.annotate(hour=ExtractHour('start_time', tzinfo=tz)).values(
+            'court__facility_id', 'hour'
+        ).annotate(count=Count('pk')):
+            histograms[row['court__facility_id']][row['hour']] = row['count']
+
+        sport_mix = defaultdict(dict)
+        for row in bookings.values('court__facility_id', 'court__sport_type__sport_name').annotate(count=Count('pk')):
+            sport_mix[row['court__facility_id']][row['court__sport_type__sport_name']] = row['count']
+
+        # Occupancy: booked share of the slot-hours offered so far
+        occupancy = {
+            row['court__facility_id']: occupancy_rate(
+                (row['booked'] or timedelta()).total_seconds(),
+                (row['offered'] or timedelta()).total_seconds(),
+            )
+            for row in occupancy_totals(
+                annotated_slots(Availability.objects.filter(court__facility_id__in=ids, start_time__lt=computed_at)),
+                'court__facility_id',
+            )
+        }
+
+        snapshots = []
+        for facility in facilities:
+            fid = facility.facility_id
+            court_row = courts.get(fid, {})
+            total_row = totals.get(fid, {})
+            histogram = histograms[fid]
+            sports = sport_mix[fid]
+            total_bookings = total_row.get('total', 0)
+
+            snapshots.append(FacilityAnalyticsSnapshot(
+                facility_id=fid,
+                total_courts=court_row.get('total', 0),
+                active_courts=court_row.get('active', 0),
+                total_bookings=total_bookings,
+                completed_bookings=total_row.get('completed', 0),
+                cancelled_bookings=total_row.get('cancelled', 0),
+                total_revenue=total_row.get('revenue') or Decimal('0'),
+                commission_collected=total_row.get('commission') or Decimal('0'),
+                month_start=month_start.date(),
+                bookings_this_month=total_row.get('month_total', 0),
+                revenue_this_month=total_row.get('month_revenue') or Decimal('0'),
+                hourly_histogram=histogram,
+                sport_mix=sports,
+                peak_booking_hour=histogram.index(max(histogram)) if total_bookings else None,
+                most_popular_sport=max(sports, key=sports.get) if sports else None,
+                average_booking_rate=occupancy.get(fid, 0.0),
+                is_stale=False,
+                computed_at=computed_at,
+            ))
+        return snapshots
+
+    @staticmethod
+    def mark_stale(facility_id):
+        """Flag a facility's snapshot for rebuild on next read"""
+        FacilityAnalyticsSnapshot.objects.filter(facility_id=facility_id, is_stale=False).update(is_stale=True)
+
+    @staticmethod
+    def mark_stale_on_commit(facility_id=None, court_id=None):
+        """
+        Flag a facility's snapshot, or that of the facility owning court_id,
+        once the current transaction commits
+
+        Every snapshot touched by one transaction is flagged together, and
+        the snapshot rows stay unlocked while the transaction is open.
+        """
+        _stale_facilities.add(facility_id)
+        _stale_courts.add(court_id)
+
+    @staticmethod
+    def refresh(facilities):
+        """
+        Rebuild missing, stale, expired or previous-month snapshots among the given facilities
+
+        Args:
+            facilities: Facility queryset to check
+
+        Returns:
+            Number of snapshots rebuilt
+        """
+        month_starts = {}
+
+        def current_month_start(tz_name):
+            tz_name = tz_name or settings.TIME_ZONE
+            if tz_name not in month_starts:
+                month_starts[tz_name] = FacilityAnalyticsService._month_start(ZoneInfo(tz_name)).date()
+            return month_starts[tz_name]
+
+        max_age = getattr(settings, 'FACILITY_SNAPSHOT_REFRESH_SECONDS', 900)
+        expired_before = timezone.now() - timedelta(seconds=max_age)
+
+        rows = facilities.order_by().values_list(
+            'facility_id', 'timezone', 'analytics_snapshot__is_stale', 'analytics_snapshot__month_start',
+            'analytics_snapshot__computed_at',
+        )
+        outdated = [
+            facility_id
+            for facility_id, tz_name, is_stale, month_start, computed_at in rows
+            if is_stale is None or is_stale or month_start != current_month_start(tz_name)
+            or computed_at <= expired_before
+        ]
+        if not outdated:
+            return 0
+        return FacilityAnalyticsService.build(outdated)
+
+    @staticmethod
+    def get(facility):
+        """Return an up-to-date snapshot for one facility"""
+        FacilityAnalyticsService.refresh(Facility.objects.filter(pk=facility.pk))
+        return FacilityAnalyticsSnapshot.objects.get(facility=facility)
+
+    @staticmethod
+    def manager_totals(manager):
+        """
+        Aggregate the snapshots of every facility a manager runs
+
+        Returns:
+            Dict of facility counts plus summed courts, bookings and revenue
+        """
+        facilities = Facility.objects.filter(manager=manager)
+        FacilityAnalyticsService.refresh(facilities)
+
+        totals = facilities.aggregate(
+            total_facilities=Count('pk'),
+            active_facilities=Count('pk', filter=Q(is_active=True, is_suspended=False)),
+            suspended_facilities=Count('pk', filter=Q(is_suspended=True)),
+            total_courts=Sum('analytics_snapshot__total_courts'),
+            total_bookings=Sum('analytics_snapshot__total_bookings'),
+            total_revenue=Sum('analytics_snapshot__total_revenue'),
+            commission_collected=Sum('analytics_snapshot__commission_collected'),
+            bookings_this_month=Sum('analytics_snapshot__bookings_this_month'),
+            revenue_this_month=Sum('analytics_snapshot__revenue_this_month'),
+        )
+        for key in ('total_courts', 'total_bookings', 'bookings_this_month'):
+            totals[key] = totals[key] or 0
+        for key in ('total_revenue', 'commission_collected', 'revenue_this_month'):
+            totals[key] = totals[key] or Decimal('0.00')
+        return totals
+
+
+class RequestMetricsService:
+    """
+    Reads the request_metrics time series written by the metrics aggregator
+
+    Counters are summed in SQL; latency percentiles are estimated from the
+    merged histograms of the matching rows. Rows older than a day are
+    compacted into wider buckets so long windows read few rows.
+    """
+
+    QUANTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+
+    COUNTERS = {
+        'requests': Sum('request_count'),
+        'client_errors': Sum('client_error_count'),
+        'server_errors': Sum('server_error_count'),
+        'latency_sum': Sum('latency_sum_ms'),
+        'latency_max': Max('latency_max_ms'),
+        'queries': Sum('db_query_count'),
+        'db_time': Sum('db_time_ms'),
+    }
+
+    @staticmethod
+    def summarize(totals, histogram):
+        """
+        Build a summary from COUNTERS totals and the merged latency histogram
+
+        Returns:
+            Dict with request/error counts, error rate (percent), mean and
+            percentile latencies in ms, and DB query totals
+        """
+        requests = totals['requests'] or 0
+        server_errors = totals['server_errors'] or 0
+        queries = totals['queries'] or 0
+        latency_sum = totals['latency_sum'] or 0.0
+        latency_max = totals['latency_max'] or 0.0
+        db_time = totals['db_time'] or 0.0
+
+        summary = {
+            'requests': requests,
+            'client_errors': totals['client_errors'] or 0,
+            'server_errors': server_errors,
+            'error_rate': round(server_errors / requests * 100, 2) if requests else 0.0,
+            'avg_latency_ms': round(latency_sum / requests, 2) if requests else 0.0,
+            'max_latency_ms': round(latency_max, 2),
+            'db_queries': queries,
+            'avg_db_queries': round(queries / requests, 2) if requests else 0.0,
+            'avg_db_time_ms': round(db_time / requests, 2) if requests else 0.0,
+            'latency_sum_ms': round(latency_sum, 2),
+        }
+        for name, quantile in RequestMetricsService.QUANTILES:
+            summary[f'{name}_latency_ms'] = histogram_percentile(histogram, quantile, latency_max) or 0.0
+        return summary
+
+    @staticmethod
+    def _window(start, end):
+        return RequestMetric.objects.filter(bucket_start__gte=start, bucket_start__lt=end)
+
+    @staticmethod
+    def overall(start, end):
+        """Summary of every request between start and end"""
+        window = RequestMetricsService._window(start, end)
+        totals = window.aggregate(**RequestMetricsService.COUNTERS)
+        histogram = merge_histograms(window.values_list('latency_histogram', flat=True).iterator())
+        return RequestMetricsService.summarize(totals, histogram)
+
+    @staticmethod
+    def by_endpoint(start, end):
+        """
+        Per-endpoint summaries between start and end
+
+        Returns:
+            Dict keyed by (endpoint, method), busiest first
+        """
+        window = RequestMetricsService._window(start, end)
+        histograms = defaultdict(empty_histogram)
+        for endpoint, method, histogram in window.values_list('endpoint', 'method', 'latency_histogram').iterator():
+            key = (endpoint, method)
+            histograms[key] = merge_histograms([histograms[key], histogram])
+
+        totals = window.values('endpoint', 'method').annotate(**RequestMetricsService.COUNTERS).order_by('-requests')
+        summaries = {}
+        for row in totals:
+            key = (row['endpoint'], row['method'])
+            summaries[key] = RequestMetricsService.summarize(row, histograms[key])
+        return summaries
+
+    @staticmethod
+    def daily_series(start_date, end_date, tzinfo=None):
+        """Per-day request and 5xx counts (local dates, zero-filled)"""
+        return time_series(
+            RequestMetric.objects.all(), start_date, end_date,
+            field='bucket_start', tzinfo=tzinfo,
+            requests=Sum('request_count'), errors=Sum('server_error_count'),
+        )
+
+    @staticmethod
+    def compact(before=None):
+        """
+        Merge rows older than METRICS_COMPACT_AFTER_HOURS into
+        METRICS_COMPACT_BUCKET_SECONDS buckets, one row per endpoint
+
+        Works an hour of rows at a time; rows already that wide are left
+        alone, so repeated runs only touch what was written since.
+
+        Returns:
+            Number of rows removed by merging
+        """
+        width = getattr(settings, 'METRICS_COMPACT_BUCKET_SECONDS', 900)
+        if before is None:
+            before = timezone.now() - timedelta(hours=getattr(settings, 'METRICS_COMPACT_AFTER_HOURS', 24))
+        before = align_to_bucket(before, width)
+        chunk = timedelta(seconds=width * max(1, 3600 // width))
+        pending = RequestMetric.objects.filter(bucket_start__lt=before, bucket_seconds__lt=width)
+
+        removed = 0
+        first = pending.aggregate(first=Min('bucket_start'))['first']
+        while first is not None:
+            chunk_start = align_to_bucket(first, width)
+            chunk_end = min(chunk_start + chunk, before)
+            with transaction.atomic():
+                rows = list(RequestMetric.objects.select_for_update().filter(
+                    bucket_start__gte=chunk_start, bucket_start__lt=chunk_end
+                ))
+                merged = {}
+                for row in rows:
+                    key = (align_to_bucket(row.bucket_start, width), row.endpoint, row.method)
+                    target = merged.get(key)
+                    if target is None:
+                        merged[key] = RequestMetric(
+                            bucket_start=key[0], bucket_seconds=width, endpoint=row.endpoint, method=row.method,
+                            request_count=row.request_count, client_error_count=row.client_error_count,
+                            server_error_count=row.server_error_count, status_counts=dict(row.status_counts),
+                            latency_sum_ms=row.latency_sum_ms, latency_max_ms=row.latency_max_ms,
+                            latency_histogram=merge_histograms([row.latency_histogram]),
+                            db_query_count=row.db_query_count, db_time_ms=row.db_time_ms,
+                        )
+                        continue
+                    target.request_count += row.request_count
+                    target.client_error_count += row.client_error_count
+                    target.server_error_count += row.server_error_count
+                    for code, count in row.status_counts.items():
+                        target.status_counts[code] = target.status_counts.get(code, 0) + count
+                    target.latency_sum_ms += row.latency_sum_ms
+                    target.latency_max_ms = max(target.latency_max_ms, row.latency_max_ms)
+                    target.latency_histogram = merge_histograms([target.latency_histogram, row.latency_histogram])
+                    target.db_query_count += row.db_query_count
+                    target.db_time_ms += row.db_time_ms
+
+                RequestMetric.objects.filter(
+                    bucket_start__gte=chunk_start, bucket_start__lt=chunk_end, pk__lte=max(row.pk for row in rows)
+                ).delete()
+                RequestMetric.objects.bulk_create(merged.values())
+            removed += len(rows) - len(merged)
+            first = pending.filter(bucket_start__gte=chunk_end).aggregate(first=Min('bucket_start'))['first']
+        return removed
+
+    @staticmethod
+    def purge(days=None):
+        """
+        Delete metric rows older than METRICS_RETENTION_DAYS
+
+        Returns:
+            Number of rows deleted
+        """
+        days = days if days is not None else getattr(settings, 'METRICS_RETENTION_DAYS', 30)
+        deleted, _ = RequestMetric.objects.filter(bucket_start__lt=timezone.now() - timedelta(days=days)).delete()
+        return deleted
+
+
+class ProfileCaptureService:
+    """
+    Stores and reads request profiles captured by ProfilingMiddleware
+
+    Each capture is a ProfileCapture row plus a JSON artefact under
+    MEDIA_ROOT/profiles, deleted after PROFILING_RETENTION_DAYS.
+    """
+
+    PROFILE_SUBDIR = 'profiles'
+
+    @staticmethod
+    def record(request, status_code, duration_ms, reason, sql, profile):
+        """
+        Write a capture's artefact and its ProfileCapture row
+
+        Args:
+            request: The profiled request (resolver_match may be None)
+            status_code: Response status code
+            duration_ms: Time spent in the view stack
+            reason: 'sampled' or 'slow'
+            sql: SQLCapture used for the request
+            profile: cprofile_summary() or stack_summary() result
+
+        Returns:
+            ProfileCapture instance
+        """
+        match = getattr(request, 'resolver_match', None)
+        url_name = (match.view_name if match else None) or 'unmatched'
+        endpoint = ('/' + match.route if match and match.route else url_name)[:255]
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        now = timezone.now()
+
+        document = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'url_name': url_name,
+            'endpoint': endpoint,
+            'status_code': status_code,
+            'duration_ms': round(duration_ms, 3),
+            'reason': reason,
+            'user_id': user_id,
+            'captured_at': now.isoformat(),
+            'sql': sql.summary(),
+            'profile': profile,
+        }
+
+        file_name = f"{now.strftime('%Y%m%dT%H%M%S%f')}_{request.method.lower()}_{url_name.replace(':', '_')[:80]}.json"
+        relative_path = os.path.join(ProfileCaptureService.PROFILE_SUBDIR, now.strftime('%Y/%m'), file_name)
+        absolute_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+        os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        with open(absolute_path, 'w', encoding='utf-8') as handle:
+            json.dump(document, handle)
+
+        return ProfileCapture.objects.create(
+            url_name=url_name[:255],
+            endpoint=endpoint,
+            method=request.method,
+            path=request.path[:500],
+            status_code=status_code,
+            duration_ms=round(duration_ms, 3),
+            query_count=sql.count,
+            db_time_ms=round(sql.elapsed * 1000, 3),
+            reason=reason,
+            profile_type=profile['type'],
+            user_id=user_id,
+            file_path=relative_path,
+            file_size=os.path.getsize(absolute_path),
+        )
+
+    @staticmethod
+    def artefact_path(capture):
+        """Absolute path of a capture's artefact"""
+        return os.path.join(settings.MEDIA_ROOT, capture.file_path)
+
+    @staticmethod
+    def slowest_by_url_name(since, per_url_name=5, url_name=None):
+        """
+        The slowest captures since a point in time, grouped by URL name
+
+        One grouped query finds each URL name's totals and one windowed query
+        its per_url_name slowest captures.
+
+        Returns:
+            List of dicts (url_name, capture_count, max/avg duration, captures)
+            ordered by the slowest capture first
+        """
+        captures = ProfileCapture.objects.filter(created_at__gte=since)
+        if url_name:
+            captures = captures.filter(url_name=url_name)
+
+        groups = {
+            row['url_name']: {**row, 'max_duration_ms': round(row['max_duration_ms'], 2),
+                              'avg_duration_ms': round(row['avg_duration_ms'], 2), 'captures': []}
+            for row in captures.order_by().values('url_name').annotate(
+                capture_count=Count('pk'),
+                max_duration_ms=Max('duration_ms'),
+                avg_duration_ms=Avg('duration_ms'),
+            )
+        }
+
+        slowest = captures.annotate(
+            rank=Window(RowNumber(), partition_by=F('url_name'), order_by=F('duration_ms').desc())
+        ).filter(rank__lte=per_url_name).select_related('user').order_by('url_name', 'rank')
+        for capture in slowest:
+            groups[capture.url_name]['captures'].append(capture)
+
+        return sorted(groups.values(), key=lambda group: group['max_duration_ms'], reverse=True)
+
+    @staticmethod
+    def purge(days=None):
+        """
+        Delete captures and their artefacts older than PROFILING_RETENTION_DAYS
+
+        Returns:
+            Number of captures deleted
+        """
+        days = days if days is not None else getattr(settings, 'PROFILING_RETENTION_DAYS', 7)
+        expired = ProfileCapture.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+        for relative_path in expired.values_list('file_path', flat=True).iterator():
+            path = os.path.join(settings.MEDIA_ROOT, relative_path)
+            if os.path.exists(path):
+                os.remove(path)
+        deleted, _ = expired.delete()
+        return deleted
+
+
+_refund_executor = None
+_refund_executor_lock = threading.Lock()
+
+
+def _get_refund_executor():
+    """Per-process pool that runs refund batches when REFUND_BATCH_EXECUTOR is 'thread'"""
+    global _refund_executor
+    with _refund_executor_lock:
+        if _refund_executor is None:
+            _refund_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='refund-batch-runner')
+        return _refund_executor
+
+
+class RefundBatchService:
+    """
+    Refunds many bookings in one background job
+
+    The affected bookings are selected together with their completed payment
+    in a single query when the batch is created. run() then works through
+    the items in chunks of REFUND_BATCH_CHUNK_SIZE: the provider refunds of a
+    chunk are issued concurrently on at most REFUND_BATCH_WORKERS threads
+    (the threads only make HTTP calls), after which the chunk's items,
+    payments, bookings and refund requests are updated with a few bulk
+    statements. Every refund carries its item's idempotency key, so a batch
+    reclaimed after a crash does not refund anyone twice. One AdminActionLog
+    entry summarises the finished batch.
+
+    Batches are started after the creating transaction commits on a thread in
+    the web process (REFUND_BATCH_EXECUTOR = 'thread') or by
+    ``python manage.py run_refund_worker`` ('worker'), which also reclaims
+    batches a crashed process left running.
+    """
+
+    # Note shown to the payer by the provider
+    REFUND_NOTES = {
+        'facility_suspension': 'Your booking was cancelled because the facility is unavailable',
+        'refund_requests': 'Your refund request was approved',
+    }
+
+    @staticmethod
+    def _completed_payment(booking_ref, field='payment_id'):
+        """Subquery for a field of the booking's (first) completed payment"""
+        return Subquery(Payment.objects.filter(
+            booking_id=OuterRef(booking_ref),
+            status__status_name='completed'
+        ).order_by('payment_id').values(field)[:1])
+
+    @staticmethod
+    def for_suspension(suspension, user):
+        """
+        Queue refunds for every confirmed upcoming booking of a suspended facility
+
+        Returns:
+            RefundBatch, or None when the facility has no such bookings
+        """
+        rows = Booking.objects.filter(
+            court__facility_id=suspension.facility_id,
+            status__status_name='confirmed',
+            start_time__gt=timezone.now(),
+        ).annotate(
+            paid_payment_id=RefundBatchService._completed_payment('pk')
+        ).order_by('booking_id').values_list('booking_id', 'paid_payment_id')
+
+        items = [
+            RefundBatchItem(booking_id=booking_id, payment_id=payment_id)
+            for booking_id, payment_id in rows
+        ]
+        return RefundBatchService._create(
+            items,
+            source='facility_suspension',
+            user=user,
+            reason=suspension.reason,
+            facility_id=suspension.facility_id,
+            suspension=suspension,
+        )
+
+    @staticmethod
+    def for_refund_requests(request_ids, user, reason):
+        """
+        Queue provider refunds for approved refund requests
+
+        Each request is refunded up to the amount of its booking's completed
+        payment; requests without one are skipped. Requests that are not
+        refunded are marked 'failed' with the error in metadata.
+
+        Returns:
+            RefundBatch, or None when none of the requests exist
+        """
+        rows = RefundRequest.objects.filter(request_id__in=request_ids).annotate(
+            paid_payment_id=RefundBatchService._completed_payment('booking_id'),
+            paid_amount=RefundBatchService._completed_payment('booking_id', 'amount'),
+        ).order_by('request_id').values_list('request_id', 'booking_id', 'amount', 'paid_payment_id', 'paid_amount')
+
+        items = []
+        for request_id, booking_id, amount, payment_id, paid_amount in rows:
+            if paid_amount is not None and amount >= paid_amount:
+                amount = None  # Full refund
+            items.append(RefundBatchItem(
+                booking_id=booking_id,
+                payment_id=payment_id,
+                refund_request_id=request_id,
+                amount=amount,
+            ))
+        return RefundBatchService._create(items, source='refund_requests', user=user, reason=reason)
+
+    @staticmethod
+    def _create(items, source, user, reason, facility_id=None, suspension=None):
+        if not items:
+            return None
+
+        with transaction.atomic():
+            batch = RefundBatch.objects.create(
+                source=source,
+                facility_id=facility_id,
+                suspension=suspension,
+                requested_by=user,
+                reason=reason,
+                total_items=len(items),
+            )
+            for item in items:
+                item.batch = batch
+            RefundBatchItem.objects.bulk_create(items)
+
+            if getattr(settings, 'REFUND_BATCH_EXECUTOR', 'thread') == 'thread':
+                batch_id = batch.batch_id
+                transaction.on_commit(lambda: _get_refund_executor().submit(RefundBatchService.run_in_thread, batch_id))
+        return batch
+
+    @staticmethod
+    def claim_next(batch_id=None):
+        """
+        Atomically mark the oldest runnable batch as running and return it
+
+        Batches left running longer than REFUND_BATCH_TIMEOUT_SECONDS (e.g.
+        after a worker crash) are picked up again.
+
+        Args:
+            batch_id: Only claim this batch
+
+        Returns:
+            RefundBatch or None when there is nothing to run
+        """
+        timeout = getattr(settings, 'REFUND_BATCH_TIMEOUT_SECONDS', 900)
+        now = timezone.now()
+
+        with transaction.atomic():
+            queryset = RefundBatch.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') |
+                Q(status='running', started_at__lt=now - timedelta(seconds=timeout))
+            )
+            if batch_id is not None:
+                queryset = queryset.filter(batch_id=batch_id)
+            batch = queryset.order_by('created_at').first()
+            if batch is None:
+                return None
+
+            batch.status = 'running'
+            batch.started_at = now
+            batch.save(update_fields=['status', 'started_at'])
+        return batch
+
+    @staticmethod
+    def run_in_thread(batch_id):
+        """Executor entry point: claim and run one batch"""
+        try:
+            batch = RefundBatchService.claim_next(batch_id)
+            if batch is not None:
+                RefundBatchService.run(batch)
+        except Exception:
+            logger.exception("Background refund batch %s failed", batch_id)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def run(batch):
+        """
+        Refund a claimed batch's pending items and record the outcome
+
+        Returns:
+            The finished RefundBatch
+        """
+        workers = getattr(settings, 'REFUND_BATCH_WORKERS', 4)
+        chunk_size = getattr(settings, 'REFUND_BATCH_CHUNK_SIZE', 50)
+        note = RefundBatchService.REFUND_NOTES[batch.source]
+        services = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='refund-batch') as executor:
+                while True:
+                    chunk = list(batch.items.filter(status='pending').select_related(
+                        'payment', 'booking'
+                    ).order_by('item_id')[:chunk_size])
+                    if not chunk:
+                        break
+
+                    for item in chunk:
+                        provider = item.payment.provider if item.payment else None
+                        if provider and provider not in services:
+                            try:
+                                services[provider] = get_payment_service(provider)
+                            except ValueError:
+                                services[provider] = None
+
+                    results = executor.map(RefundBatchService._refund, [
+                        (services.get(item.payment.provider) if item.payment else None, item, note)
+                        for item in chunk
+                    ])
+                    RefundBatchService._apply(batch, list(zip(chunk, results)))
+        except Exception as exc:
+            logger.exception("Refund batch %s failed", batch.batch_id)
+            batch.status = 'failed'
+            batch.error = str(exc)[:2000]
+        else:
+            batch.status = 'completed'
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=['status', 'error', 'completed_at'])
+
+        RefundBatchService._log(batch)
+        return batch
+
+    @staticmethod
+    def _refund(args):
+        """Issue one provider refund (runs on a pool thread)"""
+        payment_service, item, note = args
+        if item.payment is None:
+            return {'skipped': True, 'error': 'No completed payment to refund'}
+        if payment_service is None:
+            return {'success': False, 'error': f'Unsupported payment provider: {item.payment.provider}'}
+        try:
+            return payment_service.refund_payment(
+                payment_id=item.payment.provider_payment_id,
+                amount=item.amount,
+                reason=note,
+                idempotency_key=item.idempotency_key
+            )
+        except Exception as exc:
+            return {'success': False, 'error': str(exc)}
+
+    @staticmethod
+    def _apply(batch, outcomes):
+        """Store one chunk's results and update payments, bookings and requests in bulk"""
+        now = timezone.now()
+        refunded = []
+        for item, result in outcomes:
+            item.processed_at = now
+            if result.get('skipped'):
+                item.status = 'skipped'
+                item.error = result['error']
+            elif result.get('success'):
+                item.status = 'refunded'
+                item.provider_refund_id = result.get('refund_id')
+                item.error = None
+                if result.get('amount') is not None:
+                    item.amount = Decimal(str(result['amount']))
+                elif item.amount is None:
+                    item.amount = item.payment.amount
+                refunded.append(item)
+            else:
+                item.status = 'failed'
+                item.error = (result.get('error') or 'Refund failed')[:2000]
+
+        # Bookings are only cancelled once there is nothing left to give back
+        cancelled = [
+            item.booking for item, _ in outcomes
+            if batch.source == 'facility_suspension' and item.status in ('refunded', 'skipped')
+        ]
+
+        with transaction.atomic():
+            RefundBatchItem.objects.bulk_update(
+                [item for item, _ in outcomes],
+                ['status', 'amount', 'provider_refund_id', 'error', 'processed_at']
+            )
+            if refunded:
+                refunded_status, _ = PaymentStatus.objects.get_or_create(status_name='refunded')
+                Payment.objects.filter(payment_id__in=[item.payment_id for item in refunded]).update(
+                    status=refunded_status, updated_at=now
+                )
+            requests = [
+                RefundRequest(
+                    request_id=item.refund_request_id,
+                    status='processed',
+                    processed_at=now,
+                    refund_transaction_id=item.provider_refund_id
+                )
+                for item in refunded if item.refund_request_id
+            ]
+            if requests:
+                RefundRequest.objects.bulk_update(requests, ['status', 'processed_at', 'refund_transaction_id'])
+
+            # Requests nothing was refunded for end up 'failed' with the reason,
+            # so an admin can approve them again or reject them
+            errors = {
+                item.refund_request_id: item.error
+                for item, _ in outcomes
+                if item.refund_request_id and item.status in ('failed', 'skipped')
+            }
+            if errors:
+                unrefunded = list(RefundRequest.objects.filter(request_id__in=errors).only('request_id', 'metadata'))
+                for refund_request in unrefunded:
+                    refund_request.status = 'failed'
+                    refund_request.processed_at = now
+                    refund_request.metadata = {
+                        **(refund_request.metadata or {}),
+                        'refund_error': errors[refund_request.request_id],
+                        'refund_batch_id': batch.batch_id,
+                    }
+                RefundRequest.objects.bulk_update(unrefunded, ['status', 'processed_at', 'metadata'])
+            if cancelled:
+                cancelled_status, _ = BookingStatus.objects.get_or_create(status_name='cancelled')
+                Booking.objects.filter(
+                    booking_id__in=[booking.booking_id for booking in cancelled],
+                    status__status_name='confirmed'
+                ).update(status=cancelled_status, updated_at=now)
+                # Release every slot the bookings covered, as BookingService.cancel_booking does
+                Availability.objects.filter(reduce(operator.or_, [
+                    Q(court_id=booking.court_id, start_time__gte=booking.start_time, end_time__lte=booking.end_time)
+                    for booking in cancelled
+                ])).update(is_available=True)
+                FacilityAnalyticsService.mark_stale(batch.facility_id)
+                # Bulk updates skip the signal that drops the manager's overview
+                ManagerOverviewService.invalidate_for_facility(batch.facility_id)
+
+            for item, _ in outcomes:
+                if item.status == 'refunded':
+                    batch.refunded_items += 1
+                    batch.refunded_amount += item.amount
+                elif item.status == 'failed':
+                    batch.failed_items += 1
+                else:
+                    batch.skipped_items += 1
+            batch.save(update_fields=['refunded_items', 'failed_items', 'skipped_items', 'refunded_amount'])
+
+    @staticmethod
+    def _log(batch):
+        """Write the one audit entry summarising a finished batch"""
+        target_user_id = None
+        if batch.facility_id:
+            target_user_id = Facility.objects.filter(pk=batch.facility_id).values_list(
+                'manager__user_id', flat=True
+            ).first()
+
+        AdminActionLog.objects.create(
+            admin_user_id=batch.requested_by_id,
+            action_name='refund_batch',
+            resource_type='refund_batch',
+            resource_id=batch.batch_id,
+            reason=batch.reason,
+            financial_impact=-batch.refunded_amount,  # Negative because money is returned
+            target_user_id=target_user_id,
+            metadata={
+                'source': batch.source,
+                'status': batch.status,
+                'facility_id': batch.facility_id,
+                'suspension_id': batch.suspension_id,
+                'total': batch.total_items,
+                'refunded': batch.refunded_items,
+                'failed': batch.failed_items,
+                'skipped': batch.skipped_items,
+                'refunded_amount': str(batch.refunded_amount),
+                'failed_booking_ids': list(
+                    batch.items.filter(status='failed').values_list('booking_id', flat=True)[:100]
+                ),
+            }
+        )
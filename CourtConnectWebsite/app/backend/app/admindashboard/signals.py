@@ -0,0 +1,33 @@
+"""
+Admin dashboard signal handlers
+Mark facility analytics snapshots stale when their bookings, courts or slots change;
+the flags are written once the saving transaction commits
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app.bookings.models import Booking
+from app.facilities.models import Court, Availability
+from .services import FacilityAnalyticsService
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    """Invalidate the snapshot of the facility a booking belongs to"""
+    FacilityAnalyticsService.mark_stale_on_commit(court_id=instance.court_id)
+
+
+@receiver(post_save, sender=Court)
+@receiver(post_delete, sender=Court)
+def court_changed(sender, instance, **kwargs):
+    """Invalidate the snapshot of the facility a court belongs to"""
+    FacilityAnalyticsService.mark_stale_on_commit(facility_id=instance.facility_id)
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def availability_changed(sender, instance, **kwargs):
+    """Invalidate the snapshot whose occupancy depends on this slot"""
+    FacilityAnalyticsService.mark_stale_on_commit(court_id=instance.court_id)
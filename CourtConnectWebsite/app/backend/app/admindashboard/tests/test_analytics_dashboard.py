@@ -2,17 +2,24 @@
 Tests for Analytics & Dashboard functionality
 """
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
 from datetime import timedelta
+import csv
+import gzip
+import io
+from io import StringIO
 
 from app.users.models import User, Manager
 from app.facilities.models import Facility, Court, SportType, Availability
 from app.bookings.models import Booking, BookingStatus
-from app.admindashboard.models import ManagerRequest, RefundRequest, Report, ActivityLog, AdminActionLog
+from app.admindashboard.models import ManagerRequest, RefundRequest, Report, ActivityLog, AdminActionLog, FlaggedUser
+from app.admindashboard.services import FlaggedUserService
 
 
 class AnalyticsDashboardTestCase(TestCase):
@@ -21,6 +28,7 @@ class AnalyticsDashboardTestCase(TestCase):
     def setUp(self):
         """Set up test data"""
         self.client = APIClient()
+        cache.clear()
 
         # Create admin user
         self.admin_user = User.objects.create_user(
@@ -150,6 +158,31 @@ class AnalyticsDashboardTestCase(TestCase):
         self.assertEqual(activity[0]['action_name'], 'test_action')
         self.assertEqual(activity[0]['admin_email'], 'admin@test.com')
 
+    def test_dashboard_overview_query_count(self):
+        """Test dashboard overview uses one aggregate query per table"""
+        # users, managers, facilities, bookings, manager requests, refunds, reports, recent actions
+        with self.assertNumQueries(8):
+            response = self.client.get('/api/admin/dashboard/overview/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_dashboard_overview_is_cached(self):
+        """Test repeated overview requests are served from cache"""
+        first = self.client.get('/api/admin/dashboard/overview/')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/admin/dashboard/overview/')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+
+    @override_settings(DASHBOARD_CACHE_TTL=0)
+    def test_dashboard_overview_cache_disabled(self):
+        """Test a TTL of zero always recomputes the overview"""
+        self.client.get('/api/admin/dashboard/overview/')
+
+        with self.assertNumQueries(8):
+            self.client.get('/api/admin/dashboard/overview/')
+
     def test_platform_health_metrics(self):
         """Test platform health metrics endpoint"""
         response = self.client.get('/api/admin/analytics/platform-health/')
@@ -264,6 +297,101 @@ class AnalyticsDashboardTestCase(TestCase):
         self.assertIsNotNone(user1_flagged)
         self.assertIn('High cancellation rate', user1_flagged['reason'])
 
+    def _create_bookings(self, user, confirmed, cancelled):
+        """Create confirmed and cancelled one-hour bookings for a user"""
+        sport_type, _ = SportType.objects.get_or_create(sport_name='Tennis')
+        court, _ = Court.objects.get_or_create(
+            facility=self.facility,
+            name='Court 1',
+            defaults={'sport_type': sport_type, 'hourly_rate': Decimal('40.00')}
+        )
+        confirmed_status, _ = BookingStatus.objects.get_or_create(status_name='confirmed')
+        cancelled_status, _ = BookingStatus.objects.get_or_create(status_name='cancelled')
+
+        offset = Booking.objects.count()
+        statuses = [confirmed_status] * confirmed + [cancelled_status] * cancelled
+        for i, booking_status in enumerate(statuses):
+            start_time = timezone.now() + timedelta(days=offset + i + 1)
+            availability = Availability.objects.create(
+                court=court,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                is_available=False
+            )
+            Booking.objects.create(
+                user=user,
+                court=court,
+                availability=availability,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                hourly_rate_snapshot=Decimal('40.00'),
+                commission_rate_snapshot=Decimal('0.1000'),
+                status=booking_status
+            )
+
+    def test_flagged_users_one_row_per_user(self):
+        """Test a user matching several criteria is listed once with every reason"""
+        self._create_bookings(self.user1, confirmed=2, cancelled=4)
+        for _ in range(3):
+            Report.objects.create(
+                reporter_user=self.user2,
+                resource_type='user',
+                resource_id=self.user1.user_id,
+                reason='Abusive'
+            )
+        # Reports against other resources with the same id don't count
+        Report.objects.create(
+            reporter_user=self.user2,
+            resource_type='facility',
+            resource_id=self.user2.user_id,
+            reason='Dirty courts'
+        )
+
+        response = self.client.get('/api/admin/users/flagged/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Once materialised, the page is a count plus one indexed read
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/admin/users/flagged/')
+
+        data = response.data['data']
+        self.assertEqual([row['user_id'] for row in data], [self.user1.user_id])
+        self.assertEqual(data[0]['reasons'], ['High cancellation rate', 'Multiple reports'])
+        self.assertEqual(data[0]['report_count'], 3)
+        self.assertEqual(data[0]['cancellation_rate'], Decimal('66.7'))
+        self.assertEqual(response.data['meta']['total_flagged'], 1)
+
+    def test_flagged_users_filter_and_pagination(self):
+        """Test flagged users can be filtered by reason and paginated"""
+        self._create_bookings(self.user1, confirmed=0, cancelled=5)
+        for _ in range(10):
+            Report.objects.create(reporter_user=self.user2, resource_type='facility', resource_id=1)
+
+        response = self.client.get('/api/admin/users/flagged/?pageSize=1')
+        self.assertEqual(response.data['meta']['total_flagged'], 2)
+        self.assertEqual(len(response.data['data']), 1)
+
+        response = self.client.get('/api/admin/users/flagged/?reason=reporter')
+        self.assertEqual([row['user_id'] for row in response.data['data']], [self.user2.user_id])
+        self.assertEqual(response.data['data'][0]['reports_filed'], 10)
+
+        response = self.client.get('/api/admin/users/flagged/?reason=unknown')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_flagged_users_refresh_removes_cleared_users(self):
+        """Test a refresh drops users who no longer meet any criteria"""
+        self._create_bookings(self.user1, confirmed=0, cancelled=5)
+        self.assertEqual(FlaggedUserService.refresh(), 1)
+
+        Booking.objects.filter(user=self.user1).update(
+            status=BookingStatus.objects.get(status_name='confirmed')
+        )
+        out = StringIO()
+        call_command('refresh_flagged_users', stdout=out)
+
+        self.assertIn('Flagged 0 users', out.getvalue())
+        self.assertFalse(FlaggedUser.objects.exists())
+
     def test_booking_overview(self):
         """Test booking overview endpoint"""
         response = self.client.get('/api/admin/bookings/')
@@ -355,6 +483,76 @@ class AnalyticsDashboardTestCase(TestCase):
         response = self.client.get('/api/admin/logs/all-actions/?action=specific_action')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def _create_audit_entries(self):
+        """Create interleaved activity and admin action entries with distinct timestamps"""
+        now = timezone.now()
+        for i in range(3):
+            activity = ActivityLog.objects.create(
+                user=self.user1,
+                action=f'activity_{i}',
+                resource_type='booking',
+                resource_id=i
+            )
+            ActivityLog.objects.filter(pk=activity.pk).update(created_at=now - timedelta(minutes=2 * i))
+
+            admin_action = AdminActionLog.objects.create(
+                admin_user=self.admin_user,
+                action_name=f'admin_{i}',
+                resource_type='user',
+                resource_id=i,
+                reason=f'Reason {i}',
+                target_user=self.user1
+            )
+            AdminActionLog.objects.filter(pk=admin_action.pk).update(created_at=now - timedelta(minutes=2 * i + 1))
+
+    def test_unified_audit_log_merges_and_orders(self):
+        """Test unified audit log merges both tables newest first"""
+        self._create_audit_entries()
+
+        response = self.client.get('/api/admin/audit-log/?pageSize=10')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        actions = [row['action'] for row in response.data['data']]
+        self.assertEqual(actions, ['activity_0', 'admin_0', 'activity_1', 'admin_1', 'activity_2', 'admin_2'])
+        self.assertEqual(response.data['meta']['total'], 6)
+        self.assertIsNone(response.data['meta']['nextCursor'])
+
+        admin_row = response.data['data'][1]
+        self.assertEqual(admin_row['log_type'], 'admin_action')
+        self.assertEqual(admin_row['admin_email'], 'admin@test.com')
+        self.assertEqual(admin_row['target_user_id'], self.user1.user_id)
+        self.assertEqual(admin_row['reason'], 'Reason 0')
+
+    def test_unified_audit_log_cursor_pagination(self):
+        """Test following nextCursor walks every entry exactly once"""
+        self._create_audit_entries()
+
+        seen = []
+        url = '/api/admin/audit-log/?pageSize=4'
+        response = self.client.get(url)
+        seen += [row['action'] for row in response.data['data']]
+        self.assertIsNotNone(response.data['meta']['nextCursor'])
+
+        response = self.client.get(f"{url}&cursor={response.data['meta']['nextCursor']}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seen += [row['action'] for row in response.data['data']]
+        self.assertIsNone(response.data['meta']['nextCursor'])
+
+        self.assertEqual(seen, ['activity_0', 'admin_0', 'activity_1', 'admin_1', 'activity_2', 'admin_2'])
+
+    def test_unified_audit_log_page_numbers(self):
+        """Test page-number pagination still returns the requested slice"""
+        self._create_audit_entries()
+
+        response = self.client.get('/api/admin/audit-log/?page=2&pageSize=4')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['action'] for row in response.data['data']], ['activity_2', 'admin_2'])
+
+    def test_unified_audit_log_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get('/api/admin/audit-log/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_analytics_requires_admin_permission(self):
         """Test that analytics endpoints require admin permission"""
         # Authenticate as regular user
@@ -407,3 +605,58 @@ class AnalyticsDashboardTestCase(TestCase):
         # Commission: $180 * 0.10 = $18
         self.assertGreater(Decimal(str(revenue['this_month'])), 0)
         self.assertGreater(Decimal(str(revenue['commission_this_month'])), 0)
+
+    def _read_csv(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        if response['Content-Type'] == 'application/gzip':
+            body = gzip.decompress(body)
+        return list(csv.reader(io.StringIO(body.decode('utf-8'))))
+
+    def test_export_activity_report_csv_streams_rows(self):
+        """Test the activity export streams one row per log entry"""
+        ActivityLog.objects.create(user=self.user1, action='login')
+        ActivityLog.objects.create(user=None, action='system_check')
+
+        response = self.client.get('/api/admin/reports/export/activity/?days=7')
+        rows = self._read_csv(response)
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(rows[0][0], 'Timestamp')
+        self.assertEqual(len(rows), 3)
+        actions = {row[4]: row for row in rows[1:]}
+        self.assertEqual(actions['login'][2], 'user1@test.com')
+        self.assertEqual(actions['system_check'][2], 'N/A')
+
+    def test_export_user_statistics_csv_gzip(self):
+        """Test compress=gzip returns a gzipped CSV download"""
+        response = self.client.get('/api/admin/reports/export/users/?compress=gzip')
+        rows = self._read_csv(response)
+
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        self.assertEqual(rows[0][0], 'User ID')
+        self.assertEqual(len(rows), 1 + User.objects.count())
+        emails = {row[2]: row for row in rows[1:]}
+        self.assertEqual(emails['user2@test.com'][5], 'No')
+
+    def test_export_admin_actions_and_bookings_csv(self):
+        """Test the admin action and booking exports include their rows"""
+        AdminActionLog.objects.create(
+            admin_user=self.admin_user,
+            action_name='suspend_user',
+            resource_type='user',
+            resource_id=self.user2.user_id,
+            reason='Spam'
+        )
+
+        rows = self._read_csv(self.client.get('/api/admin/reports/export/admin-actions/'))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], 'admin@test.com')
+        self.assertEqual(rows[1][5], 'N/A')
+
+        rows = self._read_csv(self.client.get('/api/admin/reports/export/bookings/'))
+        self.assertEqual(rows, [[
+            'Booking ID', 'User Email', 'Facility Name', 'Court Name', 'Start Time', 'End Time',
+            'Hourly Rate', 'Commission Rate', 'Status', 'Created At'
+        ]])
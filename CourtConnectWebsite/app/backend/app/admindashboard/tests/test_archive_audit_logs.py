@@ -0,0 +1,90 @@
+"""
+Tests for the archive_audit_logs management command
+"""
+
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from app.admindashboard.models import ActivityLog, AdminActionLog
+from app.users.models import User
+
+
+class ArchiveAuditLogsCommandTest(TestCase):
+    """Test exporting and purging expired audit rows"""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            name='Admin User',
+            is_staff=True
+        )
+
+        now = timezone.now()
+        self.old_logs = [
+            ActivityLog.objects.create(user=self.admin, action='old_action', metadata={'n': i})
+            for i in range(3)
+        ]
+        # auto_now_add ignores explicit values, so backdate with an update
+        ActivityLog.objects.filter(
+            activity_id__in=[log.activity_id for log in self.old_logs]
+        ).update(created_at=now - timedelta(days=400))
+        self.recent_log = ActivityLog.objects.create(user=self.admin, action='recent_action')
+
+        old_admin_action = AdminActionLog.objects.create(
+            admin_user=self.admin,
+            action_name='suspend_user',
+            resource_type='user',
+            resource_id=1,
+            reason='Old moderation action'
+        )
+        AdminActionLog.objects.filter(pk=old_admin_action.pk).update(created_at=now - timedelta(days=400))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('archive_audit_logs', '--output-dir', self.output_dir, *args, stdout=out)
+        return out.getvalue()
+
+    def test_archives_and_deletes_expired_rows(self):
+        """Test old rows are written to compressed files and removed"""
+        output = self._run('--days', '365')
+
+        self.assertIn('Archived 4 audit rows', output)
+        self.assertEqual(list(ActivityLog.objects.values_list('action', flat=True)), ['recent_action'])
+        self.assertEqual(AdminActionLog.objects.count(), 0)
+
+        activity_files = list(Path(self.output_dir).glob('activity_log_*.jsonl.gz'))
+        self.assertEqual(len(activity_files), 1)
+        with gzip.open(activity_files[0], 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['action'] for row in rows}, {'old_action'})
+
+    def test_dry_run_changes_nothing(self):
+        """Test --dry-run reports counts without writing or deleting"""
+        output = self._run('--days', '365', '--dry-run')
+
+        self.assertIn('Would archive 4 audit rows', output)
+        self.assertEqual(ActivityLog.objects.count(), 4)
+        self.assertEqual(list(Path(self.output_dir).iterdir()), [])
+
+    def test_keep_rows_only_exports(self):
+        """Test --keep-rows writes archives but leaves the table intact"""
+        self._run('--days', '365', '--table', 'activity', '--keep-rows')
+
+        self.assertEqual(ActivityLog.objects.count(), 4)
+        self.assertEqual(len(list(Path(self.output_dir).glob('activity_log_*.jsonl.gz'))), 1)
+        self.assertEqual(list(Path(self.output_dir).glob('admin_action_log_*')), [])
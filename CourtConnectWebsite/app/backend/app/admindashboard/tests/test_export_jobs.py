@@ -0,0 +1,197 @@
+"""
+Tests for background export jobs
+"""
+
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.admindashboard.models import ActivityLog, ExportJob
+from app.admindashboard.services import ExportJobService
+from app.users.models import User
+
+
+class ExportJobTest(TestCase):
+    """Test queuing, running, reusing and downloading exports"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, EXPORT_JOB_REUSE_SECONDS=900)
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            name='Admin User',
+            is_admin=True
+        )
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            name='Regular User'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        ActivityLog.objects.create(user=self.user, action='login')
+        ActivityLog.objects.create(user=self.user, action='logout')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _run_worker(self):
+        out = io.StringIO()
+        call_command('run_export_worker', '--once', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_create_run_and_download(self):
+        """Test a queued export is written by the worker and downloadable"""
+        response = self.client.post(
+            '/api/admin/reports/export-jobs/',
+            {'type': 'activity', 'params': {'days': 7}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['data']['job_id']
+        self.assertEqual(response.data['data']['status'], 'pending')
+        self.assertIsNone(response.data['data']['download_url'])
+
+        response = self.client.get(f'/api/admin/reports/export-jobs/{job_id}/download/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.assertIn('Processed 1 export jobs', self._run_worker())
+
+        response = self.client.get(f'/api/admin/reports/export-jobs/{job_id}/')
+        self.assertEqual(response.data['data']['status'], 'completed')
+        self.assertEqual(response.data['data']['row_count'], 2)
+        self.assertTrue(response.data['data']['download_url'].endswith(f'/export-jobs/{job_id}/download/'))
+
+        response = self.client.get(f'/api/admin/reports/export-jobs/{job_id}/download/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        body = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][0], 'Timestamp')
+        self.assertEqual({row[4] for row in rows[1:]}, {'login', 'logout'})
+
+    def test_identical_request_reuses_job(self):
+        """Test an identical export within the window reuses the artefact"""
+        first, reused = ExportJobService.request_export('activity', {'days': '7'})
+        self.assertFalse(reused)
+        self._run_worker()
+
+        response = self.client.post(
+            '/api/admin/reports/export-jobs/',
+            {'type': 'activity', 'params': {'days': 7}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['meta']['reused'])
+        self.assertEqual(response.data['data']['job_id'], first.job_id)
+
+        # Different parameters produce a new job
+        second, reused = ExportJobService.request_export('activity', {'days': 30})
+        self.assertFalse(reused)
+        self.assertNotEqual(second.job_id, first.job_id)
+
+        # A missing artefact is not reused
+        os.remove(ExportJobService.artefact_path(ExportJob.objects.get(pk=first.job_id)))
+        third, reused = ExportJobService.request_export('activity', {'days': 7})
+        self.assertFalse(reused)
+
+    def test_invalid_requests(self):
+        """Test unknown export types and bad parameters are rejected"""
+        response = self.client.post('/api/admin/reports/export-jobs/', {'type': 'payments'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            '/api/admin/reports/export-jobs/',
+            {'type': 'bookings', 'params': {'days': 0}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error']['code'], 'VALIDATION_ERROR')
+
+    def test_failed_job_records_error(self):
+        """Test a failing export is marked failed with its error"""
+        job = ExportJob.objects.create(export_type='missing', params={}, params_hash='x')
+        with self.assertLogs('app.admindashboard.services', level='ERROR'):
+            self._run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unknown export type', job.error)
+
+    def test_stale_running_job_is_reclaimed(self):
+        """Test a job abandoned by a crashed worker is picked up again"""
+        job, _ = ExportJobService.request_export('users', {})
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='running',
+            started_at=timezone.now() - timedelta(hours=2)
+        )
+
+        self._run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.row_count, 2)
+
+    @override_settings(EXPORT_JOB_RETENTION_DAYS=1)
+    def test_purge_expired(self):
+        """Test old artefacts are deleted and their jobs marked expired"""
+        job, _ = ExportJobService.request_export('users', {})
+        self._run_worker()
+        job.refresh_from_db()
+        path = ExportJobService.artefact_path(job)
+        self.assertTrue(os.path.exists(path))
+
+        ExportJob.objects.filter(pk=job.pk).update(completed_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(ExportJobService.purge_expired(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'expired')
+        self.assertFalse(os.path.exists(path))
+        response = self.client.get(f'/api/admin/reports/export-jobs/{job.job_id}/download/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    @override_settings(EXPORT_WORKER_PURGE_SECONDS=0)
+    def test_worker_purges_while_running(self):
+        """Test a long-running worker keeps expiring artefacts between jobs"""
+        ExportJobService.request_export('users', {})
+        ExportJobService.request_export('activity', {})
+        with mock.patch.object(ExportJobService, 'purge_expired', return_value=0) as purge:
+            self._run_worker()
+        # Before each of the two jobs and before finding the queue empty
+        self.assertEqual(purge.call_count, 3)
+
+    def test_worker_survives_database_errors(self):
+        """Test a failed claim is retried instead of stopping the worker"""
+        ExportJobService.request_export('users', {})
+        claim_next = ExportJobService.claim_next
+        err = io.StringIO()
+        # The first poll fails, the second returns the job (claimed here up front)
+        with mock.patch.object(
+            ExportJobService, 'claim_next', side_effect=[DatabaseError('connection lost'), claim_next(), None]
+        ), mock.patch('app.admindashboard.management.commands.run_export_worker.time.sleep'):
+            call_command('run_export_worker', '--once', stdout=io.StringIO(), stderr=err)
+
+        self.assertIn('connection lost', err.getvalue())
+        self.assertEqual(ExportJob.objects.get().status, 'completed')
+
+    def test_requires_admin(self):
+        """Test export jobs are admin-only"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/admin/reports/export-jobs/', {'type': 'users'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
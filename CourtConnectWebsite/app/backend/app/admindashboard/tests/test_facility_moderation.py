@@ -7,6 +7,7 @@ from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
+from unittest import mock
 
 from app.users.models import User, Manager
 from app.facilities.models import Facility, Court, SportType, Availability
@@ -303,6 +304,195 @@ class FacilityModerationTestCase(TestCase):
         self.assertGreater(float(data['total_revenue']), 0)
         self.assertGreater(float(data['commission_collected']), 0)
 
+    def test_facility_analytics_snapshot_refreshes_on_booking(self):
+        """Test facility analytics is served from a snapshot that new bookings invalidate"""
+        from app.bookings.models import Booking, BookingStatus
+        from app.admindashboard.models import FacilityAnalyticsSnapshot
+
+        status_obj, _ = BookingStatus.objects.get_or_create(status_name='confirmed')
+        booking_user = User.objects.create_user(
+            email='user@test.com',
+            name='Test User',
+            password='testpass123'
+        )
+        url = f'/api/admin/facilities/{self.facility.facility_id}/analytics/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.data['data']['total_bookings'], 0)
+        self.assertEqual(response.data['data']['hourly_histogram'], [0] * 24)
+        self.assertFalse(FacilityAnalyticsSnapshot.objects.get(facility=self.facility).is_stale)
+
+        # 9am Sydney time
+        start_time = timezone.localtime(timezone.now()).replace(hour=9, minute=0, second=0, microsecond=0)
+        start_time += timezone.timedelta(days=1)
+        end_time = start_time + timezone.timedelta(hours=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            availability = Availability.objects.create(
+                court=self.court, start_time=start_time, end_time=end_time, is_available=True
+            )
+            Booking.objects.create(
+                user=booking_user,
+                court=self.court,
+                availability=availability,
+                start_time=start_time,
+                end_time=end_time,
+                hourly_rate_snapshot=Decimal('50.00'),
+                commission_rate_snapshot=Decimal('0.1000'),
+                status=status_obj
+            )
+            # Flagged once the transaction commits
+            self.assertFalse(FacilityAnalyticsSnapshot.objects.get(facility=self.facility).is_stale)
+        self.assertTrue(FacilityAnalyticsSnapshot.objects.get(facility=self.facility).is_stale)
+
+        response = self.client.get(url)
+        data = response.data['data']
+        self.assertEqual(data['total_bookings'], 1)
+        self.assertEqual(Decimal(data['total_revenue']), Decimal('100.00'))
+        self.assertEqual(data['hourly_histogram'][9], 1)
+        self.assertEqual(data['peak_booking_hour'], 9)
+        self.assertEqual(data['sport_mix'], {'Basketball': 1})
+
+        # A fresh snapshot is read without touching bookings
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+    def test_facility_analytics_change_during_build_keeps_snapshot_stale(self):
+        """Test a change saved while a snapshot is computed is not overwritten by the rebuild"""
+        from app.admindashboard.models import FacilityAnalyticsSnapshot
+        from app.admindashboard.services import FacilityAnalyticsService
+
+        FacilityAnalyticsService.build([self.facility.facility_id])
+        FacilityAnalyticsService.mark_stale(self.facility.facility_id)
+
+        compute_group = FacilityAnalyticsService._compute_group
+
+        def compute_then_change(*args):
+            rows = compute_group(*args)
+            Court.objects.create(
+                facility=self.facility, name='Court 2', sport_type=self.sport_type, hourly_rate=Decimal('50.00')
+            )
+            return rows
+
+        # The new court's transaction commits after the build has cleared the flag
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(FacilityAnalyticsService, '_compute_group', side_effect=compute_then_change):
+            FacilityAnalyticsService.build([self.facility.facility_id])
+
+        snapshot = FacilityAnalyticsSnapshot.objects.get(facility=self.facility)
+        self.assertEqual(snapshot.total_courts, 1)
+        self.assertTrue(snapshot.is_stale)
+
+        response = self.client.get(f'/api/admin/facilities/{self.facility.facility_id}/analytics/')
+        self.assertEqual(response.data['data']['total_courts'], 2)
+
+    def test_facility_analytics_snapshot_flagged_once_per_transaction(self):
+        """Test slots saved in one transaction flag the snapshot with a single UPDATE after commit"""
+        from app.admindashboard.models import FacilityAnalyticsSnapshot
+        from app.admindashboard.services import FacilityAnalyticsService
+
+        FacilityAnalyticsService.build([self.facility.facility_id])
+        start_time = timezone.now() + timezone.timedelta(days=1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            for hour in range(3):
+                Availability.objects.create(
+                    court=self.court, start_time=start_time + timezone.timedelta(hours=hour),
+                    end_time=start_time + timezone.timedelta(hours=hour + 1), is_available=True
+                )
+
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertTrue(FacilityAnalyticsSnapshot.objects.get(facility=self.facility).is_stale)
+
+    def test_facility_analytics_snapshot_expires(self):
+        """Test an old snapshot is rebuilt so occupancy counts slots that have since started"""
+        from app.admindashboard.models import FacilityAnalyticsSnapshot
+        from app.admindashboard.services import FacilityAnalyticsService
+
+        start_time = timezone.now() - timezone.timedelta(hours=2)
+        Availability.objects.create(
+            court=self.court, start_time=start_time, end_time=start_time + timezone.timedelta(hours=1),
+            is_available=True
+        )
+        FacilityAnalyticsService.build([self.facility.facility_id])
+        snapshot = FacilityAnalyticsSnapshot.objects.get(facility=self.facility)
+
+        # Within the max age the snapshot is reused
+        with self.settings(FACILITY_SNAPSHOT_REFRESH_SECONDS=3600):
+            self.assertEqual(FacilityAnalyticsService.get(self.facility).computed_at, snapshot.computed_at)
+
+        FacilityAnalyticsSnapshot.objects.filter(facility=self.facility).update(
+            computed_at=snapshot.computed_at - timezone.timedelta(hours=2)
+        )
+        with self.settings(FACILITY_SNAPSHOT_REFRESH_SECONDS=3600):
+            self.assertGreater(FacilityAnalyticsService.get(self.facility).computed_at, snapshot.computed_at)
+
+    def test_facility_occupancy(self):
+        """Test occupancy compares booked slot-hours with offered slot-hours"""
+        from app.bookings.models import Booking, BookingStatus
+
+        confirmed, _ = BookingStatus.objects.get_or_create(status_name='confirmed')
+        cancelled, _ = BookingStatus.objects.get_or_create(status_name='cancelled')
+        booking_user = User.objects.create_user(
+            email='user@test.com',
+            name='Test User',
+            password='testpass123'
+        )
+
+        # Yesterday 9:00-13:00 Sydney time in 1-hour slots; 12:00 is blocked by the manager
+        day_start = timezone.localtime(timezone.now()).replace(hour=9, minute=0, second=0, microsecond=0)
+        day_start -= timezone.timedelta(days=1)
+        slots = [
+            Availability.objects.create(
+                court=self.court,
+                start_time=day_start + timezone.timedelta(hours=offset),
+                end_time=day_start + timezone.timedelta(hours=offset + 1),
+                is_available=offset == 2
+            )
+            for offset in range(4)
+        ]
+
+        def book(slot, hours, booking_status):
+            Booking.objects.create(
+                user=booking_user,
+                court=self.court,
+                availability=slot,
+                start_time=slot.start_time,
+                end_time=slot.start_time + timezone.timedelta(hours=hours),
+                hourly_rate_snapshot=Decimal('50.00'),
+                commission_rate_snapshot=Decimal('0.1000'),
+                status=booking_status
+            )
+
+        # One 2-hour booking covering 9:00 and 10:00, and a cancelled one at 11:00
+        book(slots[0], 2, confirmed)
+        book(slots[2], 1, cancelled)
+
+        response = self.client.get(f'/api/admin/facilities/{self.facility.facility_id}/occupancy/?days=7')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        data = response.data['data']
+        self.assertEqual(data['offered_hours'], 3.0)
+        self.assertEqual(data['booked_hours'], 2.0)
+        self.assertEqual(data['occupancy_rate'], 66.67)
+        self.assertEqual(data['by_court'][0]['court_id'], self.court.court_id)
+        self.assertEqual(data['by_day'], [{
+            'date': day_start.date().isoformat(),
+            'offered_hours': 3.0,
+            'booked_hours': 2.0,
+            'occupancy_rate': 66.67,
+        }])
+
+        weekday = data['by_hour_of_week'][day_start.weekday()]
+        self.assertEqual(weekday[9:13], [100.0, 100.0, 0.0, None])
+
+        # The analytics snapshot reports the same occupancy
+        response = self.client.get(f'/api/admin/facilities/{self.facility.facility_id}/analytics/')
+        self.assertEqual(response.data['data']['average_booking_rate'], 66.67)
+
+        response = self.client.get(f'/api/admin/facilities/{self.facility.facility_id}/occupancy/?days=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_suspend_facility_requires_admin_permission(self):
         """Test that only admins can suspend facilities"""
         # Create regular user and authenticate
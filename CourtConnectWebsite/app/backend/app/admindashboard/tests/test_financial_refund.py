@@ -249,6 +249,85 @@ class FinancialRefundTestCase(TestCase):
             self.assertIn('total_revenue', facility_data)
             self.assertIn('manager_payout', facility_data)
             
+    def _create_second_facility(self):
+        """Create another facility with a larger booking"""
+        manager_user = User.objects.create_user(
+            email='manager2@test.com',
+            name='Second Manager',
+            password='testpass123'
+        )
+        facility = Facility.objects.create(
+            manager=Manager.objects.create(user=manager_user),
+            facility_name='Big Stadium',
+            address='456 Test St',
+            timezone='Australia/Sydney',
+            commission_rate=Decimal('0.1500'),
+            approval_status='approved'
+        )
+        court = Court.objects.create(
+            facility=facility,
+            name='Main Court',
+            sport_type=self.court.sport_type,
+            hourly_rate=Decimal('100.00')
+        )
+        start_time = timezone.now() + timedelta(days=2)
+        end_time = start_time + timedelta(hours=3)
+        Booking.objects.create(
+            user=self.booking_user,
+            court=court,
+            availability=Availability.objects.create(
+                court=court, start_time=start_time, end_time=end_time, is_available=False
+            ),
+            start_time=start_time,
+            end_time=end_time,
+            hourly_rate_snapshot=Decimal('100.00'),
+            commission_rate_snapshot=Decimal('0.1500'),
+            status=self.booking_status
+        )
+        return facility
+
+    def test_commission_breakdown_query_count(self):
+        """Test the breakdown costs the same queries regardless of facility count"""
+        self._create_second_facility()
+
+        # One grouped page query and one totals query
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/admin/payments/commission/?period=month')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['meta']['total_facilities'], 2)
+        self.assertEqual(
+            [row['facility_name'] for row in response.data['data']],
+            ['Big Stadium', 'Test Arena']
+        )
+        self.assertEqual(response.data['data'][0]['commission_collected'], Decimal('45.00'))
+        self.assertEqual(response.data['meta']['total_commission'], Decimal('53.00'))
+
+    def test_commission_breakdown_sort_and_pagination(self):
+        """Test sorting and pagination are applied to the grouped query"""
+        self._create_second_facility()
+
+        response = self.client.get('/api/admin/payments/commission/?sort=facility_name&page=2&pageSize=1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 1)
+        self.assertEqual(response.data['data'][0]['facility_name'], 'Test Arena')
+        self.assertEqual(response.data['meta']['total_facilities'], 2)
+
+    def test_export_commission_breakdown_csv(self):
+        """Test the commission export streams one CSV row per facility"""
+        self._create_second_facility()
+
+        response = self.client.get('/api/admin/payments/commission/export/?period=month')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode('utf-8').strip().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('Facility ID,Facility Name'))
+        self.assertIn('Big Stadium', lines[1])
+
     def test_refund_filter_by_status(self):
         """Test filtering refund requests by status"""
         # Create refunds with different statuses
@@ -0,0 +1,149 @@
+"""
+Tests for request profiling captures
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.admindashboard.models import ProfileCapture
+from app.admindashboard.services import ProfileCaptureService
+from app.facilities.models import Facility
+from app.users.models import User
+
+
+class ProfilingTest(TestCase):
+    """Test ProfilingMiddleware captures and the admin endpoints that read them"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, PROFILING_ENABLED=True)
+        self.settings_override.enable()
+
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            name='Admin User',
+            is_admin=True
+        )
+        Facility.objects.create(
+            facility_name='Profiled Centre',
+            address='1 Test St',
+            is_active=True,
+            approval_status='approved'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _artefact(self, capture):
+        with open(ProfileCaptureService.artefact_path(capture)) as handle:
+            return json.load(handle)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0)
+    def test_sampled_request_stores_cprofile_and_sql(self):
+        """Test a sampled request is kept with function stats and its SQL"""
+        response = self.client.get('/api/facilities/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(capture.url_name, 'facilities:facility-list')
+        self.assertEqual(capture.endpoint, '/api/facilities/')
+        self.assertEqual(capture.reason, 'sampled')
+        self.assertEqual(capture.profile_type, 'cprofile')
+        self.assertGreater(capture.query_count, 0)
+
+        artefact = self._artefact(capture)
+        self.assertEqual(artefact['status_code'], 200)
+        self.assertEqual(artefact['sql']['count'], capture.query_count)
+        self.assertIn('facilities', artefact['sql']['statements'][0]['sql'])
+        self.assertTrue(artefact['profile']['functions'])
+        self.assertGreater(artefact['profile']['total_calls'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_SLOW_MS=0.001)
+    def test_slow_request_stores_stack_samples(self):
+        """Test a request over the threshold is kept with stack samples"""
+        self.client.get('/api/facilities/')
+
+        capture = ProfileCapture.objects.get()
+        self.assertEqual(capture.reason, 'slow')
+        self.assertEqual(capture.profile_type, 'stack')
+        artefact = self._artefact(capture)
+        self.assertEqual(artefact['profile']['type'], 'stack')
+        self.assertEqual(artefact['profile']['samples'], sum(
+            int(line.rsplit(' ', 1)[1]) for line in artefact['profile']['stacks']
+        ))
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0, PROFILING_SLOW_MS=60000)
+    def test_fast_unsampled_request_is_not_kept(self):
+        """Test requests under the threshold leave nothing behind"""
+        self.client.get('/api/facilities/')
+        self.assertFalse(ProfileCapture.objects.exists())
+
+        with self.settings(PROFILING_ENABLED=False, PROFILING_SAMPLE_RATE=1.0):
+            self.client.get('/api/facilities/')
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0)
+    def test_list_slowest_per_url_name_and_download(self):
+        """Test captures are grouped per URL name, slowest first, and downloadable"""
+        for _ in range(3):
+            self.client.get('/api/facilities/')
+        self.client.get('/api/facilities/sport-types/')
+        ProfileCapture.objects.filter(url_name='facilities:sport-type-list').update(duration_ms=5000)
+
+        self.client.force_authenticate(user=self.admin)
+        with self.settings(PROFILING_ENABLED=False):
+            response = self.client.get('/api/admin/profiles/', {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        groups = response.data['data']
+        self.assertEqual([group['url_name'] for group in groups],
+                         ['facilities:sport-type-list', 'facilities:facility-list'])
+        self.assertEqual(groups[1]['capture_count'], 3)
+        durations = [capture['duration_ms'] for capture in groups[1]['captures']]
+        self.assertEqual(len(durations), 2)
+        self.assertEqual(durations, sorted(durations, reverse=True))
+
+        with self.settings(PROFILING_ENABLED=False):
+            response = self.client.get('/api/admin/profiles/', {'url_name': 'facilities:facility-list'})
+        self.assertEqual(len(response.data['data']), 1)
+
+        capture_id = groups[0]['captures'][0]['capture_id']
+        self.assertTrue(groups[0]['captures'][0]['download_url'].endswith(f'/profiles/{capture_id}/download/'))
+        with self.settings(PROFILING_ENABLED=False):
+            response = self.client.get(f'/api/admin/profiles/{capture_id}/download/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['url_name'], 'facilities:sport-type-list')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0, PROFILING_RETENTION_DAYS=1)
+    def test_purge_removes_old_captures(self):
+        """Test expired captures are deleted with their artefacts"""
+        self.client.get('/api/facilities/')
+        capture = ProfileCapture.objects.get()
+        path = ProfileCaptureService.artefact_path(capture)
+        self.assertTrue(os.path.exists(path))
+
+        ProfileCapture.objects.filter(pk=capture.pk).update(created_at=capture.created_at - timedelta(days=2))
+        self.assertEqual(ProfileCaptureService.purge(), 1)
+        self.assertFalse(ProfileCapture.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_requires_admin_and_valid_params(self):
+        """Test the listing is admin-only and validates its parameters"""
+        with self.settings(PROFILING_ENABLED=False):
+            response = self.client.get('/api/admin/profiles/')
+            self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+            self.client.force_authenticate(user=self.admin)
+            response = self.client.get('/api/admin/profiles/', {'hours': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error']['code'], 'VALIDATION_ERROR')
@@ -0,0 +1,397 @@
+"""
+Tests for batch refunds issued on facility suspension and refund approval
+"""
+
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.admindashboard.models import AdminActionLog, RefundBatch, RefundBatchItem, RefundRequest
+from app.admindashboard.services import RefundBatchService
+from app.bookings.models import Booking, BookingStatus
+from app.facilities.models import Availability, Court, Facility, SportType
+from app.payments.models import Payment, PaymentStatus
+from app.payments.services.fake_service import FakePaymentService, store
+from app.payments.tests_paypal import start_stub_paypal
+from app.users.models import Manager, User
+
+
+@override_settings(
+    PAYMENT_PROVIDERS={'fake': 'app.payments.services.fake_service.FakePaymentService'},
+    REFUND_BATCH_EXECUTOR='worker',
+    PAYMENT_FAKE_LATENCY_MS=0,
+    PAYMENT_FAKE_LATENCY_JITTER_MS=0,
+    PAYMENT_FAKE_FAILURE_RATE=0,
+    PAYMENT_FAKE_FAIL_OPERATIONS=()
+)
+class RefundBatchTestCase(TestCase):
+    """Test the refund batch engine and its admin endpoints"""
+
+    def setUp(self):
+        store.reset()
+        self.addCleanup(store.reset)
+        self.client = APIClient()
+
+        self.admin_user = User.objects.create_user(
+            email='admin@test.com',
+            name='Admin User',
+            password='testpass123',
+            is_admin=True
+        )
+        self.client.force_authenticate(user=self.admin_user)
+
+        manager_user = User.objects.create_user(
+            email='manager@test.com',
+            name='Manager User',
+            password='testpass123'
+        )
+        self.manager = Manager.objects.create(user=manager_user)
+        self.facility = Facility.objects.create(
+            manager=self.manager,
+            facility_name='Test Arena',
+            address='123 Test St',
+            timezone='Australia/Sydney',
+            approval_status='approved'
+        )
+        self.court = Court.objects.create(
+            facility=self.facility,
+            name='Court 1',
+            sport_type=SportType.objects.create(sport_name='Tennis'),
+            hourly_rate=Decimal('40.00')
+        )
+        self.booking_user = User.objects.create_user(
+            email='user@test.com',
+            name='Booking User',
+            password='testpass123'
+        )
+        self.confirmed, _ = BookingStatus.objects.get_or_create(status_name='confirmed')
+        self.completed, _ = PaymentStatus.objects.get_or_create(status_name='completed')
+        self.service = FakePaymentService()
+
+    def _booking(self, hours_from_now, court=None, paid=True, amount='80.00'):
+        court = court or self.court
+        start_time = timezone.now() + timedelta(hours=hours_from_now)
+        availability = Availability.objects.create(
+            court=court,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            is_available=False
+        )
+        booking = Booking.objects.create(
+            user=self.booking_user,
+            court=court,
+            availability=availability,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            hourly_rate_snapshot=Decimal('40.00'),
+            commission_rate_snapshot=Decimal('0.10'),
+            status=self.confirmed
+        )
+        if paid:
+            order = self.service.create_order(Decimal(amount))
+            capture = self.service.capture_payment(order['order_id'])
+            Payment.objects.create(
+                booking=booking,
+                provider='fake',
+                provider_payment_id=capture['payment_id'],
+                idempotency_key=f'test-{booking.booking_id}',
+                amount=Decimal(amount),
+                status=self.completed
+            )
+        return booking
+
+    def _suspend(self):
+        return self.client.post(
+            f'/api/admin/facilities/{self.facility.facility_id}/suspend/',
+            data={'reason': 'Suspended pending a safety inspection of the courts'},
+            format='json'
+        )
+
+    def _run_worker(self):
+        out = io.StringIO()
+        call_command('run_refund_worker', '--once', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_suspension_refunds_and_cancels_upcoming_bookings(self):
+        """Test every confirmed future booking is refunded and cancelled in one batch"""
+        paid = [self._booking(24 + hour) for hour in range(3)]
+        unpaid = self._booking(30, paid=False)
+        past = self._booking(-48)
+        other_facility = Facility.objects.create(manager=self.manager, facility_name='Other', address='1 Other St')
+        elsewhere = self._booking(24, court=Court.objects.create(
+            facility=other_facility, name='Court A', sport_type=self.court.sport_type, hourly_rate=Decimal('40.00')
+        ))
+
+        response = self._suspend()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        batch_data = response.data['data']['refund_batch']
+        self.assertEqual(batch_data['total_items'], 4)
+        self.assertEqual(batch_data['status'], 'pending')
+
+        self.assertIn('3 refunded, 0 failed, 1 skipped', self._run_worker())
+
+        batch = RefundBatch.objects.get(batch_id=batch_data['batch_id'])
+        self.assertEqual(batch.status, 'completed')
+        self.assertEqual(batch.refunded_amount, Decimal('240.00'))
+        for booking in paid + [unpaid]:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status.status_name, 'cancelled')
+            self.assertTrue(Availability.objects.get(pk=booking.availability_id).is_available)
+        for booking in (past, elsewhere):
+            booking.refresh_from_db()
+            self.assertEqual(booking.status.status_name, 'confirmed')
+        self.assertEqual(
+            set(Payment.objects.filter(booking__in=paid).values_list('status__status_name', flat=True)),
+            {'refunded'}
+        )
+        for payment in Payment.objects.filter(booking__in=paid):
+            self.assertEqual(self.service.get_payment_details(payment.provider_payment_id)['status'], 'REFUNDED')
+
+        log = AdminActionLog.objects.get(action_name='refund_batch')
+        self.assertEqual(log.resource_id, batch.batch_id)
+        self.assertEqual(log.financial_impact, Decimal('-240.00'))
+        self.assertEqual(log.target_user, self.manager.user)
+        self.assertEqual(log.metadata['refunded'], 3)
+        self.assertEqual(log.metadata['skipped'], 1)
+
+    def test_suspension_without_bookings_has_no_batch(self):
+        response = self._suspend()
+        self.assertIsNone(response.data['data']['refund_batch'])
+        self.assertFalse(RefundBatch.objects.exists())
+
+    def test_failed_refunds_leave_bookings_confirmed(self):
+        """Test a booking is only cancelled once its money is back"""
+        booking = self._booking(24)
+        self._suspend()
+        with self.settings(PAYMENT_FAKE_FAILURE_RATE=1.0, PAYMENT_FAKE_FAIL_OPERATIONS=('refund_payment',)):
+            self._run_worker()
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status.status_name, 'confirmed')
+        self.assertEqual(Payment.objects.get(booking=booking).status.status_name, 'completed')
+
+        batch = RefundBatch.objects.get()
+        response = self.client.get(f'/api/admin/payments/refund-batches/{batch.batch_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['failed_items'], 1)
+        self.assertEqual(response.data['data']['progress'], 100)
+        self.assertEqual(response.data['meta']['failures'][0]['booking_id'], booking.booking_id)
+        self.assertIn('Injected refund_payment failure', response.data['meta']['failures'][0]['error'])
+        self.assertEqual(AdminActionLog.objects.get(action_name='refund_batch').metadata['failed_booking_ids'], [booking.booking_id])
+
+    def test_rerun_batch_does_not_refund_twice(self):
+        """Test items re-sent after a crash reuse their idempotency key"""
+        booking = self._booking(24)
+        self._suspend()
+        RefundBatchService.run(RefundBatchService.claim_next())
+        first = RefundBatchItem.objects.get()
+
+        # Pretend the process died before recording the results
+        RefundBatchItem.objects.update(status='pending', provider_refund_id=None)
+        RefundBatch.objects.update(status='pending', refunded_items=0, refunded_amount=0)
+        RefundBatchService.run(RefundBatchService.claim_next())
+
+        again = RefundBatchItem.objects.get()
+        self.assertEqual(again.status, 'refunded')
+        self.assertEqual(again.provider_refund_id, first.provider_refund_id)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status.status_name, 'cancelled')
+
+    def test_refunds_run_concurrently_with_constant_queries(self):
+        """Test provider calls overlap and the SQL per chunk does not grow with its size"""
+        def run_batch(count):
+            Booking.objects.filter(court=self.court).update(status=BookingStatus.objects.get_or_create(status_name='cancelled')[0])
+            for index in range(count):
+                self._booking(24 * (count + 1) + index)
+            suspension = self.facility.suspensions.create(suspended_by=self.admin_user, reason='Load test suspension')
+            batch = RefundBatchService.for_suspension(suspension, self.admin_user)
+            batch = RefundBatchService.claim_next(batch.batch_id)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                batch = RefundBatchService.run(batch)
+                elapsed = time.perf_counter() - started
+            self.assertEqual(batch.refunded_items, count)
+            return len(queries), elapsed
+
+        with self.settings(REFUND_BATCH_WORKERS=4, PAYMENT_FAKE_LATENCY_MS=100):
+            small_queries, _ = run_batch(2)
+            large_queries, elapsed = run_batch(8)
+        self.assertEqual(small_queries, large_queries)
+        # Sequential refunds would take 0.8s
+        self.assertLess(elapsed, 0.6)
+
+    def test_approve_refund_issues_partial_refund(self):
+        """Test approving a request refunds its amount and marks it processed"""
+        booking = self._booking(24)
+        refund = RefundRequest.objects.create(
+            booking=booking,
+            requested_by=self.booking_user,
+            reason='Court lights failed for half the booking',
+            amount=Decimal('30.00')
+        )
+        response = self.client.post(
+            f'/api/admin/payments/refunds/{refund.request_id}/approve/',
+            data={'reason': 'Approved after the facility confirmed the outage'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['refund_batch']['total_items'], 1)
+        self._run_worker()
+
+        refund.refresh_from_db()
+        self.assertEqual(refund.status, 'processed')
+        self.assertIsNotNone(refund.processed_at)
+        self.assertTrue(refund.refund_transaction_id.startswith('FAKE-REFUND-'))
+        payment = Payment.objects.get(booking=booking)
+        self.assertEqual(self.service.get_payment_details(payment.provider_payment_id)['status'], 'PARTIALLY_REFUNDED')
+        booking.refresh_from_db()
+        self.assertEqual(booking.status.status_name, 'confirmed')
+        self.assertEqual(RefundBatch.objects.get().refunded_amount, Decimal('30.00'))
+
+    def test_bulk_approve(self):
+        """Test several pending requests are approved and refunded together"""
+        requests = [
+            RefundRequest.objects.create(
+                booking=self._booking(24 + index),
+                requested_by=self.booking_user,
+                reason='Facility closed without notice',
+                amount=Decimal('80.00')
+            )
+            for index in range(3)
+        ]
+        RefundRequest.objects.filter(pk=requests[2].pk).update(status='rejected')
+
+        response = self.client.post('/api/admin/payments/refunds/approve/', data={
+            'request_ids': [r.request_id for r in requests],
+            'reason': 'Approved as the closure was confirmed by the manager'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['meta']['approved'], [requests[0].request_id, requests[1].request_id])
+        self.assertEqual(response.data['meta']['skipped'], [requests[2].request_id])
+        self.assertEqual(response.data['data']['total_items'], 2)
+
+        self._run_worker()
+        self.assertEqual(
+            list(RefundRequest.objects.order_by('request_id').values_list('status', flat=True)),
+            ['processed', 'processed', 'rejected']
+        )
+        self.assertEqual(AdminActionLog.objects.filter(action_name='refund_batch').count(), 1)
+
+    def test_unrefunded_requests_fail_and_can_be_retried(self):
+        """Test requests nothing was refunded for are marked failed and can be approved again"""
+        failing = RefundRequest.objects.create(
+            booking=self._booking(24), requested_by=self.booking_user,
+            reason='Facility closed without notice', amount=Decimal('80.00')
+        )
+        unpaid = RefundRequest.objects.create(
+            booking=self._booking(25, paid=False), requested_by=self.booking_user,
+            reason='Facility closed without notice', amount=Decimal('80.00'), metadata={'source': 'support'}
+        )
+        reason = 'Approved as the closure was confirmed by the manager'
+        self.client.post('/api/admin/payments/refunds/approve/', data={
+            'request_ids': [failing.request_id, unpaid.request_id], 'reason': reason
+        }, format='json')
+        with self.settings(PAYMENT_FAKE_FAILURE_RATE=1.0, PAYMENT_FAKE_FAIL_OPERATIONS=('refund_payment',)):
+            self._run_worker()
+
+        failing.refresh_from_db()
+        unpaid.refresh_from_db()
+        self.assertEqual((failing.status, unpaid.status), ('failed', 'failed'))
+        self.assertIn('Injected refund_payment failure', failing.metadata['refund_error'])
+        self.assertEqual(unpaid.metadata['refund_error'], 'No completed payment to refund')
+        self.assertEqual(unpaid.metadata['source'], 'support')
+
+        # Retried once the provider recovers; the unpaid one is rejected instead
+        response = self.client.post(
+            f'/api/admin/payments/refunds/{failing.request_id}/approve/', data={'reason': reason}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self._run_worker()
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, 'processed')
+
+        response = self.client.post(
+            f'/api/admin/payments/refunds/{unpaid.request_id}/reject/', data={'reason': 'No payment was ever taken'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        unpaid.refresh_from_db()
+        self.assertEqual(unpaid.status, 'rejected')
+
+    def test_bulk_approve_requires_pending_requests(self):
+        response = self.client.post('/api/admin/payments/refunds/approve/', data={
+            'request_ids': [999],
+            'reason': 'Approved as the closure was confirmed by the manager'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_thread_executor_starts_after_commit(self):
+        self._booking(24)
+        with self.settings(REFUND_BATCH_EXECUTOR='thread'), \
+                mock.patch('app.admindashboard.services._get_refund_executor') as executor:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self._suspend()
+                executor.assert_not_called()
+            for callback in callbacks:
+                callback()
+        executor.return_value.submit.assert_called_once_with(
+            RefundBatchService.run_in_thread, RefundBatch.objects.get().batch_id
+        )
+
+    def test_status_requires_admin(self):
+        self._booking(24)
+        batch_id = self._suspend().data['data']['refund_batch']['batch_id']
+        self.client.force_authenticate(user=self.booking_user)
+        response = self.client.get(f'/api/admin/payments/refund-batches/{batch_id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PayPalRefundBatchTestCase(TestCase):
+    """Test batch refunds send their idempotency key to PayPal"""
+
+    def test_refund_uses_item_key_as_request_id(self):
+        server = start_stub_paypal(self)
+        admin = User.objects.create_user(email='admin@test.com', name='Admin', password='x', is_admin=True)
+        facility = Facility.objects.create(facility_name='Test Arena', address='123 Test St')
+        court = Court.objects.create(
+            facility=facility, name='Court 1',
+            sport_type=SportType.objects.create(sport_name='Tennis'), hourly_rate=Decimal('50.00')
+        )
+        start_time = timezone.now() + timedelta(days=1)
+        booking = Booking.objects.create(
+            user=admin,
+            court=court,
+            availability=Availability.objects.create(
+                court=court, start_time=start_time, end_time=start_time + timedelta(hours=1), is_available=False
+            ),
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            hourly_rate_snapshot=Decimal('50.00'),
+            commission_rate_snapshot=Decimal('0.10'),
+            status=BookingStatus.objects.get_or_create(status_name='confirmed')[0]
+        )
+        Payment.objects.create(
+            booking=booking, provider='paypal', provider_payment_id='CAP-1', idempotency_key='idem-1',
+            amount=Decimal('50.00'), status=PaymentStatus.objects.get_or_create(status_name='completed')[0]
+        )
+        suspension = facility.suspensions.create(suspended_by=admin, reason='Inspection')
+
+        with self.settings(REFUND_BATCH_EXECUTOR='worker'):
+            batch = RefundBatchService.for_suspension(suspension, admin)
+        RefundBatchService.run(RefundBatchService.claim_next())
+
+        item = batch.items.get()
+        self.assertEqual(item.status, 'refunded')
+        self.assertEqual(item.provider_refund_id, 'REFUND-CAP-1')
+        refund_call = next(call for call in server.calls if call['path'].endswith('/refund'))
+        self.assertEqual(refund_call['request_id'], item.idempotency_key)
@@ -0,0 +1,186 @@
+"""
+Tests for request metrics collection and reporting
+"""
+
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.admindashboard.models import ExportJob, RequestMetric
+from app.admindashboard.services import RequestMetricsService
+from app.users.models import User
+from app.utils.metrics import histogram_percentile, metrics_aggregator
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_FLUSH_INTERVAL=0)
+class RequestMetricsTest(TestCase):
+    """Test the metrics middleware, aggregator and the endpoints reading it"""
+
+    def setUp(self):
+        # Nothing recorded here may be flushed once the test database is gone
+        metrics_aggregator.discard()
+        self.addCleanup(metrics_aggregator.discard)
+
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            name='Admin User',
+            is_admin=True
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_histogram_percentile(self):
+        """Test percentiles interpolate within histogram buckets"""
+        # 0-5ms: 50 requests, 5-10ms: 40, 10-25ms: 10
+        histogram = [50, 40, 10] + [0] * 14
+        self.assertEqual(histogram_percentile(histogram, 0.5), 5.0)
+        self.assertEqual(histogram_percentile(histogram, 0.9), 10.0)
+        self.assertEqual(histogram_percentile(histogram, 0.95), 17.5)
+        self.assertIsNone(histogram_percentile([0] * 17, 0.5))
+
+        # The overflow bucket is bounded by the slowest request
+        overflow = [0] * 16 + [2]
+        self.assertEqual(histogram_percentile(overflow, 1.0, max_ms=30000), 30000.0)
+
+    def test_middleware_records_requests(self):
+        """Test requests are recorded per route with status and DB usage"""
+        job = ExportJob.objects.create(export_type='users', params={}, params_hash='x')
+        self.client.get(f'/api/admin/reports/export-jobs/{job.job_id}/')
+        self.client.get(f'/api/admin/reports/export-jobs/{job.job_id}/')
+        self.client.get('/api/admin/reports/export-jobs/999999/')
+
+        metrics_aggregator.flush()
+
+        # The requests may straddle a bucket boundary, so check the totals
+        rows = list(RequestMetric.objects.all())
+        self.assertEqual({(row.endpoint, row.method) for row in rows}, {
+            ('/api/admin/reports/export-jobs/<int:job_id>/', 'GET')
+        })
+        status_counts = Counter()
+        for row in rows:
+            status_counts.update(row.status_counts)
+        self.assertEqual(sum(row.request_count for row in rows), 3)
+        self.assertEqual(status_counts, {'200': 2, '404': 1})
+        self.assertEqual(sum(row.client_error_count for row in rows), 1)
+        self.assertGreaterEqual(sum(row.db_query_count for row in rows), 3)
+        self.assertEqual(sum(sum(row.latency_histogram) for row in rows), 3)
+
+    def test_system_reports_reads_metrics(self):
+        """Test the health cards and error series come from recorded metrics"""
+        now = timezone.now()
+        RequestMetric.objects.create(
+            bucket_start=now - timedelta(hours=1),
+            endpoint='/api/bookings/',
+            method='GET',
+            request_count=100,
+            server_error_count=2,
+            status_counts={'200': 98, '500': 2},
+            latency_sum_ms=1500,
+            latency_max_ms=80,
+            latency_histogram=[0, 50, 40, 0, 10] + [0] * 12,
+        )
+
+        response = self.client.get('/api/admin/analytics/system-health/?range=7d')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        cards = response.data['data']['cards']
+        # Reads do not flush, so the system-health request itself is not counted
+        self.assertEqual(cards['requestCount'], 100)
+        self.assertEqual(cards['p50LatencyMs'], 10.0)
+        self.assertGreater(cards['errorRate'], 0)
+        # The row may fall on yesterday's date shortly after midnight
+        self.assertEqual(sum(response.data['data']['series']['errors']), 2)
+
+    @override_settings(METRICS_SCRAPE_TOKEN='scrape-secret')
+    def test_prometheus_endpoint(self):
+        """Test the text exposition endpoint and scrape token access"""
+        RequestMetric.objects.create(
+            bucket_start=timezone.now() - timedelta(minutes=1),
+            endpoint='/api/bookings/',
+            method='POST',
+            request_count=4,
+            server_error_count=1,
+            latency_sum_ms=40,
+            latency_max_ms=20,
+            latency_histogram=[0, 2, 2] + [0] * 14,
+        )
+
+        scraper = APIClient()
+        response = scraper.get('/api/admin/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = scraper.get('/api/admin/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        body = response.content.decode()
+        self.assertIn('# TYPE courtconnect_http_latency_ms summary', body)
+        self.assertIn('courtconnect_http_requests{endpoint="/api/bookings/",method="POST"} 4', body)
+        self.assertIn('courtconnect_http_error_rate_percent{endpoint="/api/bookings/",method="POST"} 25.0', body)
+        self.assertIn('courtconnect_http_latency_ms{endpoint="/api/bookings/",method="POST",quantile="0.5"} 10.0', body)
+
+        response = self.client.get('/api/admin/metrics/?minutes=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_command(self):
+        """Test old rows are deleted by the prune command"""
+        RequestMetric.objects.create(
+            bucket_start=timezone.now() - timedelta(days=40), endpoint='/old/', method='GET', request_count=1
+        )
+        RequestMetric.objects.create(
+            bucket_start=timezone.now(), endpoint='/new/', method='GET', request_count=1
+        )
+
+        out = StringIO()
+        call_command('prune_request_metrics', stdout=out)
+        self.assertIn('Deleted 1 request metric rows, merged away 0 more', out.getvalue())
+        self.assertEqual(list(RequestMetric.objects.values_list('endpoint', flat=True)), ['/new/'])
+        self.assertEqual(RequestMetricsService.purge(1), 0)
+
+    def test_compact_merges_old_rows(self):
+        """Test old minute rows are merged per endpoint into wider buckets without changing totals"""
+        quarter = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+        # Two processes wrote minute 1; minute 16 falls in the next quarter hour
+        rows = [
+            (1, 1, [1, 1] + [0] * 15),
+            (1, 0, [0, 2] + [0] * 15),
+            (14, 0, [2] + [0] * 16),
+            (16, 1, [0, 0, 2] + [0] * 14),
+        ]
+        for minute, errors, histogram in rows:
+            RequestMetric.objects.create(
+                bucket_start=quarter + timedelta(minutes=minute), endpoint='/api/bookings/', method='GET',
+                request_count=2, server_error_count=errors, status_counts={'200': 2 - errors, '500': errors},
+                latency_sum_ms=20, latency_max_ms=15 + minute, latency_histogram=histogram,
+                db_query_count=3, db_time_ms=1.5,
+            )
+        RequestMetric.objects.create(bucket_start=quarter, endpoint='/api/courts/', method='GET', request_count=1)
+        recent = RequestMetric.objects.create(
+            bucket_start=timezone.now() - timedelta(minutes=5), endpoint='/api/bookings/', method='GET', request_count=1
+        )
+        start, end = quarter - timedelta(hours=1), timezone.now()
+        before = RequestMetricsService.overall(start, end)
+
+        self.assertEqual(RequestMetricsService.compact(), 2)
+
+        merged = RequestMetric.objects.get(bucket_start=quarter, endpoint='/api/bookings/')
+        self.assertEqual(merged.bucket_seconds, 900)
+        self.assertEqual(merged.request_count, 6)
+        self.assertEqual(merged.status_counts, {'200': 5, '500': 1})
+        self.assertEqual(merged.latency_max_ms, 29)
+        self.assertEqual(merged.latency_histogram, [3, 3] + [0] * 15)
+        self.assertEqual(merged.db_query_count, 9)
+        self.assertEqual(RequestMetric.objects.get(bucket_start=quarter + timedelta(minutes=15)).request_count, 2)
+        self.assertTrue(RequestMetric.objects.filter(pk=recent.pk, bucket_seconds=60).exists())
+
+        with self.assertNumQueries(2):
+            self.assertEqual(RequestMetricsService.overall(start, end), before)
+        # Compacted rows are not touched again
+        self.assertEqual(RequestMetricsService.compact(), 0)
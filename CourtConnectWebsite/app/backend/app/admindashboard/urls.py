@@ -29,6 +29,7 @@ urlpatterns = [
     path('facilities/<int:facility_id>/suspend/', facility_views.suspend_facility, name='suspend-facility'),
     path('facilities/<int:facility_id>/unsuspend/', facility_views.unsuspend_facility, name='unsuspend-facility'),
     path('facilities/<int:facility_id>/analytics/', facility_views.facility_analytics, name='facility-analytics'),
+    path('facilities/<int:facility_id>/occupancy/', facility_views.facility_occupancy, name='facility-occupancy'),
     path('facilities/<int:facility_id>/commission/', facility_views.adjust_commission_rate, name='adjust-commission'),
 
     # ====== Manager Moderation ======
@@ -57,9 +58,12 @@ urlpatterns = [
     # ====== Payment & Financial Management ======
     path('payments/stats/', financial_views.payment_statistics, name='payment-stats'),
     path('payments/refunds/', financial_views.RefundRequestListView.as_view(), name='refund-list'),
+    path('payments/refunds/approve/', financial_views.approve_refunds, name='approve-refunds'),
     path('payments/refunds/<int:request_id>/approve/', financial_views.approve_refund, name='approve-refund'),
     path('payments/refunds/<int:request_id>/reject/', financial_views.reject_refund, name='reject-refund'),
+    path('payments/refund-batches/<int:batch_id>/', financial_views.refund_batch_status, name='refund-batch-status'),
     path('payments/commission/', financial_views.commission_breakdown, name='commission-breakdown'),
+    path('payments/commission/export/', financial_views.export_commission_breakdown_csv, name='export-commission-csv'),
 
     # ====== Report & Content Moderation ======
     # More specific report paths must come before general 'reports/' path
@@ -73,8 +77,14 @@ urlpatterns = [
 
     # ====== System Reports & CSV Export ======
     path('analytics/system-health/', analytics_views.system_reports, name='system-health'),
+    path('metrics/', analytics_views.metrics_prometheus, name='metrics-prometheus'),
+    path('profiles/', analytics_views.profile_captures, name='profile-captures'),
+    path('profiles/<int:capture_id>/download/', analytics_views.download_profile_capture, name='profile-capture-download'),
     path('reports/export/activity/', analytics_views.export_activity_report_csv, name='export-activity-csv'),
     path('reports/export/admin-actions/', analytics_views.export_admin_actions_csv, name='export-admin-actions-csv'),
     path('reports/export/users/', analytics_views.export_user_statistics_csv, name='export-users-csv'),
     path('reports/export/bookings/', analytics_views.export_booking_statistics_csv, name='export-bookings-csv'),
+    path('reports/export-jobs/', analytics_views.create_export_job, name='export-job-create'),
+    path('reports/export-jobs/<int:job_id>/', analytics_views.export_job_status, name='export-job-status'),
+    path('reports/export-jobs/<int:job_id>/download/', analytics_views.download_export_job, name='export-job-download'),
 ]
\ No newline at end of file
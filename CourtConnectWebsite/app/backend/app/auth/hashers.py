@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher whose work factor is read from settings.
+
+    The algorithm name is unchanged, so existing ``pbkdf2_sha256`` hashes keep
+    verifying. When ``PASSWORD_HASH_ITERATIONS`` differs from the iteration count
+    stored in a hash, ``must_update`` returns True and Django's ModelBackend
+    transparently re-hashes the password on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        """
+        Return the configured PBKDF2 iteration count.
+
+        Returns:
+            int: PASSWORD_HASH_ITERATIONS, or Django's default when unset
+        """
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 from rest_framework.exceptions import NotAuthenticated
 from .services import AuthenticationService
@@ -75,6 +78,21 @@ class IsAdminUser(permissions.BasePermission):
         )
 
 
+class HasMetricsScrapeToken(permissions.BasePermission):
+    """
+    Permission for monitoring scrapers presenting settings.METRICS_SCRAPE_TOKEN
+    as a Bearer token. Always denies when no token is configured.
+    """
+    message = "A valid metrics scrape token is required."
+
+    def has_permission(self, request, view):
+        expected = getattr(settings, 'METRICS_SCRAPE_TOKEN', '')
+        header = request.headers.get('Authorization', '')
+        if not expected or not header.startswith('Bearer '):
+            return False
+        return hmac.compare_digest(header[len('Bearer '):], expected)
+
+
 class IsVerifiedUser(permissions.BasePermission):
     """
     Permission to only allow verified users.
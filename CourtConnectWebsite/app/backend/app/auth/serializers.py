@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Max
 from django.utils import timezone
+from datetime import timedelta
 from app.users.models import User
-from axes.handlers.proxy import AxesProxyHandler
+from axes.helpers import get_cool_off
 from axes.models import AccessAttempt
 
 
@@ -19,47 +21,47 @@ class LoginSerializer(serializers.Serializer):
             # Get request from context (required by django-axes)
             request = self.context.get('request')
 
-            # Check if user is locked out by django-axes
-            if request:
-                # Check lockout status before attempting authentication
-                handler = AxesProxyHandler()
-                if handler.is_locked(request, credentials={'username': email}):
-                    # Calculate time remaining until unlock
-                    time_remaining = self._get_lockout_time_remaining(request, email)
-                    raise serializers.ValidationError(
-                        f'Too many tries! Try again in {time_remaining}.'
-                    )
-
-            # Pass request to authenticate for django-axes to work
-            user = authenticate(request=request, username=email, password=password)
+            # Authenticate with the email keyword so django-axes records and checks
+            # attempts against the real username. The axes backend runs the only
+            # lockout lookup and fills response_context when it refuses the attempt.
+            response_context = {}
+            user = authenticate(
+                request=request,
+                email=email,
+                password=password,
+                response_context=response_context
+            )
 
             if user:
                 if not user.is_active:
                     raise serializers.ValidationError('User account is disabled.')
                 data['user'] = user
                 return data
-            else:
-                raise serializers.ValidationError('Wrong email or password.')
+
+            if 'error' in response_context:
+                # Locked out before the password was even checked
+                time_remaining = self._get_lockout_time_remaining(request, email)
+                raise serializers.ValidationError(
+                    f'Too many tries! Try again in {time_remaining}.'
+                )
+
+            raise serializers.ValidationError('Wrong email or password.')
         else:
             raise serializers.ValidationError('Must include "email" and "password".')
 
     def _get_lockout_time_remaining(self, request, username):
         """Calculate the time remaining until the account is unlocked"""
-        from django.conf import settings
-        from datetime import timedelta
-
-        # Get the cooloff time from settings (in hours)
-        cooloff_time = getattr(settings, 'AXES_COOLOFF_TIME', 1)
+        cooloff = get_cool_off(request) or timedelta(hours=1)
 
-        # Get the most recent failed attempt
-        ip_address = request.META.get('REMOTE_ADDR')
-        attempt = AccessAttempt.objects.filter(
+        # Most recent failed attempt for the same username/IP pair axes locked
+        ip_address = getattr(request, 'axes_ip_address', None) or request.META.get('REMOTE_ADDR')
+        last_attempt_time = AccessAttempt.objects.filter(
             username=username,
             ip_address=ip_address
-        ).order_by('-attempt_time').first()
+        ).aggregate(last=Max('attempt_time'))['last']
 
-        if attempt:
-            unlock_time = attempt.attempt_time + timedelta(hours=cooloff_time)
+        if last_attempt_time:
+            unlock_time = last_attempt_time + cooloff
             remaining = unlock_time - timezone.now()
 
             # Format the time remaining in a user-friendly way
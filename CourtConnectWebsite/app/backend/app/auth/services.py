@@ -1,24 +1,70 @@
 from django.contrib.auth import login, logout
+from django.db import transaction
 from django.utils import timezone
+from contextlib import contextmanager
 from datetime import timedelta
+import logging
+import time
 import uuid
 from app.users.models import User, Session
 
 
 SESSION_EXPIRY_HOURS = 1
 
+logger = logging.getLogger(__name__)
+
+
+class LoginTimer:
+    """
+    Records how long each stage of the login pipeline takes.
+
+    Usage:
+        timer = LoginTimer()
+        with timer.stage('validate'):
+            serializer.is_valid(raise_exception=True)
+        response['Server-Timing'] = timer.as_server_timing()
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """Time the wrapped block and record it under the given stage name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, (time.perf_counter() - started) * 1000))
+
+    @property
+    def total_ms(self):
+        """Total milliseconds across all recorded stages"""
+        return sum(duration for _, duration in self.stages)
+
+    def as_server_timing(self):
+        """Format the recorded stages as a Server-Timing header value"""
+        return ', '.join(f'{name};dur={duration:.1f}' for name, duration in self.stages)
+
+    def log(self, user=None):
+        """Write the stage breakdown to the auth logger at debug level"""
+        logger.debug(
+            "Login pipeline for %s took %.1fms (%s)",
+            getattr(user, 'email', 'unknown user'),
+            self.total_ms,
+            self.as_server_timing()
+        )
+
+
 class AuthenticationService:
     @staticmethod
     def create_session(user, request=None):
         """Create a new session for the user"""
-        # Revoke any existing active sessions (optional - for single session per user)
-        Session.objects.filter(user=user, expires_at__gt=timezone.now(), revoked_at__isnull=True).update(
-            revoked_at=timezone.now()
-        )
+        now = timezone.now()
 
         # Create new session
         session_id = str(uuid.uuid4())
-        expires_at = timezone.now() + timedelta(hours=SESSION_EXPIRY_HOURS)
+        expires_at = now + timedelta(hours=SESSION_EXPIRY_HOURS)
 
         session_data = {
             'session_id': session_id,
@@ -32,7 +78,13 @@ class AuthenticationService:
                 'user_agent': request.META.get('HTTP_USER_AGENT', '')[:2000]  # Limit length
             })
 
-        session = Session.objects.create(**session_data)
+        # Revoke and insert in one transaction so login pays for a single commit
+        with transaction.atomic():
+            # Revoke any existing active sessions (optional - for single session per user)
+            Session.objects.filter(user=user, expires_at__gt=now, revoked_at__isnull=True).update(
+                revoked_at=now
+            )
+            session = Session.objects.create(**session_data)
         return session
 
     @staticmethod
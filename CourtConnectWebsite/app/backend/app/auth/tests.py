@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
@@ -84,6 +84,69 @@ class LoginViewTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_login_lockout_after_repeated_failures(self):
+        """Test the lockout message is returned once the failure limit is hit"""
+        data = {
+            'email': 'test@example.com',
+            'password': 'wrongpassword'
+        }
+        for _ in range(5):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Even the correct password is refused while locked out
+        data['password'] = 'testpass123'
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Too many tries', str(response.data))
+
+    @override_settings(
+        PASSWORD_HASHERS=['app.auth.hashers.ConfigurablePBKDF2PasswordHasher'],
+        PASSWORD_HASH_ITERATIONS=1000
+    )
+    def test_login_rehashes_password_when_iterations_change(self):
+        """Test the stored hash is upgraded on login after the work factor changes"""
+        self.user.set_password('testpass123')
+        self.user.save()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        data = {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        }
+        with self.settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    @override_settings(LOGIN_TIMING_HEADER=True)
+    def test_login_server_timing_header(self):
+        """Test the login stage breakdown is exposed when enabled"""
+        data = {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        }
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('validate;dur=', response['Server-Timing'])
+        self.assertIn('session;dur=', response['Server-Timing'])
+
+    @override_settings(LOGIN_TIMING_HEADER=False)
+    def test_login_server_timing_header_disabled(self):
+        """Test no Server-Timing header is sent when disabled"""
+        data = {
+            'email': 'test@example.com',
+            'password': 'testpass123'
+        }
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
+
 
 class LogoutViewTests(APITestCase):
     """Test logout endpoint"""
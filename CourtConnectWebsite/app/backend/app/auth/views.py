@@ -1,12 +1,13 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.conf import settings
 from django.contrib.auth import login as django_login, logout as django_logout
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.utils.decorators import method_decorator
 
 from .serializers import LoginSerializer, RegisterSerializer, UserSerializer
-from .services import AuthenticationService
+from .services import AuthenticationService, LoginTimer
 from .permissions import IsAuthenticated
 from app.users.models import Manager
 from app.utils.audit import ActivityLogger
@@ -23,8 +24,11 @@ class LoginView(generics.GenericAPIView):
     authentication_classes = []  # Disable CSRF check for login
 
     def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
+        timer = LoginTimer()
+
+        with timer.stage('validate'):
+            serializer = self.get_serializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
 
         user = serializer.validated_data['user']
 
@@ -49,20 +53,23 @@ class LoginView(generics.GenericAPIView):
 
         # No MFA - proceed with normal login
         # Create session
-        session = AuthenticationService.create_session(user, request)
+        with timer.stage('session'):
+            session = AuthenticationService.create_session(user, request)
 
         # Login user in Django session (specify backend to avoid error)
-        user.backend = 'django.contrib.auth.backends.ModelBackend'
-        django_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+        with timer.stage('django_login'):
+            user.backend = 'django.contrib.auth.backends.ModelBackend'
+            django_login(request, user, backend='django.contrib.auth.backends.ModelBackend')
 
         # Return user data and session
-        user_serializer = UserSerializer(user)
+        with timer.stage('serialize'):
+            user_serializer = UserSerializer(user)
 
-        response_data = {
-            'user': user_serializer.data,
-            'session_id': session.session_id,
-            'message': 'Login successful'
-        }
+            response_data = {
+                'user': user_serializer.data,
+                'session_id': session.session_id,
+                'message': 'Login successful'
+            }
 
         response = Response(response_data, status=status.HTTP_200_OK)
 
@@ -76,6 +83,10 @@ class LoginView(generics.GenericAPIView):
             samesite='Lax'
         )
 
+        timer.log(user)
+        if getattr(settings, 'LOGIN_TIMING_HEADER', False):
+            response['Server-Timing'] = timer.as_server_timing()
+
         return response
 
 
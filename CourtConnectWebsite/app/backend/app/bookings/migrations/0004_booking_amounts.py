@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:05
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 2000
+CENTS = Decimal('0.01')
+
+
+def backfill_booking_amounts(apps, schema_editor):
+    """Populate total_amount and commission_amount for existing bookings"""
+    Booking = apps.get_model('bookings', 'Booking')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Booking.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'start_time', 'end_time', 'hourly_rate_snapshot', 'commission_rate_snapshot')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for booking in batch:
+            hours = Decimal((booking.end_time - booking.start_time).total_seconds()) / Decimal(3600)
+            total = booking.hourly_rate_snapshot * hours
+            booking.total_amount = total.quantize(CENTS, rounding=ROUND_HALF_UP)
+            booking.commission_amount = (total * booking.commission_rate_snapshot).quantize(
+                CENTS, rounding=ROUND_HALF_UP
+            )
+
+        Booking.objects.bulk_update(batch, ['total_amount', 'commission_amount'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_populate_booking_statuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='commission_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.RunPython(backfill_booking_amounts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(
+                fields=['created_at'],
+                include=('status', 'total_amount', 'commission_amount'),
+                name='idx_bookings_created_amounts',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(
+                fields=['court', 'created_at'],
+                include=('total_amount', 'commission_amount'),
+                name='idx_bookings_court_amounts',
+            ),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
 
 
+CENTS = Decimal('0.01')
+
+
 class BookingStatus(models.Model):
     status_id = models.BigAutoField(primary_key=True)
     status_name = models.CharField(max_length=50, unique=True)
@@ -28,6 +33,8 @@ class Booking(models.Model):
     end_time = models.DateTimeField()
     hourly_rate_snapshot = models.DecimalField(max_digits=10, decimal_places=2)
     commission_rate_snapshot = models.DecimalField(max_digits=5, decimal_places=2)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    commission_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     status = models.ForeignKey(BookingStatus, on_delete=models.RESTRICT)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -38,7 +45,18 @@ class Booking(models.Model):
             models.UniqueConstraint(fields=['court', 'start_time'], name='unique_court_booking_time')
         ]
         indexes = [
-            models.Index(fields=['user', 'created_at'], name='idx_bookings_user_created_at')
+            models.Index(fields=['user', 'created_at'], name='idx_bookings_user_created_at'),
+            # Covering indexes so revenue reports can SUM amounts from the index alone
+            models.Index(
+                fields=['created_at'],
+                include=['status', 'total_amount', 'commission_amount'],
+                name='idx_bookings_created_amounts'
+            ),
+            models.Index(
+                fields=['court', 'created_at'],
+                include=['total_amount', 'commission_amount'],
+                name='idx_bookings_court_amounts'
+            ),
         ]
 
     def __str__(self):
@@ -50,6 +68,50 @@ class Booking(models.Model):
         """
         return f"Booking {self.booking_id} - {self.court} - {self.start_time}"
 
+    @staticmethod
+    def calculate_amounts(start_time, end_time, hourly_rate, commission_rate):
+        """
+        Calculate the booking total and platform commission.
+
+        Args:
+            start_time: Booking start datetime
+            end_time: Booking end datetime
+            hourly_rate: Hourly rate snapshot (Decimal)
+            commission_rate: Commission rate snapshot as a fraction (Decimal)
+
+        Returns:
+            tuple: (total_amount, commission_amount) rounded to cents
+        """
+        hours = Decimal((end_time - start_time).total_seconds()) / Decimal(3600)
+        total = Decimal(str(hourly_rate)) * hours
+        commission = total * Decimal(str(commission_rate))
+        return (
+            total.quantize(CENTS, rounding=ROUND_HALF_UP),
+            commission.quantize(CENTS, rounding=ROUND_HALF_UP),
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Override save method to keep stored amounts in sync with the snapshots.
+        total_amount and commission_amount are derived from the hourly and
+        commission rate snapshots and the booking duration.
+
+        Args:
+            *args: Variable length argument list
+            **kwargs: Arbitrary keyword arguments
+        """
+        if self.start_time and self.end_time and self.hourly_rate_snapshot is not None:
+            self.total_amount, self.commission_amount = self.calculate_amounts(
+                self.start_time,
+                self.end_time,
+                self.hourly_rate_snapshot,
+                self.commission_rate_snapshot or 0,
+            )
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'total_amount', 'commission_amount'}
+        super().save(*args, **kwargs)
+
 
 class TemporaryReservation(models.Model):
     """
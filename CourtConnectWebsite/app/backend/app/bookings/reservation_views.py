@@ -15,8 +15,10 @@ from .serializers import (
 from .services import ReservationService
 from .exceptions import BookingException
 from .permissions import IsAuthenticatedAndVerified
+from app.utils.query_budget import query_budget
 
 
+@query_budget(13, max_repeats=1)
 class CreateReservationView(generics.CreateAPIView):
     """
     Create a temporary reservation for availability slots
@@ -58,6 +60,7 @@ class CreateReservationView(generics.CreateAPIView):
             )
 
 
+@query_budget(5, max_repeats=1)
 class ReservationDetailView(generics.RetrieveDestroyAPIView):
     """
     Get or cancel a reservation
@@ -91,6 +94,7 @@ class ReservationDetailView(generics.RetrieveDestroyAPIView):
         )
 
 
+@query_budget(4, max_repeats=1)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_active_reservation(request):
@@ -105,14 +105,16 @@ class BookingListSerializer(serializers.ModelSerializer):
         return None
 
     def get_total_price(self, obj):
-        """Calculate total price from hourly rate and duration"""
-        from datetime import timedelta
-        duration_hours = (obj.end_time - obj.start_time).total_seconds() / 3600
-        total = float(obj.hourly_rate_snapshot) * duration_hours
-        return f"{total:.2f}"
+        """Return the total price stored on the booking"""
+        return f"{obj.total_amount:.2f}"
 
     def get_has_reviewed(self, obj):
-        """Check if user has already reviewed this booking"""
+        """
+        Check if user has already reviewed this booking
+
+        Querysets should select_related('review') (as BookingService.get_user_bookings
+        does); otherwise this costs one query per booking.
+        """
         return hasattr(obj, 'review')
 
 
@@ -165,7 +167,8 @@ class TemporaryReservationSerializer(serializers.ModelSerializer):
         return max(0, int(delta.total_seconds()))
 
     def get_slots_count(self, obj):
-        return obj.slots.count()
+        # len() reuses the prefetched slots instead of issuing a COUNT
+        return len(obj.slots.all())
 
 
 class CreateReservationSerializer(serializers.Serializer):
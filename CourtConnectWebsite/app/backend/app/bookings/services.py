@@ -1,4 +1,5 @@
 from django.db import transaction, IntegrityError
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
 from decimal import Decimal
 from .models import Booking, BookingStatus, TemporaryReservation, ReservationSlot
@@ -161,7 +162,7 @@ class BookingService:
         Retrieves user's bookings with optional filtering
         """
         queryset = Booking.objects.filter(user=user).select_related(
-            'court', 'court__facility', 'court__sport_type', 'status'
+            'court', 'court__facility', 'court__sport_type', 'status', 'review'
         ).order_by('-created_at')
 
         if status_filter:
@@ -288,20 +289,21 @@ class ReservationService:
             if len(availabilities) != len(availability_ids):
                 raise BookingNotAvailableException("One or more time slots are not available")
 
-            # Check if any slots are already reserved or booked
-            for availability in availabilities:
-                # Check for existing bookings
-                if Booking.objects.filter(availability=availability).exists():
-                    raise BookingAlreadyExistsException(f"Time slot {availability.availability_id} is already booked")
-
-                # Check for active reservations by other users
-                active_reservation = ReservationSlot.objects.filter(
-                    availability=availability,
-                    reservation__expires_at__gt=timezone.now()
-                ).exclude(reservation__user=user).first()
-
-                if active_reservation:
-                    raise BookingNotAvailableException(f"Time slot {availability.availability_id} is currently reserved")
+            # Check if any slots are already reserved or booked (one query each
+            # for the whole set rather than two per slot)
+            booked_id = Booking.objects.filter(
+                availability__in=availabilities
+            ).order_by('availability_id').values_list('availability_id', flat=True).first()
+            if booked_id is not None:
+                raise BookingAlreadyExistsException(f"Time slot {booked_id} is already booked")
+
+            # Check for active reservations by other users
+            reserved_id = ReservationSlot.objects.filter(
+                availability__in=availabilities,
+                reservation__expires_at__gt=timezone.now()
+            ).exclude(reservation__user=user).order_by('availability_id').values_list('availability_id', flat=True).first()
+            if reserved_id is not None:
+                raise BookingNotAvailableException(f"Time slot {reserved_id} is currently reserved")
 
             # Create the temporary reservation
             expires_at = timezone.now() + timezone.timedelta(minutes=RESERVATION_DURATION_MINUTES)
@@ -311,13 +313,15 @@ class ReservationService:
                 expires_at=expires_at
             )
 
-            # Create reservation slots
-            for availability in availabilities:
-                ReservationSlot.objects.create(
-                    reservation=reservation,
-                    availability=availability
-                )
+            # Create reservation slots in one INSERT
+            ReservationSlot.objects.bulk_create([
+                ReservationSlot(reservation=reservation, availability=availability)
+                for availability in availabilities
+            ])
 
+            # Load the slots the same way get_reservation does, so serializing
+            # the new reservation doesn't fetch each availability separately
+            prefetch_related_objects([reservation], 'slots__availability')
             return reservation
 
     @classmethod
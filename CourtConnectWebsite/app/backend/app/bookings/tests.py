@@ -4,6 +4,7 @@ from rest_framework import status
 from django.utils import timezone
 from django.urls import reverse
 from datetime import timedelta
+from decimal import Decimal
 
 from app.bookings.models import Booking, BookingStatus
 from app.facilities.models import Facility, Court, SportType, Availability
@@ -150,6 +151,28 @@ class BookingModelTests(TestCase):
         self.assertIsNotNone(booking.created_at)
         self.assertIsNotNone(booking.updated_at)
 
+    def test_booking_stores_amounts(self):
+        """Test total and commission amounts are stored on save"""
+        booking = Booking.objects.create(
+            court=self.court,
+            user=self.user,
+            availability=self.availability,
+            start_time=self.availability.start_time,
+            end_time=self.availability.start_time + timedelta(minutes=90),
+            hourly_rate_snapshot=Decimal('45.00'),
+            commission_rate_snapshot=Decimal('0.15'),
+            status=self.status
+        )
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_amount, Decimal('67.50'))
+        self.assertEqual(booking.commission_amount, Decimal('10.13'))
+
+        booking.hourly_rate_snapshot = Decimal('40.00')
+        booking.save(update_fields=['hourly_rate_snapshot'])
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_amount, Decimal('60.00'))
+        self.assertEqual(booking.commission_amount, Decimal('9.00'))
+
 
 class CreateBookingViewTests(APITestCase):
     """Test booking creation endpoint"""
@@ -21,6 +21,7 @@ from .permissions import (
 from .services import BookingService
 from .exceptions import BookingException
 from app.utils.audit import ActivityLogger
+from app.utils.query_budget import query_budget
 
 
 class CreateBookingView(generics.CreateAPIView):
@@ -162,6 +163,7 @@ class CancelBookingView(generics.UpdateAPIView):
         return self.update(request, *args, **kwargs)
 
 
+@query_budget(4, max_repeats=1)
 class MyBookingsListView(generics.ListAPIView):
     """
     List current user's bookings with filtering
@@ -8,6 +8,7 @@ import pytz
 
 from app.facilities.models import Facility, Court, SportType, Availability
 from app.users.models import User, Manager
+from app.utils.query_budget import QueryBudgetTestMixin
 
 
 class SportTypeModelTests(TestCase):
@@ -250,8 +251,8 @@ class AvailabilityModelTests(TestCase):
             )
 
 
-class FacilityListViewTests(APITestCase):
-    """Test facility list endpoint"""
+class FacilityListViewTests(QueryBudgetTestMixin, APITestCase):
+    """Test facility list endpoint (declared query budget enforced)"""
 
     def setUp(self):
         self.client = APIClient()
@@ -315,6 +316,34 @@ class FacilityListViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
 
+    def test_list_query_count_does_not_grow_with_facilities(self):
+        """Test courts, sports and ratings are loaded without per-facility queries"""
+        sport = SportType.objects.create(sport_name='Tennis')
+        for index in range(5):
+            facility = Facility.objects.create(
+                facility_name=f'Extra Center {index}',
+                address=f'{index} Extra St',
+                is_active=True,
+                approval_status='approved'
+            )
+            for number in range(3):
+                Court.objects.create(
+                    facility=facility,
+                    name=f'Court {number}',
+                    sport_type=sport,
+                    hourly_rate=20 + number
+                )
+
+        with self.assertQueryBudget(2, max_repeats=1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+        extra = next(row for row in response.data if row['facility_name'] == 'Extra Center 0')
+        self.assertEqual(extra['total_courts'], 3)
+        self.assertEqual(extra['sports'], ['Tennis'])
+        self.assertEqual(extra['review_count'], 0)
+
 
 class FacilityDetailViewTests(APITestCase):
     """Test facility detail endpoint"""
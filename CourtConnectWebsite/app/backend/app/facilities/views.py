@@ -14,8 +14,10 @@ from .serializers import (
     AvailabilitySerializer
 )
 from app.utils.audit import ActivityLogger
+from app.utils.query_budget import query_budget
 
 
+@query_budget(4, max_repeats=1)
 class FacilityListView(generics.ListAPIView):
     """
     List all active facilities
@@ -35,7 +37,7 @@ class FacilityListView(generics.ListAPIView):
         if timezone:
             queryset = queryset.filter(timezone=timezone)
 
-        return queryset.select_related('manager__user').order_by('-created_at')
+        return FacilityListSerializer.setup_eager_loading(queryset).order_by('-created_at')
 
 
 class FacilityDetailView(generics.RetrieveAPIView):
@@ -212,6 +214,7 @@ class AvailabilityListView(generics.ListAPIView):
         return queryset.order_by('start_time')
 
 
+@query_budget(4, max_repeats=1)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def facility_search_view(request):
@@ -243,7 +246,7 @@ def facility_search_view(request):
         queryset = queryset.filter(court__sport_type__sport_name__icontains=sport_type).distinct()
 
     # Order by most recent
-    queryset = queryset.select_related('manager__user').order_by('-created_at')
+    queryset = FacilityListSerializer.setup_eager_loading(queryset).order_by('-created_at')
 
     # Paginate the results
     paginator = PageNumberPagination()
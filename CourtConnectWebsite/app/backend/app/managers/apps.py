@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app.managers'
+
+    def ready(self):
+        """Import signals when the app is ready"""
+        import app.managers.signals  # noqa: F401
@@ -0,0 +1,173 @@
+"""
+Manager dashboard services
+Builds and caches the manager overview statistics
+"""
+
+import operator
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from app.bookings.models import Booking
+from app.facilities.models import Court, Facility
+from app.utils.commit_batch import CommitBatch
+
+
+class ManagerOverviewService:
+    """
+    Dashboard overview of a manager's active facilities
+
+    Built from two queries however many facilities and bookings there are:
+    the facilities, then one conditional aggregate over their bookings
+    grouped by facility. "Today" and "next 7 days" follow each facility's
+    own timezone. The result is cached per manager for
+    MANAGER_OVERVIEW_CACHE_TTL seconds, never past the next local midnight,
+    and dropped whenever one of the manager's bookings or facilities
+    changes (see app/managers/signals.py).
+    """
+
+    CACHE_KEY = 'managers:overview:{manager_id}'
+    DEFAULT_COMMISSION_RATE = Decimal('0.10')
+
+    @staticmethod
+    def _day_windows(tz, now):
+        """Return (today_start, tomorrow_start, week_end) in a timezone"""
+        today = timezone.localtime(now, tz).date()
+        return tuple(
+            datetime.combine(today + timedelta(days=offset), time.min, tzinfo=tz)
+            for offset in (0, 1, 7)
+        )
+
+    @staticmethod
+    def build(manager_id, now=None):
+        """
+        Compute the overview of one manager
+
+        Returns:
+            Tuple of (payload dict, seconds until the earliest local midnight)
+        """
+        now = now or timezone.now()
+        facilities = list(
+            Facility.objects.filter(manager_id=manager_id, is_active=True)
+            .order_by('facility_id')
+            .values('facility_id', 'facility_name', 'timezone', 'commission_rate')
+        )
+
+        today_ranges, week_ranges = [], []
+        until_midnight = None
+        by_timezone = {}
+        for facility in facilities:
+            by_timezone.setdefault(facility['timezone'] or settings.TIME_ZONE, []).append(facility['facility_id'])
+        for tz_name, facility_ids in by_timezone.items():
+            today_start, tomorrow_start, week_end = ManagerOverviewService._day_windows(ZoneInfo(tz_name), now)
+            today_ranges.append(Q(court__facility_id__in=facility_ids, start_time__gte=today_start, start_time__lt=tomorrow_start))
+            week_ranges.append(Q(court__facility_id__in=facility_ids, start_time__gte=today_start, start_time__lt=week_end))
+            seconds = (tomorrow_start - now).total_seconds()
+            until_midnight = seconds if until_midnight is None else min(until_midnight, seconds)
+
+        stats = {}
+        if facilities:
+            active = ~Q(status__status_name='cancelled')
+            confirmed = Q(status__status_name='confirmed')
+            rows = Booking.objects.filter(
+                court__facility_id__in=[facility['facility_id'] for facility in facilities]
+            ).values('court__facility_id').annotate(
+                today_count=Count('pk', filter=active & reduce(operator.or_, today_ranges)),
+                next7d_count=Count('pk', filter=active & reduce(operator.or_, week_ranges)),
+                revenue=Sum('total_amount', filter=confirmed),
+                commission=Sum('commission_amount', filter=confirmed),
+            ).order_by()
+            stats = {row.pop('court__facility_id'): row for row in rows}
+
+        empty = {'today_count': 0, 'next7d_count': 0, 'revenue': None, 'commission': None}
+        facilities_list = []
+        total_revenue = commission_collected = Decimal('0')
+        for facility in facilities:
+            row = stats.get(facility['facility_id'], empty)
+            total_revenue += row['revenue'] or 0
+            commission_collected += row['commission'] or 0
+            facilities_list.append({
+                'id': facility['facility_id'],
+                'name': facility['facility_name'],
+                'timezone': facility['timezone'],
+                'today_count': row['today_count'],
+                'next7d_count': row['next7d_count'],
+            })
+
+        # Facilities share the platform rate; report the first one's
+        commission_rate = facilities[0]['commission_rate'] if facilities else ManagerOverviewService.DEFAULT_COMMISSION_RATE
+
+        payload = {
+            'today_count': sum(facility['today_count'] for facility in facilities_list),
+            'next7d_count': sum(facility['next7d_count'] for facility in facilities_list),
+            'facilities': facilities_list,
+            'total_revenue': f"{total_revenue:.2f}",
+            'commission_collected': f"{commission_collected:.2f}",
+            'commission_rate': f"{float(commission_rate) * 100:.2f}",  # As percentage
+            'net_revenue': f"{total_revenue - commission_collected:.2f}",
+            'last_updated': now.isoformat(),
+        }
+        return payload, until_midnight
+
+    @staticmethod
+    def get(manager_id):
+        """Cached overview of one manager"""
+        key = ManagerOverviewService.CACHE_KEY.format(manager_id=manager_id)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+
+        payload, until_midnight = ManagerOverviewService.build(manager_id)
+        ttl = getattr(settings, 'MANAGER_OVERVIEW_CACHE_TTL', 60)
+        if until_midnight is not None:
+            ttl = min(ttl, int(until_midnight) + 1)
+        if ttl > 0:
+            cache.set(key, payload, ttl)
+        return payload
+
+    @staticmethod
+    def invalidate(manager_id):
+        """
+        Drop a manager's cached overview
+
+        Deleted straight away and again after the surrounding transaction
+        commits, so a request that read the old rows in between cannot
+        leave a stale entry behind.
+        """
+        if manager_id is None:
+            return
+        key = ManagerOverviewService.CACHE_KEY.format(manager_id=manager_id)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+    @staticmethod
+    def invalidate_for_facility(facility_id):
+        ManagerOverviewService.invalidate(
+            Facility.objects.filter(pk=facility_id).values_list('manager_id', flat=True).first()
+        )
+
+    @staticmethod
+    def invalidate_for_court(court_id):
+        """
+        Drop the overview of the manager owning a court once the current
+        transaction commits; the courts of one transaction share one lookup
+        """
+        _changed_courts.add(court_id)
+
+
+def _invalidate_courts(court_ids):
+    manager_ids = set(Court.objects.filter(pk__in=court_ids).values_list('facility__manager_id', flat=True))
+    cache.delete_many([
+        ManagerOverviewService.CACHE_KEY.format(manager_id=manager_id)
+        for manager_id in manager_ids if manager_id is not None
+    ])
+
+
+_changed_courts = CommitBatch(_invalidate_courts)
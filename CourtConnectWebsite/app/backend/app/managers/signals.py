@@ -0,0 +1,25 @@
+"""
+Manager signal handlers
+Drop the cached manager overview when its bookings or facilities change
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app.bookings.models import Booking
+from app.facilities.models import Facility
+from .services import ManagerOverviewService
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    """Invalidate the overview of the manager owning the booked court"""
+    ManagerOverviewService.invalidate_for_court(instance.court_id)
+
+
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Facility)
+def facility_changed(sender, instance, **kwargs):
+    """Invalidate the overview listing this facility"""
+    ManagerOverviewService.invalidate(instance.manager_id)
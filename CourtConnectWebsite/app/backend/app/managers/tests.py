@@ -1,13 +1,16 @@
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.utils import timezone
-from django.urls import reverse
-from datetime import timedelta, date
+from django.urls import resolve, reverse
+from datetime import datetime, timedelta, date, timezone as dt_timezone
 
 from app.facilities.models import Facility, Court, SportType, Availability
 from app.bookings.models import Booking, BookingStatus
 from app.users.models import User, Manager
+from app.managers.services import ManagerOverviewService
+from app.utils.query_budget import QueryBudgetTestMixin, budget_for_view
 
 
 class ManagerOverviewViewTests(APITestCase):
@@ -69,6 +72,159 @@ class ManagerOverviewViewTests(APITestCase):
         ])
 
 
+class ManagerOverviewServiceTests(QueryBudgetTestMixin, APITestCase):
+    """Test the aggregated and cached manager overview"""
+
+    # 23:30 on 10 March in Perth (UTC+8), 02:30 on 11 March in Sydney (UTC+11)
+    NOW = datetime(2026, 3, 10, 15, 30, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.url = reverse('managers:manager-overview')
+
+        self.user = User.objects.create_user(
+            email='manager@example.com',
+            name='Manager User',
+            password='testpass123'
+        )
+        self.manager = Manager.objects.create(user=self.user)
+        self.player = User.objects.create_user(
+            email='player@example.com',
+            name='Player',
+            password='testpass123'
+        )
+        self.sport = SportType.objects.create(sport_name='Tennis')
+        self.confirmed, _ = BookingStatus.objects.get_or_create(status_name='confirmed')
+        self.cancelled, _ = BookingStatus.objects.get_or_create(status_name='cancelled')
+
+        self.perth = self._court('Perth Center', 'Australia/Perth')
+        self.sydney = self._court('Sydney Center', 'Australia/Sydney')
+
+    def _court(self, name, tz):
+        facility = Facility.objects.create(
+            manager=self.manager,
+            facility_name=name,
+            address='123 Test St',
+            timezone=tz,
+            is_active=True
+        )
+        return Court.objects.create(facility=facility, name='Court 1', sport_type=self.sport, hourly_rate=50.00)
+
+    def _book(self, court, start_time, booking_status=None):
+        availability = Availability.objects.create(
+            court=court,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            is_available=False
+        )
+        return Booking.objects.create(
+            court=court,
+            user=self.player,
+            availability=availability,
+            start_time=availability.start_time,
+            end_time=availability.end_time,
+            hourly_rate_snapshot=50.00,
+            commission_rate_snapshot=0.10,
+            status=booking_status or self.confirmed
+        )
+
+    def _facility(self, payload, court):
+        return next(f for f in payload['facilities'] if f['id'] == court.facility_id)
+
+    def test_days_follow_each_facility_timezone(self):
+        """Test today and the next 7 days start at each facility's local midnight"""
+        self._book(self.perth, self.NOW + timedelta(minutes=15))   # 23:45 today in Perth
+        self._book(self.perth, self.NOW + timedelta(hours=1))      # 00:30 tomorrow in Perth
+        self._book(self.sydney, self.NOW + timedelta(hours=1))     # 03:30 today in Sydney
+        self._book(self.sydney, self.NOW - timedelta(hours=3))     # 23:30 yesterday in Sydney
+        self._book(self.sydney, self.NOW + timedelta(days=7))      # Past the 7 day window
+
+        payload, until_midnight = ManagerOverviewService.build(self.manager.pk, now=self.NOW)
+
+        perth = self._facility(payload, self.perth)
+        sydney = self._facility(payload, self.sydney)
+        self.assertEqual((perth['today_count'], perth['next7d_count']), (1, 2))
+        self.assertEqual((sydney['today_count'], sydney['next7d_count']), (1, 1))
+        self.assertEqual((payload['today_count'], payload['next7d_count']), (2, 3))
+        # Perth reaches midnight first
+        self.assertEqual(until_midnight, 30 * 60)
+
+    def test_cancelled_bookings_are_excluded(self):
+        """Test cancelled bookings are not counted and only confirmed ones earn revenue"""
+        self._book(self.perth, self.NOW + timedelta(minutes=15))
+        self._book(self.sydney, self.NOW + timedelta(hours=1), self.cancelled)
+
+        payload, _ = ManagerOverviewService.build(self.manager.pk, now=self.NOW)
+
+        self.assertEqual(payload['today_count'], 1)
+        self.assertEqual(self._facility(payload, self.sydney)['today_count'], 0)
+        self.assertEqual(payload['total_revenue'], '50.00')
+        self.assertEqual(payload['commission_collected'], '5.00')
+        self.assertEqual(payload['net_revenue'], '45.00')
+
+    def test_query_count_does_not_grow_with_facilities(self):
+        """Test the overview is built from one facilities and one bookings query"""
+        for index in range(3):
+            court = self._court(f'Extra Center {index}', 'Australia/Brisbane')
+            self._book(court, self.NOW + timedelta(days=1))
+
+        with self.assertNumQueries(2):
+            payload, _ = ManagerOverviewService.build(self.manager.pk, now=self.NOW)
+        self.assertEqual(len(payload['facilities']), 5)
+        self.assertEqual(payload['next7d_count'], 3)
+
+    def test_session_request_stays_within_budget(self):
+        """Test a cache miss fits the view's query budget with real session auth"""
+        self.assertEqual(budget_for_view(resolve(self.url).func).max_queries, 5)
+        self._book(self.sydney, timezone.now() + timedelta(days=1))
+        self.client.force_login(self.user)
+
+        # Session, user, manager, facilities and the grouped bookings query
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['next7d_count'], 1)
+
+    def test_overview_is_cached_per_manager(self):
+        """Test a second request is served from the cache"""
+        self.client.force_authenticate(user=self.user)
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+
+    def test_booking_changes_invalidate_cache(self):
+        """Test creating and cancelling a booking refreshes the cached overview"""
+        self.client.force_authenticate(user=self.user)
+        start_time = timezone.now() + timedelta(days=2)
+        self.assertEqual(self.client.get(self.url).data['next7d_count'], 0)
+
+        # The cache is dropped once the saving transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self._book(self.sydney, start_time)
+        self.assertEqual(self.client.get(self.url).data['next7d_count'], 1)
+
+        booking.status = self.cancelled
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertEqual(self.client.get(self.url).data['next7d_count'], 0)
+
+    def test_facility_changes_invalidate_cache(self):
+        """Test deactivating a facility drops it from the cached overview"""
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(len(self.client.get(self.url).data['facilities']), 2)
+
+        facility = self.perth.facility
+        facility.is_active = False
+        facility.save()
+        self.assertEqual(len(self.client.get(self.url).data['facilities']), 1)
+
+
 class ManagerFacilityListViewTests(APITestCase):
     """Test manager facility list endpoint"""
 
@@ -439,6 +595,30 @@ class ManagerAvailabilityViewTests(APITestCase):
         )
 
 
+    def test_facility_occupancy(self):
+        """Test managers can read occupancy for their own facilities only"""
+        self.client.force_authenticate(user=self.user)
+        url = reverse('managers:manager-facility-occupancy', kwargs={'facility_id': self.facility.facility_id})
+
+        response = self.client.get(url, {'days': 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['occupancy_rate'], 0.0)
+        self.assertEqual(len(response.data['by_hour_of_week']), 7)
+
+        response = self.client.get(url, {'days': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other_user = User.objects.create_user(
+            email='other@example.com',
+            name='Other Manager',
+            password='testpass123'
+        )
+        Manager.objects.create(user=other_user)
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class ManagerUserSerializerTests(TestCase):
     """Test ManagerUserSerializer"""
 
@@ -10,6 +10,7 @@ urlpatterns = [
     # Manager facility management
     path('facilities/', views.ManagerFacilityListView.as_view(), name='manager-facilities-list'),
     path('facilities/<int:facility_id>/', views.ManagerFacilityDetailView.as_view(), name='manager-facility-detail'),
+    path('facilities/<int:facility_id>/occupancy/', views.manager_facility_occupancy_view, name='manager-facility-occupancy'),
 
     # Manager court management
     path('facilities/<int:facility_id>/courts/', views.manager_facility_courts_view, name='manager-facility-courts'),
@@ -3,9 +3,8 @@ from rest_framework.response import Response
 from rest_framework import generics, status
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
-from datetime import timedelta
-from decimal import Decimal
+from django.db import transaction
+from zoneinfo import ZoneInfo
 
 from .permissions import IsManager
 from app.facilities.models import Facility, Court, Availability
@@ -19,101 +18,23 @@ from app.facilities.serializers import (
 )
 from app.bookings.models import Booking
 from app.utils.audit import ActivityLogger
+from app.utils.occupancy import occupancy_report, occupancy_window
+from app.utils.query_budget import query_budget
+from .services import ManagerOverviewService
 
 
+@query_budget(5, max_repeats=1)
 @api_view(['GET'])
 @permission_classes([IsManager])
 def manager_overview_view(request):
     """
     Get manager dashboard overview with booking statistics
     GET /api/manager/overview/
-    """
-    manager = request.user.manager
-
-    # Get all facilities managed by this manager
-    facilities = Facility.objects.filter(
-        manager=manager,
-        is_active=True
-    )
-
-    # Get facility IDs for filtering bookings
-    facility_ids = list(facilities.values_list('facility_id', flat=True))
-
-    # Get commission rate (assuming all facilities have same rate, take first)
-    commission_rate = facilities.first().commission_rate if facilities.exists() else Decimal('0.10')
-
-    # Calculate today's bookings
-    today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-
-    today_count = Booking.objects.filter(
-        court__facility_id__in=facility_ids,
-        start_time__gte=today_start,
-        start_time__lt=today_end
-    ).exclude(
-        status__status_name='cancelled'
-    ).count()
-
-    # Calculate next 7 days bookings (including today)
-    next7d_end = today_start + timedelta(days=7)
-
-    next7d_count = Booking.objects.filter(
-        court__facility_id__in=facility_ids,
-        start_time__gte=today_start,
-        start_time__lt=next7d_end
-    ).exclude(
-        status__status_name='cancelled'
-    ).count()
-
-    # Calculate revenue (all-time for confirmed bookings)
-    from django.db.models import Sum, F, FloatField, ExpressionWrapper
-    from django.db.models.functions import Cast, Extract
-
-    confirmed_bookings = Booking.objects.filter(
-        court__facility_id__in=facility_ids,
-        status__status_name='confirmed'
-    )
 
-    revenue_data = confirmed_bookings.aggregate(
-        total_revenue=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        ),
-        total_commission=Sum(
-            ExpressionWrapper(
-                F('hourly_rate_snapshot') * F('commission_rate_snapshot') *
-                Cast(Extract(F('end_time') - F('start_time'), 'epoch'), FloatField()) / 3600.0,
-                output_field=FloatField()
-            )
-        )
-    )
-
-    total_revenue = Decimal(str(revenue_data['total_revenue'] or 0))
-    commission_collected = Decimal(str(revenue_data['total_commission'] or 0))
-    net_revenue = total_revenue - commission_collected
-
-    # Format facilities for response
-    facilities_list = [
-        {
-            'id': f.facility_id,
-            'name': f.facility_name
-        }
-        for f in facilities
-    ]
-
-    return Response({
-        'today_count': today_count,
-        'next7d_count': next7d_count,
-        'facilities': facilities_list,
-        'total_revenue': f"{total_revenue:.2f}",
-        'commission_collected': f"{commission_collected:.2f}",
-        'commission_rate': f"{float(commission_rate) * 100:.2f}",  # As percentage
-        'net_revenue': f"{net_revenue:.2f}",
-        'last_updated': timezone.now().isoformat(),
-    })
+    Counts use each facility's local day and are cached per manager (see
+    ManagerOverviewService); last_updated is when they were computed.
+    """
+    return Response(ManagerOverviewService.get(request.user.manager.pk))
 
 
 class ManagerFacilityListView(generics.ListAPIView):
@@ -220,6 +141,36 @@ def manager_facility_courts_view(request, facility_id):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsManager])
+def manager_facility_occupancy_view(request, facility_id):
+    """
+    Get court occupancy (booked vs offered slot-hours) for a facility owned by the manager
+    GET /api/manager/facilities/{facility_id}/occupancy/?days=30
+    """
+    # Verify facility ownership
+    facility = get_object_or_404(
+        Facility,
+        facility_id=facility_id,
+        manager=request.user.manager
+    )
+
+    try:
+        start, end = occupancy_window(timezone.now(), request.query_params.get('days'))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    report = occupancy_report(Court.objects.filter(facility=facility), start, end, ZoneInfo(facility.timezone))
+
+    return Response({
+        'facility_id': facility.facility_id,
+        'facility_name': facility.facility_name,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        **report,
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsManager])
 def manager_create_court_view(request, facility_id):
@@ -712,52 +663,54 @@ def manager_bulk_create_availability_view(request, facility_id, court_id):
     # Get facility timezone
     tz = pytz.timezone(facility.timezone)
 
-    # Generate all slots
+    # Generate all slots in one transaction so the slots are all-or-nothing
+    # and the analytics snapshot is flagged stale once, at commit
     created_slots = []
     skipped_count = 0
     current_date = start_date
 
-    while current_date <= end_date:
-        # Check if this day of week is selected (1=Monday, 7=Sunday)
-        day_of_week = current_date.isoweekday()
+    with transaction.atomic():
+        while current_date <= end_date:
+            # Check if this day of week is selected (1=Monday, 7=Sunday)
+            day_of_week = current_date.isoweekday()
 
-        if day_of_week in days_of_week:
-            # Generate slots for this day
-            current_time = datetime.combine(current_date, datetime.min.time()).replace(
-                hour=start_hour, minute=start_minute, tzinfo=tz
-            )
-            end_of_day = datetime.combine(current_date, datetime.min.time()).replace(
-                hour=end_hour, minute=end_minute, tzinfo=tz
-            )
+            if day_of_week in days_of_week:
+                # Generate slots for this day
+                current_time = datetime.combine(current_date, datetime.min.time()).replace(
+                    hour=start_hour, minute=start_minute, tzinfo=tz
+                )
+                end_of_day = datetime.combine(current_date, datetime.min.time()).replace(
+                    hour=end_hour, minute=end_minute, tzinfo=tz
+                )
 
-            while current_time < end_of_day:
-                slot_end = current_time + timedelta(minutes=slot_duration)
-
-                if slot_end > end_of_day:
-                    break
+                while current_time < end_of_day:
+                    slot_end = current_time + timedelta(minutes=slot_duration)
 
-                # Check for overlapping availability
-                overlapping = Availability.objects.filter(
-                    court=court,
-                    start_time__lt=slot_end,
-                    end_time__gt=current_time
-                ).exists()
+                    if slot_end > end_of_day:
+                        break
 
-                if not overlapping:
-                    # Create the slot
-                    availability = Availability.objects.create(
+                    # Check for overlapping availability
+                    overlapping = Availability.objects.filter(
                         court=court,
-                        start_time=current_time,
-                        end_time=slot_end,
-                        is_available=True
-                    )
-                    created_slots.append(availability)
-                else:
-                    skipped_count += 1
-
-                current_time = slot_end
-
-        current_date += timedelta(days=1)
+                        start_time__lt=slot_end,
+                        end_time__gt=current_time
+                    ).exists()
+
+                    if not overlapping:
+                        # Create the slot
+                        availability = Availability.objects.create(
+                            court=court,
+                            start_time=current_time,
+                            end_time=slot_end,
+                            is_available=True
+                        )
+                        created_slots.append(availability)
+                    else:
+                        skipped_count += 1
+
+                    current_time = slot_end
+
+            current_date += timedelta(days=1)
 
     # Log bulk availability creation
     ActivityLogger.log_manager_action(
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PaymentStatus, PaymentMethod, Payment
+from .models import PaymentStatus, PaymentMethod, Payment, PaymentDiscrepancy
 
 @admin.register(PaymentStatus)
 class PaymentStatusAdmin(admin.ModelAdmin):
@@ -16,4 +16,11 @@ class PaymentMethodAdmin(admin.ModelAdmin):
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ['payment_id', 'booking', 'amount', 'currency', 'status', 'created_at']
     list_filter = ['status', 'provider', 'currency', 'created_at']
-    search_fields = ['booking__user__email', 'provider_payment_id']
\ No newline at end of file
+    search_fields = ['booking__user__email', 'provider_payment_id']
+
+
+@admin.register(PaymentDiscrepancy)
+class PaymentDiscrepancyAdmin(admin.ModelAdmin):
+    list_display = ['payment', 'kind', 'local_status', 'booking_status', 'provider_status', 'run', 'created_at', 'resolved_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['payment__provider_payment_id', 'detail']
@@ -0,0 +1,94 @@
+"""
+Cross-check recent payments against the payment provider.
+
+Meant to run nightly (cron or a scheduled container). Every payment created
+in the window is looked up with its provider, a bounded number at a time,
+and differences in payment status, amount or booking status are stored in
+the payment_discrepancies table and printed.
+
+Usage:
+    python manage.py reconcile_payments                       # Last PAYMENT_RECONCILE_DAYS days
+    python manage.py reconcile_payments --days 7 --workers 4
+    python manage.py reconcile_payments --provider paypal --fail-on-mismatch
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.payments.services.reconciliation_service import ReconciliationService
+
+
+class Command(BaseCommand):
+    help = 'Compare recent payments with the provider and record mismatches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=getattr(settings, 'PAYMENT_RECONCILE_DAYS', 2),
+            help='Check payments created in the last N days'
+        )
+        parser.add_argument(
+            '--provider',
+            help='Only check payments of this provider'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'PAYMENT_RECONCILE_BATCH_SIZE', 200),
+            help='Payments read (and looked up) per batch'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'PAYMENT_RECONCILE_WORKERS', 8),
+            help='Concurrent provider lookups'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Number of discrepancies to print'
+        )
+        parser.add_argument(
+            '--fail-on-mismatch',
+            action='store_true',
+            help='Exit with an error when any mismatch is found (for alerting)'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be at least 1')
+
+        run = ReconciliationService.reconcile(
+            days=options['days'],
+            provider=options['provider'],
+            batch_size=options['batch_size'],
+            workers=options['workers']
+        )
+        if run.status == 'failed':
+            raise CommandError(f"Reconciliation run {run.run_id} failed: {run.error}")
+
+        discrepancies = run.discrepancies.order_by('payment_id', 'kind')[:options['limit']]
+        if discrepancies:
+            self.stdout.write(
+                f"{'Payment':>8} {'Kind':<12} {'Local':<10} {'Booking':<15} {'Provider':<18} "
+                f"{'Amount':>9} {'Provider':>9}  Detail"
+            )
+        for item in discrepancies:
+            provider_amount = item.provider_amount if item.provider_amount is not None else '-'
+            line = (
+                f"{item.payment_id:>8} {item.kind:<12} {item.local_status:<10} {item.booking_status or '-':<15} "
+                f"{item.provider_status or '-':<18} {item.local_amount:>9} {provider_amount:>9}  {item.detail}"
+            )
+            self.stdout.write(self.style.WARNING(line))
+
+        summary = (
+            f"Run {run.run_id}: checked {run.checked} payments, "
+            f"{run.mismatches} mismatched, {run.lookup_errors} lookup errors"
+        )
+        if options['fail_on_mismatch'] and run.mismatches:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
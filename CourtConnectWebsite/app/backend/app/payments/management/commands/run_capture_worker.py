@@ -0,0 +1,92 @@
+"""
+Process queued payment captures.
+
+Required when PAYMENT_CAPTURE_EXECUTOR is 'worker'. In 'thread' mode it is
+still worth running (or scheduling with --once) to pick up captures a web
+process died in the middle of. Several workers can run at once; each
+capture is claimed with SELECT ... FOR UPDATE SKIP LOCKED.
+
+Usage:
+    python manage.py run_capture_worker                   # Poll forever
+    python manage.py run_capture_worker --once            # Drain the queue and exit (cron)
+    python manage.py run_capture_worker --poll-interval 0.5
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from app.payments.services import CaptureService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Capture queued payment orders and convert their reservations into bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every runnable capture, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'PAYMENT_CAPTURE_WORKER_POLL_SECONDS', 1),
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            help='Exit after processing this many captures'
+        )
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+        max_jobs = options['max_jobs']
+        if max_jobs is not None and max_jobs < 1:
+            raise CommandError('--max-jobs must be at least 1')
+
+        processed = 0
+        try:
+            while max_jobs is None or processed < max_jobs:
+                # Drop connections the database closed while we were idle
+                # (not inside a transaction, e.g. when called from a TestCase)
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                try:
+                    capture = CaptureService.claim_next()
+                except Exception as e:
+                    logger.exception("Claiming a payment capture failed")
+                    self.stderr.write(f"Could not claim a capture, retrying: {e}")
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                if capture is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                processed += 1
+                try:
+                    capture = CaptureService.process(capture)
+                except Exception as e:
+                    # Left 'processing'; claim_next reclaims it after PAYMENT_CAPTURE_TIMEOUT_SECONDS
+                    logger.exception("Payment capture %s failed", capture.capture_id)
+                    self.stderr.write(f"Capture {capture.capture_id} ({capture.order_id}) raised: {e}")
+                    continue
+
+                if capture.status == 'failed':
+                    self.stderr.write(f"Capture {capture.capture_id} ({capture.order_id}) failed: {capture.error}")
+                else:
+                    self.stdout.write(f"Capture {capture.capture_id} ({capture.order_id}) {capture.status}")
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping capture worker')
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} payment captures"))
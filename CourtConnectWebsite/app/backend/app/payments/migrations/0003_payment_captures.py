@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_amounts'),
+        ('payments', '0002_populate_payment_statuses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCapture',
+            fields=[
+                ('capture_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('reservation_id', models.BigIntegerField()),
+                ('provider', models.CharField(max_length=50)),
+                ('order_id', models.CharField(max_length=255)),
+                ('payer_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('awaiting_provider', 'Awaiting provider'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('provider_payment_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('currency', models.CharField(blank=True, max_length=3, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='bookings.booking')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payments.payment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_captures', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'payment_captures',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='idx_payment_captures_status')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'order_id'), name='unique_capture_provider_order')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_captures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('run_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('provider', models.CharField(blank=True, max_length=50, null=True)),
+                ('since', models.DateTimeField()),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='running', max_length=20)),
+                ('checked', models.IntegerField(default=0)),
+                ('mismatches', models.IntegerField(default=0)),
+                ('lookup_errors', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'payment_reconciliation_runs',
+                'indexes': [models.Index(fields=['started_at'], name='idx_reconciliation_started')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentDiscrepancy',
+            fields=[
+                ('discrepancy_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('status', 'Payment status differs'), ('amount', 'Amount or currency differs'), ('booking', 'Booking status does not match the payment'), ('missing', 'Not found at the provider'), ('lookup_error', 'Provider lookup failed')], max_length=20)),
+                ('local_status', models.CharField(max_length=50)),
+                ('booking_status', models.CharField(blank=True, max_length=50, null=True)),
+                ('provider_status', models.CharField(blank=True, max_length=50, null=True)),
+                ('local_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('provider_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('detail', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='payments.payment')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='payments.reconciliationrun')),
+            ],
+            options={
+                'db_table': 'payment_discrepancies',
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='idx_discrepancies_kind'), models.Index(fields=['resolved_at'], name='idx_discrepancies_resolved')],
+            },
+        ),
+    ]
@@ -73,4 +73,138 @@ class Payment(models.Model):
         Returns:
             str: Formatted string with payment ID, amount, and currency
         """
-        return f"Payment {self.payment_id} - {self.amount:.2f} {self.currency}"
\ No newline at end of file
+        return f"Payment {self.payment_id} - {self.amount:.2f} {self.currency}"
+
+
+class PaymentCapture(models.Model):
+    """
+    A queued capture of an approved provider order.
+
+    The capture endpoint only records the job; the provider call and the
+    reservation-to-booking conversion run in the background (see
+    CaptureService), and provider webhooks reconcile the final state.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('awaiting_provider', 'Awaiting provider'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('refunded', 'Refunded'),
+    ]
+
+    capture_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='payment_captures')
+    reservation_id = models.BigIntegerField()  # The reservation is deleted once converted
+    provider = models.CharField(max_length=50)
+    order_id = models.CharField(max_length=255)
+    payer_id = models.CharField(max_length=255, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    provider_payment_id = models.CharField(max_length=255, null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    currency = models.CharField(max_length=3, null=True, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    booking = models.ForeignKey('bookings.Booking', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payment_captures'
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'order_id'], name='unique_capture_provider_order')
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_payment_captures_status')
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the payment capture.
+
+        Returns:
+            str: Formatted string with capture ID, order ID, and status
+        """
+        return f"Capture {self.capture_id} - {self.order_id} ({self.status})"
+
+
+class ReconciliationRun(models.Model):
+    """
+    One pass of ``python manage.py reconcile_payments`` over recent payments.
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    run_id = models.BigAutoField(primary_key=True)
+    provider = models.CharField(max_length=50, null=True, blank=True)  # None checks every provider
+    since = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    checked = models.IntegerField(default=0)
+    mismatches = models.IntegerField(default=0)
+    lookup_errors = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payment_reconciliation_runs'
+        indexes = [
+            models.Index(fields=['started_at'], name='idx_reconciliation_started')
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the reconciliation run.
+
+        Returns:
+            str: Formatted string with run ID, status, and mismatch count
+        """
+        return f"Reconciliation {self.run_id} ({self.status}) - {self.mismatches} mismatches"
+
+
+class PaymentDiscrepancy(models.Model):
+    """
+    A payment whose provider record disagrees with the local Payment or Booking.
+    """
+    KIND_CHOICES = [
+        ('status', 'Payment status differs'),
+        ('amount', 'Amount or currency differs'),
+        ('booking', 'Booking status does not match the payment'),
+        ('missing', 'Not found at the provider'),
+        ('lookup_error', 'Provider lookup failed'),
+    ]
+
+    discrepancy_id = models.BigAutoField(primary_key=True)
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='discrepancies')
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='discrepancies')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    local_status = models.CharField(max_length=50)
+    booking_status = models.CharField(max_length=50, null=True, blank=True)
+    provider_status = models.CharField(max_length=50, null=True, blank=True)
+    local_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    provider_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    detail = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payment_discrepancies'
+        indexes = [
+            models.Index(fields=['kind', 'created_at'], name='idx_discrepancies_kind'),
+            models.Index(fields=['resolved_at'], name='idx_discrepancies_resolved'),
+        ]
+
+    def __str__(self):
+        """
+        Return string representation of the discrepancy.
+
+        Returns:
+            str: Formatted string with payment ID and discrepancy kind
+        """
+        return f"Payment {self.payment_id} - {self.kind}"
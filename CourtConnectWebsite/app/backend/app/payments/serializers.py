@@ -4,7 +4,16 @@ Reusable serializers for payment operations
 """
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Payment, PaymentMethod, PaymentStatus
+from .models import Payment, PaymentCapture, PaymentMethod, PaymentStatus
+from .services.providers import available_providers
+
+
+class PaymentProviderField(serializers.ChoiceField):
+    """Choice of the providers configured in PAYMENT_PROVIDERS (read per serializer)"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('default', 'paypal')
+        super().__init__(choices=available_providers(), **kwargs)
 
 
 class PaymentMethodSerializer(serializers.ModelSerializer):
@@ -56,7 +65,7 @@ class CreatePaymentOrderSerializer(serializers.Serializer):
     reservation_id = serializers.IntegerField(required=True)
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=True)
     currency = serializers.CharField(max_length=3, default='AUD')
-    provider = serializers.ChoiceField(choices=['paypal', 'stripe'], default='paypal')
+    provider = PaymentProviderField()
     return_url = serializers.URLField(required=False)
     cancel_url = serializers.URLField(required=False)
 
@@ -71,7 +80,7 @@ class CapturePaymentSerializer(serializers.Serializer):
     """Serializer for capturing a payment"""
     order_id = serializers.CharField(required=True)
     payer_id = serializers.CharField(required=False)  # PayPal payer ID (optional in v2)
-    provider = serializers.ChoiceField(choices=['paypal', 'stripe'], default='paypal')
+    provider = PaymentProviderField()
     reservation_id = serializers.IntegerField(required=True)  # Needed to convert reservation to booking
 
 
@@ -102,3 +111,27 @@ class PaymentCallbackSerializer(serializers.Serializer):
     event_type = serializers.CharField(required=True)
     resource_id = serializers.CharField(required=True)
     data = serializers.JSONField(required=False)
+
+
+class PaymentCaptureSerializer(serializers.ModelSerializer):
+    """Serializer for the state of a queued capture (polled by clients)"""
+    booking_id = serializers.IntegerField(read_only=True)
+    payment_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PaymentCapture
+        fields = [
+            'capture_id',
+            'order_id',
+            'provider',
+            'status',
+            'booking_id',
+            'payment_id',
+            'provider_payment_id',
+            'amount',
+            'currency',
+            'error',
+            'created_at',
+            'completed_at'
+        ]
+        read_only_fields = fields
@@ -1,4 +1,14 @@
 from .payment_service import PaymentService
 from .paypal_service import PayPalService
+from .fake_service import FakePaymentService
+from .providers import available_providers, get_payment_service
+from .capture_service import CaptureService
 
-__all__ = ['PaymentService', 'PayPalService']
+__all__ = [
+    'PaymentService',
+    'PayPalService',
+    'FakePaymentService',
+    'available_providers',
+    'get_payment_service',
+    'CaptureService',
+]
@@ -0,0 +1,331 @@
+"""
+Payment Capture Pipeline
+Queues provider captures, runs them outside the request cycle and
+reconciles their final state from provider webhooks
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app.bookings.exceptions import BookingException
+from app.bookings.models import TemporaryReservation
+from app.bookings.services import BookingService, ReservationService
+from ..models import Payment, PaymentCapture, PaymentStatus
+from .providers import get_payment_service
+
+logger = logging.getLogger(__name__)
+
+# Statuses a capture can no longer leave
+FINAL_STATUSES = ('completed', 'refunded')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Bounded per-process pool used when PAYMENT_CAPTURE_EXECUTOR is 'thread'"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PAYMENT_CAPTURE_THREADS', 4),
+                thread_name_prefix='payment-capture'
+            )
+        return _executor
+
+
+class CaptureService:
+    """
+    Capture pipeline for approved provider orders
+
+    enqueue() records a PaymentCapture and returns at once. The capture is
+    then run either by a thread pool in the web process, started after the
+    enqueuing transaction commits (PAYMENT_CAPTURE_EXECUTOR = 'thread'), or
+    by ``python manage.py run_capture_worker`` ('worker'). The worker also
+    reclaims captures a crashed process left in processing, so it is worth
+    running in thread mode too. Jobs are claimed with SELECT ... FOR UPDATE
+    SKIP LOCKED, and handle_webhook() settles captures the provider
+    completes, holds or denies later.
+    """
+
+    @staticmethod
+    def enqueue(user, provider, order_id, reservation_id, payer_id=None):
+        """
+        Queue the capture of an approved order
+
+        The reservation is checked first so nothing is charged for slots the
+        user no longer holds, and its expiry is pushed out by
+        PAYMENT_CAPTURE_RESERVATION_GRACE_SECONDS so the background capture
+        can still convert it. Repeated calls for the same order return the
+        existing capture.
+
+        Returns:
+            Tuple of (PaymentCapture, created)
+
+        Raises:
+            BookingException: If the reservation is missing, not the user's or expired
+            ValueError: If the order is already being captured for another user
+        """
+        ReservationService.validate_reservation(reservation_id, user)
+
+        grace = timedelta(seconds=getattr(settings, 'PAYMENT_CAPTURE_RESERVATION_GRACE_SECONDS', 300))
+        TemporaryReservation.objects.filter(
+            reservation_id=reservation_id,
+            expires_at__lt=timezone.now() + grace
+        ).update(expires_at=timezone.now() + grace)
+
+        with transaction.atomic():
+            capture, created = PaymentCapture.objects.get_or_create(
+                provider=provider,
+                order_id=order_id,
+                defaults={
+                    'user': user,
+                    'reservation_id': reservation_id,
+                    'payer_id': payer_id,
+                }
+            )
+            if capture.user_id != user.pk:
+                raise ValueError('This payment order belongs to a different user')
+
+            if created and getattr(settings, 'PAYMENT_CAPTURE_EXECUTOR', 'thread') == 'thread':
+                capture_id = capture.capture_id
+                transaction.on_commit(lambda: _get_executor().submit(CaptureService.run_in_thread, capture_id))
+
+        return capture, created
+
+    @staticmethod
+    def claim_next(capture_id=None):
+        """
+        Atomically mark the oldest runnable capture as processing and return it
+
+        Captures left processing longer than PAYMENT_CAPTURE_TIMEOUT_SECONDS
+        (e.g. after a worker crash) are picked up again.
+
+        Args:
+            capture_id: Only claim this capture
+
+        Returns:
+            PaymentCapture or None when there is nothing to run
+        """
+        timeout = getattr(settings, 'PAYMENT_CAPTURE_TIMEOUT_SECONDS', 120)
+        now = timezone.now()
+
+        with transaction.atomic():
+            queryset = PaymentCapture.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') |
+                Q(status='processing', started_at__lt=now - timedelta(seconds=timeout))
+            )
+            if capture_id is not None:
+                queryset = queryset.filter(capture_id=capture_id)
+            capture = queryset.order_by('created_at').first()
+            if capture is None:
+                return None
+
+            capture.status = 'processing'
+            capture.started_at = now
+            capture.attempts += 1
+            capture.save(update_fields=['status', 'started_at', 'attempts', 'updated_at'])
+        return capture
+
+    @staticmethod
+    def run_in_thread(capture_id):
+        """Executor entry point: claim and process one capture"""
+        try:
+            capture = CaptureService.claim_next(capture_id)
+            if capture is not None:
+                CaptureService.process(capture)
+        except Exception:
+            logger.exception("Background capture %s failed", capture_id)
+        finally:
+            # Pool threads outlive the request; release their DB connection
+            connection.close()
+
+    @staticmethod
+    def process(capture):
+        """
+        Capture a claimed order with its provider and settle the result
+
+        Returns:
+            The updated PaymentCapture
+        """
+        max_attempts = getattr(settings, 'PAYMENT_CAPTURE_MAX_ATTEMPTS', 3)
+        if capture.attempts > max_attempts:
+            return CaptureService._fail(capture, f'Gave up after {max_attempts} attempts')
+
+        if capture.provider_payment_id:
+            # Captured on an earlier attempt that died before the booking was made
+            return CaptureService.settle(capture.capture_id, payment_id=capture.provider_payment_id)
+
+        try:
+            payment_service = get_payment_service(capture.provider)
+            # Stable per capture so a reclaimed run gets PayPal's original capture back
+            result = payment_service.capture_payment(
+                order_id=capture.order_id,
+                idempotency_key=f'capture-{capture.capture_id}'
+            )
+        except Exception as exc:
+            logger.exception("Capture %s: provider call failed", capture.capture_id)
+            return CaptureService._fail(capture, str(exc))
+
+        if not result.get('success'):
+            logger.error(f"Payment capture failed: {result.get('error')}")
+            return CaptureService._fail(capture, result.get('error') or 'Payment capture failed')
+
+        logger.info(f"Payment captured successfully: {result.get('payment_id')}")
+        # Keep the provider's capture id even if the booking step below crashes
+        PaymentCapture.objects.filter(capture_id=capture.capture_id).update(
+            provider_payment_id=result['payment_id'],
+            amount=result.get('amount'),
+            currency=result.get('currency')
+        )
+        pending = str(result.get('status', 'COMPLETED')).upper() == 'PENDING'
+        return CaptureService.settle(
+            capture.capture_id,
+            payment_id=result['payment_id'],
+            amount=result.get('amount'),
+            currency=result.get('currency'),
+            pending=pending
+        )
+
+    @staticmethod
+    def settle(capture_id, payment_id, amount=None, currency=None, pending=False):
+        """
+        Record a provider capture and convert the reservation into a booking
+
+        Safe to call from the worker and webhook handler concurrently: the
+        capture row is locked and captures already settled are left alone.
+        If the booking cannot be created (e.g. the slots were lost), the
+        money is refunded and the capture ends as 'refunded'.
+
+        Args:
+            pending: The provider holds the funds for review; the booking
+                waits for the capture.completed webhook
+
+        Returns:
+            The updated PaymentCapture
+        """
+        refund = False
+        with transaction.atomic():
+            capture = PaymentCapture.objects.select_for_update().select_related('user').get(capture_id=capture_id)
+            if capture.status in FINAL_STATUSES or (capture.status == 'failed' and capture.provider_payment_id):
+                return capture
+
+            capture.provider_payment_id = payment_id
+            capture.amount = amount if amount is not None else capture.amount
+            capture.currency = currency or capture.currency
+            capture.error = None
+
+            if pending:
+                capture.status = 'awaiting_provider'
+            else:
+                try:
+                    with transaction.atomic():
+                        booking = ReservationService.convert_reservation_to_booking(
+                            reservation_id=capture.reservation_id,
+                            user=capture.user
+                        )
+                        payment = Payment.objects.create(
+                            booking=booking,
+                            provider=capture.provider,
+                            provider_payment_id=payment_id,
+                            idempotency_key=f'capture-{capture.capture_id}',
+                            amount=capture.amount,
+                            currency=capture.currency or 'AUD',
+                            status=PaymentStatus.objects.get(status_name='completed')
+                        )
+                        BookingService.confirm_booking_payment(booking)
+                except (BookingException, ValueError) as exc:
+                    logger.error(f"Reservation conversion failed: {str(exc)}")
+                    capture.status = 'failed'
+                    capture.error = str(exc)
+                    capture.completed_at = timezone.now()
+                    refund = True
+                else:
+                    logger.info(f"Payment captured and booking confirmed: payment={payment.payment_id}, booking={booking.booking_id}")
+                    capture.status = 'completed'
+                    capture.payment = payment
+                    capture.booking = booking
+                    capture.completed_at = timezone.now()
+            capture.save()
+
+        if refund:
+            CaptureService._refund(capture)
+        return capture
+
+    @staticmethod
+    def handle_webhook(provider, event):
+        """
+        Apply a verified provider webhook to the matching capture
+
+        Returns:
+            Short description of what was done (for logging and the response)
+        """
+        payment_service = get_payment_service(provider)
+        update = payment_service.parse_webhook(event)
+        if update is None:
+            return 'ignored'
+
+        capture = PaymentCapture.objects.filter(provider=provider, order_id=update['order_id']).only(
+            'capture_id', 'status'
+        ).first()
+        if capture is None:
+            logger.warning(f"Webhook for unknown {provider} order {update['order_id']}")
+            return 'unknown_order'
+        if capture.status in FINAL_STATUSES:
+            return 'already_settled'
+
+        if update['type'] == 'capture.denied':
+            PaymentCapture.objects.filter(
+                capture_id=capture.capture_id
+            ).exclude(status__in=FINAL_STATUSES).update(
+                status='failed',
+                provider_payment_id=update['payment_id'],
+                error='Payment was denied by the provider',
+                completed_at=timezone.now(),
+                updated_at=timezone.now()
+            )
+            return 'failed'
+
+        capture = CaptureService.settle(
+            capture.capture_id,
+            payment_id=update['payment_id'],
+            amount=update['amount'],
+            currency=update['currency'],
+            pending=update['type'] == 'capture.pending'
+        )
+        return capture.status
+
+    @staticmethod
+    def _fail(capture, error):
+        """Mark a capture failed unless something else settled it meanwhile"""
+        PaymentCapture.objects.filter(
+            capture_id=capture.capture_id,
+            status__in=['pending', 'processing']
+        ).update(status='failed', error=error[:2000], completed_at=timezone.now(), updated_at=timezone.now())
+        capture.refresh_from_db()
+        return capture
+
+    @staticmethod
+    def _refund(capture):
+        """Give back the money of a capture whose booking could not be made"""
+        try:
+            result = get_payment_service(capture.provider).refund_payment(
+                payment_id=capture.provider_payment_id,
+                reason='Booking could not be completed'
+            )
+        except Exception as exc:
+            result = {'success': False, 'error': str(exc)}
+
+        if result.get('success'):
+            capture.status = 'refunded'
+            capture.save(update_fields=['status', 'updated_at'])
+        else:
+            logger.error(f"Refund of capture {capture.capture_id} failed: {result.get('error')}")
+            capture.error = f"{capture.error}; refund failed: {result.get('error')}"
+            capture.save(update_fields=['error', 'updated_at'])
@@ -0,0 +1,340 @@
+"""
+Fake Payment Service
+In-process payment provider for load tests, benchmarks and offline development
+"""
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, Any, Optional
+import hashlib
+import hmac
+import logging
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .payment_service import PaymentService
+from .paypal_service import parse_capture_event
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('create_order', 'capture_payment', 'refund_payment', 'get_payment_details')
+
+SIGNATURE_HEADER = 'X-Fake-Signature'
+
+
+class FakeProviderStore:
+    """
+    Process-wide record of fake orders and captures
+
+    Holds at most PAYMENT_FAKE_MAX_RECORDS orders and captures each (oldest
+    dropped first) so long benchmark runs do not grow without bound.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.orders = OrderedDict()
+        self.captures = OrderedDict()
+        self.capture_results = OrderedDict()  # Results by idempotency key
+        self.refunds = OrderedDict()  # Results by idempotency key
+        self._rng = None
+        self._seed = None
+
+    def random(self):
+        """Shared RNG, reseeded whenever PAYMENT_FAKE_SEED changes"""
+        seed = getattr(settings, 'PAYMENT_FAKE_SEED', None)
+        with self._lock:
+            if self._rng is None or seed != self._seed:
+                self._rng = random.Random(seed)
+                self._seed = seed
+            return self._rng.random()
+
+    def add(self, table, key, record):
+        limit = getattr(settings, 'PAYMENT_FAKE_MAX_RECORDS', 100000)
+        with self._lock:
+            table[key] = record
+            while len(table) > limit:
+                table.popitem(last=False)
+
+    def update(self, table, key, check, change):
+        """
+        Apply change(record) if check(record) returns None, atomically
+
+        Returns:
+            Tuple of (record or None, error message or None)
+        """
+        with self._lock:
+            record = table.get(key)
+            if record is None:
+                return None, 'not_found'
+            error = check(record)
+            if error:
+                return record, error
+            change(record)
+            return dict(record), None
+
+    def get(self, table, key):
+        with self._lock:
+            record = table.get(key)
+            return dict(record) if record is not None else None
+
+    def reset(self):
+        with self._lock:
+            self.orders.clear()
+            self.captures.clear()
+            self.capture_results.clear()
+            self.refunds.clear()
+            self._rng = None
+
+
+store = FakeProviderStore()
+
+
+class FakePaymentService(PaymentService):
+    """
+    PaymentService that never leaves the process.
+
+    Behaves like PayPal's order/capture flow (orders are captured once,
+    refunds are bounded by the captured amount) with configurable latency
+    and failure injection:
+    - PAYMENT_FAKE_LATENCY_MS / PAYMENT_FAKE_LATENCY_JITTER_MS: sleep per call
+    - PAYMENT_FAKE_FAILURE_RATE: share of calls (0-1) that fail
+    - PAYMENT_FAKE_FAIL_OPERATIONS: operations failures apply to (all if empty)
+    - PAYMENT_FAKE_SEED: makes injected failures reproducible
+
+    Register it in PAYMENT_PROVIDERS (PAYMENT_FAKE_PROVIDER=True) for load
+    tests and offline development only.
+    """
+
+    PAYMENT_STATUSES = {
+        'COMPLETED': ('completed',),
+        'PARTIALLY_REFUNDED': ('refunded',),
+        'REFUNDED': ('refunded',),
+        'PENDING': ('pending', 'processing'),
+        'DECLINED': ('failed',),
+    }
+
+    def _simulate(self, operation: str) -> Optional[Dict[str, Any]]:
+        """Apply the configured latency; return an error result if this call should fail"""
+        latency = getattr(settings, 'PAYMENT_FAKE_LATENCY_MS', 0)
+        jitter = getattr(settings, 'PAYMENT_FAKE_LATENCY_JITTER_MS', 0)
+        if latency or jitter:
+            delay = latency + jitter * (2 * store.random() - 1) if jitter else latency
+            time.sleep(max(delay, 0) / 1000)
+
+        failure_rate = getattr(settings, 'PAYMENT_FAKE_FAILURE_RATE', 0)
+        operations = getattr(settings, 'PAYMENT_FAKE_FAIL_OPERATIONS', ()) or OPERATIONS
+        if failure_rate and operation in operations and store.random() < failure_rate:
+            logger.info(f"Fake provider: injected {operation} failure")
+            return {'success': False, 'error': f'Injected {operation} failure', 'status_code': 503}
+        return None
+
+    def create_order(
+        self,
+        amount: Decimal,
+        currency: str = 'AUD',
+        description: str = 'Court Booking',
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a fake order that is approved straight away.
+
+        Returns:
+            Dict with order_id and an approval_url pointing at the return URL
+        """
+        failure = self._simulate('create_order')
+        if failure:
+            return failure
+
+        metadata = metadata or {}
+        order_id = f'FAKE-ORDER-{uuid.uuid4().hex[:20].upper()}'
+        store.add(store.orders, order_id, {
+            'amount': Decimal(str(amount)),
+            'currency': currency,
+            'description': description,
+            'reservation_id': metadata.get('reservation_id'),
+            'status': 'APPROVED',
+        })
+        return_url = metadata.get('return_url') or settings.PAYPAL_RETURN_URL
+        return {
+            'success': True,
+            'order_id': order_id,
+            'approval_url': f'{return_url}?token={order_id}&PayerID=FAKEPAYER',
+            'status': 'APPROVED'
+        }
+
+    def capture_payment(
+        self,
+        order_id: str,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Capture a fake order (once).
+
+        A repeated idempotency_key returns the original capture.
+
+        Returns:
+            Dict with payment details
+        """
+        failure = self._simulate('capture_payment')
+        if failure:
+            return failure
+
+        if idempotency_key:
+            previous = store.get(store.capture_results, idempotency_key)
+            if previous is not None:
+                return previous
+
+        payment_id = f'FAKE-CAP-{uuid.uuid4().hex[:20].upper()}'
+
+        def check(order):
+            if order['status'] == 'COMPLETED':
+                return 'Order already captured'
+            return None
+
+        def change(order):
+            order['status'] = 'COMPLETED'
+            order['payment_id'] = payment_id
+
+        order, error = store.update(store.orders, order_id, check, change)
+        if error == 'not_found':
+            return {'success': False, 'error': 'The specified resource does not exist.', 'status_code': 404}
+        if error:
+            return {'success': False, 'error': error, 'status_code': 422}
+
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        store.add(store.captures, payment_id, {
+            'order_id': order_id,
+            'status': 'COMPLETED',
+            'amount': order['amount'],
+            'refunded': Decimal('0'),
+            'currency': order['currency'],
+            'create_time': now,
+            'update_time': now,
+        })
+        reservation_id = order.get('reservation_id')
+        result = {
+            'success': True,
+            'payment_id': payment_id,
+            'order_id': order_id,
+            'status': 'COMPLETED',
+            'amount': order['amount'],
+            'currency': order['currency'],
+            'reservation_id': int(reservation_id) if reservation_id else None,
+            'payer_email': 'buyer@fake-provider.test',
+            'create_time': now,
+            'update_time': now
+        }
+        if idempotency_key:
+            store.add(store.capture_results, idempotency_key, result)
+        return dict(result)
+
+    def refund_payment(
+        self,
+        payment_id: str,
+        amount: Optional[Decimal] = None,
+        reason: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Refund all or part of a fake capture.
+
+        A repeated idempotency_key returns the original refund.
+
+        Returns:
+            Dict with refund details
+        """
+        failure = self._simulate('refund_payment')
+        if failure:
+            return failure
+
+        if idempotency_key:
+            previous = store.get(store.refunds, idempotency_key)
+            if previous is not None:
+                return previous
+
+        refunded = {}
+
+        def check(capture):
+            remaining = capture['amount'] - capture['refunded']
+            refunded['amount'] = remaining if amount is None else Decimal(str(amount))
+            if remaining <= 0:
+                return 'Capture has already been fully refunded'
+            if refunded['amount'] > remaining:
+                return 'Refund amount exceeds the remaining captured amount'
+            return None
+
+        def change(capture):
+            capture['refunded'] += refunded['amount']
+            capture['status'] = 'REFUNDED' if capture['refunded'] >= capture['amount'] else 'PARTIALLY_REFUNDED'
+            capture['update_time'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
+        capture, error = store.update(store.captures, payment_id, check, change)
+        if error == 'not_found':
+            return {'success': False, 'error': 'The specified resource does not exist.', 'status_code': 404}
+        if error:
+            return {'success': False, 'error': error, 'status_code': 422}
+
+        result = {
+            'success': True,
+            'refund_id': f'FAKE-REFUND-{uuid.uuid4().hex[:20].upper()}',
+            'status': 'COMPLETED',
+            'amount': refunded['amount'],
+            'currency': capture['currency'],
+            'create_time': capture['update_time']
+        }
+        if idempotency_key:
+            store.add(store.refunds, idempotency_key, result)
+        return dict(result)
+
+    def get_payment_details(self, payment_id: str) -> Dict[str, Any]:
+        """
+        Get a fake capture.
+
+        Returns:
+            Dict with payment details
+        """
+        failure = self._simulate('get_payment_details')
+        if failure:
+            return failure
+
+        capture = store.get(store.captures, payment_id)
+        if capture is None:
+            return {'success': False, 'error': 'The specified resource does not exist.', 'status_code': 404}
+        return {
+            'success': True,
+            'payment_id': payment_id,
+            'status': capture['status'],
+            'amount': capture['amount'],
+            'currency': capture['currency'],
+            'create_time': capture['create_time'],
+            'update_time': capture['update_time']
+        }
+
+    @staticmethod
+    def sign_webhook(body: str) -> str:
+        """Signature for a webhook body (what a test or load driver sends)"""
+        secret = getattr(settings, 'PAYMENT_FAKE_WEBHOOK_SECRET', '')
+        return hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+    def verify_webhook(self, headers: Dict[str, str], body: str) -> bool:
+        """
+        Verify the HMAC-SHA256 of the body in the X-Fake-Signature header.
+
+        Returns:
+            True if webhook is valid
+        """
+        if not getattr(settings, 'PAYMENT_FAKE_WEBHOOK_SECRET', ''):
+            return False
+        return hmac.compare_digest(headers.get(SIGNATURE_HEADER, ''), self.sign_webhook(body))
+
+    def parse_webhook(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Translate PAYMENT.CAPTURE.* events (same shape as PayPal's).
+
+        Returns:
+            Capture update dict, or None for other event types
+        """
+        return parse_capture_event(event)
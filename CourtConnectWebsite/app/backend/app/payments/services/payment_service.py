@@ -3,7 +3,7 @@ Abstract Payment Service
 Base class for all payment provider implementations
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from decimal import Decimal
 
 
@@ -13,6 +13,10 @@ class PaymentService(ABC):
     All payment providers (PayPal, Stripe, etc.) should inherit from this class.
     """
 
+    # Provider payment statuses (as returned by get_payment_details) mapped to
+    # the PaymentStatus names a matching local Payment may have
+    PAYMENT_STATUSES: Dict[str, Tuple[str, ...]] = {}
+
     @abstractmethod
     def create_order(
         self,
@@ -58,7 +62,8 @@ class PaymentService(ABC):
         self,
         payment_id: str,
         amount: Optional[Decimal] = None,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Refund a captured payment.
@@ -67,6 +72,7 @@ class PaymentService(ABC):
             payment_id: Provider's payment ID
             amount: Refund amount (None for full refund)
             reason: Refund reason
+            idempotency_key: Repeating a refund with the same key must not refund twice
 
         Returns:
             Dict containing refund details
@@ -99,3 +105,17 @@ class PaymentService(ABC):
             True if webhook is valid
         """
         pass
+
+    def parse_webhook(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Translate a verified webhook event into a capture update.
+
+        Args:
+            event: Decoded webhook body
+
+        Returns:
+            Dict with 'type' ('capture.completed', 'capture.pending' or
+            'capture.denied'), 'order_id', 'payment_id', 'amount' and
+            'currency', or None if the event does not concern captures
+        """
+        return None
@@ -4,15 +4,142 @@ Handles PayPal payment operations using PayPal REST API v2
 """
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional
 from decimal import Decimal
+from urllib3.util.retry import Retry
 import logging
 import base64
+import json
+import threading
+import time
+import uuid
 
 from .payment_service import PaymentService
 
 logger = logging.getLogger(__name__)
 
+# Responses worth retrying; POSTs are only retried because every PayPal call
+# that creates something carries a PayPal-Request-Id idempotency key
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# PayPal webhook event types mapped to capture updates (see PaymentService.parse_webhook)
+WEBHOOK_CAPTURE_EVENTS = {
+    'PAYMENT.CAPTURE.COMPLETED': 'capture.completed',
+    'PAYMENT.CAPTURE.PENDING': 'capture.pending',
+    'PAYMENT.CAPTURE.DENIED': 'capture.denied',
+    'PAYMENT.CAPTURE.DECLINED': 'capture.denied',
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def parse_capture_event(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Translate a PayPal-shaped PAYMENT.CAPTURE.* event into a capture update.
+
+    Shared by every provider whose webhooks use PayPal's event format.
+
+    Args:
+        event: Decoded webhook body
+
+    Returns:
+        Capture update dict (see PaymentService.parse_webhook), or None for other event types
+    """
+    event_type = WEBHOOK_CAPTURE_EVENTS.get(event.get('event_type'))
+    if event_type is None:
+        return None
+
+    resource = event.get('resource') or {}
+    amount = resource.get('amount') or {}
+    return {
+        'type': event_type,
+        'order_id': (resource.get('supplementary_data') or {}).get('related_ids', {}).get('order_id'),
+        'payment_id': resource.get('id'),
+        'amount': Decimal(amount['value']) if amount.get('value') else None,
+        'currency': amount.get('currency_code'),
+    }
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide pooled HTTP session for the PayPal API
+
+    Connections are kept alive between requests and failed connects or
+    retryable responses are retried with exponential backoff. One session is
+    built per pool/retry configuration so settings overrides take effect.
+    """
+    pool_size = getattr(settings, 'PAYPAL_POOL_SIZE', 10)
+    max_retries = getattr(settings, 'PAYPAL_MAX_RETRIES', 3)
+    backoff = getattr(settings, 'PAYPAL_RETRY_BACKOFF', 0.5)
+    key = (pool_size, max_retries, backoff)
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({'GET', 'POST'}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[key] = session
+        return session
+
+
+class TokenCache:
+    """
+    Thread-safe cache of PayPal OAuth access tokens
+
+    Tokens are shared by every PayPalService in the process, keyed by API
+    host and client id, and reused until PAYPAL_TOKEN_REFRESH_MARGIN seconds
+    before the expires_in PayPal returned with them. Only one thread fetches
+    a missing or expired token; the others wait for it.
+    """
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Return a valid token for key, calling fetch() if there is none
+
+        Args:
+            key: Cache key, e.g. (base_url, client_id)
+            fetch: Callable returning (access_token, expires_in_seconds)
+        """
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+
+            token, expires_in = fetch()
+            margin = getattr(settings, 'PAYPAL_TOKEN_REFRESH_MARGIN', 60)
+            self._tokens[key] = (token, time.monotonic() + max(expires_in - margin, 0))
+            return token
+
+    def invalidate(self, key, token=None):
+        """Drop the cached token for key (only if it is still token, when given)"""
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached and (token is None or cached[0] == token):
+                del self._tokens[key]
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+token_cache = TokenCache()
+
 
 class PayPalService(PaymentService):
     """
@@ -20,22 +147,43 @@ class PayPalService(PaymentService):
     Uses PayPal REST API v2 for order creation and payment capture.
     """
 
+    # Capture statuses; the refund view marks partial refunds 'refunded' too
+    PAYMENT_STATUSES = {
+        'COMPLETED': ('completed',),
+        'PARTIALLY_REFUNDED': ('refunded',),
+        'REFUNDED': ('refunded',),
+        'PENDING': ('pending', 'processing'),
+        'DECLINED': ('failed',),
+        'FAILED': ('failed',),
+    }
+
     def __init__(self):
         """Initialize PayPal API with credentials from settings"""
         self.mode = getattr(settings, 'PAYPAL_MODE', 'sandbox')
         self.client_id = getattr(settings, 'PAYPAL_CLIENT_ID', '')
         self.client_secret = getattr(settings, 'PAYPAL_CLIENT_SECRET', '')
 
-        # Set base URL based on mode
-        if self.mode == 'live':
+        # Set base URL based on mode (PAYPAL_BASE_URL overrides it)
+        if getattr(settings, 'PAYPAL_BASE_URL', ''):
+            self.base_url = settings.PAYPAL_BASE_URL.rstrip('/')
+        elif self.mode == 'live':
             self.base_url = 'https://api-m.paypal.com'
         else:
             self.base_url = 'https://api-m.sandbox.paypal.com'
 
+        self.timeout = (
+            getattr(settings, 'PAYPAL_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'PAYPAL_READ_TIMEOUT', 20),
+        )
+        self.session = get_session()
         self._access_token = None
 
-    def _get_access_token(self) -> str:
-        """Get OAuth 2.0 access token from PayPal"""
+    @property
+    def _token_key(self):
+        return (self.base_url, self.client_id)
+
+    def _fetch_access_token(self):
+        """Request a new OAuth 2.0 access token; returns (token, expires_in)"""
         try:
             # Create basic auth header
             auth = base64.b64encode(
@@ -49,31 +197,68 @@ class PayPalService(PaymentService):
 
             data = {'grant_type': 'client_credentials'}
 
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/v1/oauth2/token',
                 headers=headers,
-                data=data
+                data=data,
+                timeout=self.timeout
             )
             response.raise_for_status()
 
             token_data = response.json()
-            self._access_token = token_data['access_token']
-            return self._access_token
+            return token_data['access_token'], int(token_data.get('expires_in', 0))
 
         except Exception as e:
             logger.exception(f"Failed to get PayPal access token: {str(e)}")
             raise
 
+    def _get_access_token(self) -> str:
+        """Get a cached OAuth 2.0 access token from PayPal"""
+        self._access_token = token_cache.get(self._token_key, self._fetch_access_token)
+        return self._access_token
+
     def _get_headers(self) -> Dict[str, str]:
         """Get headers for PayPal API requests"""
-        if not self._access_token:
-            self._get_access_token()
-
         return {
             'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self._access_token}'
+            'Authorization': f'Bearer {self._get_access_token()}'
         }
 
+    def _request(
+        self,
+        method: str,
+        path: str,
+        idempotent_post: bool = False,
+        request_id: Optional[str] = None,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Call the PayPal API through the pooled session
+
+        POSTs get a PayPal-Request-Id (request_id, or a random one) so PayPal
+        deduplicates retries. A 401
+        means the cached token was revoked or expired early; it is dropped
+        and the call is made once more with a fresh token.
+        """
+        extra_headers = {}
+        if idempotent_post:
+            extra_headers['PayPal-Request-Id'] = request_id or str(uuid.uuid4())
+
+        for attempt in range(2):
+            headers = {**self._get_headers(), **extra_headers}
+            response = self.session.request(
+                method,
+                f'{self.base_url}{path}',
+                headers=headers,
+                timeout=self.timeout,
+                **kwargs
+            )
+            if response.status_code != 401 or attempt:
+                return response
+            logger.warning("PayPal rejected the cached access token; fetching a new one")
+            token_cache.invalidate(self._token_key, self._access_token)
+        return response
+
     def create_order(
         self,
         amount: Decimal,
@@ -115,9 +300,10 @@ class PayPalService(PaymentService):
                 }
             }
 
-            response = requests.post(
-                f'{self.base_url}/v2/checkout/orders',
-                headers=self._get_headers(),
+            response = self._request(
+                'POST',
+                '/v2/checkout/orders',
+                idempotent_post=True,
                 json=order_data
             )
 
@@ -177,7 +363,8 @@ class PayPalService(PaymentService):
 
         Args:
             order_id: PayPal order ID
-            idempotency_key: Payer ID from PayPal redirect (not used in v2)
+            idempotency_key: Sent as PayPal-Request-Id; repeating it returns
+                the original capture instead of ORDER_ALREADY_CAPTURED
 
         Returns:
             Dict with payment details
@@ -186,12 +373,15 @@ class PayPalService(PaymentService):
             logger.info(f"Capturing PayPal order: {order_id}")
 
             # Capture the order
-            response = requests.post(
-                f'{self.base_url}/v2/checkout/orders/{order_id}/capture',
-                headers=self._get_headers()
+            response = self._request(
+                'POST',
+                f'/v2/checkout/orders/{order_id}/capture',
+                idempotent_post=True,
+                request_id=idempotency_key
             )
 
-            if response.status_code == 201:
+            # 200 is PayPal replaying an earlier capture with the same request id
+            if response.status_code in (200, 201):
                 capture_data = response.json()
                 logger.info(f"PayPal order captured: {order_id}")
                 logger.info(f"Full PayPal capture response: {capture_data}")
@@ -261,7 +451,8 @@ class PayPalService(PaymentService):
         self,
         payment_id: str,
         amount: Optional[Decimal] = None,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Refund a PayPal capture using Payments API v2.
@@ -270,6 +461,7 @@ class PayPalService(PaymentService):
             payment_id: PayPal capture ID
             amount: Partial refund amount (None for full refund)
             reason: Refund reason
+            idempotency_key: Sent as the PayPal-Request-Id so repeats return the original refund
 
         Returns:
             Dict with refund details
@@ -287,9 +479,11 @@ class PayPalService(PaymentService):
             if reason:
                 refund_request['note_to_payer'] = reason
 
-            response = requests.post(
-                f'{self.base_url}/v2/payments/captures/{payment_id}/refund',
-                headers=self._get_headers(),
+            response = self._request(
+                'POST',
+                f'/v2/payments/captures/{payment_id}/refund',
+                idempotent_post=True,
+                request_id=idempotency_key,
                 json=refund_request if refund_request else None
             )
 
@@ -345,9 +539,9 @@ class PayPalService(PaymentService):
             Dict with payment details
         """
         try:
-            response = requests.get(
-                f'{self.base_url}/v2/payments/captures/{payment_id}',
-                headers=self._get_headers()
+            response = self._request(
+                'GET',
+                f'/v2/payments/captures/{payment_id}'
             )
 
             if response.status_code == 200:
@@ -368,7 +562,8 @@ class PayPalService(PaymentService):
 
                 return {
                     'success': False,
-                    'error': error_data.get('message', 'Failed to get payment details')
+                    'error': error_data.get('message', 'Failed to get payment details'),
+                    'status_code': response.status_code
                 }
 
         except requests.exceptions.RequestException as e:
@@ -388,6 +583,10 @@ class PayPalService(PaymentService):
         """
         Verify PayPal webhook signature.
 
+        Uses PayPal's verify-webhook-signature API with PAYPAL_WEBHOOK_ID
+        (from the PayPal dashboard). Without a webhook id every event is
+        rejected.
+
         Args:
             headers: HTTP headers from webhook
             body: Raw request body
@@ -395,7 +594,43 @@ class PayPalService(PaymentService):
         Returns:
             True if webhook is valid
         """
-        # TODO: Implement PayPal webhook verification
-        # This requires webhook_id from PayPal dashboard
-        logger.warning("PayPal webhook verification not implemented")
-        return True
+        webhook_id = getattr(settings, 'PAYPAL_WEBHOOK_ID', '')
+        if not webhook_id:
+            logger.warning("PAYPAL_WEBHOOK_ID is not set; rejecting PayPal webhook")
+            return False
+
+        try:
+            verification = {
+                'auth_algo': headers.get('PAYPAL-AUTH-ALGO'),
+                'cert_url': headers.get('PAYPAL-CERT-URL'),
+                'transmission_id': headers.get('PAYPAL-TRANSMISSION-ID'),
+                'transmission_sig': headers.get('PAYPAL-TRANSMISSION-SIG'),
+                'transmission_time': headers.get('PAYPAL-TRANSMISSION-TIME'),
+                'webhook_id': webhook_id,
+                'webhook_event': json.loads(body),
+            }
+            response = self._request(
+                'POST',
+                '/v1/notifications/verify-webhook-signature',
+                json=verification
+            )
+            if response.status_code != 200:
+                logger.error(f"PayPal webhook verification failed: {response.status_code}")
+                return False
+            return response.json().get('verification_status') == 'SUCCESS'
+
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.exception(f"PayPal webhook verification error: {str(e)}")
+            return False
+
+    def parse_webhook(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Translate PAYMENT.CAPTURE.* webhook events into capture updates.
+
+        Args:
+            event: Decoded webhook body
+
+        Returns:
+            Capture update dict, or None for other event types
+        """
+        return parse_capture_event(event)
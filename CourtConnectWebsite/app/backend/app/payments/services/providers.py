@@ -0,0 +1,41 @@
+"""
+Payment Provider Registry
+Maps provider names to the PaymentService classes configured in PAYMENT_PROVIDERS
+"""
+from functools import lru_cache
+from typing import List
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .payment_service import PaymentService
+
+
+@lru_cache(maxsize=None)
+def _provider_class(dotted_path: str):
+    service_class = import_string(dotted_path)
+    if not issubclass(service_class, PaymentService):
+        raise TypeError(f"{dotted_path} is not a PaymentService")
+    return service_class
+
+
+def available_providers() -> List[str]:
+    """Names of the configured payment providers"""
+    return list(getattr(settings, 'PAYMENT_PROVIDERS', {}))
+
+
+def get_payment_service(provider: str) -> PaymentService:
+    """
+    Factory function to get payment service based on provider.
+
+    Providers are registered by name in settings.PAYMENT_PROVIDERS, e.g.
+    {'paypal': 'app.payments.services.paypal_service.PayPalService'}; add a
+    PaymentService subclass there to support a new provider.
+
+    Raises:
+        ValueError: If the provider is not configured
+    """
+    dotted_path = getattr(settings, 'PAYMENT_PROVIDERS', {}).get(provider)
+    if dotted_path is None:
+        raise ValueError(f"Unsupported payment provider: {provider}")
+    return _provider_class(dotted_path)()
@@ -0,0 +1,183 @@
+"""
+Payment Reconciliation
+Cross-checks local Payment and Booking state against the payment provider
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Payment, PaymentDiscrepancy, ReconciliationRun
+from .providers import get_payment_service
+
+logger = logging.getLogger(__name__)
+
+# Booking statuses that are consistent with a payment in a given local status
+# (statuses without an entry are not checked)
+BOOKING_STATUSES = {
+    'completed': ('confirmed', 'completed', 'no_show'),
+    'failed': ('pending_payment', 'cancelled'),
+}
+
+
+class ReconciliationService:
+    """
+    Compares recent payments with the provider's records
+
+    Payments are read in keyset-paginated batches; the provider lookups of a
+    batch run concurrently on a bounded thread pool (the provider services
+    share a pooled HTTP session, so keep the worker count within
+    PAYPAL_POOL_SIZE). The threads only make HTTP calls; every database
+    read and write happens on the calling thread. Mismatches are stored as
+    PaymentDiscrepancy rows of a ReconciliationRun.
+    """
+
+    @staticmethod
+    def reconcile(days=None, provider=None, batch_size=None, workers=None):
+        """
+        Check every payment created in the last ``days`` days
+
+        Args:
+            days: Look-back window (defaults to PAYMENT_RECONCILE_DAYS)
+            provider: Only check this provider's payments
+            batch_size: Payments per page (defaults to PAYMENT_RECONCILE_BATCH_SIZE)
+            workers: Concurrent provider lookups (defaults to PAYMENT_RECONCILE_WORKERS)
+
+        Returns:
+            The finished ReconciliationRun
+        """
+        days = days if days is not None else getattr(settings, 'PAYMENT_RECONCILE_DAYS', 2)
+        batch_size = batch_size or getattr(settings, 'PAYMENT_RECONCILE_BATCH_SIZE', 200)
+        workers = workers or getattr(settings, 'PAYMENT_RECONCILE_WORKERS', 8)
+
+        run = ReconciliationRun.objects.create(
+            provider=provider,
+            since=timezone.now() - timedelta(days=days)
+        )
+        services = {}
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment-reconcile') as executor:
+                for batch in ReconciliationService._batches(run, batch_size):
+                    for payment in batch:
+                        if payment.provider not in services:
+                            try:
+                                services[payment.provider] = get_payment_service(payment.provider)
+                            except ValueError:
+                                # Provider no longer configured; reported as a lookup error
+                                services[payment.provider] = None
+
+                    results = executor.map(ReconciliationService._lookup, [
+                        (services[payment.provider], payment.provider_payment_id) for payment in batch
+                    ])
+                    discrepancies = []
+                    for payment, result in zip(batch, results):
+                        found = ReconciliationService.compare(payment, result, services[payment.provider])
+                        if found and found[0].kind == 'lookup_error':
+                            run.lookup_errors += 1
+                        for discrepancy in found:
+                            discrepancy.run = run
+                        discrepancies.extend(found)
+
+                    PaymentDiscrepancy.objects.bulk_create(discrepancies)
+                    run.checked += len(batch)
+                    run.mismatches += len({d.payment_id for d in discrepancies if d.kind != 'lookup_error'})
+                    run.save(update_fields=['checked', 'mismatches', 'lookup_errors'])
+        except Exception as exc:
+            logger.exception("Reconciliation run %s failed", run.run_id)
+            run.status = 'failed'
+            run.error = str(exc)[:2000]
+        else:
+            run.status = 'completed'
+        run.completed_at = timezone.now()
+        run.save(update_fields=['status', 'error', 'completed_at'])
+        return run
+
+    @staticmethod
+    def _batches(run, batch_size):
+        """Yield lists of payments in the run's window, ordered by payment_id"""
+        queryset = Payment.objects.filter(created_at__gte=run.since).select_related(
+            'status', 'booking__status'
+        ).only(
+            'payment_id', 'provider', 'provider_payment_id', 'amount', 'currency',
+            'status__status_name', 'booking__booking_id', 'booking__status__status_name'
+        ).order_by('payment_id')
+        if run.provider:
+            queryset = queryset.filter(provider=run.provider)
+
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(payment_id__gt=last_id)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].payment_id
+
+    @staticmethod
+    def _lookup(args):
+        """Fetch one payment from its provider (runs on a pool thread)"""
+        payment_service, provider_payment_id = args
+        if payment_service is None:
+            return {'success': False, 'error': 'Payment provider is not configured'}
+        try:
+            return payment_service.get_payment_details(provider_payment_id)
+        except Exception as exc:
+            return {'success': False, 'error': str(exc)}
+
+    @staticmethod
+    def compare(payment, result, payment_service):
+        """
+        Diff one payment against its provider record
+
+        Returns:
+            List of unsaved PaymentDiscrepancy instances (empty when consistent)
+        """
+        local_status = payment.status.status_name
+        booking_status = payment.booking.status.status_name
+
+        def discrepancy(kind, detail, provider_status=None, provider_amount=None):
+            return PaymentDiscrepancy(
+                payment=payment,
+                kind=kind,
+                local_status=local_status,
+                booking_status=booking_status,
+                provider_status=provider_status,
+                local_amount=payment.amount,
+                provider_amount=provider_amount,
+                detail=detail
+            )
+
+        if not result.get('success'):
+            if result.get('status_code') == 404:
+                return [discrepancy('missing', result.get('error') or 'Not found')]
+            return [discrepancy('lookup_error', result.get('error') or 'Lookup failed')]
+
+        provider_status = str(result.get('status', '')).upper()
+        provider_amount = result.get('amount')
+        found = []
+
+        expected = payment_service.PAYMENT_STATUSES.get(provider_status)
+        if expected is None or local_status not in expected:
+            allowed = ', '.join(expected) if expected else 'unknown provider status'
+            found.append(discrepancy(
+                'status', f'Payment is {local_status}; provider status {provider_status} expects {allowed}',
+                provider_status, provider_amount
+            ))
+
+        if provider_amount is not None and (
+            Decimal(provider_amount) != payment.amount or result.get('currency', payment.currency) != payment.currency
+        ):
+            found.append(discrepancy(
+                'amount', f'Local {payment.amount} {payment.currency}, provider {provider_amount} {result.get("currency")}',
+                provider_status, provider_amount
+            ))
+
+        allowed_bookings = BOOKING_STATUSES.get(expected[0]) if expected else None
+        if allowed_bookings and booking_status not in allowed_bookings:
+            found.append(discrepancy(
+                'booking', f'Booking {payment.booking.booking_id} is {booking_status} but the provider payment is {provider_status}',
+                provider_status, provider_amount
+            ))
+        return found
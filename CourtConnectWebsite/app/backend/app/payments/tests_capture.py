@@ -0,0 +1,279 @@
+"""
+Tests for the asynchronous capture pipeline and webhook reconciliation,
+run end to end against the local stub PayPal server
+"""
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from app.bookings.models import Booking, BookingStatus, ReservationSlot, TemporaryReservation
+from app.facilities.models import Availability, Court, Facility, SportType
+from app.payments.models import Payment, PaymentCapture, PaymentStatus
+from app.payments.services import CaptureService, get_payment_service
+from app.payments.tests_paypal import start_stub_paypal
+from app.users.models import User
+from app.utils.query_budget import QueryBudgetTestMixin
+
+
+@override_settings(PAYMENT_CAPTURE_EXECUTOR='worker')
+class CaptureFlowTests(QueryBudgetTestMixin, APITestCase):
+    """Test queuing captures, the worker, the status endpoint and webhooks"""
+
+    def setUp(self):
+        super().setUp()
+        self.server = start_stub_paypal(self, PAYPAL_WEBHOOK_ID='WH-STUB')
+        self.client = APIClient()
+
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            name='Test User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        facility = Facility.objects.create(facility_name='Test Center', address='123 Test St')
+        self.court = Court.objects.create(
+            facility=facility,
+            name='Court 1',
+            sport_type=SportType.objects.create(sport_name='Tennis'),
+            hourly_rate=50.00
+        )
+        start_time = timezone.now() + timedelta(days=1)
+        self.availability = Availability.objects.create(
+            court=self.court,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            is_available=True
+        )
+        self.reservation = TemporaryReservation.objects.create(
+            user=self.user,
+            expires_at=timezone.now() + timedelta(minutes=15)
+        )
+        ReservationSlot.objects.create(reservation=self.reservation, availability=self.availability)
+        self.server.custom_id = str(self.reservation.reservation_id)
+
+        PaymentStatus.objects.get_or_create(status_name='completed')
+        BookingStatus.objects.get_or_create(status_name='pending_payment')
+        BookingStatus.objects.get_or_create(status_name='confirmed')
+
+    def _capture(self, order_id='ORDER-1'):
+        return self.client.post('/api/payments/capture/', {
+            'order_id': order_id,
+            'payer_id': 'PAYER-1',
+            'provider': 'paypal',
+            'reservation_id': self.reservation.reservation_id
+        }, format='json')
+
+    def _run_worker(self):
+        out = io.StringIO()
+        call_command('run_capture_worker', '--once', stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def _webhook(self, event_type, capture_id='CAP-ORDER-1', order_id='ORDER-1'):
+        event = {
+            'id': 'WH-EVENT-1',
+            'event_type': event_type,
+            'resource': {
+                'id': capture_id,
+                'status': 'COMPLETED',
+                'amount': {'value': '50.00', 'currency_code': 'AUD'},
+                'supplementary_data': {'related_ids': {'order_id': order_id}},
+            },
+        }
+        return APIClient().post(
+            '/api/payments/webhooks/paypal/',
+            data=json.dumps(event),
+            content_type='application/json',
+            HTTP_PAYPAL_TRANSMISSION_ID='T-1',
+            HTTP_PAYPAL_TRANSMISSION_SIG='sig'
+        )
+
+    def test_capture_is_queued_then_completed_by_worker(self):
+        """Test the endpoint returns pending at once and the worker books it"""
+        response = self._capture()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        capture_id = response.data['capture_id']
+        self.assertEqual(response.data['status_url'], f'/api/payments/capture/{capture_id}/')
+        self.assertFalse(any(call['path'].endswith('/capture') for call in self.server.calls))
+
+        response = self.client.get(f'/api/payments/capture/{capture_id}/')
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertIn('poll_after_ms', response.data)
+
+        self.assertIn('Processed 1 payment captures', self._run_worker())
+
+        response = self.client.get(f'/api/payments/capture/{capture_id}/')
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertNotIn('poll_after_ms', response.data)
+        booking = Booking.objects.get(booking_id=response.data['booking_id'])
+        self.assertEqual(booking.status.status_name, 'confirmed')
+        payment = Payment.objects.get(payment_id=response.data['payment_id'])
+        self.assertEqual(payment.provider_payment_id, 'CAP-ORDER-1')
+        self.assertFalse(TemporaryReservation.objects.filter(pk=self.reservation.pk).exists())
+
+    def test_repeated_capture_request_returns_same_job(self):
+        """Test a retried capture call for one order does not queue twice"""
+        first = self._capture()
+        second = self._capture()
+        self.assertEqual(second.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(first.data['capture_id'], second.data['capture_id'])
+        self.assertEqual(PaymentCapture.objects.count(), 1)
+
+    def test_expired_reservation_is_rejected_before_queueing(self):
+        """Test nothing is queued (or charged) for an expired reservation"""
+        TemporaryReservation.objects.filter(pk=self.reservation.pk).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        response = self._capture()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expired', response.data['error'])
+        self.assertFalse(PaymentCapture.objects.exists())
+
+    def test_queueing_extends_reservation_hold(self):
+        """Test the reservation outlives its normal expiry while queued"""
+        TemporaryReservation.objects.filter(pk=self.reservation.pk).update(
+            expires_at=timezone.now() + timedelta(seconds=10)
+        )
+        with self.settings(PAYMENT_CAPTURE_RESERVATION_GRACE_SECONDS=300):
+            self._capture()
+        self.reservation.refresh_from_db()
+        self.assertGreater(self.reservation.expires_at, timezone.now() + timedelta(seconds=250))
+
+    def test_thread_executor_starts_after_commit(self):
+        """Test thread mode hands new captures to the pool on commit only"""
+        with self.settings(PAYMENT_CAPTURE_EXECUTOR='thread'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self._capture()
+            with self.captureOnCommitCallbacks() as repeated:
+                self._capture()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(repeated), 0)
+
+    def test_status_is_private(self):
+        """Test users cannot poll someone else's capture"""
+        capture_id = self._capture().data['capture_id']
+        other = User.objects.create_user(email='other@example.com', name='Other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f'/api/payments/capture/{capture_id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pending_provider_capture_is_settled_by_webhook(self):
+        """Test a capture PayPal holds for review completes via webhook"""
+        self.server.capture_status = 'PENDING'
+        capture_id = self._capture().data['capture_id']
+        self._run_worker()
+        self.assertEqual(PaymentCapture.objects.get().status, 'awaiting_provider')
+        self.assertFalse(Booking.objects.exists())
+
+        response = self._webhook('PAYMENT.CAPTURE.COMPLETED')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['outcome'], 'completed')
+
+        response = self.client.get(f'/api/payments/capture/{capture_id}/')
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertIsNotNone(response.data['booking_id'])
+
+        # Redelivered webhooks change nothing
+        self.assertEqual(self._webhook('PAYMENT.CAPTURE.COMPLETED').data['outcome'], 'already_settled')
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_webhook_reconciles_failed_capture_call(self):
+        """Test a capture call that failed on our side is fixed by the webhook"""
+        self.server.script = [(500, {'message': 'Internal error'}, 0)] * 4
+        capture_id = self._capture().data['capture_id']
+        with self.settings(PAYPAL_MAX_RETRIES=0):
+            self._run_worker()
+        capture = PaymentCapture.objects.get(capture_id=capture_id)
+        self.assertEqual(capture.status, 'failed')
+        self.assertEqual(capture.error, 'Internal error')
+
+        self._webhook('PAYMENT.CAPTURE.COMPLETED')
+        capture.refresh_from_db()
+        self.assertEqual(capture.status, 'completed')
+        self.assertEqual(capture.provider_payment_id, 'CAP-ORDER-1')
+
+    def test_denied_webhook_fails_capture(self):
+        """Test a denied capture ends failed without a booking"""
+        self.server.capture_status = 'PENDING'
+        self._capture()
+        self._run_worker()
+        self.assertEqual(self._webhook('PAYMENT.CAPTURE.DENIED').data['outcome'], 'failed')
+        self.assertEqual(PaymentCapture.objects.get().status, 'failed')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_lost_reservation_is_refunded(self):
+        """Test money is returned when the booking cannot be made after capture"""
+        self._capture()
+        TemporaryReservation.objects.filter(pk=self.reservation.pk).delete()
+        self._run_worker()
+
+        capture = PaymentCapture.objects.get()
+        self.assertEqual(capture.status, 'refunded')
+        self.assertIn('Reservation not found', capture.error)
+        self.assertTrue(any(call['path'] == '/v2/payments/captures/CAP-ORDER-1/refund' for call in self.server.calls))
+
+    def test_webhook_signature_is_verified(self):
+        """Test unverified webhooks are rejected and do not touch captures"""
+        self.server.capture_status = 'PENDING'
+        self._capture()
+        self._run_worker()
+
+        self.server.verification_status = 'FAILURE'
+        self.assertEqual(self._webhook('PAYMENT.CAPTURE.COMPLETED').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.server.verification_status = 'SUCCESS'
+        with self.settings(PAYPAL_WEBHOOK_ID=''):
+            self.assertEqual(self._webhook('PAYMENT.CAPTURE.COMPLETED').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PaymentCapture.objects.get().status, 'awaiting_provider')
+
+        self.assertEqual(self._webhook('CHECKOUT.ORDER.APPROVED').data['outcome'], 'ignored')
+
+    def test_stale_processing_capture_is_reclaimed(self):
+        """Test a capture abandoned mid-run is picked up again"""
+        self._capture()
+        capture = CaptureService.claim_next()
+        self.assertIsNone(CaptureService.claim_next())
+
+        PaymentCapture.objects.filter(pk=capture.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        reclaimed = CaptureService.claim_next()
+        self.assertEqual(reclaimed.pk, capture.pk)
+        self.assertEqual(reclaimed.attempts, 2)
+
+    def test_reclaimed_capture_gets_original_capture_back(self):
+        """Test a run that died after PayPal captured reuses the request id instead of failing"""
+        self._capture()
+        capture = CaptureService.claim_next()
+        # The first run reached PayPal, then died before recording the result
+        self.assertTrue(get_payment_service('paypal').capture_payment(
+            order_id='ORDER-1', idempotency_key=f'capture-{capture.capture_id}'
+        )['success'])
+        PaymentCapture.objects.filter(pk=capture.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        self._run_worker()
+
+        capture.refresh_from_db()
+        self.assertEqual(capture.status, 'completed')
+        self.assertEqual(capture.provider_payment_id, 'CAP-ORDER-1')
+        calls = [call for call in self.server.api_calls() if call['path'].endswith('/capture')]
+        self.assertEqual([call['request_id'] for call in calls], [f'capture-{capture.capture_id}'] * 2)
+
+    def test_worker_survives_unexpected_errors(self):
+        """Test an exception while processing is logged and the worker keeps polling"""
+        self._capture()
+        out, err = io.StringIO(), io.StringIO()
+        with mock.patch.object(CaptureService, 'process', side_effect=PaymentStatus.DoesNotExist('no status')), \
+                self.assertLogs('app.payments.management.commands.run_capture_worker', level='ERROR'):
+            call_command('run_capture_worker', '--once', stdout=out, stderr=err)
+
+        self.assertIn('raised: no status', err.getvalue())
+        self.assertIn('Processed 1 payment captures', out.getvalue())
+        # Left for a later run to reclaim
+        self.assertEqual(PaymentCapture.objects.get().status, 'processing')
@@ -0,0 +1,259 @@
+"""
+Tests for the payment provider registry and the in-process fake provider
+"""
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from app.bookings.models import Booking, BookingStatus, ReservationSlot, TemporaryReservation
+from app.facilities.models import Availability, Court, Facility, SportType
+from app.payments.models import Payment, PaymentCapture, PaymentStatus
+from app.payments.services import FakePaymentService, PayPalService, available_providers, get_payment_service
+from app.payments.services.fake_service import SIGNATURE_HEADER, store
+from app.users.models import User
+
+PROVIDERS = {
+    'paypal': 'app.payments.services.paypal_service.PayPalService',
+    'fake': 'app.payments.services.fake_service.FakePaymentService',
+}
+
+
+@override_settings(PAYMENT_PROVIDERS=PROVIDERS)
+class ProviderRegistryTests(SimpleTestCase):
+    """Test providers are resolved from settings"""
+
+    def test_configured_providers_are_available(self):
+        self.assertEqual(available_providers(), ['paypal', 'fake'])
+        self.assertIsInstance(get_payment_service('fake'), FakePaymentService)
+        self.assertIsInstance(get_payment_service('paypal'), PayPalService)
+
+    def test_unknown_provider_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'Unsupported payment provider: stripe'):
+            get_payment_service('stripe')
+
+    def test_fake_provider_is_off_unless_configured(self):
+        with self.settings(PAYMENT_PROVIDERS={'paypal': PROVIDERS['paypal']}):
+            self.assertEqual(available_providers(), ['paypal'])
+            with self.assertRaises(ValueError):
+                get_payment_service('fake')
+
+
+@override_settings(
+    PAYMENT_FAKE_LATENCY_MS=0,
+    PAYMENT_FAKE_LATENCY_JITTER_MS=0,
+    PAYMENT_FAKE_FAILURE_RATE=0,
+    PAYMENT_FAKE_FAIL_OPERATIONS=(),
+    PAYMENT_FAKE_SEED=None
+)
+class FakeProviderTests(SimpleTestCase):
+    """Test the fake provider's order, capture and refund semantics"""
+
+    def setUp(self):
+        store.reset()
+        self.addCleanup(store.reset)
+        self.service = FakePaymentService()
+
+    def _captured(self, amount='50.00'):
+        order = self.service.create_order(Decimal(amount), metadata={'reservation_id': 7})
+        return self.service.capture_payment(order['order_id'])
+
+    def test_orders_are_captured_once(self):
+        order = self.service.create_order(Decimal('50.00'), metadata={'reservation_id': 7})
+        self.assertTrue(order['success'])
+        self.assertIn(f"token={order['order_id']}", order['approval_url'])
+
+        capture = self.service.capture_payment(order['order_id'])
+        self.assertTrue(capture['success'])
+        self.assertEqual(capture['amount'], Decimal('50.00'))
+        self.assertEqual(capture['reservation_id'], 7)
+
+        again = self.service.capture_payment(order['order_id'])
+        self.assertFalse(again['success'])
+        self.assertEqual(again['status_code'], 422)
+        self.assertEqual(self.service.capture_payment('FAKE-ORDER-NOPE')['status_code'], 404)
+
+    def test_repeated_capture_key_returns_original_capture(self):
+        order = self.service.create_order(Decimal('50.00'))
+        capture = self.service.capture_payment(order['order_id'], idempotency_key='capture-1')
+        again = self.service.capture_payment(order['order_id'], idempotency_key='capture-1')
+        self.assertTrue(again['success'])
+        self.assertEqual(again['payment_id'], capture['payment_id'])
+        self.assertFalse(self.service.capture_payment(order['order_id'], idempotency_key='capture-2')['success'])
+
+    def test_concurrent_captures_of_one_order_succeed_once(self):
+        order = self.service.create_order(Decimal('50.00'))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: self.service.capture_payment(order['order_id']), range(8)))
+        self.assertEqual(sum(result['success'] for result in results), 1)
+
+    def test_refunds_are_bounded_by_captured_amount(self):
+        capture = self._captured()
+        partial = self.service.refund_payment(capture['payment_id'], Decimal('20.00'))
+        self.assertEqual(partial['amount'], Decimal('20.00'))
+        self.assertEqual(self.service.get_payment_details(capture['payment_id'])['status'], 'PARTIALLY_REFUNDED')
+
+        self.assertFalse(self.service.refund_payment(capture['payment_id'], Decimal('40.00'))['success'])
+        rest = self.service.refund_payment(capture['payment_id'])
+        self.assertEqual(rest['amount'], Decimal('30.00'))
+        self.assertEqual(self.service.get_payment_details(capture['payment_id'])['status'], 'REFUNDED')
+        self.assertFalse(self.service.refund_payment(capture['payment_id'])['success'])
+
+    def test_failures_are_injected_per_operation(self):
+        with self.settings(PAYMENT_FAKE_FAILURE_RATE=1.0, PAYMENT_FAKE_FAIL_OPERATIONS=('capture_payment',)):
+            order = self.service.create_order(Decimal('50.00'))
+            self.assertTrue(order['success'])
+            result = self.service.capture_payment(order['order_id'])
+        self.assertFalse(result['success'])
+        self.assertEqual(result['status_code'], 503)
+        # The failed call left the order capturable
+        self.assertTrue(self.service.capture_payment(order['order_id'])['success'])
+
+    def test_seeded_failures_are_reproducible(self):
+        def outcomes():
+            store.reset()
+            return [self.service.create_order(Decimal('1.00'))['success'] for _ in range(40)]
+
+        with self.settings(PAYMENT_FAKE_FAILURE_RATE=0.5, PAYMENT_FAKE_SEED=42):
+            first = outcomes()
+            second = outcomes()
+        self.assertEqual(first, second)
+        self.assertIn(True, first)
+        self.assertIn(False, first)
+
+    def test_latency_is_simulated(self):
+        with self.settings(PAYMENT_FAKE_LATENCY_MS=30):
+            started = time.perf_counter()
+            self.service.create_order(Decimal('50.00'))
+        self.assertGreaterEqual(time.perf_counter() - started, 0.03)
+
+    def test_store_is_capped(self):
+        with self.settings(PAYMENT_FAKE_MAX_RECORDS=3):
+            orders = [self.service.create_order(Decimal('1.00'))['order_id'] for _ in range(5)]
+        self.assertEqual(list(store.orders), orders[2:])
+
+    def test_webhook_signature(self):
+        body = json.dumps({'event_type': 'PAYMENT.CAPTURE.COMPLETED'})
+        self.assertTrue(self.service.verify_webhook({SIGNATURE_HEADER: FakePaymentService.sign_webhook(body)}, body))
+        self.assertFalse(self.service.verify_webhook({SIGNATURE_HEADER: 'forged'}, body))
+        self.assertFalse(self.service.verify_webhook({}, body))
+
+
+@override_settings(
+    PAYMENT_PROVIDERS=PROVIDERS,
+    PAYMENT_CAPTURE_EXECUTOR='worker',
+    PAYMENT_FAKE_LATENCY_MS=0,
+    PAYMENT_FAKE_LATENCY_JITTER_MS=0,
+    PAYMENT_FAKE_FAILURE_RATE=0
+)
+class FakeCheckoutFlowTests(APITestCase):
+    """Test a whole checkout through the payment endpoints without PayPal"""
+
+    def setUp(self):
+        store.reset()
+        self.addCleanup(store.reset)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            name='Test User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+
+        facility = Facility.objects.create(facility_name='Test Center', address='123 Test St')
+        court = Court.objects.create(
+            facility=facility,
+            name='Court 1',
+            sport_type=SportType.objects.create(sport_name='Tennis'),
+            hourly_rate=50.00
+        )
+        start_time = timezone.now() + timedelta(days=1)
+        availability = Availability.objects.create(
+            court=court,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            is_available=True
+        )
+        self.reservation = TemporaryReservation.objects.create(
+            user=self.user,
+            expires_at=timezone.now() + timedelta(minutes=15)
+        )
+        ReservationSlot.objects.create(reservation=self.reservation, availability=availability)
+
+        PaymentStatus.objects.get_or_create(status_name='completed')
+        BookingStatus.objects.get_or_create(status_name='pending_payment')
+        BookingStatus.objects.get_or_create(status_name='confirmed')
+
+    def _order(self, provider='fake'):
+        return self.client.post('/api/payments/create/', {
+            'reservation_id': self.reservation.reservation_id,
+            'amount': '50.00',
+            'provider': provider
+        }, format='json')
+
+    def _capture(self, order_id):
+        return self.client.post('/api/payments/capture/', {
+            'order_id': order_id,
+            'payer_id': 'FAKEPAYER',
+            'provider': 'fake',
+            'reservation_id': self.reservation.reservation_id
+        }, format='json')
+
+    def test_checkout_completes_offline(self):
+        """Test create, capture and the worker confirm a booking with the fake provider"""
+        order = self._order()
+        self.assertEqual(order.status_code, status.HTTP_200_OK)
+        capture_id = self._capture(order.data['order_id']).data['capture_id']
+
+        call_command('run_capture_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+
+        response = self.client.get(f'/api/payments/capture/{capture_id}/')
+        self.assertEqual(response.data['status'], 'completed')
+        booking = Booking.objects.get(booking_id=response.data['booking_id'])
+        self.assertEqual(booking.status.status_name, 'confirmed')
+        payment = Payment.objects.get()
+        self.assertEqual(payment.provider, 'fake')
+        self.assertTrue(payment.provider_payment_id.startswith('FAKE-CAP-'))
+
+    def test_unconfigured_provider_is_rejected(self):
+        """Test the serializer only accepts registered providers"""
+        self.assertEqual(self._order('stripe').status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(PAYMENT_PROVIDERS={'paypal': PROVIDERS['paypal']}):
+            self.assertEqual(self._order().status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_signed_webhook_settles_capture(self):
+        """Test a signed fake webhook settles a capture that failed on our side"""
+        order_id = self._order().data['order_id']
+        self._capture(order_id)
+        with self.settings(PAYMENT_FAKE_FAILURE_RATE=1.0, PAYMENT_FAKE_FAIL_OPERATIONS=('capture_payment',)):
+            call_command('run_capture_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(PaymentCapture.objects.get().status, 'failed')
+
+        body = json.dumps({
+            'event_type': 'PAYMENT.CAPTURE.COMPLETED',
+            'resource': {
+                'id': 'FAKE-CAP-WEBHOOK',
+                'amount': {'value': '50.00', 'currency_code': 'AUD'},
+                'supplementary_data': {'related_ids': {'order_id': order_id}},
+            },
+        })
+        forged = APIClient().post(
+            '/api/payments/webhooks/fake/', data=body, content_type='application/json',
+            HTTP_X_FAKE_SIGNATURE='forged'
+        )
+        self.assertEqual(forged.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = APIClient().post(
+            '/api/payments/webhooks/fake/', data=body, content_type='application/json',
+            HTTP_X_FAKE_SIGNATURE=FakePaymentService.sign_webhook(body)
+        )
+        self.assertEqual(response.data['outcome'], 'completed')
+        self.assertEqual(PaymentCapture.objects.get().provider_payment_id, 'FAKE-CAP-WEBHOOK')
@@ -0,0 +1,287 @@
+"""
+Tests for the PayPal HTTP client against a local stub PayPal server
+"""
+import json
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from app.payments.services.paypal_service import PayPalService, token_cache
+
+
+class StubPayPalHandler(BaseHTTPRequestHandler):
+    """Answers the PayPal endpoints PayPalService uses from the server's script"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status_code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        server = self.server
+        with server.lock:
+            server.calls.append({
+                'method': self.command,
+                'path': self.path,
+                'client_port': self.client_address[1],
+                'authorization': self.headers.get('Authorization'),
+                'request_id': self.headers.get('PayPal-Request-Id'),
+            })
+
+        if self.path == '/v1/oauth2/token':
+            with server.lock:
+                server.token_count += 1
+                token = f'token-{server.token_count}'
+            time.sleep(server.token_delay)
+            self._reply(200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': server.expires_in})
+            return
+
+        with server.lock:
+            scripted = server.script.pop(0) if server.script else None
+        if scripted is not None:
+            status_code, body, delay = scripted
+            time.sleep(delay)
+            self._reply(status_code, body)
+            return
+
+        if server.valid_tokens is not None and self.headers.get('Authorization') not in server.valid_tokens:
+            self._reply(401, {'error': 'invalid_token'})
+            return
+
+        if self.path == '/v1/notifications/verify-webhook-signature':
+            self._reply(200, {'verification_status': server.verification_status})
+            return
+
+        if self.path.endswith('/capture'):
+            order_id = self.path.split('/')[-2]
+            request_id = self.headers.get('PayPal-Request-Id')
+            with server.lock:
+                replay = order_id in server.captured_orders
+                first_request_id = server.captured_orders.setdefault(order_id, request_id)
+            if first_request_id != request_id:
+                self._reply(422, {'name': 'UNPROCESSABLE_ENTITY', 'details': [{'issue': 'ORDER_ALREADY_CAPTURED'}]})
+                return
+            # PayPal replays a repeated request id with 200
+            self._reply(200 if replay else 201, {
+                'id': order_id,
+                'status': 'COMPLETED',
+                'purchase_units': [{
+                    'custom_id': server.custom_id,
+                    'payments': {'captures': [{
+                        'id': f'CAP-{order_id}',
+                        'status': server.capture_status,
+                        'amount': {'value': '50.00', 'currency_code': 'AUD'},
+                    }]},
+                }],
+            })
+            return
+
+        if self.path.endswith('/refund'):
+            self._reply(201, {
+                'id': f'REFUND-{self.path.split("/")[-2]}',
+                'status': 'COMPLETED',
+                'amount': {'value': '50.00', 'currency_code': 'AUD'},
+            })
+            return
+
+        capture_id = self.path.rstrip('/').split('/')[-1]
+        if capture_id in server.captures:
+            with server.lock:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            time.sleep(server.detail_delay)
+            with server.lock:
+                server.in_flight -= 1
+            status_code, body = server.captures[capture_id]
+            self._reply(status_code, body)
+            return
+
+        self._reply(200, {
+            'id': capture_id,
+            'status': 'COMPLETED',
+            'amount': {'value': '50.00', 'currency_code': 'AUD'},
+        })
+
+    do_GET = _handle
+    do_POST = _handle
+
+
+class StubPayPalServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the PayPal API
+
+    script holds (status, body, delay) responses served, in order, to API
+    calls before the default responses: order capture, refund, webhook
+    signature verification and capture details. Orders are captured once:
+    repeating the PayPal-Request-Id replays the capture, any other id gets
+    ORDER_ALREADY_CAPTURED. captures maps capture ids to (status, body)
+    details responses, served after detail_delay seconds.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubPayPalHandler)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.script = []
+        self.token_count = 0
+        self.token_delay = 0
+        self.expires_in = 32400
+        self.valid_tokens = None
+        self.capture_status = 'COMPLETED'
+        self.custom_id = ''
+        self.verification_status = 'SUCCESS'
+        self.captures = {}
+        self.captured_orders = {}
+        self.detail_delay = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up before the stub replies
+        pass
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def api_calls(self):
+        return [call for call in self.calls if call['path'] != '/v1/oauth2/token']
+
+
+def start_stub_paypal(test_case, **settings):
+    """Run a StubPayPalServer for one test and point PayPalService at it"""
+    server = StubPayPalServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    test_case.addCleanup(server.server_close)
+    test_case.addCleanup(server.shutdown)
+
+    settings_override = override_settings(
+        PAYPAL_BASE_URL=server.url,
+        PAYPAL_CLIENT_ID='stub-client',
+        PAYPAL_CLIENT_SECRET='stub-secret',
+        PAYPAL_RETRY_BACKOFF=0,
+        **settings
+    )
+    settings_override.enable()
+    test_case.addCleanup(settings_override.disable)
+    token_cache.clear()
+    test_case.addCleanup(token_cache.clear)
+    return server
+
+
+class PayPalClientTests(SimpleTestCase):
+    """Test connection pooling, token caching, retries and timeouts of PayPalService"""
+
+    def setUp(self):
+        self.server = start_stub_paypal(self)
+
+    def test_token_is_shared_across_instances_and_threads(self):
+        """Test one OAuth token serves every service instance and thread"""
+        self.server.token_delay = 0.05
+        results = []
+
+        def fetch():
+            results.append(PayPalService().get_payment_details('CAP-1')['success'])
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(self.server.token_count, 1)
+        self.assertEqual({call['authorization'] for call in self.server.api_calls()}, {'Bearer token-1'})
+
+    @override_settings(PAYPAL_TOKEN_REFRESH_MARGIN=60)
+    def test_token_is_refreshed_when_it_expires(self):
+        """Test a token within the refresh margin of expires_in is renewed"""
+        self.server.expires_in = 60
+        PayPalService().get_payment_details('CAP-1')
+        PayPalService().get_payment_details('CAP-2')
+        self.assertEqual(self.server.token_count, 2)
+
+        self.server.expires_in = 3600
+        PayPalService().get_payment_details('CAP-3')
+        PayPalService().get_payment_details('CAP-4')
+        self.assertEqual(self.server.token_count, 3)
+
+    def test_rejected_token_is_replaced_once(self):
+        """Test a 401 drops the cached token and retries with a new one"""
+        PayPalService().get_payment_details('CAP-1')
+        self.server.valid_tokens = {'Bearer token-2'}
+
+        result = PayPalService().get_payment_details('CAP-2')
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.server.token_count, 2)
+
+    def test_connections_are_kept_alive(self):
+        """Test sequential calls reuse one pooled connection"""
+        service = PayPalService()
+        for capture_id in ('CAP-1', 'CAP-2', 'CAP-3'):
+            self.assertTrue(service.get_payment_details(capture_id)['success'])
+
+        self.assertEqual(len({call['client_port'] for call in self.server.calls}), 1)
+
+    @override_settings(PAYPAL_MAX_RETRIES=2)
+    def test_retries_transient_errors_with_same_request_id(self):
+        """Test 503s are retried and a POST keeps its idempotency key"""
+        self.server.script = [
+            (503, {'name': 'SERVICE_UNAVAILABLE'}, 0),
+            (503, {'name': 'SERVICE_UNAVAILABLE'}, 0),
+            (201, {
+                'id': 'REFUND-1',
+                'status': 'COMPLETED',
+                'amount': {'value': '20.00', 'currency_code': 'AUD'},
+            }, 0),
+        ]
+
+        result = PayPalService().refund_payment('CAP-1', amount=Decimal('20.00'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['refund_id'], 'REFUND-1')
+        calls = self.server.api_calls()
+        self.assertEqual(len(calls), 3)
+        self.assertIsNotNone(calls[0]['request_id'])
+        self.assertEqual({call['request_id'] for call in calls}, {calls[0]['request_id']})
+
+    @override_settings(PAYPAL_MAX_RETRIES=1)
+    def test_gives_up_after_max_retries(self):
+        """Test the last error response is returned once retries run out"""
+        self.server.script = [(503, {'message': 'Try later'}, 0)] * 3
+
+        result = PayPalService().get_payment_details('CAP-1')
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'Try later')
+        self.assertEqual(len(self.server.api_calls()), 2)
+
+    @override_settings(PAYPAL_MAX_RETRIES=0, PAYPAL_READ_TIMEOUT=0.2)
+    def test_read_timeout_is_enforced(self):
+        """Test a PayPal response slower than the read timeout fails fast"""
+        PayPalService().get_payment_details('CAP-1')
+        self.server.script = [(200, {'id': 'CAP-2'}, 1)]
+
+        started = time.monotonic()
+        result = PayPalService().get_payment_details('CAP-2')
+
+        self.assertFalse(result['success'])
+        self.assertIn('PayPal API error', result['error'])
+        self.assertLess(time.monotonic() - started, 0.9)
@@ -0,0 +1,151 @@
+"""
+Tests for nightly payment reconciliation against the local stub PayPal server
+"""
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from app.bookings.models import Booking, BookingStatus
+from app.facilities.models import Availability, Court, Facility, SportType
+from app.payments.models import Payment, PaymentDiscrepancy, PaymentStatus, ReconciliationRun
+from app.payments.services.reconciliation_service import ReconciliationService
+from app.payments.tests_paypal import start_stub_paypal
+from app.users.models import User
+
+
+def capture_details(status='COMPLETED', value='50.00', currency='AUD'):
+    return 200, {'id': 'CAP', 'status': status, 'amount': {'value': value, 'currency_code': currency}}
+
+
+class ReconciliationTests(TestCase):
+    """Test provider lookups, diffing and the discrepancy report"""
+
+    def setUp(self):
+        self.server = start_stub_paypal(self, PAYPAL_MAX_RETRIES=0)
+
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            name='Test User',
+            password='testpass123'
+        )
+        facility = Facility.objects.create(facility_name='Test Center', address='123 Test St')
+        self.court = Court.objects.create(
+            facility=facility,
+            name='Court 1',
+            sport_type=SportType.objects.create(sport_name='Tennis'),
+            hourly_rate=50.00
+        )
+        self.start = timezone.now() + timedelta(days=1)
+
+    def _payment(self, capture_id, payment_status='completed', booking_status='confirmed', amount='50.00'):
+        start_time = self.start + timedelta(hours=Payment.objects.count())
+        availability = Availability.objects.create(
+            court=self.court,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            is_available=False
+        )
+        booking = Booking.objects.create(
+            court=self.court,
+            user=self.user,
+            availability=availability,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            hourly_rate_snapshot=50.00,
+            commission_rate_snapshot=0.10,
+            status=BookingStatus.objects.get_or_create(status_name=booking_status)[0]
+        )
+        return Payment.objects.create(
+            booking=booking,
+            provider='paypal',
+            provider_payment_id=capture_id,
+            idempotency_key=f'idem-{capture_id}',
+            amount=Decimal(amount),
+            status=PaymentStatus.objects.get_or_create(status_name=payment_status)[0]
+        )
+
+    def test_mismatches_are_recorded(self):
+        """Test each kind of disagreement ends up in the report table"""
+        consistent = self._payment('CAP-OK')
+        refunded = self._payment('CAP-REFUNDED')
+        short = self._payment('CAP-SHORT')
+        cancelled = self._payment('CAP-CANCELLED', booking_status='cancelled')
+        missing = self._payment('CAP-MISSING')
+        broken = self._payment('CAP-BROKEN')
+        self.server.captures = {
+            'CAP-OK': capture_details(),
+            'CAP-REFUNDED': capture_details('REFUNDED'),
+            'CAP-SHORT': capture_details(value='45.00'),
+            'CAP-CANCELLED': capture_details(),
+            'CAP-MISSING': (404, {'name': 'RESOURCE_NOT_FOUND', 'message': 'Not found'}),
+            'CAP-BROKEN': (500, {'message': 'Internal error'}),
+        }
+
+        run = ReconciliationService.reconcile(days=1)
+
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(run.checked, 6)
+        self.assertEqual(run.mismatches, 4)
+        self.assertEqual(run.lookup_errors, 1)
+        kinds = {(d.payment_id, d.kind) for d in PaymentDiscrepancy.objects.filter(run=run)}
+        self.assertEqual(kinds, {
+            (refunded.payment_id, 'status'),
+            (short.payment_id, 'amount'),
+            (cancelled.payment_id, 'booking'),
+            (missing.payment_id, 'missing'),
+            (broken.payment_id, 'lookup_error'),
+        })
+        self.assertFalse(PaymentDiscrepancy.objects.filter(payment=consistent).exists())
+
+        amount = PaymentDiscrepancy.objects.get(payment=short)
+        self.assertEqual(amount.provider_amount, Decimal('45.00'))
+        self.assertEqual(amount.local_amount, Decimal('50.00'))
+
+    def test_only_recent_payments_are_checked(self):
+        """Test payments older than the window are skipped"""
+        old = self._payment('CAP-OLD')
+        Payment.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=5))
+        self._payment('CAP-NEW')
+        self.server.captures = {'CAP-OLD': capture_details('REFUNDED'), 'CAP-NEW': capture_details()}
+
+        run = ReconciliationService.reconcile(days=2)
+
+        self.assertEqual(run.checked, 1)
+        self.assertEqual(run.mismatches, 0)
+        self.assertNotIn('/v2/payments/captures/CAP-OLD', [call['path'] for call in self.server.calls])
+
+    def test_lookups_are_concurrent_and_bounded(self):
+        """Test batches are looked up in parallel, never above the worker count"""
+        for index in range(6):
+            self._payment(f'CAP-{index}')
+        self.server.captures = {f'CAP-{index}': capture_details() for index in range(6)}
+        self.server.detail_delay = 0.2
+
+        run = ReconciliationService.reconcile(days=1, batch_size=4, workers=3)
+
+        self.assertEqual(run.checked, 6)
+        self.assertEqual(run.mismatches, 0)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        self.assertEqual(self.server.token_count, 1)
+
+    def test_command_prints_report(self):
+        """Test the command lists mismatches and can fail for alerting"""
+        refunded = self._payment('CAP-REFUNDED')
+        self.server.captures = {'CAP-REFUNDED': capture_details('REFUNDED')}
+
+        out = io.StringIO()
+        call_command('reconcile_payments', '--days', '1', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Kind', output)
+        self.assertIn(f"{refunded.payment_id:>8} status", output)
+        self.assertIn('checked 1 payments, 1 mismatched', output)
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_payments', '--days', '1', '--fail-on-mismatch', stdout=io.StringIO())
+        self.assertEqual(ReconciliationRun.objects.count(), 2)
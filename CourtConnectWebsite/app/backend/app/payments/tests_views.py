@@ -7,7 +7,9 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.utils import timezone
 from unittest.mock import patch, Mock
+from django.core.management import call_command
 from decimal import Decimal
+import io
 from datetime import timedelta
 
 from app.users.models import User
@@ -293,7 +295,16 @@ class CapturePaymentViewTests(APITestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-    @patch('app.payments.views.get_payment_service')
+    def _queue_and_run(self, data):
+        """Queue a capture, run the capture worker and return the final status"""
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+
+        call_command('run_capture_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        return self.client.get(response.data['status_url'])
+
+    @patch('app.payments.services.capture_service.get_payment_service')
     def test_capture_payment_service_failure(self, mock_get_service):
         """Test payment capture when service fails"""
         mock_service = Mock()
@@ -310,13 +321,13 @@ class CapturePaymentViewTests(APITestCase):
             'provider': 'paypal',
             'reservation_id': self.reservation.reservation_id
         }
-        response = self.client.post(self.url, data, format='json')
+        response = self._queue_and_run(data)
 
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['status'], 'failed')
         self.assertIn('Capture failed', response.data['error'])
 
-    @patch('app.payments.views.get_payment_service')
-    @patch('app.payments.views.ReservationService.convert_reservation_to_booking')
+    @patch('app.payments.services.capture_service.get_payment_service')
+    @patch('app.payments.services.capture_service.ReservationService.convert_reservation_to_booking')
     def test_capture_payment_success(self, mock_convert, mock_get_service):
         """Test successful payment capture"""
         # Create booking for conversion
@@ -351,14 +362,18 @@ class CapturePaymentViewTests(APITestCase):
             'reservation_id': self.reservation.reservation_id,
             'payer_id': 'PAYER123'
         }
-        response = self.client.post(self.url, data, format='json')
+        response = self._queue_and_run(data)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['status'], 'completed')
         self.assertEqual(response.data['booking_id'], booking.booking_id)
+        mock_service.capture_payment.assert_called_once_with(
+            order_id='ORDER123',
+            idempotency_key=f"capture-{response.data['capture_id']}"
+        )
 
-    @patch('app.payments.views.get_payment_service')
-    @patch('app.payments.views.ReservationService.convert_reservation_to_booking')
+    @patch('app.payments.services.capture_service.get_payment_service')
+    @patch('app.payments.services.capture_service.ReservationService.convert_reservation_to_booking')
     def test_capture_payment_reservation_conversion_error(self, mock_convert, mock_get_service):
         """Test payment capture when reservation conversion fails"""
         mock_service = Mock()
@@ -368,6 +383,7 @@ class CapturePaymentViewTests(APITestCase):
             'amount': Decimal('50.00'),
             'currency': 'AUD'
         }
+        mock_service.refund_payment.return_value = {'success': True}
         mock_get_service.return_value = mock_service
 
         mock_convert.side_effect = ValueError("Reservation expired")
@@ -379,10 +395,11 @@ class CapturePaymentViewTests(APITestCase):
             'provider': 'paypal',
             'reservation_id': self.reservation.reservation_id
         }
-        response = self.client.post(self.url, data, format='json')
+        response = self._queue_and_run(data)
 
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['status'], 'refunded')
         self.assertIn('Reservation expired', response.data['error'])
+        mock_service.refund_payment.assert_called_once()
 
     @patch('app.payments.views.get_payment_service')
     def test_capture_payment_exception(self, mock_get_service):
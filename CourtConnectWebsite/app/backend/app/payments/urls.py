@@ -6,6 +6,8 @@ app_name = 'payments'
 urlpatterns = [
     path('create/', views.create_payment_order, name='create'),
     path('capture/', views.capture_payment, name='capture'),
+    path('capture/<int:capture_id>/', views.capture_status, name='capture-status'),
+    path('webhooks/<str:provider>/', views.payment_webhook, name='webhook'),
     path('<int:payment_id>/', views.get_payment, name='detail'),
     path('<int:payment_id>/refund/', views.refund_payment, name='refund'),
-]
\ No newline at end of file
+]
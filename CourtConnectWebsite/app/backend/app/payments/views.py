@@ -3,42 +3,33 @@ Payment Views
 Handles payment creation, capture, and refunds
 """
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from decimal import Decimal
-import uuid
+from django.urls import reverse
+import json
 import logging
 
 from app.auth.permissions import IsAuthenticated
-from .models import Payment, PaymentStatus
+from app.utils.query_budget import query_budget
+from .models import Payment, PaymentCapture, PaymentStatus
 from .serializers import (
     CreatePaymentOrderSerializer,
     CapturePaymentSerializer,
     RefundPaymentSerializer,
-    PaymentSerializer
+    PaymentSerializer,
+    PaymentCaptureSerializer
 )
-from .services import PayPalService
-from app.bookings.models import Booking, TemporaryReservation
-from app.bookings.services import ReservationService
+from .services import CaptureService, get_payment_service
+from app.bookings.exceptions import BookingException
+from app.bookings.models import TemporaryReservation
 
 logger = logging.getLogger(__name__)
 
 
-def get_payment_service(provider: str):
-    """
-    Factory function to get payment service based on provider.
-    Makes it easy to add new payment providers (Stripe, etc.)
-    """
-    if provider == 'paypal':
-        return PayPalService()
-    # elif provider == 'stripe':
-    #     return StripeService()
-    else:
-        raise ValueError(f"Unsupported payment provider: {provider}")
-
-
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_payment_order(request):
@@ -150,23 +141,27 @@ def create_payment_order(request):
 @permission_classes([IsAuthenticated])
 def capture_payment(request):
     """
-    Capture/execute a payment after user approves.
+    Queue the capture of a payment after user approves.
     POST /api/payments/capture/
 
+    The provider capture and booking conversion run in the background;
+    poll the returned status_url until the status is final.
+
     Body:
         {
             "order_id": "PAYPAL-ORDER-ID",
             "payer_id": "PAYERID123",
-            "provider": "paypal"
+            "provider": "paypal",
+            "reservation_id": 123
         }
 
-    Returns:
+    Returns (202):
         {
             "success": true,
-            "payment_id": "PAY-123",
-            "booking_id": 123,
-            "amount": 50.00,
-            "status": "completed"
+            "capture_id": 7,
+            "status": "pending",
+            "status_url": "/api/payments/capture/7/",
+            "poll_after_ms": 1000
         }
     """
     serializer = CapturePaymentSerializer(data=request.data)
@@ -177,72 +172,22 @@ def capture_payment(request):
     provider = serializer.validated_data['provider']
     reservation_id = serializer.validated_data['reservation_id']
 
-    logger.info(f"Capturing payment for order {order_id}, reservation {reservation_id}")
+    logger.info(f"Queueing capture for order {order_id}, reservation {reservation_id}")
 
     try:
-        # Get payment service
-        payment_service = get_payment_service(provider)
+        # Fail fast on unknown providers before anything is queued
+        get_payment_service(provider)
 
-        # Capture payment
-        result = payment_service.capture_payment(
+        capture, created = CaptureService.enqueue(
+            user=request.user,
+            provider=provider,
             order_id=order_id,
-            idempotency_key=payer_id
+            reservation_id=reservation_id,
+            payer_id=payer_id
         )
-
-        if not result.get('success'):
-            logger.error(f"Payment capture failed: {result.get('error')}")
-            return Response({
-                'error': result.get('error', 'Payment capture failed')
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        logger.info(f"Payment captured successfully: {result.get('payment_id')}")
-
-        # Convert reservation to booking and store payment record
-        with transaction.atomic():
-            # Convert reservation to actual booking
-            booking = ReservationService.convert_reservation_to_booking(
-                reservation_id=reservation_id,
-                user=request.user
-            )
-
-            # Get completed payment status
-            completed_status = PaymentStatus.objects.get(status_name='completed')
-
-            # Generate idempotency key
-            idempotency_key = str(uuid.uuid4())
-
-            # Create payment record linked to booking
-            payment = Payment.objects.create(
-                booking=booking,
-                provider=provider,
-                provider_payment_id=result['payment_id'],
-                idempotency_key=idempotency_key,
-                amount=result['amount'],
-                currency=result['currency'],
-                status=completed_status
-            )
-
-            # Update booking status to confirmed
-            from app.bookings.models import BookingStatus
-            confirmed_status = BookingStatus.objects.get(status_name='confirmed')
-            booking.status = confirmed_status
-            booking.save()
-
-            logger.info(f"Payment captured and booking confirmed: payment={payment.payment_id}, booking={booking.booking_id}")
-
-            return Response({
-                'success': True,
-                'payment_id': payment.payment_id,
-                'provider_payment_id': result['payment_id'],
-                'booking_id': booking.booking_id,
-                'amount': str(result['amount']),
-                'currency': result['currency'],
-                'status': 'completed'
-            })
-
-    except ValueError as e:
-        # ReservationService raises ValueError for invalid/expired reservations
-        logger.error(f"Reservation conversion failed: {str(e)}")
+    except (BookingException, ValueError) as e:
+        # Invalid/expired reservations and orders owned by someone else
+        logger.error(f"Capture not queued: {str(e)}")
         return Response({
             'error': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -252,6 +197,69 @@ def capture_payment(request):
             'error': 'An error occurred while capturing payment'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    return Response({
+        'success': True,
+        'capture_id': capture.capture_id,
+        'status': capture.status,
+        'status_url': reverse('payments:capture-status', args=[capture.capture_id]),
+        'poll_after_ms': getattr(settings, 'PAYMENT_CAPTURE_POLL_MS', 1000)
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@query_budget(2)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def capture_status(request, capture_id):
+    """
+    Get the state of a queued capture.
+    GET /api/payments/capture/{capture_id}/
+
+    Returns:
+        {
+            "capture_id": 7,
+            "status": "completed",
+            "booking_id": 123,
+            "payment_id": 45,
+            ...
+        }
+    """
+    capture = get_object_or_404(PaymentCapture, capture_id=capture_id, user=request.user)
+    data = PaymentCaptureSerializer(capture).data
+    if capture.status in ('pending', 'processing', 'awaiting_provider'):
+        data['poll_after_ms'] = getattr(settings, 'PAYMENT_CAPTURE_POLL_MS', 1000)
+    return Response(data)
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def payment_webhook(request, provider):
+    """
+    Receive a payment provider webhook.
+    POST /api/payments/webhooks/{provider}/
+
+    The signature is checked with the provider before the event settles
+    the matching capture. Unrelated events are acknowledged and ignored.
+    """
+    try:
+        payment_service = get_payment_service(provider)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+    body = request.body.decode('utf-8')
+    if not payment_service.verify_webhook(request.headers, body):
+        logger.warning(f"Rejected {provider} webhook with invalid signature")
+        return Response({'error': 'Invalid webhook signature'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        return Response({'error': 'Invalid webhook body'}, status=status.HTTP_400_BAD_REQUEST)
+
+    outcome = CaptureService.handle_webhook(provider, event)
+    logger.info(f"{provider} webhook {event.get('event_type')}: {outcome}")
+    return Response({'received': True, 'outcome': outcome})
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
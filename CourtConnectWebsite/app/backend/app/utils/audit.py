@@ -3,28 +3,46 @@ Audit Logging Utility
 Provides centralized logging for user and manager actions across the platform
 """
 
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from app.admindashboard.models import ActivityLog
-import threading
+from .audit_buffer import audit_buffer
+import contextvars
 
-# Thread-local storage to check if we're in an API request context
-_thread_locals = threading.local()
+# Context-local storage to check if we're in an API request context.
+# A ContextVar is isolated per thread and per asyncio task, so it works under
+# both WSGI workers and ASGI/async views.
+_current_request = contextvars.ContextVar('audit_current_request', default=None)
 
 
 def set_current_request(request):
-    """Store the current request in thread-local storage"""
-    _thread_locals.request = request
+    """
+    Store the current request in the audit context
+
+    Returns:
+        Token that can be passed to clear_current_request to restore the previous value
+    """
+    return _current_request.set(request)
 
 
 def get_current_request():
-    """Get the current request from thread-local storage"""
-    return getattr(_thread_locals, 'request', None)
+    """Get the current request from the audit context"""
+    return _current_request.get()
+
 
+def clear_current_request(token=None):
+    """
+    Clear the current request from the audit context
 
-def clear_current_request():
-    """Clear the current request from thread-local storage"""
-    if hasattr(_thread_locals, 'request'):
-        del _thread_locals.request
+    Args:
+        token: Token returned by set_current_request; when given, the previous
+               value is restored instead of clearing unconditionally
+    """
+    if token is not None:
+        _current_request.reset(token)
+    else:
+        _current_request.set(None)
 
 
 def is_api_request():
@@ -82,11 +100,26 @@ class ActivityLogger:
             resource_type: Type of resource (e.g., 'booking', 'facility', 'court')
             resource_id: ID of the affected resource
             metadata: Dict with additional context (serializable to JSON)
+
+        When AUDIT_LOG_BUFFERED is enabled the entry is returned unsaved and
+        handed to the buffered sink once the surrounding transaction commits,
+        so actions that are rolled back leave no audit entry.
         """
         # Only log if we're in an API request context (exclude Django admin, shell, etc.)
         if not is_api_request():
             return None
 
+        if getattr(settings, 'AUDIT_LOG_BUFFERED', False):
+            log_entry = ActivityLog(
+                user=user,
+                action=action,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                metadata=metadata or {},
+            )
+            transaction.on_commit(lambda: audit_buffer.enqueue(log_entry))
+            return log_entry
+
         try:
             log_entry = ActivityLog.objects.create(
                 user=user,
@@ -0,0 +1,147 @@
+"""
+Buffered Audit Log Sink
+Collects ActivityLog entries in a per-process queue and writes them in batches
+"""
+
+import atexit
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+from app.admindashboard.models import ActivityLog
+
+
+class AuditLogBuffer:
+    """
+    Per-process buffer that batches ActivityLog inserts with bulk_create
+
+    Entries are flushed when the queue reaches AUDIT_LOG_BATCH_SIZE, or every
+    AUDIT_LOG_FLUSH_INTERVAL seconds by a background thread (0 disables the
+    timer). When the queue holds AUDIT_LOG_MAX_QUEUE entries, AUDIT_LOG_OVERFLOW
+    decides what happens to new ones:
+    - 'flush': the caller writes the queue synchronously (no entries are lost)
+    - 'drop': the new entry is discarded and counted in ``dropped``
+
+    Remaining entries are written at interpreter exit when
+    AUDIT_LOG_FLUSH_ON_SHUTDOWN is enabled.
+
+    Note: created_at is set by auto_now_add when the batch is written, so it can
+    trail the action by up to one flush interval.
+    """
+
+    def __init__(self):
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._stop = threading.Event()
+        self._shutdown_registered = False
+        self.dropped = 0
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 100)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0)
+
+    @property
+    def max_queue(self):
+        return getattr(settings, 'AUDIT_LOG_MAX_QUEUE', 10000)
+
+    @property
+    def overflow(self):
+        return getattr(settings, 'AUDIT_LOG_OVERFLOW', 'flush')
+
+    def __len__(self):
+        return len(self._queue)
+
+    def enqueue(self, entry):
+        """
+        Add an unsaved ActivityLog instance to the queue
+
+        Args:
+            entry: ActivityLog instance (not yet saved)
+
+        Returns:
+            True if the entry was queued, False if it was dropped
+        """
+        self._ensure_started()
+
+        if len(self._queue) >= self.max_queue:
+            if self.overflow == 'drop':
+                with self._lock:
+                    self.dropped += 1
+                return False
+            self.flush()
+
+        with self._lock:
+            self._queue.append(entry)
+            should_flush = len(self._queue) >= self.batch_size
+
+        if should_flush:
+            self.flush()
+        return True
+
+    def flush(self):
+        """
+        Write all queued entries with a single bulk_create per batch
+
+        Returns:
+            Number of entries written
+        """
+        with self._flush_lock:
+            with self._lock:
+                entries = list(self._queue)
+                self._queue.clear()
+
+            if not entries:
+                return 0
+
+            try:
+                ActivityLog.objects.bulk_create(entries, batch_size=self.batch_size)
+                return len(entries)
+            except Exception as e:
+                # Log the error but don't fail the caller
+                print(f"[AuditLogBuffer] Failed to write {len(entries)} audit entries: {e}")
+                return 0
+
+    def shutdown(self):
+        """Stop the background flusher and write any remaining entries"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval + 1)
+            self._worker = None
+        if getattr(settings, 'AUDIT_LOG_FLUSH_ON_SHUTDOWN', True):
+            self.flush()
+
+    def _ensure_started(self):
+        """Start the timer thread and register the exit hook on first use"""
+        if not self._shutdown_registered:
+            with self._lock:
+                if not self._shutdown_registered:
+                    atexit.register(self.shutdown)
+                    self._shutdown_registered = True
+
+        if self.flush_interval and (self._worker is None or not self._worker.is_alive()):
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._stop.clear()
+                    self._worker = threading.Thread(
+                        target=self._run, name='audit-log-flusher', daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        """Background loop that flushes the queue on a fixed interval"""
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        finally:
+            # The worker owns its own DB connection; release it on exit
+            connection.close()
+
+
+audit_buffer = AuditLogBuffer()
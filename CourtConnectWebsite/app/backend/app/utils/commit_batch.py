@@ -0,0 +1,40 @@
+"""
+Commit Batches
+Collect ids touched by a transaction and act on them once it commits
+"""
+
+import threading
+
+from django.db import transaction
+
+
+class CommitBatch:
+    """
+    Per-thread set of ids handed to flush(ids) after the transaction commits
+
+    Every add() registers an on_commit callback, but only the first one to
+    run finds the ids and calls flush, so a transaction that saves many rows
+    costs one flush. Outside a transaction the callback runs straight away.
+    Ids added by a transaction that rolls back stay queued and are flushed
+    with the next commit, which is harmless for invalidation.
+    """
+
+    def __init__(self, flush):
+        self._flush = flush
+        self._local = threading.local()
+
+    def add(self, item):
+        if item is None:
+            return
+        pending = getattr(self._local, 'items', None)
+        if pending is None:
+            pending = self._local.items = set()
+        pending.add(item)
+        transaction.on_commit(self._run)
+
+    def _run(self):
+        items = getattr(self._local, 'items', None)
+        if not items:
+            return
+        self._local.items = set()
+        self._flush(items)
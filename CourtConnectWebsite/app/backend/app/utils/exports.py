@@ -0,0 +1,197 @@
+"""
+CSV Export Utilities
+Streams large CSV downloads row by row instead of building them in memory,
+and writes the same rows to compressed files for background export jobs
+"""
+
+import csv
+import io
+import os
+import zlib
+
+from django.http import StreamingHttpResponse
+
+
+# Rows are written to a small buffer and flushed in blocks of roughly this size
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Default number of rows fetched per round trip by queryset.iterator()
+EXPORT_CHUNK_SIZE = 2000
+
+
+def wants_gzip(request):
+    """
+    Check whether the client asked for a gzip-compressed export
+
+    Accepts ?compress=gzip (or ?gzip=1/true) on the query string.
+    """
+    params = request.query_params if hasattr(request, 'query_params') else request.GET
+    if params.get('compress', '').lower() in ('gzip', 'gz'):
+        return True
+    return params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+
+def _csv_blocks(header, rows):
+    """Yield encoded CSV text in blocks of about STREAM_BLOCK_SIZE bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BLOCK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip_blocks(blocks):
+    """Compress a stream of byte blocks into a single gzip member"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_csv_response(filename, header, rows, gzip=False):
+    """
+    Build a StreamingHttpResponse that writes CSV rows as they are produced
+
+    Memory use stays flat regardless of row count as long as ``rows`` is lazy,
+    e.g. a generator over ``queryset.values_list(...).iterator(chunk_size=...)``.
+
+    Usage:
+        from app.utils.exports import stream_csv_response, wants_gzip, EXPORT_CHUNK_SIZE
+
+        rows = (
+            [booking_id, created_at.isoformat()]
+            for booking_id, created_at in Booking.objects.order_by('pk')
+            .values_list('booking_id', 'created_at').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return stream_csv_response('bookings.csv', ['Booking ID', 'Created At'], rows,
+                                   gzip=wants_gzip(request))
+
+    Args:
+        filename: Download file name for the Content-Disposition header
+        header: List of column titles
+        rows: Iterable of row lists (consumed lazily while the response streams)
+        gzip: Compress the stream and serve it as <filename>.gz
+    """
+    blocks = _csv_blocks(header, rows)
+
+    if gzip:
+        response = StreamingHttpResponse(_gzip_blocks(blocks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(blocks, content_type='text/csv')
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def parquet_available():
+    """Return True when pyarrow is installed and Parquet files can be written"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _write_atomic(path, write):
+    """Write to a temporary sibling file and move it into place when complete"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    try:
+        result = write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return result
+
+
+class _CountingIterator:
+    """Wrap an iterable and count the items consumed"""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+
+def write_csv_gz_file(path, header, rows):
+    """
+    Write rows to a gzip-compressed CSV file
+
+    Args:
+        path: Destination file path (parent directories are created)
+        header: List of column titles
+        rows: Iterable of row lists
+
+    Returns:
+        Number of data rows written
+    """
+    counted = _CountingIterator(rows)
+
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as handle:
+            for block in _gzip_blocks(_csv_blocks(header, counted)):
+                handle.write(block)
+
+    _write_atomic(path, write)
+    return counted.count
+
+
+def write_parquet_file(path, header, rows, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Write rows to a Parquet file in row groups of batch_size (requires pyarrow)
+
+    Values are stored as strings so every export shares one writer.
+
+    Returns:
+        Number of data rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.string()) for name in header])
+    count = 0
+
+    def to_batch(batch_rows):
+        columns = list(zip(*batch_rows))
+        return pa.record_batch(
+            [pa.array([None if v is None else str(v) for v in column], pa.string()) for column in columns],
+            schema=schema,
+        )
+
+    def write(tmp_path):
+        nonlocal count
+        with pq.ParquetWriter(tmp_path, schema, compression='snappy') as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_batch(to_batch(batch))
+                    count += len(batch)
+                    batch = []
+            if batch:
+                writer.write_batch(to_batch(batch))
+                count += len(batch)
+
+    _write_atomic(path, write)
+    return count
+
@@ -0,0 +1,250 @@
+"""
+Request Metrics Aggregator
+Accumulates per-endpoint latency histograms, status codes and DB usage in
+process memory and periodically writes them to the request_metrics table
+"""
+
+import atexit
+import logging
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from app.admindashboard.models import RequestMetric
+
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds (inclusive) of the latency histogram buckets in milliseconds;
+# histograms carry one extra count for requests slower than the last bound
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2500, 5000, 10000)
+
+
+def empty_histogram():
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def align_to_bucket(moment, bucket_seconds):
+    """Start (UTC) of the bucket_seconds wide bucket containing moment"""
+    seconds = int(moment.timestamp())
+    return datetime.fromtimestamp(seconds - seconds % bucket_seconds, tz=dt_timezone.utc)
+
+
+def merge_histograms(histograms):
+    """Sum histograms bucket by bucket"""
+    total = empty_histogram()
+    for histogram in histograms:
+        for index, count in enumerate(histogram[:len(total)]):
+            total[index] += count
+    return total
+
+
+def histogram_percentile(histogram, quantile, max_ms=None):
+    """
+    Estimate a latency percentile from a bucketed histogram
+
+    Interpolates linearly inside the bucket containing the requested rank,
+    so the result is accurate to the bucket width.
+
+    Args:
+        histogram: Counts per LATENCY_BUCKETS_MS bound plus the overflow count
+        quantile: Fraction between 0 and 1 (0.95 for p95)
+        max_ms: Largest observed latency, used as the overflow bucket's upper bound
+
+    Returns:
+        Latency in milliseconds, or None for an empty histogram
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            if index < len(LATENCY_BUCKETS_MS):
+                upper = LATENCY_BUCKETS_MS[index]
+            else:
+                upper = max(max_ms or lower, lower)
+            return round(lower + (upper - lower) * (rank - seen) / count, 2)
+        seen += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+class _EndpointStats:
+    """Running totals for one (bucket, endpoint, method) key"""
+
+    __slots__ = ('requests', 'client_errors', 'server_errors', 'statuses', 'latency_sum',
+                 'latency_max', 'histogram', 'queries', 'db_time')
+
+    def __init__(self):
+        self.requests = 0
+        self.client_errors = 0
+        self.server_errors = 0
+        self.statuses = {}
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.histogram = empty_histogram()
+        self.queries = 0
+        self.db_time = 0.0
+
+
+class MetricsAggregator:
+    """
+    Per-process request metrics, flushed to RequestMetric rows
+
+    Requests are grouped into METRICS_BUCKET_SECONDS buckets. A background
+    thread writes the accumulated buckets every METRICS_FLUSH_INTERVAL
+    seconds (0 disables the timer; call flush() directly instead), and the
+    remainder is written at interpreter exit while METRICS_ENABLED is on.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._stop = threading.Event()
+        self._shutdown_registered = False
+
+    @property
+    def bucket_seconds(self):
+        return getattr(settings, 'METRICS_BUCKET_SECONDS', 60)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'METRICS_FLUSH_INTERVAL', 60.0)
+
+    def _bucket_start(self, now):
+        return align_to_bucket(now, self.bucket_seconds)
+
+    def record(self, endpoint, method, status_code, duration_ms, query_count=0, db_time_ms=0.0):
+        """
+        Add one finished request to the current bucket
+
+        Args:
+            endpoint: Route pattern the request resolved to
+            method: HTTP method
+            status_code: Response status code
+            duration_ms: Wall-clock time spent in the view stack
+            query_count: Number of SQL statements executed
+            db_time_ms: Time spent executing them
+        """
+        self._ensure_started()
+        key = (self._bucket_start(timezone.now()), endpoint, method)
+        bucket_index = bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+
+        with self._lock:
+            stats = self._buckets.get(key)
+            if stats is None:
+                stats = self._buckets[key] = _EndpointStats()
+            stats.requests += 1
+            if 400 <= status_code < 500:
+                stats.client_errors += 1
+            elif status_code >= 500:
+                stats.server_errors += 1
+            stats.statuses[str(status_code)] = stats.statuses.get(str(status_code), 0) + 1
+            stats.latency_sum += duration_ms
+            stats.latency_max = max(stats.latency_max, duration_ms)
+            stats.histogram[bucket_index] += 1
+            stats.queries += query_count
+            stats.db_time += db_time_ms
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def flush(self):
+        """
+        Write every accumulated bucket as RequestMetric rows
+
+        Returns:
+            Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                buckets = self._buckets
+                self._buckets = {}
+            bucket_seconds = self.bucket_seconds
+
+            if not buckets:
+                return 0
+
+            rows = [
+                RequestMetric(
+                    bucket_start=bucket_start,
+                    bucket_seconds=bucket_seconds,
+                    endpoint=endpoint[:255],
+                    method=method,
+                    request_count=stats.requests,
+                    client_error_count=stats.client_errors,
+                    server_error_count=stats.server_errors,
+                    status_counts=stats.statuses,
+                    latency_sum_ms=round(stats.latency_sum, 3),
+                    latency_max_ms=round(stats.latency_max, 3),
+                    latency_histogram=stats.histogram,
+                    db_query_count=stats.queries,
+                    db_time_ms=round(stats.db_time, 3),
+                )
+                for (bucket_start, endpoint, method), stats in buckets.items()
+            ]
+            try:
+                RequestMetric.objects.bulk_create(rows)
+                return len(rows)
+            except Exception as e:
+                # Metrics must never break the caller; the batch is dropped
+                logger.warning("Failed to write %d request metric rows: %s", len(rows), e)
+                return 0
+
+    def discard(self):
+        """Drop every buffered bucket without writing it"""
+        with self._lock:
+            self._buckets = {}
+
+    def shutdown(self):
+        """Stop the background flusher and write what is left"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval + 1)
+            self._worker = None
+        if getattr(settings, 'METRICS_ENABLED', True):
+            self.flush()
+        else:
+            # Collection was switched off (e.g. a test run that enabled it
+            # per test); the database the settings name is not the one the
+            # buffered requests were served from
+            self.discard()
+
+    def _ensure_started(self):
+        """Start the timer thread and register the exit hook on first use"""
+        if not self._shutdown_registered:
+            with self._lock:
+                if not self._shutdown_registered:
+                    atexit.register(self.shutdown)
+                    self._shutdown_registered = True
+
+        if self.flush_interval and (self._worker is None or not self._worker.is_alive()):
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._stop.clear()
+                    self._worker = threading.Thread(
+                        target=self._run, name='request-metrics-flusher', daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self):
+        """Background loop that flushes on a fixed interval"""
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        finally:
+            # The worker owns its own DB connection; release it on exit
+            connection.close()
+
+
+metrics_aggregator = MetricsAggregator()
@@ -2,26 +2,279 @@
 Custom middleware for the application
 """
 
+import cProfile
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from app.admindashboard.services import ProfileCaptureService
 from app.utils.audit import set_current_request, clear_current_request
+from app.utils.metrics import metrics_aggregator
+from app.utils.profiling import SQLCapture, cprofile_summary, stack_sampler, stack_summary
+from app.utils.query_budget import QueryRecorder, budget_for_view, check_request, query_stats
+
+
+logger = logging.getLogger(__name__)
 
 
 class AuditLogMiddleware:
     """
-    Middleware that stores the current request in thread-local storage
+    Middleware that stores the current request in the audit context
     This allows the ActivityLogger to determine if an action is from an API request
+
+    Supports both sync and async request handling; the request is held in a
+    ContextVar so concurrent requests on one event loop don't see each other.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         # Store the request before processing
-        set_current_request(request)
+        token = set_current_request(request)
 
         try:
             response = self.get_response(request)
         finally:
             # Clear the request after processing
-            clear_current_request()
+            clear_current_request(token)
 
         return response
+
+    async def __acall__(self, request):
+        token = set_current_request(request)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            clear_current_request(token)
+
+        return response
+
+
+class _QueryTimer:
+    """execute_wrapper that counts SQL statements and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+            self.count += 1
+
+
+def _endpoint_label(request):
+    """Route pattern of the resolved view, so metric keys stay low-cardinality"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name or 'unmatched'
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware that records latency, status code and DB usage per endpoint
+    into the in-process metrics aggregator (see app/utils/metrics.py)
+
+    Place it first in MIDDLEWARE so the timing covers the whole stack.
+    DB statistics are only collected for sync requests; on the async path
+    queries run in worker threads the wrapper cannot see.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _enabled():
+        return getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._enabled():
+            return self.get_response(request)
+
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timer))
+                response = self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics_aggregator.record(
+                _endpoint_label(request),
+                request.method,
+                status_code,
+                (time.perf_counter() - start) * 1000,
+                query_count=timer.count,
+                db_time_ms=timer.elapsed * 1000,
+            )
+
+    async def __acall__(self, request):
+        if not self._enabled():
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics_aggregator.record(
+                _endpoint_label(request),
+                request.method,
+                status_code,
+                (time.perf_counter() - start) * 1000,
+            )
+
+
+class QueryBudgetMiddleware:
+    """
+    Development/test middleware that counts SQL statements per request and
+    checks them against the view's @query_budget (see app/utils/query_budget.py)
+
+    Inactive unless QUERY_BUDGET_ENABLED (defaults to DEBUG). Over-budget
+    requests and repeated statement shapes are logged, or raise
+    QueryBudgetExceeded when QUERY_BUDGET_ACTION is 'raise'. Per-endpoint
+    statistics are written to QUERY_BUDGET_REPORT_FILE at exit when set.
+    Async requests pass through unchecked.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+        report_file = getattr(settings, 'QUERY_BUDGET_REPORT_FILE', '')
+        if report_file:
+            query_stats.write_at_exit(report_file)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.capture():
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            check_request(
+                f"{request.method} {_endpoint_label(request)}",
+                recorder,
+                budget_for_view(match.func),
+            )
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in middleware that keeps profiles of sampled and slow requests
+    (see app/utils/profiling.py)
+
+    With PROFILING_ENABLED, a PROFILING_SAMPLE_RATE fraction of requests run
+    under cProfile. Every other request is stack-sampled every
+    PROFILING_SAMPLE_INTERVAL_MS and kept only if it takes longer than
+    PROFILING_SLOW_MS. Kept requests are stored with their SQL through
+    ProfileCaptureService and listed at /api/admin/profiles/.
+    Async requests pass through unprofiled.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            return self.get_response(request)
+
+        slow_ms = getattr(settings, 'PROFILING_SLOW_MS', 0)
+        profiler = None
+        if random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active (only one may run at a time on
+                # newer Pythons); fall back to stack sampling
+                profiler = None
+        sampled = profiler is not None
+        if not sampled and not slow_ms:
+            return self.get_response(request)
+
+        sql = SQLCapture()
+        thread_id = threading.get_ident()
+        samples = None if sampled else stack_sampler.watch(thread_id)
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            with sql.capture():
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if sampled:
+                        profiler.disable()
+            status_code = response.status_code
+            return response
+        finally:
+            if samples is not None:
+                stack_sampler.unwatch(thread_id)
+            duration_ms = (time.perf_counter() - start) * 1000
+            slow = bool(slow_ms) and duration_ms >= slow_ms
+            if sampled or slow:
+                self._store(request, status_code, duration_ms, 'slow' if slow else 'sampled', sql,
+                            cprofile_summary(profiler) if sampled else stack_summary(samples))
+
+    @staticmethod
+    def _store(request, status_code, duration_ms, reason, sql, profile):
+        try:
+            ProfileCaptureService.record(request, status_code, duration_ms, reason, sql, profile)
+        except Exception as e:
+            # Profiling must never break the request it observed
+            logger.warning("Failed to store profile of %s %s: %s", request.method, request.path, e)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
@@ -0,0 +1,71 @@
+"""
+Pagination helpers for large, append-only tables
+Provides opaque keyset cursors and cheap approximate row counts
+"""
+
+import base64
+import json
+
+from django.db import connection
+
+
+# Below this estimate an exact COUNT(*) is cheap enough to run instead
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def encode_cursor(values):
+    """
+    Encode a dict of keyset values into an opaque URL-safe cursor string
+
+    Args:
+        values: Dict of JSON-serializable values identifying the last row of a page
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Returns:
+        Dict of keyset values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def approximate_count(queryset, threshold=EXACT_COUNT_THRESHOLD):
+    """
+    Estimate the number of rows a queryset returns without scanning them
+
+    On PostgreSQL the planner's row estimate is read from EXPLAIN; estimates
+    below the threshold are replaced by an exact count. Other databases always
+    use an exact count.
+
+    Returns:
+        Tuple of (count, is_approximate)
+    """
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    if estimate < threshold:
+        return queryset.count(), False
+    return estimate, True
@@ -0,0 +1,178 @@
+"""
+Request Profiler
+Collects the SQL a request executes together with either a cProfile run or
+periodic stack samples, for ProfilingMiddleware to store as a capture
+"""
+
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from app.utils.query_budget import sql_shape
+
+
+class SQLCapture:
+    """
+    execute_wrapper that keeps the statements a request runs with their timings
+
+    Only the first max_statements are stored verbatim (without parameters,
+    which may hold personal data); count and total time cover every statement.
+    """
+
+    def __init__(self, max_statements=None):
+        self.max_statements = max_statements if max_statements is not None else getattr(
+            settings, 'PROFILING_MAX_STATEMENTS', 500
+        )
+        self.statements = []
+        self.count = 0
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.elapsed += duration
+            if len(self.statements) < self.max_statements:
+                self.statements.append((sql, duration))
+
+    @contextmanager
+    def capture(self):
+        """Record every statement run on any connection inside the block"""
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(self))
+            yield self
+
+    def summary(self, top=20):
+        """Statements, totals and the most frequent statement shapes"""
+        shapes = Counter()
+        shape_time = Counter()
+        for sql, duration in self.statements:
+            shape = sql_shape(sql)
+            shapes[shape] += 1
+            shape_time[shape] += duration
+        return {
+            'count': self.count,
+            'time_ms': round(self.elapsed * 1000, 3),
+            'truncated': self.count > len(self.statements),
+            'shapes': [
+                {'sql': shape, 'count': count, 'time_ms': round(shape_time[shape] * 1000, 3)}
+                for shape, count in shapes.most_common(top)
+            ],
+            'statements': [
+                {'sql': sql, 'duration_ms': round(duration * 1000, 3)}
+                for sql, duration in self.statements
+            ],
+        }
+
+
+def cprofile_summary(profiler, limit=200):
+    """
+    Function statistics of a finished cProfile run, slowest cumulative first
+
+    Returns:
+        Dict with profile type and one row per function
+    """
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, name), (primitive, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f'{filename}:{lineno}({name})',
+            'calls': calls,
+            'primitive_calls': primitive,
+            'total_ms': round(total * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return {'type': 'cprofile', 'total_calls': stats.total_calls, 'functions': rows[:limit]}
+
+
+def fold_stack(frame, limit=128):
+    """Render a frame and its callers as one 'outer;...;inner' line"""
+    names = []
+    while frame is not None and len(names) < limit:
+        code = frame.f_code
+        names.append(f'{code.co_filename}:{code.co_name}:{frame.f_lineno}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    Background thread that samples the stacks of watched request threads
+
+    Samples are folded stacks with counts, the input format of flame graph
+    tools (flamegraph.pl, speedscope). The thread only wakes up while at
+    least one request is being watched.
+
+    Usage:
+        samples = stack_sampler.watch(threading.get_ident())
+        try:
+            ...
+        finally:
+            stack_sampler.unwatch(threading.get_ident())
+    """
+
+    def __init__(self):
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._worker = None
+
+    @property
+    def interval(self):
+        return getattr(settings, 'PROFILING_SAMPLE_INTERVAL_MS', 5) / 1000
+
+    def watch(self, thread_id):
+        """Start sampling a thread; returns the Counter its samples go into"""
+        samples = Counter()
+        with self._lock:
+            self._watched[thread_id] = samples
+            self._active.set()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='request-stack-sampler', daemon=True)
+                self._worker.start()
+        return samples
+
+    def unwatch(self, thread_id):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+            if not self._watched:
+                self._active.clear()
+
+    def sample(self):
+        """Take one sample of every watched thread"""
+        frames = sys._current_frames()
+        with self._lock:
+            for thread_id, samples in self._watched.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    samples[fold_stack(frame)] += 1
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            self.sample()
+            time.sleep(self.interval)
+
+
+stack_sampler = StackSampler()
+
+
+def stack_summary(samples):
+    """Folded stack samples of a finished request, most frequent first"""
+    return {
+        'type': 'stack',
+        'interval_ms': getattr(settings, 'PROFILING_SAMPLE_INTERVAL_MS', 5),
+        'samples': sum(samples.values()),
+        'stacks': [f'{stack} {count}' for stack, count in samples.most_common()],
+    }
@@ -0,0 +1,272 @@
+"""
+Query Budgets
+Declare how many SQL statements a view may run, detect repeated statement
+shapes (N+1 patterns), and collect per-endpoint statistics for reporting
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when QUERY_BUDGET_ACTION is 'raise' and a request goes over budget"""
+
+
+class QueryBudget:
+    """
+    Limits for one view
+
+    Args:
+        max_queries: Maximum SQL statements per request (None for no limit)
+        max_repeats: Maximum executions of one statement shape per request
+            (defaults to settings.QUERY_BUDGET_MAX_REPEATS)
+    """
+
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+
+    def __repr__(self):
+        return f"QueryBudget(max_queries={self.max_queries}, max_repeats={self.max_repeats})"
+
+
+def query_budget(max_queries=None, max_repeats=None):
+    """
+    Declare a query budget on a view function or class
+
+    Apply it outermost, above @api_view, so the budget sits on the callable
+    the URLconf resolves to. On class-based views it is read from the class.
+
+    Usage:
+        @query_budget(5)
+        @api_view(['GET'])
+        def facility_search_view(request):
+            ...
+
+        @query_budget(4, max_repeats=1)
+        class FacilityListView(generics.ListAPIView):
+            ...
+    """
+    def decorator(view):
+        view.query_budget = QueryBudget(max_queries, max_repeats)
+        return view
+    return decorator
+
+
+def budget_for_view(func):
+    """Return the QueryBudget declared on a resolved view callable, if any"""
+    budget = getattr(func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(func, 'view_class', None) or getattr(func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
+
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_shape(sql):
+    """
+    Normalise a SQL statement so executions differing only in values match
+
+    Parameter lists of any length collapse to IN (...), and inline string and
+    numeric literals become placeholders.
+    """
+    shape = _WHITESPACE.sub(' ', sql).strip()
+    shape = _STRING_LITERAL.sub('%s', shape)
+    shape = _NUMBER_LITERAL.sub('%s', shape)
+    return _IN_LIST.sub('IN (...)', shape)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts statements and statement shapes
+
+    Usage:
+        recorder = QueryRecorder()
+        with recorder.capture():
+            ...
+        recorder.count, recorder.repeated(3)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.shapes[sql_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def capture(self):
+        """Record every statement run on any connection inside the block"""
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(self))
+            yield self
+
+    def repeated(self, max_repeats):
+        """Statement shapes executed more than max_repeats times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > max_repeats]
+
+    def problems(self, budget):
+        """
+        Describe how a request broke its budget
+
+        Returns:
+            List of human-readable messages (empty when within budget)
+        """
+        messages = []
+        if budget.max_queries is not None and self.count > budget.max_queries:
+            messages.append(f"ran {self.count} queries (budget {budget.max_queries})")
+
+        max_repeats = budget.max_repeats
+        if max_repeats is None:
+            max_repeats = getattr(settings, 'QUERY_BUDGET_MAX_REPEATS', 10)
+        for shape, count in self.repeated(max_repeats):
+            messages.append(f"repeated {count}x (limit {max_repeats}, likely N+1): {shape[:300]}")
+        return messages
+
+
+class QueryStats:
+    """
+    Process-wide per-endpoint query statistics
+
+    Filled by QueryBudgetMiddleware; written as JSON at exit when
+    QUERY_BUDGET_REPORT_FILE is set, for ``manage.py query_budget_report``.
+    Runs of the same suite merge into the existing file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._report_files = set()
+        self.endpoints = {}
+
+    def write_at_exit(self, path):
+        """Register a report file to be written at interpreter exit (once per path)"""
+        with self._lock:
+            if path in self._report_files:
+                return
+            self._report_files.add(path)
+        atexit.register(self.write, path)
+
+    def record(self, endpoint, recorder, budget, violated):
+        """Fold one request into the endpoint's totals"""
+        top_shape, top_count = recorder.shapes.most_common(1)[0] if recorder.shapes else ('', 0)
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'total_queries': 0,
+                'max_queries': 0,
+                'max_repeats': 0,
+                'worst_shape': '',
+                'budget': None,
+                'violations': 0,
+            })
+            stats['requests'] += 1
+            stats['total_queries'] += recorder.count
+            stats['max_queries'] = max(stats['max_queries'], recorder.count)
+            if top_count > stats['max_repeats']:
+                stats['max_repeats'] = top_count
+                stats['worst_shape'] = top_shape[:500]
+            stats['budget'] = budget.max_queries if budget else None
+            stats['violations'] += int(violated)
+
+    def write(self, path):
+        """Merge the collected statistics into a JSON report file"""
+        with self._lock:
+            if not self.endpoints:
+                return
+            merged = {}
+            if os.path.exists(path):
+                with open(path) as handle:
+                    merged = json.load(handle)
+            for endpoint, stats in self.endpoints.items():
+                previous = merged.get(endpoint)
+                if previous:
+                    stats = {
+                        'requests': previous['requests'] + stats['requests'],
+                        'total_queries': previous['total_queries'] + stats['total_queries'],
+                        'max_queries': max(previous['max_queries'], stats['max_queries']),
+                        'max_repeats': max(previous['max_repeats'], stats['max_repeats']),
+                        'worst_shape': stats['worst_shape'] if stats['max_repeats'] >= previous['max_repeats'] else previous['worst_shape'],
+                        'budget': stats['budget'],
+                        'violations': previous['violations'] + stats['violations'],
+                    }
+                merged[endpoint] = stats
+            with open(path, 'w') as handle:
+                json.dump(merged, handle, indent=2, sort_keys=True)
+
+
+query_stats = QueryStats()
+
+
+def check_request(endpoint, recorder, budget):
+    """
+    Apply QUERY_BUDGET_ACTION to a finished request
+
+    Logs a warning (or raises QueryBudgetExceeded when the action is 'raise')
+    if the request broke its declared budget, or repeated one statement shape
+    more than QUERY_BUDGET_MAX_REPEATS times.
+    """
+    effective = budget or QueryBudget(getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+    problems = recorder.problems(effective)
+    query_stats.record(endpoint, recorder, budget, bool(problems))
+    if not problems:
+        return
+
+    message = f"{endpoint} " + '; '.join(problems)
+    if getattr(settings, 'QUERY_BUDGET_ACTION', 'warn') == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning("Query budget: %s", message)
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin that enforces declared view budgets on every test request
+
+    Requests made through the test client raise QueryBudgetExceeded (failing
+    the test) when a view goes over its @query_budget or repeats a statement
+    shape too often. assertQueryBudget checks arbitrary code the same way.
+
+    Usage:
+        class FacilityListTests(QueryBudgetTestMixin, APITestCase):
+            def test_list(self):
+                self.client.get('/api/facilities/')          # budget enforced
+
+                with self.assertQueryBudget(3, max_repeats=1):
+                    serializer.data
+    """
+
+    def setUp(self):
+        from django.test import override_settings
+
+        self._query_budget_settings = override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+        self._query_budget_settings.enable()
+        self.addCleanup(self._query_budget_settings.disable)
+        super().setUp()
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries=None, max_repeats=None):
+        recorder = QueryRecorder()
+        with recorder.capture():
+            yield recorder
+        problems = recorder.problems(QueryBudget(max_queries, max_repeats))
+        if problems:
+            self.fail('Query budget exceeded: ' + '; '.join(problems))
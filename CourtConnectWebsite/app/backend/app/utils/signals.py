@@ -12,18 +12,20 @@ from app.payments.models import Payment
 from .audit import ActivityLogger, get_current_request
 
 
-# Store data before deletion for logging
-_deletion_cache = {}
+# Attribute used to carry data captured in pre_delete to the matching post_delete.
+# The collector passes the same instance to both signals, so the snapshot lives
+# and dies with the object being deleted instead of in a shared dict.
+SNAPSHOT_ATTR = '_audit_deletion_snapshot'
 
 
 @receiver(pre_delete, sender=Facility)
 def cache_facility_before_delete(sender, instance, **kwargs):
     """Cache facility data before deletion"""
-    _deletion_cache[f'facility_{instance.facility_id}'] = {
+    setattr(instance, SNAPSHOT_ATTR, {
         'facility_name': instance.facility_name,
         'address': instance.address,
-        'manager_id': instance.manager.manager_id if instance.manager else None
-    }
+        'manager_id': instance.manager_id
+    })
 
 
 @receiver(post_delete, sender=Facility)
@@ -33,7 +35,7 @@ def log_facility_delete(sender, instance, **kwargs):
     if not request or not hasattr(request, 'user') or not request.user.is_authenticated:
         return
 
-    cached_data = _deletion_cache.pop(f'facility_{instance.facility_id}', {})
+    cached_data = getattr(instance, SNAPSHOT_ATTR, {})
 
     # Check if user is a manager
     is_manager = hasattr(request.user, 'manager') and request.user.manager is not None
@@ -55,11 +57,11 @@ def log_facility_delete(sender, instance, **kwargs):
 @receiver(pre_delete, sender=Court)
 def cache_court_before_delete(sender, instance, **kwargs):
     """Cache court data before deletion"""
-    _deletion_cache[f'court_{instance.court_id}'] = {
+    setattr(instance, SNAPSHOT_ATTR, {
         'court_name': instance.name,
         'facility_id': instance.facility.facility_id if instance.facility else None,
         'facility_name': instance.facility.facility_name if instance.facility else None
-    }
+    })
 
 
 @receiver(post_delete, sender=Court)
@@ -69,7 +71,7 @@ def log_court_delete(sender, instance, **kwargs):
     if not request or not hasattr(request, 'user') or not request.user.is_authenticated:
         return
 
-    cached_data = _deletion_cache.pop(f'court_{instance.court_id}', {})
+    cached_data = getattr(instance, SNAPSHOT_ATTR, {})
 
     ActivityLogger.log_manager_action(
         user=request.user,
@@ -87,12 +89,12 @@ def log_court_delete(sender, instance, **kwargs):
 @receiver(pre_delete, sender=Availability)
 def cache_availability_before_delete(sender, instance, **kwargs):
     """Cache availability data before deletion"""
-    _deletion_cache[f'availability_{instance.availability_id}'] = {
+    setattr(instance, SNAPSHOT_ATTR, {
         'court_id': instance.court.court_id if instance.court else None,
         'court_name': instance.court.name if instance.court else None,
         'start_time': instance.start_time.isoformat() if instance.start_time else None,
         'end_time': instance.end_time.isoformat() if instance.end_time else None
-    }
+    })
 
 
 @receiver(post_delete, sender=Availability)
@@ -102,7 +104,7 @@ def log_availability_delete(sender, instance, **kwargs):
     if not request or not hasattr(request, 'user') or not request.user.is_authenticated:
         return
 
-    cached_data = _deletion_cache.pop(f'availability_{instance.availability_id}', {})
+    cached_data = getattr(instance, SNAPSHOT_ATTR, {})
 
     ActivityLogger.log_manager_action(
         user=request.user,
@@ -1,10 +1,23 @@
-from django.test import TestCase, RequestFactory
+from django.db import transaction
+from django.test import TestCase, RequestFactory, override_settings
 from app.users.models import User
 from app.admindashboard.models import ActivityLog
 from app.utils.audit import (
     set_current_request, get_current_request, clear_current_request,
     is_api_request, ActivityLogger
 )
+from app.utils.audit_buffer import AuditLogBuffer, audit_buffer
+from app.utils.middleware import AuditLogMiddleware
+from app.utils.timeseries import bucket_starts, time_series
+from app.utils.query_budget import (
+    QueryBudget, QueryBudgetExceeded, QueryRecorder, budget_for_view,
+    check_request, query_budget, sql_shape
+)
+from django.db.models import Count
+from django.utils import timezone
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo
+import asyncio
 
 
 class AuditUtilsTests(TestCase):
@@ -19,7 +32,7 @@ class AuditUtilsTests(TestCase):
         self.factory = RequestFactory()
 
     def tearDown(self):
-        """Clear thread-local storage after each test"""
+        """Clear the audit request context after each test"""
         clear_current_request()
 
     def test_set_and_get_current_request(self):
@@ -71,6 +84,49 @@ class AuditUtilsTests(TestCase):
         clear_current_request()
         self.assertFalse(is_api_request())
 
+    def test_clear_current_request_with_token_restores_previous(self):
+        """Test clearing with a token restores the outer request"""
+        outer = self.factory.get('/api/outer/')
+        inner = self.factory.get('/api/inner/')
+        set_current_request(outer)
+
+        token = set_current_request(inner)
+        self.assertEqual(get_current_request(), inner)
+
+        clear_current_request(token)
+        self.assertEqual(get_current_request(), outer)
+
+    def test_request_context_is_isolated_between_async_tasks(self):
+        """Test concurrent asyncio tasks each see their own request"""
+        async def handle(path):
+            request = self.factory.get(path)
+            set_current_request(request)
+            await asyncio.sleep(0)
+            return get_current_request().path
+
+        async def run_concurrently():
+            return await asyncio.gather(handle('/api/a/'), handle('/api/b/'))
+
+        self.assertEqual(asyncio.run(run_concurrently()), ['/api/a/', '/api/b/'])
+        self.assertIsNone(get_current_request())
+
+    def test_middleware_sets_request_for_async_views(self):
+        """Test AuditLogMiddleware exposes the request to async handlers"""
+        seen = []
+
+        async def get_response(request):
+            seen.append(get_current_request())
+            return 'response'
+
+        middleware = AuditLogMiddleware(get_response)
+        request = self.factory.get('/api/async/')
+
+        response = asyncio.run(middleware(request))
+
+        self.assertEqual(response, 'response')
+        self.assertEqual(seen, [request])
+        self.assertIsNone(get_current_request())
+
 
 class ActivityLoggerTests(TestCase):
     """Test ActivityLogger class"""
@@ -84,7 +140,7 @@ class ActivityLoggerTests(TestCase):
         self.factory = RequestFactory()
 
     def tearDown(self):
-        """Clear thread-local storage after each test"""
+        """Clear the audit request context after each test"""
         clear_current_request()
 
     def test_log_action_in_api_context(self):
@@ -297,7 +353,7 @@ class SignalsTests(TestCase):
         self.factory = RequestFactory()
 
     def tearDown(self):
-        """Clear thread-local storage after each test"""
+        """Clear the audit request context after each test"""
         clear_current_request()
 
     def test_facility_delete_signal_logs_action(self):
@@ -320,6 +376,7 @@ class SignalsTests(TestCase):
         log = logs.first()
         self.assertEqual(log.user, self.manager_user)
         self.assertEqual(log.metadata.get('deleted_via'), 'signal')
+        self.assertEqual(log.metadata.get('facility_name'), self.facility.facility_name)
 
     def test_court_delete_signal_logs_action(self):
         """Test that deleting court creates audit log"""
@@ -459,3 +516,263 @@ class SignalsTests(TestCase):
         self.assertEqual(logs.count(), 1)
         log = logs.first()
         self.assertEqual(log.metadata.get('email'), 'newuser@example.com')
+
+
+@override_settings(AUDIT_LOG_BUFFERED=True, AUDIT_LOG_FLUSH_INTERVAL=0, AUDIT_LOG_FLUSH_ON_SHUTDOWN=False)
+class AuditLogBufferTests(TestCase):
+    """Test the buffered audit log sink"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buffer@example.com',
+            name='Buffer User',
+            password='testpass123'
+        )
+        self.factory = RequestFactory()
+        set_current_request(self.factory.post('/api/bookings/'))
+
+    def tearDown(self):
+        clear_current_request()
+        audit_buffer.flush()
+
+    def _entry(self, action='test_action'):
+        return ActivityLog(user=self.user, action=action, metadata={})
+
+    def test_log_action_is_queued_until_commit(self):
+        """Test buffered entries are only queued once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            log_entry = ActivityLogger.log_action(user=self.user, action='create_booking')
+            self.assertIsNone(log_entry.activity_id)
+            self.assertEqual(len(audit_buffer), 0)
+
+        self.assertEqual(len(audit_buffer), 1)
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        audit_buffer.flush()
+        self.assertTrue(ActivityLog.objects.filter(action='create_booking').exists())
+
+    def test_rolled_back_entries_are_dropped(self):
+        """Test entries logged inside a rolled-back transaction are never written"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    ActivityLogger.log_action(user=self.user, action='rolled_back')
+                    raise ValueError('abort')
+            except ValueError:
+                pass
+
+        audit_buffer.flush()
+        self.assertFalse(ActivityLog.objects.filter(action='rolled_back').exists())
+
+    @override_settings(AUDIT_LOG_BATCH_SIZE=3)
+    def test_flush_on_batch_size(self):
+        """Test the queue is written once it reaches the batch size"""
+        buffer = AuditLogBuffer()
+        buffer.enqueue(self._entry())
+        buffer.enqueue(self._entry())
+        self.assertEqual(ActivityLog.objects.count(), 0)
+
+        buffer.enqueue(self._entry())
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        self.assertEqual(len(buffer), 0)
+
+    @override_settings(AUDIT_LOG_MAX_QUEUE=2, AUDIT_LOG_OVERFLOW='drop')
+    def test_overflow_drop(self):
+        """Test new entries are dropped when the queue is full in drop mode"""
+        buffer = AuditLogBuffer()
+        self.assertTrue(buffer.enqueue(self._entry()))
+        self.assertTrue(buffer.enqueue(self._entry()))
+        self.assertFalse(buffer.enqueue(self._entry()))
+
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(buffer.flush(), 2)
+
+    @override_settings(AUDIT_LOG_MAX_QUEUE=2, AUDIT_LOG_OVERFLOW='flush')
+    def test_overflow_flush(self):
+        """Test a full queue is written synchronously in flush mode"""
+        buffer = AuditLogBuffer()
+        for _ in range(3):
+            buffer.enqueue(self._entry())
+
+        self.assertEqual(ActivityLog.objects.count(), 2)
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.dropped, 0)
+        buffer.flush()
+
+    def test_shutdown_flushes_remaining_entries(self):
+        """Test shutdown writes anything still queued"""
+        buffer = AuditLogBuffer()
+        buffer.enqueue(self._entry())
+
+        with self.settings(AUDIT_LOG_FLUSH_ON_SHUTDOWN=True):
+            buffer.shutdown()
+
+        self.assertEqual(ActivityLog.objects.count(), 1)
+
+
+class TimeSeriesTests(TestCase):
+    """Test the shared time-bucketed query helper"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='series@example.com',
+            name='Series User',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+
+    def _log_days_ago(self, days):
+        log = ActivityLog.objects.create(user=self.user, action='login')
+        created_at = timezone.now() - timedelta(days=days)
+        ActivityLog.objects.filter(pk=log.pk).update(created_at=created_at)
+
+    def test_bucket_starts_daily(self):
+        """Test daily buckets cover the inclusive range"""
+        buckets = bucket_starts(date(2025, 1, 1), date(2025, 1, 3))
+        self.assertEqual(buckets, [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)])
+
+    def test_bucket_starts_weekly_aligns_to_monday(self):
+        """Test weekly buckets start on Monday"""
+        buckets = bucket_starts(date(2025, 1, 8), date(2025, 1, 20), interval='week')
+        self.assertEqual(buckets, [date(2025, 1, 6), date(2025, 1, 13), date(2025, 1, 20)])
+
+    def test_bucket_starts_rejects_unknown_interval(self):
+        """Test unsupported intervals raise ValueError"""
+        with self.assertRaises(ValueError):
+            bucket_starts(date(2025, 1, 1), date(2025, 1, 2), interval='hour')
+
+    def test_daily_series_is_zero_filled(self):
+        """Test days without rows are returned as zero"""
+        self._log_days_ago(0)
+        self._log_days_ago(0)
+        self._log_days_ago(2)
+
+        with self.assertNumQueries(1):
+            series = time_series(
+                ActivityLog.objects.all(),
+                self.today - timedelta(days=3),
+                self.today,
+                logins=Count('pk'),
+            )
+
+        self.assertEqual(len(series['buckets']), 4)
+        self.assertEqual(series['buckets'][-1], self.today)
+        self.assertEqual(series['logins'], [0, 1, 0, 2])
+
+    def test_weekly_series(self):
+        """Test weekly buckets sum every day of the week"""
+        self._log_days_ago(0)
+        self._log_days_ago(14)
+
+        series = time_series(
+            ActivityLog.objects.all(),
+            self.today - timedelta(days=14),
+            self.today,
+            interval='week',
+            logins=Count('pk'),
+        )
+
+        self.assertEqual(series['buckets'][-1], self.today - timedelta(days=self.today.weekday()))
+        self.assertEqual(sum(series['logins']), 2)
+        self.assertEqual(series['logins'][-1], 1)
+
+    def test_reversed_range_is_empty(self):
+        """Test an end date before the start date returns empty series without querying"""
+        with self.assertNumQueries(0):
+            series = time_series(ActivityLog.objects.all(), self.today, self.today - timedelta(days=1), logins=Count('pk'))
+        self.assertEqual(series, {'buckets': [], 'logins': []})
+
+    def test_series_respects_timezone(self):
+        """Test bucket boundaries follow the given timezone"""
+        log = ActivityLog.objects.create(user=self.user, action='login')
+        # 23:30 UTC on Jan 1 is already Jan 2 in Sydney
+        ActivityLog.objects.filter(pk=log.pk).update(
+            created_at=timezone.datetime(2025, 1, 1, 23, 30, tzinfo=ZoneInfo('UTC'))
+        )
+
+        sydney = time_series(
+            ActivityLog.objects.all(), date(2025, 1, 1), date(2025, 1, 2),
+            tzinfo=ZoneInfo('Australia/Sydney'), logins=Count('pk')
+        )
+        utc = time_series(
+            ActivityLog.objects.all(), date(2025, 1, 1), date(2025, 1, 2),
+            tzinfo=ZoneInfo('UTC'), logins=Count('pk')
+        )
+
+        self.assertEqual(sydney['logins'], [0, 1])
+        self.assertEqual(utc['logins'], [1, 0])
+
+
+class QueryBudgetTests(TestCase):
+    """Test query counting, N+1 detection and budget enforcement"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f'budget{i}@example.com', name=f'Budget {i}', password='testpass123')
+            for i in range(4)
+        ]
+
+    def test_sql_shape_ignores_values(self):
+        """Test statements differing only in literals or IN-list length share a shape"""
+        self.assertEqual(
+            sql_shape('SELECT * FROM t WHERE id = 5 AND name = \'x\''),
+            sql_shape('SELECT  *  FROM t\nWHERE id = 12 AND name = \'yy\''),
+        )
+        self.assertEqual(
+            sql_shape('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            sql_shape('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    def test_recorder_detects_repeated_shapes(self):
+        """Test a per-row lookup loop is reported as a repeated shape"""
+        recorder = QueryRecorder()
+        with recorder.capture():
+            for user in self.users:
+                User.objects.filter(pk=user.pk).exists()
+            list(User.objects.all())
+
+        self.assertEqual(recorder.count, 5)
+        repeated = recorder.repeated(1)
+        self.assertEqual(len(repeated), 1)
+        self.assertEqual(repeated[0][1], 4)
+
+        problems = recorder.problems(QueryBudget(3, max_repeats=2))
+        self.assertEqual(len(problems), 2)
+        self.assertIn('ran 5 queries (budget 3)', problems[0])
+        self.assertIn('likely N+1', problems[1])
+        self.assertEqual(recorder.problems(QueryBudget(5, max_repeats=4)), [])
+
+    def test_decorator_is_found_on_functions_and_classes(self):
+        """Test budgets declared with @query_budget are resolved from the view"""
+        @query_budget(3)
+        def view(request):
+            pass
+
+        @query_budget(4, max_repeats=1)
+        class View:
+            pass
+
+        def as_view(request):
+            pass
+        as_view.view_class = View
+
+        self.assertEqual(budget_for_view(view).max_queries, 3)
+        self.assertEqual(budget_for_view(as_view).max_repeats, 1)
+        self.assertIsNone(budget_for_view(lambda request: None))
+
+    def test_check_request_warns_or_raises(self):
+        """Test QUERY_BUDGET_ACTION selects between logging and raising"""
+        recorder = QueryRecorder()
+        with recorder.capture():
+            list(User.objects.all())
+            list(User.objects.all())
+
+        with self.settings(QUERY_BUDGET_ACTION='warn'):
+            with self.assertLogs('app.utils.query_budget', level='WARNING') as logs:
+                check_request('GET /api/test/', recorder, QueryBudget(1))
+        self.assertIn('GET /api/test/ ran 2 queries (budget 1)', logs.output[0])
+
+        with self.settings(QUERY_BUDGET_ACTION='raise'):
+            with self.assertRaises(QueryBudgetExceeded):
+                check_request('GET /api/test/', recorder, QueryBudget(1))
+            check_request('GET /api/test/', recorder, QueryBudget(2))
@@ -0,0 +1,96 @@
+"""
+Time-Series Query Helper
+Buckets a queryset by day or week in one GROUP BY query and zero-fills the gaps
+"""
+
+from datetime import datetime, timedelta
+
+from django.db.models.functions import TruncDay, TruncWeek
+from django.utils import timezone
+
+
+TRUNC_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+
+def bucket_starts(start_date, end_date, interval='day'):
+    """
+    List the bucket start dates covering an inclusive date range
+
+    Weekly buckets start on Monday (matching TruncWeek), so the first bucket
+    may begin before start_date.
+
+    Args:
+        start_date: First date in the range
+        end_date: Last date in the range
+        interval: 'day' or 'week'
+    """
+    if interval not in TRUNC_FUNCTIONS:
+        raise ValueError(f"Unsupported interval: {interval}")
+
+    step = timedelta(days=1 if interval == 'day' else 7)
+    current = start_date if interval == 'day' else start_date - timedelta(days=start_date.weekday())
+
+    buckets = []
+    while current <= end_date:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def time_series(queryset, start_date, end_date, interval='day', field='created_at', tzinfo=None, **aggregates):
+    """
+    Aggregate a queryset into aligned day/week buckets with a single query
+
+    Usage:
+        from app.utils.timeseries import time_series
+
+        series = time_series(
+            Booking.objects.all(), start, end, interval='day',
+            tzinfo=ZoneInfo(facility.timezone),
+            bookings=Count('pk'), revenue=Sum('total_amount'),
+        )
+        series['buckets']   # [date, date, ...]
+        series['bookings']  # [3, 0, 5, ...] aligned with buckets
+
+    Args:
+        queryset: Base queryset (already filtered by anything other than time)
+        start_date: First local date to include
+        end_date: Last local date to include
+        interval: 'day' or 'week'
+        field: DateTimeField to bucket on
+        tzinfo: Timezone used for bucket boundaries (defaults to the current timezone)
+        **aggregates: Aggregate expressions keyed by metric name
+
+    Returns:
+        Dict with 'buckets' (list of dates) and one zero-filled list per metric;
+        every list is empty when end_date is before start_date
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    buckets = bucket_starts(start_date, end_date, interval)
+    if not buckets:
+        return {'buckets': [], **{name: [] for name in aggregates}}
+
+    range_start = timezone.make_aware(datetime.combine(buckets[0], datetime.min.time()), tzinfo)
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()), tzinfo)
+
+    rows = queryset.filter(**{
+        f'{field}__gte': range_start,
+        f'{field}__lt': range_end,
+    }).annotate(
+        bucket=TRUNC_FUNCTIONS[interval](field, tzinfo=tzinfo)
+    ).values('bucket').annotate(**aggregates).order_by('bucket')
+
+    by_bucket = {}
+    for row in rows:
+        key = row['bucket']
+        if isinstance(key, datetime):
+            key = timezone.localtime(key, tzinfo).date() if timezone.is_aware(key) else key.date()
+        by_bucket[key] = row
+
+    series = {'buckets': buckets}
+    for name in aggregates:
+        series[name] = [by_bucket.get(bucket, {}).get(name) or 0 for bucket in buckets]
+    return series
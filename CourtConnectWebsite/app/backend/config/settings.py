@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,6 +31,9 @@ SECRET_KEY = 'django-insecure-w9^%i&v*f(w(fn_&kha(g01xdxi2frgg(iwur688uenjufqh$e
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# True under `python manage.py test`; background writers default to off so they never outlive the test database
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = []
 
 
@@ -62,6 +66,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'app.utils.middleware.RequestMetricsMiddleware',  # Latency, status and DB timing per endpoint (keep first)
+    'app.utils.middleware.QueryBudgetMiddleware',  # Per-view query budgets and N+1 detection (dev/test)
+    'app.utils.middleware.ProfilingMiddleware',  # Opt-in profiles of sampled and slow requests
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -128,6 +135,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# PBKDF2 work factor is configurable so ops can tune login latency against the
+# current hardware; stored hashes with a different count are upgraded on login.
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '1000000'))
+
+PASSWORD_HASHERS = [
+    'app.auth.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Emit a Server-Timing header with the per-stage login breakdown
+LOGIN_TIMING_HEADER = os.getenv('LOGIN_TIMING_HEADER', str(DEBUG)) == 'True'
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -222,12 +245,109 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@courtconnect.com')
 EMAIL_TIMEOUT = 10  # seconds
 
+# Payment providers (name -> PaymentService class, see app/payments/services/providers.py)
+PAYMENT_PROVIDERS = {
+    'paypal': 'app.payments.services.paypal_service.PayPalService',
+}
+# The in-process fake provider is for load tests and offline development only
+if os.getenv('PAYMENT_FAKE_PROVIDER', 'False') == 'True':
+    PAYMENT_PROVIDERS['fake'] = 'app.payments.services.fake_service.FakePaymentService'
+PAYMENT_FAKE_LATENCY_MS = float(os.getenv('PAYMENT_FAKE_LATENCY_MS', '0'))  # Simulated provider latency per call
+PAYMENT_FAKE_LATENCY_JITTER_MS = float(os.getenv('PAYMENT_FAKE_LATENCY_JITTER_MS', '0'))  # Latency varies uniformly by +/- this much
+PAYMENT_FAKE_FAILURE_RATE = float(os.getenv('PAYMENT_FAKE_FAILURE_RATE', '0'))  # Share of calls (0-1) that fail
+PAYMENT_FAKE_FAIL_OPERATIONS = tuple(op for op in os.getenv('PAYMENT_FAKE_FAIL_OPERATIONS', '').split(',') if op)  # e.g. capture_payment,refund_payment (empty: all)
+PAYMENT_FAKE_SEED = int(os.getenv('PAYMENT_FAKE_SEED')) if os.getenv('PAYMENT_FAKE_SEED') else None  # Reproducible failure injection
+PAYMENT_FAKE_MAX_RECORDS = int(os.getenv('PAYMENT_FAKE_MAX_RECORDS', '100000'))  # Orders/captures kept in memory
+PAYMENT_FAKE_WEBHOOK_SECRET = os.getenv('PAYMENT_FAKE_WEBHOOK_SECRET', 'fake-webhook-secret')  # HMAC key for X-Fake-Signature
+
 # PayPal configuration
 PAYPAL_MODE = os.getenv('PAYPAL_MODE', 'sandbox')
 PAYPAL_CLIENT_ID = os.getenv('PAYPAL_CLIENT_ID', '')
 PAYPAL_CLIENT_SECRET = os.getenv('PAYPAL_CLIENT_SECRET', '')
 PAYPAL_RETURN_URL = os.getenv('PAYPAL_RETURN_URL', 'http://localhost:5173/bookings/success')
 PAYPAL_CANCEL_URL = os.getenv('PAYPAL_CANCEL_URL', 'http://localhost:5173/bookings/cancel')
+PAYPAL_BASE_URL = os.getenv('PAYPAL_BASE_URL', '')  # Overrides the API host chosen by PAYPAL_MODE (e.g. a local stub)
+PAYPAL_CONNECT_TIMEOUT = float(os.getenv('PAYPAL_CONNECT_TIMEOUT', '3.05'))  # Seconds to wait for a connection to PayPal
+PAYPAL_READ_TIMEOUT = float(os.getenv('PAYPAL_READ_TIMEOUT', '20'))  # Seconds to wait for PayPal to respond
+PAYPAL_MAX_RETRIES = int(os.getenv('PAYPAL_MAX_RETRIES', '3'))  # Retries on connection errors and 429/5xx responses
+PAYPAL_RETRY_BACKOFF = float(os.getenv('PAYPAL_RETRY_BACKOFF', '0.5'))  # Exponential backoff factor between retries (seconds)
+PAYPAL_POOL_SIZE = int(os.getenv('PAYPAL_POOL_SIZE', '10'))  # Keep-alive connections held open to PayPal per process
+PAYPAL_TOKEN_REFRESH_MARGIN = int(os.getenv('PAYPAL_TOKEN_REFRESH_MARGIN', '60'))  # Seconds before expires_in that a cached OAuth token is renewed
+PAYPAL_WEBHOOK_ID = os.getenv('PAYPAL_WEBHOOK_ID', '')  # Webhook id from the PayPal dashboard; webhooks are rejected while unset
+
+# Payment captures (queued by /api/payments/capture/, reconciled by /api/payments/webhooks/<provider>/)
+# 'thread' runs captures in a pool inside the web process after commit; 'worker' leaves them to `python manage.py run_capture_worker`
+PAYMENT_CAPTURE_EXECUTOR = os.getenv('PAYMENT_CAPTURE_EXECUTOR', 'thread')
+PAYMENT_CAPTURE_THREADS = int(os.getenv('PAYMENT_CAPTURE_THREADS', '4'))  # Capture threads per web process
+PAYMENT_CAPTURE_TIMEOUT_SECONDS = int(os.getenv('PAYMENT_CAPTURE_TIMEOUT_SECONDS', '120'))  # Processing captures older than this are reclaimed
+PAYMENT_CAPTURE_MAX_ATTEMPTS = int(os.getenv('PAYMENT_CAPTURE_MAX_ATTEMPTS', '3'))
+PAYMENT_CAPTURE_RESERVATION_GRACE_SECONDS = int(os.getenv('PAYMENT_CAPTURE_RESERVATION_GRACE_SECONDS', '300'))  # Reservation hold extended while a capture is queued
+PAYMENT_CAPTURE_POLL_MS = int(os.getenv('PAYMENT_CAPTURE_POLL_MS', '1000'))  # Polling interval suggested to clients
+PAYMENT_CAPTURE_WORKER_POLL_SECONDS = float(os.getenv('PAYMENT_CAPTURE_WORKER_POLL_SECONDS', '1'))
+
+# Payment reconciliation (`python manage.py reconcile_payments`, results in payment_discrepancies)
+PAYMENT_RECONCILE_DAYS = int(os.getenv('PAYMENT_RECONCILE_DAYS', '2'))  # Look-back window of a run
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv('PAYMENT_RECONCILE_BATCH_SIZE', '200'))  # Payments read per page
+PAYMENT_RECONCILE_WORKERS = int(os.getenv('PAYMENT_RECONCILE_WORKERS', '8'))  # Concurrent provider lookups (keep within PAYPAL_POOL_SIZE)
+
+# Admin dashboard
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '30'))  # Seconds the overview metrics are cached (0 disables)
+DAILY_METRICS_REFRESH_SECONDS = int(os.getenv('DAILY_METRICS_REFRESH_SECONDS', '300'))  # Max age of the daily rollup before analytics refresh it
+FLAGGED_USERS_REFRESH_SECONDS = int(os.getenv('FLAGGED_USERS_REFRESH_SECONDS', '300'))  # Max age of the flagged_users table before the moderation page rebuilds it
+FACILITY_SNAPSHOT_REFRESH_SECONDS = int(os.getenv('FACILITY_SNAPSHOT_REFRESH_SECONDS', '900'))  # Max age of a facility analytics snapshot; occupancy moves as slots pass
+
+# Manager dashboard
+MANAGER_OVERVIEW_CACHE_TTL = int(os.getenv('MANAGER_OVERVIEW_CACHE_TTL', '60'))  # Seconds a manager's overview is cached (0 disables); dropped on booking changes
+
+# Background exports (processed by `python manage.py run_export_worker`, written under MEDIA_ROOT/exports)
+EXPORT_JOB_REUSE_SECONDS = int(os.getenv('EXPORT_JOB_REUSE_SECONDS', '900'))  # Identical requests within this window reuse the artefact
+EXPORT_JOB_TIMEOUT_SECONDS = int(os.getenv('EXPORT_JOB_TIMEOUT_SECONDS', '3600'))  # Running jobs older than this are reclaimed
+EXPORT_JOB_RETENTION_DAYS = int(os.getenv('EXPORT_JOB_RETENTION_DAYS', '7'))  # Artefacts are deleted after this many days
+EXPORT_WORKER_POLL_SECONDS = float(os.getenv('EXPORT_WORKER_POLL_SECONDS', '5'))
+EXPORT_WORKER_PURGE_SECONDS = float(os.getenv('EXPORT_WORKER_PURGE_SECONDS', '3600'))  # How often a running worker deletes expired artefacts
+
+# Batch refunds (facility suspensions and approved refund requests; progress at /api/admin/payments/refund-batches/<id>/)
+# 'thread' runs a batch inside the web process after commit; 'worker' leaves it to `python manage.py run_refund_worker`
+REFUND_BATCH_EXECUTOR = os.getenv('REFUND_BATCH_EXECUTOR', 'thread')
+REFUND_BATCH_WORKERS = int(os.getenv('REFUND_BATCH_WORKERS', '4'))  # Concurrent provider refunds per batch (keep within PAYPAL_POOL_SIZE)
+REFUND_BATCH_CHUNK_SIZE = int(os.getenv('REFUND_BATCH_CHUNK_SIZE', '50'))  # Refunds issued between progress updates
+REFUND_BATCH_TIMEOUT_SECONDS = int(os.getenv('REFUND_BATCH_TIMEOUT_SECONDS', '900'))  # Running batches older than this are reclaimed
+REFUND_WORKER_POLL_SECONDS = float(os.getenv('REFUND_WORKER_POLL_SECONDS', '5'))
+
+# Request metrics (aggregated in process, written to the request_metrics table)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', str(not TESTING)) == 'True'  # Off under tests unless a test enables it
+METRICS_BUCKET_SECONDS = int(os.getenv('METRICS_BUCKET_SECONDS', '60'))  # Width of one time-series bucket
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '60'))  # Seconds between timed flushes (0 disables)
+METRICS_RETENTION_DAYS = int(os.getenv('METRICS_RETENTION_DAYS', '30'))  # Rows older than this are deleted by prune_request_metrics
+METRICS_COMPACT_AFTER_HOURS = int(os.getenv('METRICS_COMPACT_AFTER_HOURS', '24'))  # prune_request_metrics merges rows older than this...
+METRICS_COMPACT_BUCKET_SECONDS = int(os.getenv('METRICS_COMPACT_BUCKET_SECONDS', '900'))  # ...into buckets this wide (divides an hour, so local days stay exact)
+METRICS_SCRAPE_TOKEN = os.getenv('METRICS_SCRAPE_TOKEN', '')  # Bearer token accepted by the Prometheus endpoint (empty: admins only)
+
+# Query budgets (development/test): checks each request against the view's @query_budget
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_ACTION = os.getenv('QUERY_BUDGET_ACTION', 'warn')  # 'warn' (log) or 'raise' (fail the request)
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '0')) or None  # Budget for views without one (unset: none)
+QUERY_BUDGET_MAX_REPEATS = int(os.getenv('QUERY_BUDGET_MAX_REPEATS', '10'))  # Same SQL shape more often than this is flagged as N+1
+QUERY_BUDGET_REPORT_FILE = os.getenv('QUERY_BUDGET_REPORT_FILE', '')  # Per-endpoint stats written here at exit (see query_budget_report)
+
+# Request profiling (opt-in): captures are listed at /api/admin/profiles/ and written under MEDIA_ROOT/profiles
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.01'))  # Fraction of requests run under cProfile
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', '1000'))  # Stack-sampled requests slower than this are kept (0 disables)
+PROFILING_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILING_SAMPLE_INTERVAL_MS', '5'))  # Stack sampling period
+PROFILING_MAX_STATEMENTS = int(os.getenv('PROFILING_MAX_STATEMENTS', '500'))  # SQL statements kept verbatim per capture
+PROFILING_RETENTION_DAYS = int(os.getenv('PROFILING_RETENTION_DAYS', '7'))  # Captures are deleted by prune_profile_captures after this
+
+# Audit logging
+# When buffered, ActivityLog entries are queued after commit and written with bulk_create
+AUDIT_LOG_BUFFERED = os.getenv('AUDIT_LOG_BUFFERED', 'False') == 'True'
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', '100'))  # Flush when this many entries are queued
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', '2.0'))  # Seconds between timed flushes (0 disables)
+AUDIT_LOG_MAX_QUEUE = int(os.getenv('AUDIT_LOG_MAX_QUEUE', '10000'))  # Back-pressure threshold
+AUDIT_LOG_OVERFLOW = os.getenv('AUDIT_LOG_OVERFLOW', 'flush')  # 'flush' (write synchronously) or 'drop'
+AUDIT_LOG_FLUSH_ON_SHUTDOWN = os.getenv('AUDIT_LOG_FLUSH_ON_SHUTDOWN', 'True') == 'True'
+AUDIT_LOG_RETENTION_DAYS = int(os.getenv('AUDIT_LOG_RETENTION_DAYS', '365'))  # Rows older than this are archived
+AUDIT_LOG_ARCHIVE_DIR = os.getenv('AUDIT_LOG_ARCHIVE_DIR', str(BASE_DIR / 'archives' / 'audit'))
 
 # Django-axes configuration for login attempt tracking and account lockout
 AXES_FAILURE_LIMIT = 5  # Lock account after 5 failed login attempts
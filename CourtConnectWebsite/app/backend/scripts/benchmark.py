@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+"""
+Endpoint benchmark suite for CourtConnect.
+
+Replays scripted scenarios in-process through the full Django middleware
+stack against the configured database (seed it first with
+scripts/benchmark_data.py) and reports throughput, p50/p95/p99 latency and
+SQL queries per operation. Results are written as JSON so runs on two
+commits can be compared, and --max-regression turns the comparison into a
+pass/fail check.
+
+Scenarios:
+    facility_search          GET /api/facilities/search/ by suburb and sport
+    facility_list            GET /api/facilities/ with a search term
+    availability_listing     GET /api/facilities/courts/<id>/availability/ for one local day
+    reservation_burst        Concurrent users racing for a handful of slots (409s are expected)
+    checkout                 Reserve an open slot, then POST /api/bookings/v1/ for it
+    payment_checkout         Reserve a slot, create and capture a payment with the fake provider
+    manager_overview         GET /api/manager/overview/ as a random manager, cache cleared first
+    manager_overview_cached  The same, served from the MANAGER_OVERVIEW_CACHE_TTL cache once warm
+    admin_dashboard          GET /api/admin/dashboard/overview/ as the benchmark admin, cache cleared first
+    admin_dashboard_cached   The same, served from the DASHBOARD_CACHE_TTL cache after the first request
+
+Checkout stops at the pending-payment booking. payment_checkout drives the
+payment endpoints against the in-process fake provider (tune it with the
+PAYMENT_FAKE_* settings) and polls the capture until the booking is
+confirmed, so it measures our side of a checkout without PayPal.
+The cold overview and dashboard scenarios clear the cache inside the
+timed operation; with --concurrency above 1 a worker can still hit an
+entry another worker just rebuilt, so use --concurrency 1 for strictly
+uncached numbers.
+reservation_burst and both checkout scenarios change data, so reseed (benchmark_data.py --reset) between runs you intend
+to compare. Concurrent write scenarios need PostgreSQL; SQLite serialises
+writers and reports "database is locked" failures.
+
+Usage:
+    python scripts/benchmark.py                                # Every scenario
+    python scripts/benchmark.py --scenario facility_search --scenario checkout
+    python scripts/benchmark.py --iterations 500 --concurrency 8 --output after.json
+    python scripts/benchmark.py --compare before.json --max-regression 10
+    python scripts/benchmark.py --help                         # Show help
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+# Add the backend directory to Python path
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Set up Django settings; the development query budget checks would add
+# their own overhead to every request, so they are off unless asked for
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('QUERY_BUDGET_ENABLED', 'False')
+os.environ.setdefault('PAYMENT_FAKE_PROVIDER', 'True')
+
+import django
+django.setup()
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app.admindashboard.analytics_views import DASHBOARD_OVERVIEW_CACHE_KEY
+from app.facilities.models import Availability, Court
+from app.managers.services import ManagerOverviewService
+from app.users.models import Manager, User
+from app.utils.query_budget import QueryRecorder
+from benchmark_data import BENCH_ADMIN_EMAIL, BENCH_EMAIL_DOMAIN, KINDS, SPORTS, SUBURBS
+
+
+def print_banner(text):
+    """Print a formatted banner."""
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Dataset:
+    """
+    Samples of the seeded benchmark data that scenarios draw from.
+
+    Loaded once before the scenarios run; none of these lookups are timed.
+    """
+
+    def __init__(self, sample_size, seed):
+        rng = random.Random(seed)
+        users = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+
+        self.admin = users.filter(email=BENCH_ADMIN_EMAIL).first()
+        self.managers = list(Manager.objects.filter(user__in=users).select_related('user')[:sample_size])
+        self.users = list(users.filter(manager__isnull=True, is_admin=False).order_by('pk')[:sample_size])
+        if not (self.admin and self.managers and self.users):
+            raise SystemExit("✗ No benchmark dataset found; run scripts/benchmark_data.py first")
+        self._checkout_users = itertools.cycle(self.users)
+
+        court_ids = list(Court.objects.filter(facility__manager__in=self.managers).values_list('pk', flat=True))
+        rng.shuffle(court_ids)
+        self.courts = list(
+            Court.objects.filter(pk__in=court_ids[:sample_size]).select_related('facility').annotate(
+                first_slot=Min('availability__start_time'),
+                last_slot=Max('availability__start_time'),
+            ).filter(first_slot__isnull=False).order_by('pk')
+        )
+        if not self.courts:
+            raise SystemExit("✗ The benchmark courts have no availability")
+
+        # Open future slots: a shuffled pool for checkout and a small hot set
+        # that every reservation_burst worker fights over
+        soon = timezone.now() + timedelta(hours=2)
+        open_slots = list(Availability.objects.filter(
+            court__in=self.courts, is_available=True, start_time__gte=soon
+        ).order_by('pk').values_list('pk', flat=True)[:sample_size * 20])
+        rng.shuffle(open_slots)
+        self.hot_slots = open_slots[:8]
+        self._open_slots = open_slots[8:]
+        self._lock = threading.Lock()
+
+    def next_open_slot(self):
+        with self._lock:
+            return self._open_slots.pop() if self._open_slots else None
+
+    def next_checkout_user(self):
+        # Rotate through users so the five-active-bookings cap is hit as late as possible
+        with self._lock:
+            return next(self._checkout_users)
+
+    def counts(self):
+        return {
+            'users': len(self.users),
+            'managers': len(self.managers),
+            'courts': len(self.courts),
+            'open_slots': len(self._open_slots),
+        }
+
+
+# Each scenario performs one operation with the given client and returns a
+# list of (status_code, expected, conflict) per request it made
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+@scenario('facility_search')
+def facility_search(client, data, rng):
+    params = {'q': rng.choice(SUBURBS)}
+    if rng.random() < 0.5:
+        params['sport_type'] = rng.choice(SPORTS)
+    response = client.get('/api/facilities/search/', params)
+    return [(response.status_code, response.status_code == 200, False)]
+
+
+@scenario('facility_list')
+def facility_list(client, data, rng):
+    response = client.get('/api/facilities/', {'search': rng.choice(KINDS)})
+    return [(response.status_code, response.status_code == 200, False)]
+
+
+@scenario('availability_listing')
+def availability_listing(client, data, rng):
+    court = rng.choice(data.courts)
+    tz = ZoneInfo(court.facility.timezone)
+    span = (court.last_slot - court.first_slot).days
+    day = court.first_slot.astimezone(tz).date() + timedelta(days=rng.randint(0, max(0, span)))
+    client.force_authenticate(user=rng.choice(data.users))
+    response = client.get(f'/api/facilities/courts/{court.pk}/availability/', {
+        'start_date': f'{day.isoformat()}T00:00:00',
+        'end_date': f'{(day + timedelta(days=1)).isoformat()}T00:00:00',
+    })
+    return [(response.status_code, response.status_code == 200, False)]
+
+
+@scenario('reservation_burst')
+def reservation_burst(client, data, rng):
+    if not data.hot_slots:
+        return [(0, False, False)]
+    client.force_authenticate(user=rng.choice(data.users))
+    response = client.post(
+        '/api/bookings/v1/reservations/',
+        {'availability_ids': [rng.choice(data.hot_slots)]},
+        format='json'
+    )
+    if response.status_code != 201:
+        return [(response.status_code, False, response.status_code in (400, 409))]
+
+    released = client.delete(f"/api/bookings/v1/reservations/{response.data['reservation_id']}/")
+    return [(201, True, False), (released.status_code, released.status_code in (200, 204), False)]
+
+
+@scenario('checkout')
+def checkout(client, data, rng):
+    slot = data.next_open_slot()
+    if slot is None:
+        return [(0, False, False)]
+    client.force_authenticate(user=data.next_checkout_user())
+    reserved = client.post('/api/bookings/v1/reservations/', {'availability_ids': [slot]}, format='json')
+    if reserved.status_code != 201:
+        return [(reserved.status_code, False, reserved.status_code == 409)]
+
+    booked = client.post('/api/bookings/v1/', {'availability_id': slot}, format='json')
+    return [(201, True, False), (booked.status_code, booked.status_code == 201, booked.status_code == 409)]
+
+
+@scenario('payment_checkout')
+def payment_checkout(client, data, rng):
+    slot = data.next_open_slot()
+    if slot is None:
+        return [(0, False, False)]
+    client.force_authenticate(user=data.next_checkout_user())
+    reserved = client.post('/api/bookings/v1/reservations/', {'availability_ids': [slot]}, format='json')
+    if reserved.status_code != 201:
+        return [(reserved.status_code, False, reserved.status_code == 409)]
+    reservation_id = reserved.data['reservation_id']
+
+    order = client.post('/api/payments/create/', {
+        'reservation_id': reservation_id,
+        'amount': '50.00',
+        'provider': 'fake',
+    }, format='json')
+    requests = [(201, True, False), (order.status_code, order.status_code == 200, False)]
+    if order.status_code != 200:
+        return requests
+
+    queued = client.post('/api/payments/capture/', {
+        'order_id': order.data['order_id'],
+        'payer_id': 'FAKEPAYER',
+        'provider': 'fake',
+        'reservation_id': reservation_id,
+    }, format='json')
+    requests.append((queued.status_code, queued.status_code == 202, False))
+    if queued.status_code != 202:
+        return requests
+
+    # Poll like the frontend does, but without its back-off so the capture
+    # pipeline rather than the client's sleep dominates the latency
+    deadline = time.perf_counter() + 30
+    while True:
+        polled = client.get(queued.data['status_url'])
+        if polled.status_code != 200 or 'poll_after_ms' not in polled.data or time.perf_counter() > deadline:
+            break
+        time.sleep(0.005)
+    requests.append((polled.status_code, polled.data.get('status') == 'completed', False))
+    return requests
+
+
+@scenario('manager_overview')
+def manager_overview(client, data, rng):
+    # Cold: the manager's cached overview is dropped so it is rebuilt
+    manager = rng.choice(data.managers)
+    ManagerOverviewService.invalidate(manager.pk)
+    return request_manager_overview(client, manager)
+
+
+@scenario('manager_overview_cached')
+def manager_overview_cached(client, data, rng):
+    return request_manager_overview(client, rng.choice(data.managers))
+
+
+def request_manager_overview(client, manager):
+    client.force_authenticate(user=manager.user)
+    response = client.get('/api/manager/overview/')
+    return [(response.status_code, response.status_code == 200, False)]
+
+
+@scenario('admin_dashboard')
+def admin_dashboard(client, data, rng):
+    # Cold: the cached overview is dropped so the aggregates are recomputed
+    cache.delete(DASHBOARD_OVERVIEW_CACHE_KEY)
+    return admin_dashboard_cached(client, data, rng)
+
+
+@scenario('admin_dashboard_cached')
+def admin_dashboard_cached(client, data, rng):
+    client.force_authenticate(user=data.admin)
+    response = client.get('/api/admin/dashboard/overview/')
+    return [(response.status_code, response.status_code == 200, False)]
+
+
+def run_scenario(name, data, iterations, concurrency, warmup, seed):
+    """Run one scenario and return its summary dictionary."""
+    func = SCENARIOS[name]
+    counter = itertools.count()
+    lock = threading.Lock()
+    samples = []
+
+    def worker(worker_id):
+        # Server errors are counted as failed operations rather than aborting the run
+        client = APIClient(SERVER_NAME='localhost', raise_request_exception=False)
+        rng = random.Random(f'{seed}:{name}:{worker_id}')
+        results = []
+        try:
+            for _ in range(warmup):
+                func(client, data, rng)
+            while next(counter) < iterations:
+                recorder = QueryRecorder()
+                started = time.perf_counter()
+                with recorder.capture():
+                    requests = func(client, data, rng)
+                results.append(((time.perf_counter() - started) * 1000, recorder.count, requests))
+        finally:
+            connection.close()
+        with lock:
+            samples.extend(results)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in samples)
+    queries = sorted(count for _, count, _ in samples)
+    statuses = Counter()
+    successes = conflicts = 0
+    for _, _, requests in samples:
+        statuses.update(str(code) for code, _, _ in requests)
+        if all(expected for _, expected, _ in requests):
+            successes += 1
+        elif any(conflict for _, _, conflict in requests):
+            conflicts += 1
+
+    return {
+        'operations': len(samples),
+        'requests': sum(statuses.values()),
+        'successes': successes,
+        'conflicts': conflicts,
+        'failures': len(samples) - successes - conflicts,
+        'status_counts': dict(sorted(statuses.items())),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_ops': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 2) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'queries': {
+            'mean': round(statistics.mean(queries), 2) if queries else 0.0,
+            'p95': percentile(queries, 95),
+            'max': queries[-1] if queries else 0,
+        },
+    }
+
+
+def git_revision():
+    """Short commit hash of the working tree, if it is a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(name, summary):
+    """Print one scenario's summary line."""
+    latency = summary['latency_ms']
+    print(
+        f"{name:<22}{summary['throughput_ops']:>9}/s  "
+        f"p50={latency['p50']:<8} p95={latency['p95']:<8} p99={latency['p99']:<8} "
+        f"queries={summary['queries']['mean']:<6} "
+        f"ok={summary['successes']} conflict={summary['conflicts']} fail={summary['failures']}"
+    )
+
+
+def compare(before, after, max_regression):
+    """
+    Print the change per scenario between two result files.
+
+    Returns:
+        Names of scenarios whose p95 latency or mean query count grew by
+        more than max_regression percent (empty when max_regression is None)
+    """
+    print_banner(f"Comparison ({before['meta'].get('git_revision')} -> {after['meta'].get('git_revision')})")
+
+    def delta(old, new):
+        if not old:
+            return None
+        return (new - old) / old * 100
+
+    def show(value):
+        return 'n/a' if value is None else f"{value:+.1f}%"
+
+    regressions = []
+    print(f"{'scenario':<22}{'ops/s':>10}{'p95 ms':>10}{'queries':>10}")
+    for name, new in after['scenarios'].items():
+        old = before['scenarios'].get(name)
+        if old is None:
+            print(f"{name:<22}{'new':>10}")
+            continue
+        throughput = delta(old['throughput_ops'], new['throughput_ops'])
+        p95 = delta(old['latency_ms']['p95'], new['latency_ms']['p95'])
+        queries = delta(old['queries']['mean'], new['queries']['mean'])
+        print(f"{name:<22}{show(throughput):>10}{show(p95):>10}{show(queries):>10}")
+        if max_regression is not None and any(
+            change is not None and change > max_regression for change in (p95, queries)
+        ):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark CourtConnect endpoints against a seeded dataset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/benchmark_data.py --scale small --reset --today 2026-01-05
+  python scripts/benchmark.py --output before.json
+  git checkout feature && python scripts/benchmark_data.py --scale small --reset --today 2026-01-05
+  python scripts/benchmark.py --output after.json --compare before.json --max-regression 10
+        """
+    )
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable; default: all)')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed operations per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent workers')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed operations per worker first')
+    parser.add_argument('--sample-size', type=int, default=500,
+                        help='Users, managers and courts sampled from the dataset')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for scenario choices')
+    parser.add_argument('--output', '-o', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare against a previous JSON result file')
+    parser.add_argument('--max-regression', type=float,
+                        help='With --compare, exit 1 if p95 latency or queries grow by more than this percent')
+
+    args = parser.parse_args()
+    if args.iterations < 1 or args.concurrency < 1:
+        parser.error('--iterations and --concurrency must be at least 1')
+
+    print_banner("CourtConnect Endpoint Benchmark")
+    print(f"Database: {connection.vendor} ({connection.settings_dict['NAME']})")
+
+    data = Dataset(args.sample_size, args.seed)
+    print(f"Sampled:  {data.counts()}\n")
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'database': connection.vendor,
+            'iterations': args.iterations,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'sample': data.counts(),
+        },
+        'scenarios': {},
+    }
+    for name in args.scenario or SCENARIOS:
+        summary = run_scenario(name, data, args.iterations, args.concurrency, args.warmup, args.seed)
+        results['scenarios'][name] = summary
+        print_summary(name, summary)
+    connections.close_all()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.compare:
+        compare_path = Path(args.compare)
+        if not compare_path.exists():
+            print(f"\n✗ Comparison file not found: {compare_path}")
+            sys.exit(1)
+        regressions = compare(json.loads(compare_path.read_text()), results, args.max_regression)
+        if regressions:
+            print(f"\n✗ Regressed by more than {args.max_regression}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,488 @@
+#!/usr/bin/env python
+"""
+Deterministic benchmark dataset generator for CourtConnect.
+
+Seeds users, managers, facilities, courts, hourly availability slots and
+completed bookings (with payments and some reviews) at a chosen scale. The
+same --seed and scale always produce the same rows, so benchmark runs on
+different commits see identical data. On PostgreSQL rows are streamed with
+COPY; other databases fall back to bulk_create.
+
+Benchmark rows are recognisable by their email domain (BENCH_EMAIL_DOMAIN)
+and are meant for a dedicated database: --reset deletes the previous
+benchmark dataset before seeding a new one.
+
+Scales (users / facilities / courts / availability slots):
+    tiny      200 / 20 / 100 / 10,000           (seconds, also works on SQLite)
+    small     5,000 / 500 / 5,000 / 500,000
+    medium    20,000 / 2,000 / 40,000 / 5,000,000
+    full      100,000 / 10,000 / 200,000 / 50,000,000
+
+Usage:
+    python scripts/benchmark_data.py --scale tiny
+    python scripts/benchmark_data.py --scale full --reset
+    python scripts/benchmark_data.py --scale small --users 20000 --seed 7
+    python scripts/benchmark_data.py --scale small --reset --today 2026-01-05   # Reproducible
+    python scripts/benchmark_data.py --help                 # Show help
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+# Add the backend directory to Python path
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Set up Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from app.bookings.models import Booking, BookingStatus
+from app.facilities.models import Availability, Court, Facility, FacilityReview, SportType
+from app.payments.models import Payment, PaymentStatus
+from app.users.models import Manager, User
+
+
+BENCH_EMAIL_DOMAIN = 'bench.courtconnect.test'
+BENCH_ADMIN_EMAIL = f'admin@{BENCH_EMAIL_DOMAIN}'
+BENCH_PASSWORD = 'bench-password'
+
+SCALES = {
+    'tiny': {'users': 200, 'facilities': 20, 'courts': 100, 'slots': 10_000},
+    'small': {'users': 5_000, 'facilities': 500, 'courts': 5_000, 'slots': 500_000},
+    'medium': {'users': 20_000, 'facilities': 2_000, 'courts': 40_000, 'slots': 5_000_000},
+    'full': {'users': 100_000, 'facilities': 10_000, 'courts': 200_000, 'slots': 50_000_000},
+}
+
+SPORTS = ['Tennis', 'Basketball', 'Badminton', 'Futsal', 'Netball', 'Volleyball', 'Squash', 'Pickleball']
+SUBURBS = ['Parramatta', 'Fitzroy', 'Fortitude Valley', 'Glenelg', 'Fremantle', 'Sandy Bay', 'Nightcliff',
+           'Bondi', 'Carlton', 'Newtown', 'Toowong', 'Norwood', 'Subiaco', 'Battery Point']
+KINDS = ['Sports Centre', 'Leisure Centre', 'Recreation Hub', 'Courts', 'Arena', 'Athletic Club']
+
+OPENING_HOUR = 6
+CLOSING_HOUR = 22
+HOURS_PER_DAY = CLOSING_HOUR - OPENING_HOUR
+
+
+def print_banner(text):
+    """Print a formatted banner."""
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+
+class BulkWriter:
+    """Insert rows with bulk_create, committing every chunk."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+
+    def write(self, model, attnames, rows):
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(model(**dict(zip(attnames, row))))
+            if len(batch) >= self.chunk_size:
+                written += self._flush(model, batch)
+                batch = []
+        if batch:
+            written += self._flush(model, batch)
+        return written
+
+    def _flush(self, model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=2000)
+        return len(batch)
+
+
+class CopyWriter(BulkWriter):
+    """Stream rows into PostgreSQL with COPY ... FROM STDIN in CSV chunks."""
+
+    def write(self, model, attnames, rows):
+        columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in attnames)
+        sql = f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+        written = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= self.chunk_size:
+                written += self._copy(sql, buffer, pending)
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                pending = 0
+        if pending:
+            written += self._copy(sql, buffer, pending)
+        return written
+
+    def _copy(self, sql, buffer, count):
+        buffer.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.copy_expert(sql, buffer)
+        return count
+
+
+class DatasetGenerator:
+    """
+    Build the benchmark dataset table by table with explicit primary keys.
+
+    Keys are allocated after the current maximum of each table, so foreign
+    keys can be computed without reading rows back, and sequences are reset
+    afterwards.
+    """
+
+    def __init__(self, counts, seed, booking_rate, review_rate, past_fraction, writer, today):
+        self.counts = counts
+        self.seed = seed
+        self.booking_rate = booking_rate
+        self.review_rate = review_rate
+        self.past_fraction = past_fraction
+        self.writer = writer
+        # Every timestamp derives from the anchor day, not the wall clock
+        self.now = datetime.combine(today, dt_time(0), ZoneInfo('UTC'))
+
+        self.courts_per_facility = max(1, counts['courts'] // counts['facilities'])
+        self.slots_per_court = max(1, counts['slots'] // (self.courts_per_facility * counts['facilities']))
+        self.days = math.ceil(self.slots_per_court / HOURS_PER_DAY)
+        self.first_day = today - timedelta(days=math.floor(self.days * past_fraction))
+        self.managers = max(1, counts['facilities'] // 10)
+        self.summary = {}
+
+    def rng(self, *scope):
+        """Independent deterministic stream per table/entity."""
+        return random.Random(f"{self.seed}:{':'.join(str(part) for part in scope)}")
+
+    def _next_id(self, model):
+        return (model.objects.aggregate(last=Max(model._meta.pk.attname))['last'] or 0) + 1
+
+    def _write(self, label, model, attnames, rows):
+        started = time.perf_counter()
+        written = self.writer.write(model, attnames, rows)
+        elapsed = time.perf_counter() - started
+        self.summary[label] = written
+        rate = written / elapsed if elapsed else 0
+        print(f"  {label:<14}{written:>12,} rows  {elapsed:>8.1f}s  {rate:>12,.0f} rows/s")
+
+    def run(self):
+        sports = [SportType.objects.get_or_create(sport_name=name)[0].pk for name in SPORTS]
+        completed_booking = BookingStatus.objects.get_or_create(status_name='completed')[0].pk
+        completed_payment = PaymentStatus.objects.get_or_create(status_name='completed')[0].pk
+
+        user_base = self._next_id(User)
+        facility_base = self._next_id(Facility)
+        court_base = self._next_id(Court)
+        slot_base = self._next_id(Availability)
+        booking_base = self._next_id(Booking)
+        payment_base = self._next_id(Payment)
+        review_base = self._next_id(FacilityReview)
+
+        self._write('users', User, *self._users(user_base))
+        self._write('managers', Manager, *self._managers(user_base))
+        self._write('facilities', Facility, *self._facilities(user_base, facility_base))
+        self._write('courts', Court, *self._courts(facility_base, court_base, sports))
+
+        def schedule():
+            return self._schedule(user_base, facility_base, court_base, slot_base)
+
+        self._write('availability', Availability, *self._slots(schedule()))
+        self._write('bookings', Booking, *self._bookings(schedule(), booking_base, completed_booking))
+        self._write('payments', Payment, *self._payments(schedule(), booking_base, payment_base, completed_payment))
+        self._write('reviews', FacilityReview, *self._reviews(schedule(), booking_base, review_base))
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Facility, Court, Availability, Booking, Payment, FacilityReview]
+            ):
+                cursor.execute(sql)
+            if connection.vendor == 'postgresql':
+                for model in (User, Manager, Facility, Court, Availability, Booking, Payment, FacilityReview):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+        return self.summary
+
+    def _users(self, base):
+        password = make_password(BENCH_PASSWORD)
+        now = self.now
+
+        def rows():
+            yield (base, BENCH_ADMIN_EMAIL, 'Benchmark Admin', password, 'verified', True, True, True, now, now, now)
+            rng = self.rng('users')
+            for index in range(1, self.counts['users']):
+                created = now - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86399))
+                email = f'manager{index}@{BENCH_EMAIL_DOMAIN}' if index <= self.managers else f'user{index}@{BENCH_EMAIL_DOMAIN}'
+                yield (base + index, email, f'Bench User {index}', password, 'verified', False, False, True,
+                       created, created, created)
+
+        return ['user_id', 'email', 'name', 'password', 'verification_status', 'is_admin', 'is_staff',
+                'is_active', 'created_at', 'updated_at', 'date_joined'], rows()
+
+    def _managers(self, user_base):
+        now = self.now
+        rows = ((user_base + index, 'paypal', f'bench-payout-{index}', 'verified', False, now, now)
+                for index in range(1, self.managers + 1))
+        return ['user_id', 'payment_provider', 'payment_account_id', 'payout_verification_status',
+                'is_suspended', 'created_at', 'updated_at'], rows
+
+    def _manager_for(self, user_base, facility_index):
+        return user_base + 1 + facility_index % self.managers
+
+    def _timezone_for(self, facility_index):
+        choices = Facility.TIMEZONE_CHOICES
+        return choices[facility_index % len(choices)][0]
+
+    def _facilities(self, user_base, base):
+        now = self.now
+
+        def rows():
+            rng = self.rng('facilities')
+            for index in range(self.counts['facilities']):
+                suburb = rng.choice(SUBURBS)
+                name = f'{suburb} {rng.choice(KINDS)} {index}'
+                yield (base + index, self._manager_for(user_base, index), name,
+                       f'{rng.randint(1, 999)} {suburb} Road', self._timezone_for(index),
+                       Decimal(f'{rng.uniform(-43, -12):.6f}'), Decimal(f'{rng.uniform(115, 153):.6f}'),
+                       self.courts_per_facility, Decimal('0.1000'), 'approved', now, True, False, now, now)
+
+        return ['facility_id', 'manager_id', 'facility_name', 'address', 'timezone', 'latitude', 'longitude',
+                'court_count', 'commission_rate', 'approval_status', 'approved_at', 'is_active',
+                'is_suspended', 'created_at', 'updated_at'], rows()
+
+    def _court_rate(self, court_id):
+        return Decimal(20 + (court_id * 7) % 41)
+
+    def _courts(self, facility_base, base, sports):
+        now = self.now
+
+        def rows():
+            rng = self.rng('courts')
+            for facility_index in range(self.counts['facilities']):
+                for number in range(self.courts_per_facility):
+                    court_id = base + facility_index * self.courts_per_facility + number
+                    yield (court_id, facility_base + facility_index, f'Court {number + 1}', rng.choice(sports),
+                           self._court_rate(court_id), True, dt_time(OPENING_HOUR), dt_time(CLOSING_HOUR),
+                           self.first_day, now, now)
+
+        return ['court_id', 'facility_id', 'name', 'sport_type_id', 'hourly_rate', 'is_active', 'opening_time',
+                'closing_time', 'availability_start_date', 'created_at', 'updated_at'], rows()
+
+    def _schedule(self, user_base, facility_base, court_base, slot_base):
+        """
+        Walk every slot in id order: hourly from OPENING_HOUR to CLOSING_HOUR
+        local time per court, starting at first_day.
+
+        Yields (slot_id, court_id, facility_id, start, end, user_id) where
+        user_id is the booker for the past slots picked at booking_rate and
+        None otherwise. Each court draws from its own seeded stream, so the
+        walk can be repeated for the slot, booking, payment and review tables
+        without holding tens of millions of bookings in memory.
+        """
+        day_starts = {}
+        first_user = user_base + self.managers + 1
+        last_user = user_base + self.counts['users'] - 1
+        can_book = last_user >= first_user
+        now = self.now
+
+        slot_id = slot_base
+        for facility_index in range(self.counts['facilities']):
+            tz_name = self._timezone_for(facility_index)
+            for number in range(self.courts_per_facility):
+                court_id = court_base + facility_index * self.courts_per_facility + number
+                rng = self.rng('slots', court_id)
+                for slot in range(self.slots_per_court):
+                    day = slot // HOURS_PER_DAY
+                    if (tz_name, day) not in day_starts:
+                        local = datetime.combine(self.first_day + timedelta(days=day), dt_time(OPENING_HOUR), ZoneInfo(tz_name))
+                        day_starts[tz_name, day] = local.astimezone(ZoneInfo('UTC'))
+                    start = day_starts[tz_name, day] + timedelta(hours=slot % HOURS_PER_DAY)
+                    end = start + timedelta(hours=1)
+
+                    user_id = None
+                    if can_book and end <= now and rng.random() < self.booking_rate:
+                        user_id = rng.randint(first_user, last_user)
+                    yield slot_id, court_id, facility_base + facility_index, start, end, user_id
+                    slot_id += 1
+
+    def _booked(self, schedule):
+        """The booked slots of a schedule walk, numbered from 0 in booking id order."""
+        return enumerate(slot for slot in schedule if slot[5] is not None)
+
+    def _slots(self, schedule):
+        rows = ((slot_id, court_id, start, end, user_id is None)
+                for slot_id, court_id, _, start, end, user_id in schedule)
+        return ['availability_id', 'court_id', 'start_time', 'end_time', 'is_available'], rows
+
+    def _bookings(self, schedule, base, status_id):
+        commission_rate = Decimal('0.10')
+
+        def rows():
+            for index, (slot_id, court_id, _, start, end, user_id) in self._booked(schedule):
+                rate = self._court_rate(court_id)
+                yield (base + index, court_id, user_id, slot_id, start, end, rate, commission_rate, rate,
+                       (rate * commission_rate).quantize(Decimal('0.01')), status_id, end, end)
+
+        return ['booking_id', 'court_id', 'user_id', 'availability_id', 'start_time', 'end_time',
+                'hourly_rate_snapshot', 'commission_rate_snapshot', 'total_amount', 'commission_amount',
+                'status_id', 'created_at', 'updated_at'], rows()
+
+    def _payments(self, schedule, booking_base, base, status_id):
+        def rows():
+            for index, (_, court_id, _, start, _, _) in self._booked(schedule):
+                paid_at = start - timedelta(days=1)
+                yield (base + index, booking_base + index, 'paypal', f'BENCH-{self.seed}-{base + index}',
+                       f'bench-{self.seed}-{base + index}', self._court_rate(court_id), 'AUD', status_id,
+                       paid_at, paid_at)
+
+        return ['payment_id', 'booking_id', 'provider', 'provider_payment_id', 'idempotency_key', 'amount',
+                'currency', 'status_id', 'created_at', 'updated_at'], rows()
+
+    def _reviews(self, schedule, booking_base, base):
+        def rows():
+            rng = self.rng('reviews')
+            review_id = base
+            for index, (_, _, facility_id, _, end, user_id) in self._booked(schedule):
+                if rng.random() < self.review_rate:
+                    yield (review_id, facility_id, user_id, booking_base + index, rng.randint(1, 5), end, end)
+                    review_id += 1
+
+        return ['review_id', 'facility_id', 'user_id', 'booking_id', 'rating', 'created_at', 'updated_at'], rows()
+
+
+def _delete(model, queryset):
+    """DELETE rows matching a queryset in one statement, bypassing signals and cascades."""
+    sql, params = queryset.values(model._meta.pk.attname).query.sql_with_params()
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({sql})", params)
+        return cursor.rowcount
+
+
+def reset_dataset():
+    """
+    Delete every row belonging to the benchmark users, children first.
+
+    Uses set-based DELETEs rather than Model.delete(), which would load and
+    signal each of up to 50M slots.
+    """
+    users = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+    facilities = Facility.objects.filter(manager__user__in=users)
+    with transaction.atomic():
+        _delete(FacilityReview, FacilityReview.objects.filter(facility__in=facilities))
+        _delete(Payment, Payment.objects.filter(booking__court__facility__in=facilities))
+        _delete(Booking, Booking.objects.filter(court__facility__in=facilities))
+        _delete(Availability, Availability.objects.filter(court__facility__in=facilities))
+        _delete(Court, Court.objects.filter(facility__in=facilities))
+        _delete(Facility, facilities)
+        _delete(Manager, Manager.objects.filter(user__in=users))
+        _delete(User, users)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Seed a deterministic CourtConnect benchmark dataset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/benchmark_data.py --scale tiny
+  python scripts/benchmark_data.py --scale full --reset --manifest dataset.json
+        """
+    )
+    parser.add_argument('--scale', choices=sorted(SCALES), default='tiny', help='Dataset size preset')
+    parser.add_argument('--users', type=int, help='Override the number of users')
+    parser.add_argument('--facilities', type=int, help='Override the number of facilities')
+    parser.add_argument('--courts', type=int, help='Override the total number of courts')
+    parser.add_argument('--slots', type=int, help='Override the total number of availability slots')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+    parser.add_argument('--booking-rate', type=float, default=0.3, help='Share of past slots that are booked')
+    parser.add_argument('--review-rate', type=float, default=0.1, help='Share of bookings with a review')
+    parser.add_argument('--past-fraction', type=float, default=0.5,
+                        help='Share of each court\'s schedule that lies in the past')
+    parser.add_argument('--today', type=date.fromisoformat,
+                        help='Anchor date (YYYY-MM-DD) for the schedule; pin it to reproduce a dataset exactly')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='Rows per COPY/bulk insert transaction')
+    parser.add_argument('--reset', action='store_true', help='Delete the previous benchmark dataset first')
+    parser.add_argument('--skip-refresh', action='store_true',
+                        help='Do not rebuild the analytics rollups and facility snapshots afterwards')
+    parser.add_argument('--manifest', help='Write the generated row counts to this JSON file')
+
+    args = parser.parse_args()
+
+    counts = dict(SCALES[args.scale])
+    for key in counts:
+        if getattr(args, key) is not None:
+            counts[key] = getattr(args, key)
+    if counts['users'] < 2 or min(counts['facilities'], counts['courts'], counts['slots']) < 1:
+        print("✗ Need at least 2 users and one facility, court and slot")
+        sys.exit(1)
+
+    print_banner("CourtConnect Benchmark Dataset")
+    print(f"Database: {connection.vendor} ({connection.settings_dict['NAME']})")
+    print(f"Scale:    {args.scale} {counts} seed={args.seed}\n")
+
+    if User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').exists():
+        if not args.reset:
+            print("✗ A benchmark dataset already exists; pass --reset to replace it")
+            sys.exit(1)
+        print("Removing previous benchmark dataset...")
+        reset_dataset()
+
+    writer_class = CopyWriter if connection.vendor == 'postgresql' else BulkWriter
+    generator = DatasetGenerator(
+        counts, args.seed, args.booking_rate, args.review_rate, args.past_fraction,
+        writer_class(args.chunk_size), args.today or timezone.localdate(),
+    )
+
+    started = time.perf_counter()
+    summary = generator.run()
+    print(f"\n✓ Seeded in {time.perf_counter() - started:.1f}s")
+
+    if args.skip_refresh:
+        pass
+    elif connection.vendor != 'postgresql':
+        print("Skipping the analytics rollups (they need PostgreSQL)")
+    else:
+        print("Refreshing analytics rollups...")
+        call_command('refresh_daily_metrics', '--full')
+        call_command('refresh_facility_snapshots', '--all')
+
+    if args.manifest:
+        manifest = {
+            'scale': args.scale,
+            'seed': args.seed,
+            'counts': counts,
+            'rows': summary,
+            'today': generator.now.date().isoformat(),
+            'first_day': generator.first_day.isoformat(),
+            'days': generator.days,
+            'generated_at': datetime.now().isoformat(),
+        }
+        Path(args.manifest).write_text(json.dumps(manifest, indent=2))
+        print(f"✓ Manifest written to {args.manifest}")
+
+    print(f"\nLog in as {BENCH_ADMIN_EMAIL} / {BENCH_PASSWORD}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Login throughput benchmark for CourtConnect.
+
+Fires concurrent POST /api/auth/login/ requests at a running server and
+reports logins/sec plus p50/p95/p99 latency. Results can be written to JSON
+and compared against an earlier run to check a change to the password hashing
+work factor or the login pipeline.
+
+Usage:
+    python scripts/login_load_test.py --email user@example.com --password secret
+    python scripts/login_load_test.py ... --requests 200 --concurrency 10
+    python scripts/login_load_test.py ... --output after.json --compare before.json
+    python scripts/login_load_test.py --help                 # Show help
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+
+def print_banner(text):
+    """Print a formatted banner."""
+    print("\n" + "=" * 70)
+    print(f"  {text}")
+    print("=" * 70 + "\n")
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def attempt_login(url, email, password, timeout):
+    """Perform a single login and return (status_code, latency_ms, server_timing)."""
+    started = time.perf_counter()
+    try:
+        response = requests.post(
+            url,
+            json={'email': email, 'password': password},
+            timeout=timeout
+        )
+        status_code = response.status_code
+        server_timing = response.headers.get('Server-Timing', '')
+    except requests.RequestException:
+        status_code = 0
+        server_timing = ''
+    return status_code, (time.perf_counter() - started) * 1000, server_timing
+
+
+def run_benchmark(url, email, password, total, concurrency, timeout):
+    """Run the benchmark and return a summary dictionary."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: attempt_login(url, email, password, timeout),
+            range(total)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency, _ in results)
+    successes = sum(1 for status_code, _, _ in results if status_code == 200)
+
+    return {
+        'url': url,
+        'timestamp': datetime.now().isoformat(),
+        'requests': total,
+        'concurrency': concurrency,
+        'successes': successes,
+        'failures': total - successes,
+        'elapsed_seconds': round(elapsed, 3),
+        'logins_per_second': round(successes / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies), 2) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+        },
+        'sample_server_timing': next((timing for _, _, timing in results if timing), ''),
+    }
+
+
+def print_summary(summary):
+    """Print a benchmark summary."""
+    latency = summary['latency_ms']
+    print(f"Requests:      {summary['requests']} ({summary['concurrency']} concurrent)")
+    print(f"Successes:     {summary['successes']}")
+    print(f"Failures:      {summary['failures']}")
+    print(f"Throughput:    {summary['logins_per_second']} logins/sec")
+    print(f"Latency (ms):  p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}")
+    if summary['sample_server_timing']:
+        print(f"Server-Timing: {summary['sample_server_timing']}")
+
+
+def print_comparison(before, after):
+    """Print the change between two benchmark summaries."""
+    print_banner("Comparison")
+
+    def delta(old, new):
+        if not old:
+            return 'n/a'
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    rows = [('logins/sec', before['logins_per_second'], after['logins_per_second'])]
+    for key in ('p50', 'p95', 'p99'):
+        rows.append((f'{key} ms', before['latency_ms'][key], after['latency_ms'][key]))
+
+    print(f"{'metric':<12}{'before':>12}{'after':>12}{'change':>10}")
+    for name, old, new in rows:
+        print(f"{name:<12}{old:>12}{new:>12}{delta(old, new):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark CourtConnect login throughput and latency',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/login_load_test.py --email a@b.com --password pw
+  python scripts/login_load_test.py --email a@b.com --password pw --output before.json
+  python scripts/login_load_test.py --email a@b.com --password pw --compare before.json
+        """
+    )
+    parser.add_argument('--url', default='http://localhost:8000/api/auth/login/',
+                        help='Login endpoint URL')
+    parser.add_argument('--email', required=True, help='Email of an existing account')
+    parser.add_argument('--password', required=True, help='Password for the account')
+    parser.add_argument('--requests', type=int, default=100, help='Total login attempts')
+    parser.add_argument('--concurrency', type=int, default=5, help='Concurrent workers')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--output', '-o', help='Write the summary to this JSON file')
+    parser.add_argument('--compare', help='Compare against a previous JSON summary')
+
+    args = parser.parse_args()
+
+    print_banner("CourtConnect Login Load Test")
+    print(f"Target: {args.url}\n")
+
+    summary = run_benchmark(
+        args.url, args.email, args.password,
+        args.requests, args.concurrency, args.timeout
+    )
+    print_summary(summary)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2))
+        print(f"\n✓ Summary written to {args.output}")
+
+    if args.compare:
+        compare_path = Path(args.compare)
+        if not compare_path.exists():
+            print(f"\n✗ Comparison file not found: {compare_path}")
+            sys.exit(1)
+        print_comparison(json.loads(compare_path.read_text()), summary)
+
+    if summary['failures']:
+        print("\n⚠️  Some logins failed - note that repeated failures trigger the lockout")
+
+
+if __name__ == '__main__':
+    main()
@@ -44,17 +44,51 @@ export async function createPaymentOrder(orderData) {
   }
 }
 
+const CAPTURE_FINAL_STATUSES = ['completed', 'failed', 'refunded'];
+const CAPTURE_TIMEOUT_MS = 120000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Get the status of a queued capture
+ * @param {number} captureId - Capture ID returned by capturePayment
+ * @returns {Promise<Object>} Capture status (status, booking_id, payment_id, ...)
+ */
+export async function getCaptureStatus(captureId) {
+  const response = await api.get(`/payments/capture/${captureId}/`);
+  return response.data;
+}
+
 /**
  * Capture a payment after user approval
+ * The backend queues the capture; this polls its status until it is final.
  * @param {Object} captureData - Capture data
  * @param {string} captureData.order_id - Provider's order ID
  * @param {string} captureData.payer_id - Payer ID from provider
  * @param {string} captureData.provider - Payment provider
- * @returns {Promise<Object>} Payment details
+ * @param {number} captureData.reservation_id - Reservation being paid for
+ * @returns {Promise<Object>} Completed capture (booking_id, payment_id, amount, currency, status)
  */
 export async function capturePayment(captureData) {
   const response = await api.post('/payments/capture/', captureData);
-  return response.data;
+  let capture = response.data;
+  const deadline = Date.now() + CAPTURE_TIMEOUT_MS;
+
+  while (!CAPTURE_FINAL_STATUSES.includes(capture.status)) {
+    if (Date.now() > deadline) {
+      throw new Error('Payment is still processing. Check My Bookings shortly.');
+    }
+    await sleep(capture.poll_after_ms ?? 1000);
+    capture = await getCaptureStatus(capture.capture_id);
+  }
+
+  if (capture.status !== 'completed') {
+    // Reject like a failed request so callers surface the backend message
+    const e = new Error(capture.error || 'Payment capture failed');
+    e.response = { status: 200, data: { error: capture.error || 'Payment capture failed' } };
+    throw e;
+  }
+  return capture;
 }
 
 /**